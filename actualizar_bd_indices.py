@@ -0,0 +1,72 @@
+"""
+Script para agregar a la base de datos existente los índices compuestos
+usados por las consultas de período (ausencias, deudas y pagos) y por el
+listado paginado de personal
+"""
+
+import sqlite3
+import sys
+
+# (nombre, tabla, columnas): deben coincidir con los db.Index de models.py
+INDICES = [
+    ('ix_ausencias_empleado_fecha', 'ausencias', ('empleado_id', 'fecha')),
+    ('ix_prestamos_empleado_activo', 'prestamos', ('empleado_id', 'activo')),
+    ('ix_adelantos_empleado_periodo', 'adelantos', ('empleado_id', 'año_aplicar', 'mes_aplicar', 'aplicado')),
+    ('ix_empleados_empresa_activo', 'empleados', ('empresa_id', 'activo')),
+    ('ix_pagos_empleado_periodo', 'pagos', ('empleado_id', 'año', 'mes')),
+    ('ix_empleados_empresa_apellidos', 'empleados', ('empresa_id', 'apellidos', 'id')),
+    ('ix_empleados_empresa_nombres', 'empleados', ('empresa_id', 'nombres')),
+    ('ix_empleados_empresa_dni', 'empleados', ('empresa_id', 'dni')),
+    ('ix_locadores_empresa_apellidos', 'locadores', ('empresa_id', 'apellidos', 'id')),
+    ('ix_locadores_empresa_nombres', 'locadores', ('empresa_id', 'nombres')),
+    ('ix_locadores_empresa_dni', 'locadores', ('empresa_id', 'dni')),
+]
+
+def columnas_tabla(cursor, tabla):
+    """Retorna el conjunto de columnas de la tabla (vacío si no existe)"""
+    cursor.execute(f"PRAGMA table_info({tabla})")
+    return {fila[1] for fila in cursor.fetchall()}
+
+def indice_existe(cursor, nombre):
+    """Indica si el índice ya existe"""
+    cursor.execute("SELECT name FROM sqlite_master WHERE type='index' AND name=?", (nombre,))
+    return cursor.fetchone() is not None
+
+def actualizar_base_datos(ruta_bd='sispla.db'):
+    """Crea los índices compuestos que falten y actualiza las estadísticas"""
+    print("Actualizando índices de la base de datos...")
+
+    try:
+        conn = sqlite3.connect(ruta_bd)
+        cursor = conn.cursor()
+
+        for nombre, tabla, columnas in INDICES:
+            if indice_existe(cursor, nombre):
+                print(f"✓ Índice {nombre} ya existe")
+                continue
+            faltantes = set(columnas) - columnas_tabla(cursor, tabla)
+            if faltantes:
+                # Esquemas de otras versiones del sistema pueden no tener todas las columnas
+                print(f"⚠️ Índice {nombre} omitido: faltan columnas {', '.join(sorted(faltantes))} en {tabla}")
+                continue
+            cursor.execute(f"CREATE INDEX {nombre} ON {tabla} ({', '.join(columnas)})")
+            print(f"✓ Índice {nombre} creado en {tabla}")
+
+        # Estadísticas para que el planificador elija los nuevos índices
+        cursor.execute("ANALYZE")
+
+        conn.commit()
+        conn.close()
+
+        print("✓ Base de datos actualizada exitosamente")
+        return True
+
+    except Exception as e:
+        print(f"❌ Error actualizando base de datos: {e}")
+        return False
+
+if __name__ == '__main__':
+    ruta = sys.argv[1] if len(sys.argv) > 1 else 'sispla.db'
+    if not actualizar_base_datos(ruta):
+        print("La actualización falló. Revise los errores anteriores.")
+        sys.exit(1)
@@ -0,0 +1,74 @@
+"""
+Script para agregar a la base de datos existente la clave única de período
+de los pagos, eliminando antes los duplicados de recálculos anteriores
+"""
+
+import sqlite3
+import sys
+
+# (nombre, tabla, columnas): deben coincidir con los db.UniqueConstraint de models.py
+CLAVES_UNICAS = [
+    ('uq_pago_periodo', 'pagos', ('empleado_id', 'mes', 'año', 'tipo_pago')),
+    ('uq_pago_locador_periodo', 'pagos_locadores', ('locador_id', 'mes', 'año')),
+]
+
+def tabla_existe(cursor, tabla):
+    """Indica si la tabla existe"""
+    cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name=?", (tabla,))
+    return cursor.fetchone() is not None
+
+def clave_existe(cursor, tabla, columnas):
+    """Indica si la tabla ya tiene un índice único exactamente sobre esas columnas"""
+    cursor.execute(f"PRAGMA index_list({tabla})")
+    for indice in cursor.fetchall():
+        if not indice[2]:
+            continue
+        cursor.execute(f"PRAGMA index_info('{indice[1]}')")
+        if {fila[2] for fila in cursor.fetchall()} == set(columnas):
+            return True
+    return False
+
+def eliminar_duplicados(cursor, tabla, columnas):
+    """Conserva por clave solo el último pago calculado (el de mayor id)"""
+    cursor.execute(f"""
+        DELETE FROM {tabla} WHERE id NOT IN (
+            SELECT MAX(id) FROM {tabla} GROUP BY {', '.join(columnas)}
+        )
+    """)
+    return cursor.rowcount
+
+def actualizar_base_datos(ruta_bd='sispla.db'):
+    """Elimina pagos duplicados y crea las claves únicas que falten"""
+    print("Actualizando claves únicas de pagos...")
+
+    try:
+        conn = sqlite3.connect(ruta_bd)
+        cursor = conn.cursor()
+
+        for nombre, tabla, columnas in CLAVES_UNICAS:
+            if not tabla_existe(cursor, tabla):
+                print(f"⚠️ Tabla {tabla} no existe, se omite")
+                continue
+            if clave_existe(cursor, tabla, columnas):
+                print(f"✓ Clave única de {tabla} ya existe")
+                continue
+            eliminados = eliminar_duplicados(cursor, tabla, columnas)
+            print(f"✓ {eliminados} pagos duplicados eliminados de {tabla}")
+            cursor.execute(f"CREATE UNIQUE INDEX {nombre} ON {tabla} ({', '.join(columnas)})")
+            print(f"✓ Clave única {nombre} creada en {tabla}")
+
+        conn.commit()
+        conn.close()
+
+        print("✓ Base de datos actualizada exitosamente")
+        return True
+
+    except Exception as e:
+        print(f"❌ Error actualizando base de datos: {e}")
+        return False
+
+if __name__ == '__main__':
+    ruta = sys.argv[1] if len(sys.argv) > 1 else 'sispla.db'
+    if not actualizar_base_datos(ruta):
+        print("La actualización falló. Revise los errores anteriores.")
+        sys.exit(1)
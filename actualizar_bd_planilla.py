@@ -0,0 +1,66 @@
+"""
+Script para actualizar la base de datos existente con el seguimiento de
+cambios usado por el recálculo incremental de planillas
+"""
+
+import sqlite3
+import sys
+
+def columna_existe(cursor, tabla, columna):
+    """Indica si la columna ya existe en la tabla"""
+    cursor.execute(f"PRAGMA table_info({tabla})")
+    return any(fila[1] == columna for fila in cursor.fetchall())
+
+def actualizar_base_datos(ruta_bd='sispla.db'):
+    """Agrega fecha_modificacion a empleados y crea la tabla planillas"""
+    print("Actualizando base de datos para recálculo incremental...")
+
+    try:
+        conn = sqlite3.connect(ruta_bd)
+        cursor = conn.cursor()
+
+        if columna_existe(cursor, 'empleados', 'fecha_modificacion'):
+            print("✓ Columna empleados.fecha_modificacion ya existe")
+        else:
+            cursor.execute("ALTER TABLE empleados ADD COLUMN fecha_modificacion DATETIME")
+            # Sin historial previo: los empleados quedan como no modificados
+            print("✓ Columna empleados.fecha_modificacion agregada")
+
+        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='planillas'")
+        if cursor.fetchone():
+            print("✓ Tabla planillas ya existe")
+        else:
+            cursor.execute('''
+                CREATE TABLE planillas (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    empresa_id INTEGER NOT NULL,
+                    mes INTEGER NOT NULL,
+                    año INTEGER NOT NULL,
+                    tipo_pago VARCHAR(20) NOT NULL DEFAULT 'mensual',
+                    total_empleados INTEGER DEFAULT 0,
+                    total_locadores INTEGER DEFAULT 0,
+                    total_ingresos NUMERIC(12, 2) DEFAULT 0,
+                    total_descuentos NUMERIC(12, 2) DEFAULT 0,
+                    total_neto NUMERIC(12, 2) DEFAULT 0,
+                    fecha_calculo DATETIME DEFAULT CURRENT_TIMESTAMP,
+                    CONSTRAINT uq_planilla_periodo UNIQUE (empresa_id, mes, año, tipo_pago),
+                    FOREIGN KEY (empresa_id) REFERENCES empresas (id)
+                )
+            ''')
+            print("✓ Tabla planillas creada")
+
+        conn.commit()
+        conn.close()
+
+        print("✓ Base de datos actualizada exitosamente")
+        return True
+
+    except Exception as e:
+        print(f"❌ Error actualizando base de datos: {e}")
+        return False
+
+if __name__ == '__main__':
+    ruta = sys.argv[1] if len(sys.argv) > 1 else 'sispla.db'
+    if not actualizar_base_datos(ruta):
+        print("La actualización falló. Revise los errores anteriores.")
+        sys.exit(1)
@@ -1,27 +1,42 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify
-from flask_sqlalchemy import SQLAlchemy
+from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, Response, stream_with_context
 from datetime import datetime, date
 import os
+import json
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'sispla_peru_2024'
 app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///sispla.db'
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
-db = SQLAlchemy(app)
+# Perfil de base de datos (SISPLA_CONFIG=production activa WAL y el pool)
+from config import aplicar_perfil_bd, registrar_pragmas_sqlite
+aplicar_perfil_bd(app)
 
-# Importar modelos después de crear db
-import models
-# Hacer que los modelos usen la instancia de db de app.py
-models.db = db
+# La instancia de db vive en models.py para evitar importaciones circulares
+from models import db
+db.init_app(app)
+registrar_pragmas_sqlite(app, db)
 from models import *
-from calculadora_planilla import calcular_planilla_completa
+from calculadora_planilla import calcular_planilla_completa, recalcular_planilla, iterar_planilla
+from paginacion import leer_filtros_personal, paginar_personal, contar_personal
+from busqueda import buscar_personal, LIMITE_BUSQUEDA
 
 @app.route('/')
 def index():
-    """Página principal del sistema"""
-    empresas = Empresa.query.all()
-    return render_template('index.html', empresas=empresas)
+    """Página principal del sistema (conteos y última planilla desde empresa_resumen)"""
+    filas = (
+        db.session.query(Empresa, EmpresaResumen)
+        .outerjoin(EmpresaResumen, EmpresaResumen.empresa_id == Empresa.id)
+        .order_by(Empresa.id)
+    )
+    empresas_con_conteos = [{
+        'empresa': empresa,
+        'empleados_activos': resumen.empleados_activos if resumen else 0,
+        'locadores_activos': resumen.locadores_activos if resumen else 0,
+        'ultima_planilla': float(resumen.ultima_planilla_neto)
+        if resumen and resumen.ultima_planilla_neto is not None else None
+    } for empresa, resumen in filas]
+    return render_template('index.html', empresas_con_conteos=empresas_con_conteos)
 
 @app.route('/empresas')
 def empresas():
@@ -51,11 +66,33 @@ def nueva_empresa():
 
 @app.route('/personal/<int:empresa_id>')
 def personal(empresa_id):
-    """Gestión de personal por empresa"""
+    """Gestión de personal por empresa
+
+    Empleados y locadores se listan por páginas (keyset sobre apellidos, id)
+    con los filtros de la URL: nombre, dni, banco, tipo_pago y activo. Los
+    totales de cada pestaña salen de un solo COUNT con los mismos filtros.
+    """
     empresa = Empresa.query.get_or_404(empresa_id)
-    empleados = Empleado.query.filter_by(empresa_id=empresa_id).all()
-    locadores = Locador.query.filter_by(empresa_id=empresa_id).all()
-    return render_template('personal.html', empresa=empresa, empleados=empleados, locadores=locadores)
+    filtros = leer_filtros_personal(request.args, activo='todos')
+    empleados, siguiente_empleados = paginar_personal(
+        Empleado, empresa_id, filtros, request.args.get('empleados_despues'))
+    locadores, siguiente_locadores = paginar_personal(
+        Locador, empresa_id, filtros, request.args.get('locadores_despues'))
+    total_empleados, total_locadores = contar_personal(empresa_id, filtros, Empleado, Locador)
+    return render_template('personal.html', empresa=empresa, empleados=empleados, locadores=locadores,
+                           filtros=filtros, siguiente_empleados=siguiente_empleados,
+                           siguiente_locadores=siguiente_locadores, total_empleados=total_empleados,
+                           total_locadores=total_locadores)
+
+@app.route('/buscar')
+def buscar():
+    """Búsqueda global de empleados y locadores por DNI, nombres o apellidos (JSON)"""
+    texto = request.args.get('q', '')
+    limite = request.args.get('limite', LIMITE_BUSQUEDA, type=int)
+    resultados = buscar_personal(db.session.connection(), texto, limite)
+    # La primera búsqueda en una base de datos crea el índice: se confirma para conservarlo
+    db.session.commit()
+    return jsonify({'consulta': texto, 'resultados': resultados})
 
 @app.route('/empleado/nuevo/<int:empresa_id>', methods=['GET', 'POST'])
 def nuevo_empleado(empresa_id):
@@ -142,6 +179,59 @@ def calcular_planilla(empresa_id):
             'error': str(e)
         })
 
+@app.route('/recalcular_planilla/<int:empresa_id>', methods=['POST'])
+def recalcular_planilla_route(empresa_id):
+    """Recalcular solo los empleados con insumos modificados desde el último cálculo"""
+    empresa = Empresa.query.get_or_404(empresa_id)
+    mes = int(request.form['mes'])
+    año = int(request.form['año'])
+    tipo_pago = request.form.get('tipo_pago', 'mensual')
+    
+    try:
+        resultado = recalcular_planilla(empresa_id, mes, año, tipo_pago)
+        return jsonify({
+            'success': True,
+            'resultado': resultado,
+            'empresa': empresa.nombre,
+            'mes': mes,
+            'año': año
+        })
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        })
+
+@app.route('/planilla_stream/<int:empresa_id>')
+def planilla_stream(empresa_id):
+    """Planilla como JSON por líneas: una fila por persona y los totales al final"""
+    Empresa.query.get_or_404(empresa_id)
+    mes = request.args.get('mes', datetime.now().month, type=int)
+    año = request.args.get('año', datetime.now().year, type=int)
+    tipo_pago = request.args.get('tipo_pago', 'mensual')
+    
+    def generar():
+        totales = None
+        for registro in iterar_planilla(empresa_id, mes, año, tipo_pago):
+            totales = registro['totales']
+            yield json.dumps({'tipo': registro['tipo'], **registro['fila']}, ensure_ascii=False) + '\n'
+        yield json.dumps({'tipo': 'totales', **(totales or {})}, ensure_ascii=False) + '\n'
+    
+    return Response(stream_with_context(generar()), mimetype='application/x-ndjson')
+
+@app.route('/calcular_planilla_anual/<int:empresa_id>', methods=['POST'])
+def calcular_planilla_anual_route(empresa_id):
+    """Recalcular los doce meses de una empresa en una sola pasada"""
+    from planilla_anual import calcular_planilla_anual
+    año = int(request.form['año'])
+
+    resumen = calcular_planilla_anual(empresa_id, año)
+    return jsonify({
+        'success': True,
+        'resumen': resumen
+    })
+
 @app.route('/ausencias/<int:empresa_id>')
 def ausencias(empresa_id):
     """Gestión de ausencias por empresa"""
@@ -169,5 +259,6 @@ def deudas(empresa_id):
 if __name__ == '__main__':
     with app.app_context():
         db.create_all()
+        asegurar_resumen_empresas()
     app.run(debug=True, host='0.0.0.0', port=5000)
 
@@ -2,13 +2,36 @@ from flask import Flask, render_template, request, redirect, url_for, flash, jso
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime, date
 import os
+from dinero import a_centimos, a_float, multiplicar, fraccion
+from config import aplicar_perfil_bd, registrar_pragmas_sqlite
+from reglas_regimen import ReglasRegimen, compilar_reglas
+from paginacion import leer_filtros_personal, paginar_personal, contar_personal
+from busqueda import buscar_personal, LIMITE_BUSQUEDA
+
+# Factores de beneficios por régimen laboral (fracciones del sueldo ajustado)
+REGLAS_REGIMEN = compilar_reglas({
+    'microempresa': {'vacaciones': (15, 360)},
+    'pequeña_empresa': {
+        'vacaciones': (15, 360), 'cts': (15, 12), 'gratificacion': (1, 2),
+        'asignacion_familiar': (10250, 102500)
+    },
+    'general': {
+        'vacaciones': (30, 360), 'cts': (1, 1), 'gratificacion': (109, 100),
+        'asignacion_familiar': (10250, 102500)
+    }
+})
+# Un régimen no registrado recibe vacaciones y CTS del régimen general
+REGLAS_OTRO_REGIMEN = ReglasRegimen('otro', vacaciones=(30, 360), cts=(1, 1))
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'sispla_peru_2024'
 app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///sispla.db'
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
+# Perfil de base de datos (SISPLA_CONFIG=production activa WAL y el pool)
+aplicar_perfil_bd(app)
 db = SQLAlchemy(app)
+registrar_pragmas_sqlite(app, db)
 
 # Modelos ultra básicos sin herencia compleja
 class Empresa(db.Model):
@@ -25,6 +48,12 @@ class Empresa(db.Model):
 
 class Empleado(db.Model):
     __tablename__ = 'empleados'
+    # Listado de personal: orden (apellidos, id) y filtros por nombre y DNI
+    __table_args__ = (
+        db.Index('ix_empleados_empresa_apellidos', 'empresa_id', 'apellidos', 'id'),
+        db.Index('ix_empleados_empresa_nombres', 'empresa_id', 'nombres'),
+        db.Index('ix_empleados_empresa_dni', 'empresa_id', 'dni'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     empresa_id = db.Column(db.Integer, db.ForeignKey('empresas.id'), nullable=False)
     nombres = db.Column(db.String(100), nullable=False)
@@ -46,6 +75,12 @@ class Empleado(db.Model):
 
 class Locador(db.Model):
     __tablename__ = 'locadores'
+    # Listado de personal: orden (apellidos, id) y filtros por nombre y DNI
+    __table_args__ = (
+        db.Index('ix_locadores_empresa_apellidos', 'empresa_id', 'apellidos', 'id'),
+        db.Index('ix_locadores_empresa_nombres', 'empresa_id', 'nombres'),
+        db.Index('ix_locadores_empresa_dni', 'empresa_id', 'dni'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     empresa_id = db.Column(db.Integer, db.ForeignKey('empresas.id'), nullable=False)
     nombres = db.Column(db.String(100), nullable=False)
@@ -108,25 +143,35 @@ class Adelanto(db.Model):
     # Relación con Empleado
     empleado = db.relationship('Empleado', backref='adelantos')
 
+def rango_mes(mes, año):
+    """Retorna el rango [inicio, fin) de fechas de un mes (filtro que usa los índices)"""
+    inicio = date(año, mes, 1)
+    fin = date(año + 1, 1, 1) if mes == 12 else date(año, mes + 1, 1)
+    return inicio, fin
+
 # Rutas principales
 @app.route('/')
 def index():
     """Página principal del sistema"""
-    empresas = Empresa.query.all()
-    
-    # Calcular conteos de empleados y locadores activos por empresa
-    empresas_con_conteos = []
-    for empresa in empresas:
-        empleados_activos = Empleado.query.filter_by(empresa_id=empresa.id, activo=True).count()
-        locadores_activos = Locador.query.filter_by(empresa_id=empresa.id, activo=True).count()
-        
-        empresas_con_conteos.append({
-            'empresa': empresa,
-            'empleados_activos': empleados_activos,
-            'locadores_activos': locadores_activos
-        })
+    return render_template('index.html', empresas_con_conteos=resumen_empresas())
+
+def resumen_empresas():
+    """Empresas con sus empleados y locadores activos, en una sola consulta"""
+    empleados_activos = db.session.query(db.func.count(Empleado.id)).filter(
+        Empleado.empresa_id == Empresa.id, Empleado.activo == True
+    ).correlate(Empresa).scalar_subquery()
+    locadores_activos = db.session.query(db.func.count(Locador.id)).filter(
+        Locador.empresa_id == Empresa.id, Locador.activo == True
+    ).correlate(Empresa).scalar_subquery()
     
-    return render_template('index.html', empresas_con_conteos=empresas_con_conteos)
+    # Esta versión no guarda planillas: no hay total de la última planilla
+    filas = db.session.query(Empresa, empleados_activos, locadores_activos).order_by(Empresa.id)
+    return [{
+        'empresa': empresa,
+        'empleados_activos': empleados,
+        'locadores_activos': locadores,
+        'ultima_planilla': None
+    } for empresa, empleados, locadores in filas]
 
 @app.route('/empresas')
 def empresas():
@@ -156,11 +201,33 @@ def nueva_empresa():
 
 @app.route('/personal/<int:empresa_id>')
 def personal(empresa_id):
-    """Gestión de personal por empresa"""
+    """Gestión de personal por empresa
+
+    Empleados y locadores se listan por páginas (keyset sobre apellidos, id)
+    con los filtros de la URL: nombre, dni, banco, tipo_pago y activo. Los
+    totales de cada pestaña salen de un solo COUNT con los mismos filtros.
+    """
     empresa = Empresa.query.get_or_404(empresa_id)
-    empleados = Empleado.query.filter_by(empresa_id=empresa_id).all()
-    locadores = Locador.query.filter_by(empresa_id=empresa_id).all()
-    return render_template('personal.html', empresa=empresa, empleados=empleados, locadores=locadores)
+    filtros = leer_filtros_personal(request.args, activo='todos')
+    empleados, siguiente_empleados = paginar_personal(
+        Empleado, empresa_id, filtros, request.args.get('empleados_despues'))
+    locadores, siguiente_locadores = paginar_personal(
+        Locador, empresa_id, filtros, request.args.get('locadores_despues'))
+    total_empleados, total_locadores = contar_personal(empresa_id, filtros, Empleado, Locador)
+    return render_template('personal.html', empresa=empresa, empleados=empleados, locadores=locadores,
+                           filtros=filtros, siguiente_empleados=siguiente_empleados,
+                           siguiente_locadores=siguiente_locadores, total_empleados=total_empleados,
+                           total_locadores=total_locadores)
+
+@app.route('/buscar')
+def buscar():
+    """Búsqueda global de empleados y locadores por DNI, nombres o apellidos (JSON)"""
+    texto = request.args.get('q', '')
+    limite = request.args.get('limite', LIMITE_BUSQUEDA, type=int)
+    resultados = buscar_personal(db.session.connection(), texto, limite)
+    # La primera búsqueda en una base de datos crea el índice: se confirma para conservarlo
+    db.session.commit()
+    return jsonify({'consulta': texto, 'resultados': resultados})
 
 @app.route('/empleado/nuevo/<int:empresa_id>', methods=['GET', 'POST'])
 def nuevo_empleado(empresa_id):
@@ -253,9 +320,26 @@ def calcular_planilla(empresa_id):
         })
 
 def calcular_planilla_simple(empresa_id, mes, año):
-    """Función simplificada para calcular planilla"""
+    """
+    Función simplificada para calcular planilla
+    
+    Los montos se calculan en céntimos enteros (ver dinero.py); cada
+    concepto se redondea una vez y los totales son la suma exacta de filas.
+    La cantidad de consultas por corrida no depende del número de empleados.
+    """
     empresa = Empresa.query.get_or_404(empresa_id)
-    empleados = Empleado.query.filter_by(empresa_id=empresa_id, activo=True).all()
+    inicio_mes, fin_mes = rango_mes(mes, año)
+    # Ausencias del mes, préstamos activos y adelantos pendientes de todo el
+    # personal en una consulta por colección (selectin), no tres por empleado
+    empleados = (Empleado.query
+                 .options(
+                     db.selectinload(Empleado.ausencias.and_(
+                         Ausencia.fecha >= inicio_mes, Ausencia.fecha < fin_mes)),
+                     db.selectinload(Empleado.prestamos.and_(Prestamo.activo == True)),
+                     db.selectinload(Empleado.adelantos.and_(
+                         Adelanto.mes_aplicar == mes, Adelanto.año_aplicar == año,
+                         Adelanto.aplicado == False)))
+                 .filter_by(empresa_id=empresa_id, activo=True).all())
     locadores = Locador.query.filter_by(empresa_id=empresa_id, activo=True).all()
     
     resultados = {
@@ -273,25 +357,22 @@ def calcular_planilla_simple(empresa_id, mes, año):
             'total_neto': 0
         }
     }
+    total_ingresos_planilla = total_descuentos_planilla = total_neto_planilla = 0
+    
+    reglas = REGLAS_REGIMEN.get(empresa.regimen_laboral, REGLAS_OTRO_REGIMEN)
     
     # Calcular planillas de empleados
     for empleado in empleados:
         # Cálculo básico
-        sueldo_base = float(empleado.sueldo_base)
+        sueldo_base = a_centimos(empleado.sueldo_base)
         
         # Calcular días trabajados (considerando ausencias)
         dias_trabajados = 30  # Días base del mes
         dias_faltados = 0
         horas_perdidas = 0
         
-        # Obtener ausencias del empleado en el mes
-        ausencias_empleado = db.session.query(Ausencia).filter(
-            Ausencia.empleado_id == empleado.id,
-            db.extract('month', Ausencia.fecha) == mes,
-            db.extract('year', Ausencia.fecha) == año
-        ).all()
-        
-        for ausencia in ausencias_empleado:
+        # Ausencias del empleado en el mes (precargadas)
+        for ausencia in empleado.ausencias:
             if ausencia.tipo == 'falta' and not ausencia.justificada:
                 dias_faltados += 1
                 horas_perdidas += ausencia.horas_perdidas
@@ -301,48 +382,25 @@ def calcular_planilla_simple(empresa_id, mes, año):
         
         dias_trabajados = 30 - dias_faltados
         
-        # Ajustar sueldo base por días trabajados
-        sueldo_ajustado = sueldo_base * (dias_trabajados / 30)
-        
-        # Aplicar tipo de pago (quincenal = 50% del sueldo ajustado)
+        # Ajustar sueldo base por días trabajados y tipo de pago
+        # (quincenal = 50% del sueldo ajustado), con un solo redondeo
+        dias_numerador, dias_denominador = fraccion(dias_trabajados)
+        divisor = dias_denominador * 30
         if empleado.tipo_pago == 'quincenal':
-            sueldo_ajustado = sueldo_ajustado * 0.5
+            divisor *= 2
+        sueldo_ajustado = multiplicar(sueldo_base, dias_numerador, divisor)
         
-        # Beneficios según régimen
-        if empresa.regimen_laboral in ['microempresa', 'pequeña_empresa']:
-            vacaciones = sueldo_ajustado * 15 / 360
-        else:
-            vacaciones = sueldo_ajustado * 30 / 360
-            
-        if empresa.regimen_laboral == 'microempresa':
-            cts = 0
-        elif empresa.regimen_laboral == 'pequeña_empresa':
-            cts = sueldo_ajustado * 15 / 12
-        else:
-            cts = sueldo_ajustado
-            
-        if empresa.regimen_laboral == 'microempresa':
-            gratificacion = 0
-        elif empresa.regimen_laboral == 'pequeña_empresa' and mes in [7, 12]:
-            gratificacion = sueldo_ajustado / 2
-        elif empresa.regimen_laboral == 'general' and mes in [7, 12]:
-            gratificacion = sueldo_ajustado * 1.09
-        else:
-            gratificacion = 0
-            
-        if empresa.regimen_laboral in ['pequeña_empresa', 'general'] and sueldo_ajustado <= 1025:
-            asignacion_familiar = 102.50
-        else:
-            asignacion_familiar = 0
+        # Beneficios según las reglas compiladas del régimen
+        vacaciones, cts, gratificacion, asignacion_familiar = reglas.beneficios(sueldo_ajustado, mes)
         
         # Descuentos por pensión e impuestos
         if empleado.tipo_pension == 'ONP':
-            pension = sueldo_ajustado * 0.13
+            pension = multiplicar(sueldo_ajustado, 13, 100)
         else:
-            pension = sueldo_ajustado * 0.12
+            pension = multiplicar(sueldo_ajustado, 12, 100)
             
-        if sueldo_ajustado > 1025:
-            impuesto_renta = max(0, (sueldo_ajustado - 1025) * 0.08)
+        if sueldo_ajustado > 102500:
+            impuesto_renta = multiplicar(sueldo_ajustado - 102500, 8, 100)
         else:
             impuesto_renta = 0
         
@@ -350,25 +408,13 @@ def calcular_planilla_simple(empresa_id, mes, año):
         prestamos_descuento = 0
         adelantos_descuento = 0
         
-        # Obtener préstamos activos del empleado
-        prestamos = db.session.query(Prestamo).filter(
-            Prestamo.empleado_id == empleado.id,
-            Prestamo.activo == True
-        ).all()
-        
-        for prestamo in prestamos:
-            prestamos_descuento += prestamo.cuota_mensual
-        
-        # Obtener adelantos pendientes del empleado para este mes
-        adelantos = db.session.query(Adelanto).filter(
-            Adelanto.empleado_id == empleado.id,
-            Adelanto.mes_aplicar == mes,
-            Adelanto.año_aplicar == año,
-            Adelanto.aplicado == False
-        ).all()
+        # Préstamos activos del empleado (precargados)
+        for prestamo in empleado.prestamos:
+            prestamos_descuento += a_centimos(prestamo.cuota_mensual)
         
-        for adelanto in adelantos:
-            adelantos_descuento += adelanto.monto
+        # Adelantos pendientes del empleado para este mes (precargados)
+        for adelanto in empleado.adelantos:
+            adelantos_descuento += a_centimos(adelanto.monto)
             adelanto.aplicado = True  # Marcar como aplicado
         
         # Totales
@@ -381,8 +427,8 @@ def calcular_planilla_simple(empresa_id, mes, año):
             'nombres': empleado.nombres,
             'apellidos': empleado.apellidos,
             'dni': empleado.dni,
-            'sueldo_base': sueldo_base,
-            'sueldo_ajustado': round(sueldo_ajustado, 2),
+            'sueldo_base': a_float(sueldo_base),
+            'sueldo_ajustado': a_float(sueldo_ajustado),
             'tipo_pago': empleado.tipo_pago,
             'cuenta_bancaria': empleado.cuenta_bancaria or '',
             'banco': empleado.banco or '',
@@ -390,31 +436,31 @@ def calcular_planilla_simple(empresa_id, mes, año):
             'dias_faltados': round(dias_faltados, 1),
             'horas_perdidas': round(horas_perdidas, 1),
             'beneficios': {
-                'vacaciones': round(vacaciones, 2),
-                'cts': round(cts, 2),
-                'gratificacion': round(gratificacion, 2),
-                'asignacion_familiar': round(asignacion_familiar, 2)
+                'vacaciones': a_float(vacaciones),
+                'cts': a_float(cts),
+                'gratificacion': a_float(gratificacion),
+                'asignacion_familiar': a_float(asignacion_familiar)
             },
             'descuentos': {
-                'pension': round(pension, 2),
-                'impuesto_renta': round(impuesto_renta, 2),
-                'prestamos': round(prestamos_descuento, 2),
-                'adelantos': round(adelantos_descuento, 2)
+                'pension': a_float(pension),
+                'impuesto_renta': a_float(impuesto_renta),
+                'prestamos': a_float(prestamos_descuento),
+                'adelantos': a_float(adelantos_descuento)
             },
-            'total_ingresos': round(total_ingresos, 2),
-            'total_descuentos': round(total_descuentos, 2),
-            'neto_pagar': round(neto_pagar, 2)
+            'total_ingresos': a_float(total_ingresos),
+            'total_descuentos': a_float(total_descuentos),
+            'neto_pagar': a_float(neto_pagar)
         })
         
-        resultados['totales']['total_ingresos'] += total_ingresos
-        resultados['totales']['total_descuentos'] += total_descuentos
-        resultados['totales']['total_neto'] += neto_pagar
+        total_ingresos_planilla += total_ingresos
+        total_descuentos_planilla += total_descuentos
+        total_neto_planilla += neto_pagar
     
     # Calcular planillas de locadores
     for locador in locadores:
-        monto_bruto = float(locador.monto_mensual)
-        if not locador.suspendido and monto_bruto > 1500:
-            retencion_4ta_cat = monto_bruto * 0.08
+        monto_bruto = a_centimos(locador.monto_mensual)
+        if not locador.suspendido and monto_bruto > 150000:
+            retencion_4ta_cat = multiplicar(monto_bruto, 8, 100)
         else:
             retencion_4ta_cat = 0
         neto_pagar = monto_bruto - retencion_4ta_cat
@@ -424,21 +470,21 @@ def calcular_planilla_simple(empresa_id, mes, año):
             'nombres': locador.nombres,
             'apellidos': locador.apellidos,
             'dni': locador.dni,
-            'monto_mensual': monto_bruto,
+            'monto_mensual': a_float(monto_bruto),
             'suspendido': locador.suspendido,
-            'monto_bruto': monto_bruto,
-            'retencion_4ta_cat': round(retencion_4ta_cat, 2),
-            'neto_pagar': round(neto_pagar, 2)
+            'monto_bruto': a_float(monto_bruto),
+            'retencion_4ta_cat': a_float(retencion_4ta_cat),
+            'neto_pagar': a_float(neto_pagar)
         })
         
-        resultados['totales']['total_neto'] += neto_pagar
+        total_neto_planilla += neto_pagar
     
     # Actualizar contadores
     resultados['totales']['total_empleados'] = len(empleados)
     resultados['totales']['total_locadores'] = len(locadores)
-    resultados['totales']['total_ingresos'] = round(resultados['totales']['total_ingresos'], 2)
-    resultados['totales']['total_descuentos'] = round(resultados['totales']['total_descuentos'], 2)
-    resultados['totales']['total_neto'] = round(resultados['totales']['total_neto'], 2)
+    resultados['totales']['total_ingresos'] = a_float(total_ingresos_planilla)
+    resultados['totales']['total_descuentos'] = a_float(total_descuentos_planilla)
+    resultados['totales']['total_neto'] = a_float(total_neto_planilla)
     
     return resultados
 
@@ -453,10 +499,11 @@ def ausencias(empresa_id):
     mes_actual = datetime.now().month
     año_actual = datetime.now().year
     
+    inicio_mes, fin_mes = rango_mes(mes_actual, año_actual)
     ausencias = db.session.query(Ausencia).join(Empleado).filter(
         Empleado.empresa_id == empresa_id,
-        db.extract('month', Ausencia.fecha) == mes_actual,
-        db.extract('year', Ausencia.fecha) == año_actual
+        Ausencia.fecha >= inicio_mes,
+        Ausencia.fecha < fin_mes
     ).all()
     
     return render_template('ausencias.html', 
@@ -7,12 +7,35 @@ Versión Completa con Todas las Funcionalidades
 
 from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, make_response, send_file
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event, inspect, text
+from sqlalchemy.orm import Session
 from datetime import datetime, date
 import os
 import sqlite3
 import io
-from openpyxl import Workbook, load_workbook
+import json
+import uuid
+from openpyxl import Workbook
 from werkzeug.utils import secure_filename
+from dinero import a_centimos, a_float, multiplicar, FORMATO_EXCEL
+from config import aplicar_perfil_bd, registrar_pragmas_sqlite
+from reglas_regimen import compilar_reglas
+from paginacion import leer_filtros_personal, paginar_personal, contar_personal
+from busqueda import buscar_personal, LIMITE_BUSQUEDA
+from carga_masiva import validar_archivo, formato_archivo, errores_carga, ENCABEZADOS_PLANTILLA, HOJAS_MOVIMIENTOS
+
+# Factores de beneficios por régimen laboral (fracciones del sueldo ajustado)
+REGLAS_REGIMEN = compilar_reglas({
+    'microempresa': {},
+    'pequeña_empresa': {
+        'vacaciones': (15, 365), 'cts': (15, 365), 'gratificacion': (1, 2),
+        'asignacion_familiar': (10250, 102500)
+    },
+    'general': {
+        'vacaciones': (30, 365), 'cts': (1, 1), 'gratificacion': (109, 100),
+        'asignacion_familiar': (10250, 102500)
+    }
+})
 
 # Configuración de Flask
 app = Flask(__name__)
@@ -24,8 +47,12 @@ app.config['UPLOAD_FOLDER'] = 'uploads'
 # Crear directorio de uploads
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 
+# Perfil de base de datos (SISPLA_CONFIG=production activa WAL y el pool)
+aplicar_perfil_bd(app)
+
 # Inicializar SQLAlchemy
 db = SQLAlchemy(app)
+registrar_pragmas_sqlite(app, db)
 
 # Modelos completos
 class Empresa(db.Model):
@@ -41,6 +68,12 @@ class Empresa(db.Model):
 
 class Empleado(db.Model):
     __tablename__ = 'empleados'
+    # Listado de personal: orden (apellidos, id) y filtros por nombre y DNI
+    __table_args__ = (
+        db.Index('ix_empleados_empresa_apellidos', 'empresa_id', 'apellidos', 'id'),
+        db.Index('ix_empleados_empresa_nombres', 'empresa_id', 'nombres'),
+        db.Index('ix_empleados_empresa_dni', 'empresa_id', 'dni'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     empresa_id = db.Column(db.Integer, db.ForeignKey('empresas.id'), nullable=False)
     nombres = db.Column(db.String(100), nullable=False)
@@ -63,6 +96,12 @@ class Empleado(db.Model):
 
 class Locador(db.Model):
     __tablename__ = 'locadores'
+    # Listado de personal: orden (apellidos, id) y filtros por nombre y DNI
+    __table_args__ = (
+        db.Index('ix_locadores_empresa_apellidos', 'empresa_id', 'apellidos', 'id'),
+        db.Index('ix_locadores_empresa_nombres', 'empresa_id', 'nombres'),
+        db.Index('ix_locadores_empresa_dni', 'empresa_id', 'dni'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     empresa_id = db.Column(db.Integer, db.ForeignKey('empresas.id'), nullable=False)
     nombres = db.Column(db.String(100), nullable=False)
@@ -110,25 +149,163 @@ class Adelanto(db.Model):
     activo = db.Column(db.Boolean, default=True)
     empleado = db.relationship('Empleado', backref='adelantos')
 
+class Planilla(db.Model):
+    """Versión guardada de una planilla calculada por empresa y período"""
+    __tablename__ = 'planillas'
+    __table_args__ = (
+        db.UniqueConstraint('empresa_id', 'mes', 'año', 'version', name='uq_planilla_version'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    empresa_id = db.Column(db.Integer, db.ForeignKey('empresas.id'), nullable=False)
+    mes = db.Column(db.Integer, nullable=False)
+    año = db.Column(db.Integer, nullable=False)
+    version = db.Column(db.Integer, nullable=False, default=1)
+    vigente = db.Column(db.Boolean, default=True)  # Se desactiva al cambiar los insumos de la empresa
+    total_ingresos = db.Column(db.Float, default=0.0)
+    total_descuentos = db.Column(db.Float, default=0.0)
+    total_neto = db.Column(db.Float, default=0.0)
+    fecha_calculo = db.Column(db.DateTime, default=datetime.utcnow)
+
+class Pago(db.Model):
+    __tablename__ = 'pagos'
+    id = db.Column(db.Integer, primary_key=True)
+    planilla_id = db.Column(db.Integer, db.ForeignKey('planillas.id'), nullable=False)
+    empleado_id = db.Column(db.Integer, db.ForeignKey('empleados.id'), nullable=False)
+    sueldo_base = db.Column(db.Float, nullable=False)
+    sueldo_ajustado = db.Column(db.Float, nullable=False)
+    vacaciones = db.Column(db.Float, default=0.0)
+    cts = db.Column(db.Float, default=0.0)
+    gratificacion = db.Column(db.Float, default=0.0)
+    asignacion_familiar = db.Column(db.Float, default=0.0)
+    pension = db.Column(db.Float, default=0.0)
+    impuesto_renta = db.Column(db.Float, default=0.0)
+    descuento_alimentos = db.Column(db.Float, default=0.0)
+    prestamos = db.Column(db.Float, default=0.0)
+    adelantos = db.Column(db.Float, default=0.0)
+    total_ingresos = db.Column(db.Float, nullable=False)
+    total_descuentos = db.Column(db.Float, nullable=False)
+    neto = db.Column(db.Float, nullable=False)
+    empleado = db.relationship('Empleado')
+
+class PagoLocador(db.Model):
+    __tablename__ = 'pagos_locadores'
+    id = db.Column(db.Integer, primary_key=True)
+    planilla_id = db.Column(db.Integer, db.ForeignKey('planillas.id'), nullable=False)
+    locador_id = db.Column(db.Integer, db.ForeignKey('locadores.id'), nullable=False)
+    monto_base = db.Column(db.Float, nullable=False)
+    retencion_4ta = db.Column(db.Float, default=0.0)
+    descuento_alimentos = db.Column(db.Float, default=0.0)
+    total_ingresos = db.Column(db.Float, nullable=False)
+    total_descuentos = db.Column(db.Float, nullable=False)
+    neto = db.Column(db.Float, nullable=False)
+    locador = db.relationship('Locador')
+
+class TrabajoCarga(db.Model):
+    """Carga masiva en cola: el archivo queda en disco y lo procesa worker_carga.py"""
+    __tablename__ = 'trabajos_carga'
+    __table_args__ = (
+        db.Index('ix_trabajos_carga_estado', 'estado', 'id'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    empresa_id = db.Column(db.Integer, db.ForeignKey('empresas.id'), nullable=False)
+    nombre_archivo = db.Column(db.String(255), nullable=False)
+    ruta_archivo = db.Column(db.String(500), nullable=False)
+    modo = db.Column(db.String(20), nullable=False, default='insertar')  # 'insertar' o 'actualizar' (por DNI)
+    estado = db.Column(db.String(20), nullable=False, default='pendiente')  # 'pendiente', 'procesando', 'terminado', 'error'
+    worker = db.Column(db.String(100))  # Proceso que tomó el trabajo
+    total_filas = db.Column(db.Integer)
+    filas_procesadas = db.Column(db.Integer, default=0)
+    empleados = db.Column(db.Integer, default=0)
+    locadores = db.Column(db.Integer, default=0)
+    creados = db.Column(db.Integer, default=0)
+    actualizados = db.Column(db.Integer, default=0)
+    sin_cambios = db.Column(db.Integer, default=0)
+    errores = db.Column(db.Integer, default=0)
+    detalle_errores = db.Column(db.Text)  # JSON con las primeras filas con error
+    mensaje = db.Column(db.String(500))
+    fecha_creacion = db.Column(db.DateTime, default=datetime.utcnow)
+    fecha_inicio = db.Column(db.DateTime)
+    fecha_avance = db.Column(db.DateTime)  # Último bloque confirmado: vence la reserva del worker
+    intentos = db.Column(db.Integer, default=0)  # Veces que un worker tomó el trabajo
+    fecha_fin = db.Column(db.DateTime)
+
+TABLAS_PLANILLA = [Planilla.__table__, Pago.__table__, PagoLocador.__table__, TrabajoCarga.__table__]
+_bases_con_tablas_planilla = set()
+
+# Columnas agregadas a tablas ya creadas por versiones anteriores
+COLUMNAS_AGREGADAS = {'trabajos_carga': ('fecha_avance', 'intentos')}
+
+def asegurar_tablas_planilla(conexion):
+    """Crea las tablas de planillas guardadas y de la cola de cargas en bases creadas antes de esta versión"""
+    url = str(conexion.engine.url)
+    if url not in _bases_con_tablas_planilla:
+        db.metadata.create_all(conexion, tables=TABLAS_PLANILLA)
+        for nombre_tabla, nombres in COLUMNAS_AGREGADAS.items():
+            existentes = {columna['name'] for columna in inspect(conexion).get_columns(nombre_tabla)}
+            for nombre in nombres:
+                if nombre not in existentes:
+                    tipo = db.metadata.tables[nombre_tabla].c[nombre].type.compile(conexion.dialect)
+                    conexion.execute(text(f'ALTER TABLE {nombre_tabla} ADD COLUMN {nombre} {tipo}'))
+        _bases_con_tablas_planilla.add(url)
+
+@event.listens_for(Session, 'before_flush')
+def _registrar_empresas_modificadas(session, flush_context, instances):
+    """Anota las empresas cuyos insumos de planilla cambian en este flush"""
+    empresas = session.info.setdefault('empresas_planilla_modificadas', set())
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, Empresa):
+            empresas.add(obj.id)
+        elif isinstance(obj, (Empleado, Locador)):
+            empresas.add(obj.empresa_id)
+        elif isinstance(obj, (Prestamo, Adelanto)):
+            empleado = obj.empleado or session.get(Empleado, obj.empleado_id)
+            if empleado:
+                empresas.add(empleado.empresa_id)
+
+@event.listens_for(Session, 'after_flush')
+def _invalidar_planillas(session, flush_context):
+    """Marca como no vigentes las planillas guardadas de las empresas modificadas"""
+    empresas = session.info.pop('empresas_planilla_modificadas', set())
+    empresas.discard(None)
+    if empresas:
+        conexion = session.connection()
+        asegurar_tablas_planilla(conexion)
+        tabla = Planilla.__table__
+        conexion.execute(
+            tabla.update()
+            .where(tabla.c.empresa_id.in_(empresas), tabla.c.vigente == True)
+            .values(vigente=False)
+        )
+
 # Rutas principales
 @app.route('/')
 def index():
     """Página principal con resumen de empresas"""
-    empresas = Empresa.query.all()
-    empresas_con_conteos = []
-    
-    for empresa in empresas:
-        # Contar empleados y locadores activos
-        empleados_activos = Empleado.query.filter_by(empresa_id=empresa.id, activo=True).count()
-        locadores_activos = Locador.query.filter_by(empresa_id=empresa.id, activo=True).count()
-        
-        empresas_con_conteos.append({
-            'empresa': empresa,
-            'empleados_activos': empleados_activos,
-            'locadores_activos': locadores_activos
-        })
+    return render_template('index.html', empresas_con_conteos=resumen_empresas())
+
+def resumen_empresas():
+    """
+    Empresas con sus empleados y locadores activos y el total neto de su
+    última planilla guardada, en una sola consulta
+    """
+    empleados_activos = db.session.query(db.func.count(Empleado.id)).filter(
+        Empleado.empresa_id == Empresa.id, Empleado.activo == True
+    ).correlate(Empresa).scalar_subquery()
+    locadores_activos = db.session.query(db.func.count(Locador.id)).filter(
+        Locador.empresa_id == Empresa.id, Locador.activo == True
+    ).correlate(Empresa).scalar_subquery()
+    ultima_planilla = db.session.query(Planilla.total_neto).filter(
+        Planilla.empresa_id == Empresa.id
+    ).order_by(Planilla.año.desc(), Planilla.mes.desc(), Planilla.version.desc(), Planilla.id.desc()
+    ).limit(1).correlate(Empresa).scalar_subquery()
     
-    return render_template('index.html', empresas_con_conteos=empresas_con_conteos)
+    filas = db.session.query(Empresa, empleados_activos, locadores_activos, ultima_planilla).order_by(Empresa.id)
+    return [{
+        'empresa': empresa,
+        'empleados_activos': empleados,
+        'locadores_activos': locadores,
+        'ultima_planilla': total_neto
+    } for empresa, empleados, locadores, total_neto in filas]
 
 @app.route('/empresas')
 def empresas():
@@ -160,11 +337,33 @@ def nueva_empresa():
 
 @app.route('/personal/<int:empresa_id>')
 def personal(empresa_id):
-    """Lista de personal de una empresa"""
+    """Lista de personal de una empresa
+
+    Empleados y locadores se listan por páginas (keyset sobre apellidos, id)
+    con los filtros de la URL: nombre, dni, banco, tipo_pago y activo. Los
+    totales de cada pestaña salen de un solo COUNT con los mismos filtros.
+    """
     empresa = Empresa.query.get_or_404(empresa_id)
-    empleados = Empleado.query.filter_by(empresa_id=empresa_id, activo=True).all()
-    locadores = Locador.query.filter_by(empresa_id=empresa_id, activo=True).all()
-    return render_template('personal.html', empresa=empresa, empleados=empleados, locadores=locadores)
+    filtros = leer_filtros_personal(request.args, activo='1')
+    empleados, siguiente_empleados = paginar_personal(
+        Empleado, empresa_id, filtros, request.args.get('empleados_despues'))
+    locadores, siguiente_locadores = paginar_personal(
+        Locador, empresa_id, filtros, request.args.get('locadores_despues'))
+    total_empleados, total_locadores = contar_personal(empresa_id, filtros, Empleado, Locador)
+    return render_template('personal.html', empresa=empresa, empleados=empleados, locadores=locadores,
+                           filtros=filtros, siguiente_empleados=siguiente_empleados,
+                           siguiente_locadores=siguiente_locadores, total_empleados=total_empleados,
+                           total_locadores=total_locadores)
+
+@app.route('/buscar')
+def buscar():
+    """Búsqueda global de empleados y locadores por DNI, nombres o apellidos (JSON)"""
+    texto = request.args.get('q', '')
+    limite = request.args.get('limite', LIMITE_BUSQUEDA, type=int)
+    resultados = buscar_personal(db.session.connection(), texto, limite)
+    # La primera búsqueda en una base de datos crea el índice: se confirma para conservarlo
+    db.session.commit()
+    return jsonify({'consulta': texto, 'resultados': resultados})
 
 @app.route('/empleado/nuevo/<int:empresa_id>', methods=['GET', 'POST'])
 def nuevo_empleado(empresa_id):
@@ -324,8 +523,8 @@ def calcular_planilla(empresa_id):
     empleados = Empleado.query.filter_by(empresa_id=empresa_id, activo=True).all()
     locadores = Locador.query.filter_by(empresa_id=empresa_id, activo=True).all()
     
-    # Calcular planilla
-    resultado = calcular_planilla_completa(empresa_id, mes, año)
+    # Planilla guardada (se recalcula solo si cambiaron los insumos)
+    resultado = obtener_planilla(empresa_id, mes, año)
     
     return render_template('planilla_completo.html', 
                          empresa=empresa, 
@@ -343,7 +542,7 @@ def exportar_excel(empresa_id):
     año = int(request.form['año'])
     
     try:
-        resultado = calcular_planilla_completa(empresa_id, mes, año)
+        resultado = obtener_planilla(empresa_id, mes, año)
         
         # Crear libro de trabajo
         wb = Workbook()
@@ -383,6 +582,8 @@ def exportar_excel(empresa_id):
             ws_empleados.cell(row=row, column=15, value=emp['total_ingresos'])
             ws_empleados.cell(row=row, column=16, value=emp['total_descuentos'])
             ws_empleados.cell(row=row, column=17, value=emp['neto'])
+            for col in range(4, 18):
+                ws_empleados.cell(row=row, column=col).number_format = FORMATO_EXCEL
         
         # Hoja de locadores
         ws_locadores = wb.create_sheet("Locadores")
@@ -408,6 +609,8 @@ def exportar_excel(empresa_id):
             ws_locadores.cell(row=row, column=7, value=loc['total_ingresos'])
             ws_locadores.cell(row=row, column=8, value=loc['total_descuentos'])
             ws_locadores.cell(row=row, column=9, value=loc['neto'])
+            for col in range(4, 10):
+                ws_locadores.cell(row=row, column=col).number_format = FORMATO_EXCEL
         
         # Guardar en memoria
         output = io.BytesIO()
@@ -425,9 +628,19 @@ def exportar_excel(empresa_id):
         return redirect(url_for('planilla', empresa_id=empresa_id))
 
 def calcular_planilla_completa(empresa_id, mes, año):
-    """Función completa de cálculo de planilla con todas las funcionalidades"""
+    """
+    Función completa de cálculo de planilla con todas las funcionalidades
+    
+    Los montos se calculan en céntimos enteros (ver dinero.py) y se entregan
+    como float ya redondeados, de modo que los totales cuadran con las filas.
+    La cantidad de consultas por corrida no depende del número de empleados.
+    """
     empresa = Empresa.query.get(empresa_id)
-    empleados = Empleado.query.filter_by(empresa_id=empresa_id, activo=True).all()
+    # Préstamos y adelantos de todo el personal en una consulta por colección
+    # (selectin), no dos cargas perezosas por empleado
+    empleados = (Empleado.query
+                 .options(db.selectinload(Empleado.prestamos), db.selectinload(Empleado.adelantos))
+                 .filter_by(empresa_id=empresa_id, activo=True).all())
     locadores = Locador.query.filter_by(empresa_id=empresa_id, activo=True).all()
     
     resultado = {
@@ -435,50 +648,34 @@ def calcular_planilla_completa(empresa_id, mes, año):
         'mes': mes,
         'año': año,
         'empleados': [],
-        'locadores': [],
-        'totales': {
-            'total_ingresos': 0,
-            'total_descuentos': 0,
-            'total_neto': 0
-        }
+        'locadores': []
     }
+    totales = {'total_ingresos': 0, 'total_descuentos': 0, 'total_neto': 0}
+    # Un régimen no registrado se calcula como el régimen general
+    reglas = REGLAS_REGIMEN.get(empresa.regimen_laboral, REGLAS_REGIMEN['general'])
     
     # Calcular para empleados
     for empleado in empleados:
-        sueldo_base = empleado.sueldo_base
+        sueldo_base = a_centimos(empleado.sueldo_base)
         
         # Aplicar pago quincenal si corresponde
         sueldo_ajustado = sueldo_base
         if empleado.tipo_pago == 'quincenal':
-            sueldo_ajustado = sueldo_base * 0.5
+            sueldo_ajustado = multiplicar(sueldo_base, 1, 2)
         
-        # Calcular beneficios según régimen
-        if empresa.regimen_laboral == 'microempresa':
-            vacaciones = 0
-            cts = 0
-            gratificacion = 0
-            asignacion_familiar = 0
-        elif empresa.regimen_laboral == 'pequeña_empresa':
-            vacaciones = sueldo_ajustado * 15 / 365
-            cts = sueldo_ajustado * 15 / 365
-            gratificacion = sueldo_ajustado * 0.5 if mes in [7, 12] else 0
-            asignacion_familiar = 102.50 if sueldo_ajustado <= 1025 else 0
-        else:  # régimen general
-            vacaciones = sueldo_ajustado * 30 / 365
-            cts = sueldo_ajustado
-            gratificacion = sueldo_ajustado * 1.09 if mes in [7, 12] else 0
-            asignacion_familiar = 102.50 if sueldo_ajustado <= 1025 else 0
+        # Beneficios según las reglas compiladas del régimen
+        vacaciones, cts, gratificacion, asignacion_familiar = reglas.beneficios(sueldo_ajustado, mes)
         
         # Calcular descuentos
-        pension = sueldo_ajustado * 0.13 if empleado.tipo_pension == 'ONP' else sueldo_ajustado * 0.12
-        impuesto_renta = max(0, (sueldo_ajustado - 1025) * 0.08) if sueldo_ajustado > 1025 else 0
+        pension = multiplicar(sueldo_ajustado, 13 if empleado.tipo_pension == 'ONP' else 12, 100)
+        impuesto_renta = multiplicar(sueldo_ajustado - 102500, 8, 100) if sueldo_ajustado > 102500 else 0
         
         # Descuento por alimentos (solo en pago mensual)
-        descuento_alimentos = empleado.descuento_alimentos if empleado.tipo_pago == 'mensual' else 0
+        descuento_alimentos = a_centimos(empleado.descuento_alimentos or 0) if empleado.tipo_pago == 'mensual' else 0
         
         # Calcular préstamos y adelantos
-        prestamos = sum(p.cuota_mensual for p in empleado.prestamos if p.activo)
-        adelantos = sum(a.descuento_mensual for a in empleado.adelantos if a.activo)
+        prestamos = sum(a_centimos(p.cuota_mensual) for p in empleado.prestamos if p.activo)
+        adelantos = sum(a_centimos(a.descuento_mensual) for a in empleado.adelantos if a.activo)
         
         total_ingresos = sueldo_ajustado + vacaciones + cts + gratificacion + asignacion_familiar
         total_descuentos = pension + impuesto_renta + descuento_alimentos + prestamos + adelantos
@@ -486,35 +683,35 @@ def calcular_planilla_completa(empresa_id, mes, año):
         
         resultado['empleados'].append({
             'empleado': empleado,
-            'sueldo_base': sueldo_base,
-            'sueldo_ajustado': sueldo_ajustado,
-            'vacaciones': vacaciones,
-            'cts': cts,
-            'gratificacion': gratificacion,
-            'asignacion_familiar': asignacion_familiar,
-            'pension': pension,
-            'impuesto_renta': impuesto_renta,
-            'descuento_alimentos': descuento_alimentos,
+            'sueldo_base': a_float(sueldo_base),
+            'sueldo_ajustado': a_float(sueldo_ajustado),
+            'vacaciones': a_float(vacaciones),
+            'cts': a_float(cts),
+            'gratificacion': a_float(gratificacion),
+            'asignacion_familiar': a_float(asignacion_familiar),
+            'pension': a_float(pension),
+            'impuesto_renta': a_float(impuesto_renta),
+            'descuento_alimentos': a_float(descuento_alimentos),
             'descuentos': {
-                'prestamos': prestamos,
-                'adelantos': adelantos
+                'prestamos': a_float(prestamos),
+                'adelantos': a_float(adelantos)
             },
-            'total_ingresos': total_ingresos,
-            'total_descuentos': total_descuentos,
-            'neto': neto
+            'total_ingresos': a_float(total_ingresos),
+            'total_descuentos': a_float(total_descuentos),
+            'neto': a_float(neto)
         })
         
-        resultado['totales']['total_ingresos'] += total_ingresos
-        resultado['totales']['total_descuentos'] += total_descuentos
-        resultado['totales']['total_neto'] += neto
+        totales['total_ingresos'] += total_ingresos
+        totales['total_descuentos'] += total_descuentos
+        totales['total_neto'] += neto
     
     # Calcular para locadores
     for locador in locadores:
-        monto_base = locador.monto_mensual
-        retencion_4ta = monto_base * 0.08 if not locador.suspendido and monto_base > 1500 else 0
+        monto_base = a_centimos(locador.monto_mensual)
+        retencion_4ta = multiplicar(monto_base, 8, 100) if not locador.suspendido and monto_base > 150000 else 0
         
         # Descuento por alimentos (solo en pago mensual)
-        descuento_alimentos = locador.descuento_alimentos
+        descuento_alimentos = a_centimos(locador.descuento_alimentos or 0)
         
         total_ingresos = monto_base
         total_descuentos = retencion_4ta + descuento_alimentos
@@ -522,23 +719,182 @@ def calcular_planilla_completa(empresa_id, mes, año):
         
         resultado['locadores'].append({
             'locador': locador,
-            'monto_base': monto_base,
-            'retencion_4ta': retencion_4ta,
-            'descuento_alimentos': descuento_alimentos,
-            'total_ingresos': total_ingresos,
-            'total_descuentos': total_descuentos,
-            'neto': neto
+            'monto_base': a_float(monto_base),
+            'retencion_4ta': a_float(retencion_4ta),
+            'descuento_alimentos': a_float(descuento_alimentos),
+            'total_ingresos': a_float(total_ingresos),
+            'total_descuentos': a_float(total_descuentos),
+            'neto': a_float(neto)
         })
         
-        resultado['totales']['total_ingresos'] += total_ingresos
-        resultado['totales']['total_descuentos'] += total_descuentos
-        resultado['totales']['total_neto'] += neto
+        totales['total_ingresos'] += total_ingresos
+        totales['total_descuentos'] += total_descuentos
+        totales['total_neto'] += neto
     
+    resultado['totales'] = {clave: a_float(centimos) for clave, centimos in totales.items()}
     return resultado
 
+def guardar_planilla(resultado):
+    """
+    Guarda un resultado de calcular_planilla_completa como nueva versión
+    
+    La versión es por empresa y período: el cálculo ya aplica a cada
+    empleado su propio tipo de pago, así que un mismo período no tiene
+    planillas distintas por tipo de pago.
+    """
+    empresa = resultado['empresa']
+    anterior = db.session.query(db.func.max(Planilla.version)).filter_by(
+        empresa_id=empresa.id, mes=resultado['mes'], año=resultado['año']
+    ).scalar()
+    
+    planilla = Planilla(
+        empresa_id=empresa.id,
+        mes=resultado['mes'],
+        año=resultado['año'],
+        version=(anterior or 0) + 1,
+        total_ingresos=resultado['totales']['total_ingresos'],
+        total_descuentos=resultado['totales']['total_descuentos'],
+        total_neto=resultado['totales']['total_neto']
+    )
+    db.session.add(planilla)
+    db.session.flush()
+    
+    db.session.bulk_insert_mappings(Pago, [{
+        'planilla_id': planilla.id,
+        'empleado_id': emp['empleado'].id,
+        'sueldo_base': emp['sueldo_base'],
+        'sueldo_ajustado': emp['sueldo_ajustado'],
+        'vacaciones': emp['vacaciones'],
+        'cts': emp['cts'],
+        'gratificacion': emp['gratificacion'],
+        'asignacion_familiar': emp['asignacion_familiar'],
+        'pension': emp['pension'],
+        'impuesto_renta': emp['impuesto_renta'],
+        'descuento_alimentos': emp['descuento_alimentos'],
+        'prestamos': emp['descuentos']['prestamos'],
+        'adelantos': emp['descuentos']['adelantos'],
+        'total_ingresos': emp['total_ingresos'],
+        'total_descuentos': emp['total_descuentos'],
+        'neto': emp['neto']
+    } for emp in resultado['empleados']])
+    
+    db.session.bulk_insert_mappings(PagoLocador, [{
+        'planilla_id': planilla.id,
+        'locador_id': loc['locador'].id,
+        'monto_base': loc['monto_base'],
+        'retencion_4ta': loc['retencion_4ta'],
+        'descuento_alimentos': loc['descuento_alimentos'],
+        'total_ingresos': loc['total_ingresos'],
+        'total_descuentos': loc['total_descuentos'],
+        'neto': loc['neto']
+    } for loc in resultado['locadores']])
+    
+    db.session.commit()
+    return planilla
+
+def cargar_planilla(planilla):
+    """Arma desde una planilla guardada el mismo dict que calcular_planilla_completa"""
+    pagos = (Pago.query.options(db.joinedload(Pago.empleado))
+             .filter_by(planilla_id=planilla.id).order_by(Pago.id).all())
+    pagos_locadores = (PagoLocador.query.options(db.joinedload(PagoLocador.locador))
+                       .filter_by(planilla_id=planilla.id).order_by(PagoLocador.id).all())
+    
+    return {
+        'empresa': Empresa.query.get(planilla.empresa_id),
+        'mes': planilla.mes,
+        'año': planilla.año,
+        'version': planilla.version,
+        'fecha_calculo': planilla.fecha_calculo,
+        'empleados': [{
+            'empleado': pago.empleado,
+            'sueldo_base': pago.sueldo_base,
+            'sueldo_ajustado': pago.sueldo_ajustado,
+            'vacaciones': pago.vacaciones,
+            'cts': pago.cts,
+            'gratificacion': pago.gratificacion,
+            'asignacion_familiar': pago.asignacion_familiar,
+            'pension': pago.pension,
+            'impuesto_renta': pago.impuesto_renta,
+            'descuento_alimentos': pago.descuento_alimentos,
+            'descuentos': {
+                'prestamos': pago.prestamos,
+                'adelantos': pago.adelantos
+            },
+            'total_ingresos': pago.total_ingresos,
+            'total_descuentos': pago.total_descuentos,
+            'neto': pago.neto
+        } for pago in pagos],
+        'locadores': [{
+            'locador': pago.locador,
+            'monto_base': pago.monto_base,
+            'retencion_4ta': pago.retencion_4ta,
+            'descuento_alimentos': pago.descuento_alimentos,
+            'total_ingresos': pago.total_ingresos,
+            'total_descuentos': pago.total_descuentos,
+            'neto': pago.neto
+        } for pago in pagos_locadores],
+        'totales': {
+            'total_ingresos': planilla.total_ingresos,
+            'total_descuentos': planilla.total_descuentos,
+            'total_neto': planilla.total_neto
+        }
+    }
+
+def obtener_planilla(empresa_id, mes, año):
+    """
+    Retorna la planilla del período desde la última versión guardada
+    
+    Solo se calcula y guarda una nueva versión cuando no existe ninguna o
+    cuando los insumos de la empresa cambiaron desde la última (ver
+    _invalidar_planillas).
+    """
+    asegurar_tablas_planilla(db.session.connection())
+    planilla = (Planilla.query
+                .filter_by(empresa_id=empresa_id, mes=mes, año=año)
+                .order_by(Planilla.version.desc())
+                .first())
+    
+    if not planilla or not planilla.vigente:
+        planilla = guardar_planilla(calcular_planilla_completa(empresa_id, mes, año))
+    
+    return cargar_planilla(planilla)
+
+@app.route('/api/planilla/<int:empresa_id>')
+def api_planilla(empresa_id):
+    """Planilla guardada del período en formato JSON"""
+    Empresa.query.get_or_404(empresa_id)
+    hoy = date.today()
+    mes = request.args.get('mes', hoy.month, type=int)
+    año = request.args.get('año', hoy.year, type=int)
+    
+    resultado = obtener_planilla(empresa_id, mes, año)
+    
+    return jsonify({
+        'empresa': resultado['empresa'].nombre,
+        'mes': mes,
+        'año': año,
+        'version': resultado['version'],
+        'fecha_calculo': resultado['fecha_calculo'].isoformat(),
+        'empleados': [{
+            'id': emp['empleado'].id,
+            'nombres': emp['empleado'].nombres,
+            'apellidos': emp['empleado'].apellidos,
+            'dni': emp['empleado'].dni,
+            **{clave: valor for clave, valor in emp.items() if clave != 'empleado'}
+        } for emp in resultado['empleados']],
+        'locadores': [{
+            'id': loc['locador'].id,
+            'nombres': loc['locador'].nombres,
+            'apellidos': loc['locador'].apellidos,
+            'dni': loc['locador'].dni,
+            **{clave: valor for clave, valor in loc.items() if clave != 'locador'}
+        } for loc in resultado['locadores']],
+        'totales': resultado['totales']
+    })
+
 @app.route('/cargar_excel/<int:empresa_id>', methods=['GET', 'POST'])
 def cargar_excel(empresa_id):
-    """Cargar personal desde archivo Excel"""
+    """Cargar personal desde archivo Excel o CSV (en bloques, con memoria acotada)"""
     empresa = Empresa.query.get_or_404(empresa_id)
     
     if request.method == 'POST':
@@ -551,70 +907,115 @@ def cargar_excel(empresa_id):
             flash('No se seleccionó ningún archivo', 'error')
             return redirect(url_for('cargar_excel', empresa_id=empresa_id))
         
-        if archivo and archivo.filename.endswith('.xlsx'):
+        if archivo and archivo.filename.lower().endswith(('.xlsx', '.csv')):
+            modo = 'actualizar' if request.form.get('modo') == 'actualizar' else 'insertar'
+            if request.form.get('accion') == 'validar':
+                return validar_carga(empresa, archivo, modo)
             try:
-                wb = load_workbook(archivo)
-                ws = wb.active
-                
-                empleados_creados = 0
-                locadores_creados = 0
-                
-                # Leer datos de empleados (asumiendo que están en las primeras filas)
-                for row in ws.iter_rows(min_row=2, values_only=True):
-                    if not row[0]:  # Si la primera celda está vacía, terminar
-                        break
-                    
-                    tipo = row[0].lower() if row[0] else ''
-                    
-                    if tipo == 'empleado':
-                        empleado = Empleado(
-                            empresa_id=empresa_id,
-                            nombres=row[1] or '',
-                            apellidos=row[2] or '',
-                            dni=row[3] or '',
-                            sueldo_base=float(row[4]) if row[4] else 0,
-                            fecha_ingreso=row[5] if row[5] else date.today(),
-                            fecha_nacimiento=row[6] if row[6] else None,
-                            direccion=row[7] or '',
-                            telefono=row[8] or '',
-                            email=row[9] or '',
-                            tipo_pension=row[10] or 'ONP',
-                            afp_codigo=row[11] if row[11] else None,
-                            cuenta_bancaria=row[12] or '',
-                            banco=row[13] or '',
-                            tipo_pago=row[14] or 'mensual',
-                            descuento_alimentos=float(row[15]) if row[15] else 0
-                        )
-                        db.session.add(empleado)
-                        empleados_creados += 1
-                    
-                    elif tipo == 'locador':
-                        locador = Locador(
-                            empresa_id=empresa_id,
-                            nombres=row[1] or '',
-                            apellidos=row[2] or '',
-                            dni=row[3] or '',
-                            monto_mensual=float(row[4]) if row[4] else 0,
-                            fecha_inicio=row[5] if row[5] else date.today(),
-                            suspendido=bool(row[6]) if row[6] else False,
-                            cuenta_bancaria=row[7] or '',
-                            banco=row[8] or '',
-                            descuento_alimentos=float(row[9]) if row[9] else 0
-                        )
-                        db.session.add(locador)
-                        locadores_creados += 1
-                
-                db.session.commit()
-                flash(f'Carga exitosa: {empleados_creados} empleados y {locadores_creados} locadores', 'success')
-                return redirect(url_for('personal', empresa_id=empresa_id))
+                # El archivo se guarda en disco y lo procesa worker_carga.py en segundo plano
+                trabajo = encolar_carga(empresa_id, archivo, app.config['UPLOAD_FOLDER'], modo)
+                flash(f'Archivo recibido: la carga #{trabajo.id} se procesará en segundo plano', 'info')
+                return redirect(url_for('cargar_excel', empresa_id=empresa_id, trabajo_id=trabajo.id))
                 
             except Exception as e:
                 db.session.rollback()
-                flash(f'Error al procesar el archivo: {str(e)}', 'error')
+                flash(f'Error al recibir el archivo: {str(e)}', 'error')
         else:
-            flash('Formato de archivo no válido. Use archivos .xlsx', 'error')
+            flash('Formato de archivo no válido. Use archivos .xlsx o .csv', 'error')
     
-    return render_template('cargar_excel.html', empresa=empresa)
+    trabajo = None
+    trabajo_id = request.args.get('trabajo_id', type=int)
+    if trabajo_id:
+        asegurar_tablas_planilla(db.session.connection())
+        trabajo = TrabajoCarga.query.filter_by(id=trabajo_id, empresa_id=empresa_id).first()
+    return render_template('cargar_excel.html', empresa=empresa, trabajo=trabajo)
+
+def validar_carga(empresa, archivo, modo):
+    """
+    Simulación de la carga: valida el archivo y lo compara con la base de
+    datos sin escribir. Si hay filas rechazadas se descarga el libro de
+    errores; si no, se informa lo que haría la carga.
+    """
+    libro_errores = io.BytesIO()
+    try:
+        resumen = validar_archivo(db, empresa.id, archivo.stream, modo, destino_errores=libro_errores,
+                                  formato=formato_archivo(archivo.stream, archivo.filename))
+    except Exception as e:
+        db.session.rollback()
+        flash(f'Error al validar el archivo: {str(e)}', 'error')
+        return redirect(url_for('cargar_excel', empresa_id=empresa.id))
+
+    mensaje = (f"Validación de {resumen['filas']} filas sin cambios en la base: {resumen['creados']} nuevos, "
+               f"{resumen['actualizados']} por actualizar, {resumen['sin_cambios']} sin cambios")
+    if resumen['existentes']:
+        mensaje += f" ({resumen['existentes']} DNI ya registrados se duplicarían; use la actualización por DNI)"
+    for hoja in resumen['hojas'].values():
+        mensaje += f"; {hoja['hoja']}: {hoja['validas']} registros válidos"
+    flash(mensaje, 'info')
+    errores = errores_carga(resumen)
+    if not errores:
+        return redirect(url_for('cargar_excel', empresa_id=empresa.id))
+
+    flash(f"{len(errores)} filas con errores: corríjalas en el libro descargado", 'warning')
+    libro_errores.seek(0)
+    return send_file(
+        libro_errores,
+        as_attachment=True,
+        download_name=f'errores_{os.path.splitext(secure_filename(archivo.filename))[0] or "carga"}.xlsx',
+        mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    )
+
+def encolar_carga(empresa_id, archivo, carpeta, modo='insertar'):
+    """
+    Guarda el archivo subido en la carpeta de cargas y registra el trabajo
+    pendiente (la petición responde sin esperar el procesamiento). En modo
+    'actualizar' el personal se cruza por DNI con el existente.
+    """
+    asegurar_tablas_planilla(db.session.connection())
+    nombre = secure_filename(archivo.filename) or f'carga.{formato_archivo(archivo, archivo.filename)}'
+    ruta = os.path.abspath(os.path.join(carpeta, f'{uuid.uuid4().hex}_{nombre}'))
+    archivo.save(ruta)
+    trabajo = TrabajoCarga(empresa_id=empresa_id, nombre_archivo=archivo.filename, ruta_archivo=ruta, modo=modo)
+    db.session.add(trabajo)
+    db.session.commit()
+    return trabajo
+
+def estado_trabajo(trabajo, ahora=None):
+    """Avance de una carga: filas, errores y tiempo restante estimado (ETA)"""
+    ahora = ahora or datetime.utcnow()
+    procesadas = trabajo.filas_procesadas or 0
+    eta = None
+    if trabajo.estado == 'procesando' and trabajo.fecha_inicio and trabajo.total_filas and procesadas:
+        transcurrido = (ahora - trabajo.fecha_inicio).total_seconds()
+        eta = round(transcurrido / procesadas * max(trabajo.total_filas - procesadas, 0), 1)
+    elif trabajo.estado == 'terminado':
+        eta = 0
+    return {
+        'id': trabajo.id,
+        'empresa_id': trabajo.empresa_id,
+        'archivo': trabajo.nombre_archivo,
+        'modo': trabajo.modo,
+        'estado': trabajo.estado,
+        'total_filas': trabajo.total_filas,
+        'filas_procesadas': procesadas,
+        'porcentaje': round(procesadas * 100 / trabajo.total_filas, 1) if trabajo.total_filas else None,
+        'empleados': trabajo.empleados or 0,
+        'locadores': trabajo.locadores or 0,
+        'creados': trabajo.creados or 0,
+        'actualizados': trabajo.actualizados or 0,
+        'sin_cambios': trabajo.sin_cambios or 0,
+        'errores': trabajo.errores or 0,
+        'detalle_errores': json.loads(trabajo.detalle_errores) if trabajo.detalle_errores else [],
+        'mensaje': trabajo.mensaje,
+        'eta_segundos': eta
+    }
+
+@app.route('/estado_carga/<int:trabajo_id>')
+def estado_carga(trabajo_id):
+    """Estado de una carga en segundo plano (JSON para consultar el avance)"""
+    asegurar_tablas_planilla(db.session.connection())
+    trabajo = TrabajoCarga.query.get_or_404(trabajo_id)
+    return jsonify(estado_trabajo(trabajo))
 
 @app.route('/descargar_plantilla/<int:empresa_id>')
 def descargar_plantilla(empresa_id):
@@ -626,14 +1027,8 @@ def descargar_plantilla(empresa_id):
     ws = wb.active
     ws.title = "Plantilla Carga Masiva"
     
-    # Encabezados
-    headers = [
-        'Tipo', 'Nombres', 'Apellidos', 'DNI', 'Sueldo/Monto', 'Fecha Ingreso/Inicio',
-        'Fecha Nacimiento', 'Dirección', 'Teléfono', 'Email', 'Tipo Pensión',
-        'Código AFP', 'Cuenta Bancaria', 'Banco', 'Tipo Pago', 'Descuento Alimentos'
-    ]
-    
-    for col, header in enumerate(headers, 1):
+    # Encabezados (los mismos que lee carga_masiva)
+    for col, header in enumerate(ENCABEZADOS_PLANTILLA, 1):
         ws.cell(row=1, column=col, value=header)
     
     # Datos de ejemplo para empleados
@@ -672,6 +1067,11 @@ def descargar_plantilla(empresa_id):
     ws.cell(row=3, column=15, value='')
     ws.cell(row=3, column=16, value=0)
     
+    # Hojas opcionales de movimientos (solo encabezados; se cruzan por el DNI del empleado)
+    for hoja in HOJAS_MOVIMIENTOS.values():
+        ws_movimientos = wb.create_sheet(hoja['titulo'])
+        ws_movimientos.append(hoja['encabezados'])
+    
     # Crear respuesta
     output = io.BytesIO()
     wb.save(output)
@@ -6,6 +6,26 @@ import io
 from openpyxl import Workbook, load_workbook
 from openpyxl.styles import Font, Alignment, PatternFill
 from werkzeug.utils import secure_filename
+from dinero import a_centimos, a_float, multiplicar, FORMATO_EXCEL
+from config import aplicar_perfil_bd, registrar_pragmas_sqlite
+from reglas_regimen import ReglasRegimen, compilar_reglas
+from paginacion import leer_filtros_personal, paginar_personal, contar_personal
+from busqueda import buscar_personal, LIMITE_BUSQUEDA
+
+# Factores de beneficios por régimen laboral (fracciones del sueldo ajustado)
+REGLAS_REGIMEN = compilar_reglas({
+    'microempresa': {'vacaciones': (15, 360)},
+    'pequeña_empresa': {
+        'vacaciones': (15, 360), 'cts': (15, 12), 'gratificacion': (1, 2),
+        'asignacion_familiar': (10250, 102500)
+    },
+    'general': {
+        'vacaciones': (30, 360), 'cts': (1, 1), 'gratificacion': (109, 100),
+        'asignacion_familiar': (10250, 102500)
+    }
+})
+# Un régimen no registrado recibe vacaciones y CTS del régimen general
+REGLAS_OTRO_REGIMEN = ReglasRegimen('otro', vacaciones=(30, 360), cts=(1, 1))
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'sispla_peru_2024'
@@ -17,7 +37,10 @@ app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
 # Crear directorio de uploads si no existe
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 
+# Perfil de base de datos (SISPLA_CONFIG=production activa WAL y el pool)
+aplicar_perfil_bd(app)
 db = SQLAlchemy(app)
+registrar_pragmas_sqlite(app, db)
 
 # Modelos que coinciden exactamente con la base de datos existente
 class Empresa(db.Model):
@@ -34,6 +57,12 @@ class Empresa(db.Model):
 
 class Empleado(db.Model):
     __tablename__ = 'empleados'
+    # Listado de personal: orden (apellidos, id) y filtros por nombre y DNI
+    __table_args__ = (
+        db.Index('ix_empleados_empresa_apellidos', 'empresa_id', 'apellidos', 'id'),
+        db.Index('ix_empleados_empresa_nombres', 'empresa_id', 'nombres'),
+        db.Index('ix_empleados_empresa_dni', 'empresa_id', 'dni'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     empresa_id = db.Column(db.Integer, db.ForeignKey('empresas.id'), nullable=False)
     nombres = db.Column(db.String(100), nullable=False)
@@ -55,6 +84,12 @@ class Empleado(db.Model):
 
 class Locador(db.Model):
     __tablename__ = 'locadores'
+    # Listado de personal: orden (apellidos, id) y filtros por nombre y DNI
+    __table_args__ = (
+        db.Index('ix_locadores_empresa_apellidos', 'empresa_id', 'apellidos', 'id'),
+        db.Index('ix_locadores_empresa_nombres', 'empresa_id', 'nombres'),
+        db.Index('ix_locadores_empresa_dni', 'empresa_id', 'dni'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     empresa_id = db.Column(db.Integer, db.ForeignKey('empresas.id'), nullable=False)
     nombres = db.Column(db.String(100), nullable=False)
@@ -76,21 +111,25 @@ class Locador(db.Model):
 @app.route('/')
 def index():
     """Página principal del sistema"""
-    empresas = Empresa.query.all()
-    
-    # Calcular conteos de empleados y locadores activos por empresa
-    empresas_con_conteos = []
-    for empresa in empresas:
-        empleados_activos = Empleado.query.filter_by(empresa_id=empresa.id, activo=True).count()
-        locadores_activos = Locador.query.filter_by(empresa_id=empresa.id, activo=True).count()
-        
-        empresas_con_conteos.append({
-            'empresa': empresa,
-            'empleados_activos': empleados_activos,
-            'locadores_activos': locadores_activos
-        })
-    
-    return render_template('index.html', empresas_con_conteos=empresas_con_conteos)
+    return render_template('index.html', empresas_con_conteos=resumen_empresas())
+
+def resumen_empresas():
+    """Empresas con sus empleados y locadores activos, en una sola consulta"""
+    empleados_activos = db.session.query(db.func.count(Empleado.id)).filter(
+        Empleado.empresa_id == Empresa.id, Empleado.activo == True
+    ).correlate(Empresa).scalar_subquery()
+    locadores_activos = db.session.query(db.func.count(Locador.id)).filter(
+        Locador.empresa_id == Empresa.id, Locador.activo == True
+    ).correlate(Empresa).scalar_subquery()
+    
+    # Esta versión no guarda planillas: no hay total de la última planilla
+    filas = db.session.query(Empresa, empleados_activos, locadores_activos).order_by(Empresa.id)
+    return [{
+        'empresa': empresa,
+        'empleados_activos': empleados,
+        'locadores_activos': locadores,
+        'ultima_planilla': None
+    } for empresa, empleados, locadores in filas]
 
 @app.route('/empresas')
 def empresas():
@@ -120,11 +159,33 @@ def nueva_empresa():
 
 @app.route('/personal/<int:empresa_id>')
 def personal(empresa_id):
-    """Gestión de personal por empresa"""
+    """Gestión de personal por empresa
+
+    Empleados y locadores se listan por páginas (keyset sobre apellidos, id)
+    con los filtros de la URL: nombre, dni, banco, tipo_pago y activo. Los
+    totales de cada pestaña salen de un solo COUNT con los mismos filtros.
+    """
     empresa = Empresa.query.get_or_404(empresa_id)
-    empleados = Empleado.query.filter_by(empresa_id=empresa_id).all()
-    locadores = Locador.query.filter_by(empresa_id=empresa_id).all()
-    return render_template('personal.html', empresa=empresa, empleados=empleados, locadores=locadores)
+    filtros = leer_filtros_personal(request.args, activo='todos')
+    empleados, siguiente_empleados = paginar_personal(
+        Empleado, empresa_id, filtros, request.args.get('empleados_despues'))
+    locadores, siguiente_locadores = paginar_personal(
+        Locador, empresa_id, filtros, request.args.get('locadores_despues'))
+    total_empleados, total_locadores = contar_personal(empresa_id, filtros, Empleado, Locador)
+    return render_template('personal.html', empresa=empresa, empleados=empleados, locadores=locadores,
+                           filtros=filtros, siguiente_empleados=siguiente_empleados,
+                           siguiente_locadores=siguiente_locadores, total_empleados=total_empleados,
+                           total_locadores=total_locadores)
+
+@app.route('/buscar')
+def buscar():
+    """Búsqueda global de empleados y locadores por DNI, nombres o apellidos (JSON)"""
+    texto = request.args.get('q', '')
+    limite = request.args.get('limite', LIMITE_BUSQUEDA, type=int)
+    resultados = buscar_personal(db.session.connection(), texto, limite)
+    # La primera búsqueda en una base de datos crea el índice: se confirma para conservarlo
+    db.session.commit()
+    return jsonify({'consulta': texto, 'resultados': resultados})
 
 @app.route('/empleado/nuevo/<int:empresa_id>', methods=['GET', 'POST'])
 def nuevo_empleado(empresa_id):
@@ -434,7 +495,12 @@ def planilla(empresa_id):
                          año=año_actual)
 
 def calcular_planilla_simple(empresa_id, mes, año):
-    """Función simplificada para calcular planilla"""
+    """
+    Función simplificada para calcular planilla
+    
+    Los montos se calculan en céntimos enteros (ver dinero.py); cada
+    concepto se redondea una vez y los totales son la suma exacta de filas.
+    """
     empresa = Empresa.query.get_or_404(empresa_id)
     empleados = Empleado.query.filter_by(empresa_id=empresa_id, activo=True).all()
     locadores = Locador.query.filter_by(empresa_id=empresa_id, activo=True).all()
@@ -454,48 +520,27 @@ def calcular_planilla_simple(empresa_id, mes, año):
             'total_neto': 0
         }
     }
+    total_ingresos_planilla = total_descuentos_planilla = total_neto_planilla = 0
+    
+    reglas = REGLAS_REGIMEN.get(empresa.regimen_laboral, REGLAS_OTRO_REGIMEN)
     
     # Calcular planillas de empleados
     for empleado in empleados:
         # Cálculo básico
-        sueldo_base = float(empleado.sueldo_base)
+        sueldo_base = a_centimos(empleado.sueldo_base)
         sueldo_ajustado = sueldo_base
         
-        # Beneficios según régimen
-        if empresa.regimen_laboral in ['microempresa', 'pequeña_empresa']:
-            vacaciones = sueldo_ajustado * 15 / 360
-        else:
-            vacaciones = sueldo_ajustado * 30 / 360
-            
-        if empresa.regimen_laboral == 'microempresa':
-            cts = 0
-        elif empresa.regimen_laboral == 'pequeña_empresa':
-            cts = sueldo_ajustado * 15 / 12
-        else:
-            cts = sueldo_ajustado
-            
-        if empresa.regimen_laboral == 'microempresa':
-            gratificacion = 0
-        elif empresa.regimen_laboral == 'pequeña_empresa' and mes in [7, 12]:
-            gratificacion = sueldo_ajustado / 2
-        elif empresa.regimen_laboral == 'general' and mes in [7, 12]:
-            gratificacion = sueldo_ajustado * 1.09
-        else:
-            gratificacion = 0
-            
-        if empresa.regimen_laboral in ['pequeña_empresa', 'general'] and sueldo_ajustado <= 1025:
-            asignacion_familiar = 102.50
-        else:
-            asignacion_familiar = 0
+        # Beneficios según las reglas compiladas del régimen
+        vacaciones, cts, gratificacion, asignacion_familiar = reglas.beneficios(sueldo_ajustado, mes)
         
         # Descuentos
         if empleado.tipo_pension == 'ONP':
-            pension = sueldo_ajustado * 0.13
+            pension = multiplicar(sueldo_ajustado, 13, 100)
         else:
-            pension = sueldo_ajustado * 0.12
+            pension = multiplicar(sueldo_ajustado, 12, 100)
             
-        if sueldo_ajustado > 1025:
-            impuesto_renta = max(0, (sueldo_ajustado - 1025) * 0.08)
+        if sueldo_ajustado > 102500:
+            impuesto_renta = multiplicar(sueldo_ajustado - 102500, 8, 100)
         else:
             impuesto_renta = 0
         
@@ -509,37 +554,37 @@ def calcular_planilla_simple(empresa_id, mes, año):
             'nombres': empleado.nombres,
             'apellidos': empleado.apellidos,
             'dni': empleado.dni,
-            'sueldo_base': sueldo_base,
-            'sueldo_ajustado': round(sueldo_ajustado, 2),
+            'sueldo_base': a_float(sueldo_base),
+            'sueldo_ajustado': a_float(sueldo_ajustado),
             'dias_trabajados': 30,
             'dias_faltados': 0,
             'horas_perdidas': 0,
             'beneficios': {
-                'vacaciones': round(vacaciones, 2),
-                'cts': round(cts, 2),
-                'gratificacion': round(gratificacion, 2),
-                'asignacion_familiar': round(asignacion_familiar, 2)
+                'vacaciones': a_float(vacaciones),
+                'cts': a_float(cts),
+                'gratificacion': a_float(gratificacion),
+                'asignacion_familiar': a_float(asignacion_familiar)
             },
             'descuentos': {
-                'pension': round(pension, 2),
-                'impuesto_renta': round(impuesto_renta, 2),
+                'pension': a_float(pension),
+                'impuesto_renta': a_float(impuesto_renta),
                 'prestamos': 0,
                 'adelantos': 0
             },
-            'total_ingresos': round(total_ingresos, 2),
-            'total_descuentos': round(total_descuentos, 2),
-            'neto_pagar': round(neto_pagar, 2)
+            'total_ingresos': a_float(total_ingresos),
+            'total_descuentos': a_float(total_descuentos),
+            'neto_pagar': a_float(neto_pagar)
         })
         
-        resultados['totales']['total_ingresos'] += total_ingresos
-        resultados['totales']['total_descuentos'] += total_descuentos
-        resultados['totales']['total_neto'] += neto_pagar
+        total_ingresos_planilla += total_ingresos
+        total_descuentos_planilla += total_descuentos
+        total_neto_planilla += neto_pagar
     
     # Calcular planillas de locadores
     for locador in locadores:
-        monto_bruto = float(locador.monto_mensual)
-        if not locador.suspendido and monto_bruto > 1500:
-            retencion_4ta_cat = monto_bruto * 0.08
+        monto_bruto = a_centimos(locador.monto_mensual)
+        if not locador.suspendido and monto_bruto > 150000:
+            retencion_4ta_cat = multiplicar(monto_bruto, 8, 100)
         else:
             retencion_4ta_cat = 0
         neto_pagar = monto_bruto - retencion_4ta_cat
@@ -549,21 +594,21 @@ def calcular_planilla_simple(empresa_id, mes, año):
             'nombres': locador.nombres,
             'apellidos': locador.apellidos,
             'dni': locador.dni,
-            'monto_mensual': monto_bruto,
+            'monto_mensual': a_float(monto_bruto),
             'suspendido': locador.suspendido,
-            'monto_bruto': monto_bruto,
-            'retencion_4ta_cat': round(retencion_4ta_cat, 2),
-            'neto_pagar': round(neto_pagar, 2)
+            'monto_bruto': a_float(monto_bruto),
+            'retencion_4ta_cat': a_float(retencion_4ta_cat),
+            'neto_pagar': a_float(neto_pagar)
         })
         
-        resultados['totales']['total_neto'] += neto_pagar
+        total_neto_planilla += neto_pagar
     
     # Actualizar contadores
     resultados['totales']['total_empleados'] = len(empleados)
     resultados['totales']['total_locadores'] = len(locadores)
-    resultados['totales']['total_ingresos'] = round(resultados['totales']['total_ingresos'], 2)
-    resultados['totales']['total_descuentos'] = round(resultados['totales']['total_descuentos'], 2)
-    resultados['totales']['total_neto'] = round(resultados['totales']['total_neto'], 2)
+    resultados['totales']['total_ingresos'] = a_float(total_ingresos_planilla)
+    resultados['totales']['total_descuentos'] = a_float(total_descuentos_planilla)
+    resultados['totales']['total_neto'] = a_float(total_neto_planilla)
     
     return resultados
 
@@ -644,6 +689,8 @@ def exportar_excel(empresa_id):
             ws_empleados.cell(row=row, column=18, value=emp['total_ingresos'])
             ws_empleados.cell(row=row, column=19, value=emp['total_descuentos'])
             ws_empleados.cell(row=row, column=20, value=emp['neto_pagar'])
+            for col in [4, 5] + list(range(9, 17)) + [18, 19, 20]:
+                ws_empleados.cell(row=row, column=col).number_format = FORMATO_EXCEL
         
         # Ajustar ancho de columnas
         for column in ws_empleados.columns:
@@ -683,6 +730,8 @@ def exportar_excel(empresa_id):
             ws_locadores.cell(row=row, column=5, value='Sí' if loc['suspendido'] else 'No')
             ws_locadores.cell(row=row, column=6, value=loc['retencion_4ta_cat'])
             ws_locadores.cell(row=row, column=7, value=loc['neto_pagar'])
+            for col in (4, 6, 7):
+                ws_locadores.cell(row=row, column=col).number_format = FORMATO_EXCEL
         
         # Ajustar ancho de columnas
         for column in ws_locadores.columns:
@@ -13,6 +13,7 @@ import sqlite3
 import io
 from openpyxl import Workbook
 from werkzeug.utils import secure_filename
+from dinero import a_centimos, a_float, multiplicar
 
 # Configuración de Flask
 app = Flask(__name__)
@@ -220,7 +221,12 @@ def calcular_planilla(empresa_id):
                          año=año)
 
 def calcular_planilla_simple(empresa_id, mes, año):
-    """Función simplificada de cálculo de planilla"""
+    """
+    Función simplificada de cálculo de planilla
+
+    Los montos se calculan en céntimos enteros (ver dinero.py) y se entregan
+    como float ya redondeados, de modo que los totales cuadran con las filas.
+    """
     empresa = Empresa.query.get(empresa_id)
     empleados = Empleado.query.filter_by(empresa_id=empresa_id, activo=True).all()
     locadores = Locador.query.filter_by(empresa_id=empresa_id, activo=True).all()
@@ -230,17 +236,13 @@ def calcular_planilla_simple(empresa_id, mes, año):
         'mes': mes,
         'año': año,
         'empleados': [],
-        'locadores': [],
-        'totales': {
-            'total_ingresos': 0,
-            'total_descuentos': 0,
-            'total_neto': 0
-        }
+        'locadores': []
     }
+    totales = {'total_ingresos': 0, 'total_descuentos': 0, 'total_neto': 0}
     
     # Calcular para empleados
     for empleado in empleados:
-        sueldo_base = empleado.sueldo_base
+        sueldo_base = a_centimos(empleado.sueldo_base)
         
         # Calcular beneficios según régimen
         if empresa.regimen_laboral == 'microempresa':
@@ -249,19 +251,19 @@ def calcular_planilla_simple(empresa_id, mes, año):
             gratificacion = 0
             asignacion_familiar = 0
         elif empresa.regimen_laboral == 'pequeña_empresa':
-            vacaciones = sueldo_base * 15 / 365
-            cts = sueldo_base * 15 / 365
-            gratificacion = sueldo_base * 0.5 if mes in [7, 12] else 0
-            asignacion_familiar = 102.50 if sueldo_base <= 1025 else 0
+            vacaciones = multiplicar(sueldo_base, 15, 365)
+            cts = multiplicar(sueldo_base, 15, 365)
+            gratificacion = multiplicar(sueldo_base, 1, 2) if mes in [7, 12] else 0
+            asignacion_familiar = 10250 if sueldo_base <= 102500 else 0
         else:  # régimen general
-            vacaciones = sueldo_base * 30 / 365
+            vacaciones = multiplicar(sueldo_base, 30, 365)
             cts = sueldo_base
-            gratificacion = sueldo_base * 1.09 if mes in [7, 12] else 0
-            asignacion_familiar = 102.50 if sueldo_base <= 1025 else 0
+            gratificacion = multiplicar(sueldo_base, 109, 100) if mes in [7, 12] else 0
+            asignacion_familiar = 10250 if sueldo_base <= 102500 else 0
         
         # Calcular descuentos
-        pension = sueldo_base * 0.13 if empleado.tipo_pension == 'ONP' else sueldo_base * 0.12
-        impuesto_renta = max(0, (sueldo_base - 1025) * 0.08) if sueldo_base > 1025 else 0
+        pension = multiplicar(sueldo_base, 13 if empleado.tipo_pension == 'ONP' else 12, 100)
+        impuesto_renta = multiplicar(sueldo_base - 102500, 8, 100) if sueldo_base > 102500 else 0
         
         total_ingresos = sueldo_base + vacaciones + cts + gratificacion + asignacion_familiar
         total_descuentos = pension + impuesto_renta
@@ -269,26 +271,26 @@ def calcular_planilla_simple(empresa_id, mes, año):
         
         resultado['empleados'].append({
             'empleado': empleado,
-            'sueldo_base': sueldo_base,
-            'vacaciones': vacaciones,
-            'cts': cts,
-            'gratificacion': gratificacion,
-            'asignacion_familiar': asignacion_familiar,
-            'pension': pension,
-            'impuesto_renta': impuesto_renta,
-            'total_ingresos': total_ingresos,
-            'total_descuentos': total_descuentos,
-            'neto': neto
+            'sueldo_base': a_float(sueldo_base),
+            'vacaciones': a_float(vacaciones),
+            'cts': a_float(cts),
+            'gratificacion': a_float(gratificacion),
+            'asignacion_familiar': a_float(asignacion_familiar),
+            'pension': a_float(pension),
+            'impuesto_renta': a_float(impuesto_renta),
+            'total_ingresos': a_float(total_ingresos),
+            'total_descuentos': a_float(total_descuentos),
+            'neto': a_float(neto)
         })
         
-        resultado['totales']['total_ingresos'] += total_ingresos
-        resultado['totales']['total_descuentos'] += total_descuentos
-        resultado['totales']['total_neto'] += neto
+        totales['total_ingresos'] += total_ingresos
+        totales['total_descuentos'] += total_descuentos
+        totales['total_neto'] += neto
     
     # Calcular para locadores
     for locador in locadores:
-        monto_base = locador.monto_mensual
-        retencion_4ta = monto_base * 0.08 if not locador.suspendido and monto_base > 1500 else 0
+        monto_base = a_centimos(locador.monto_mensual)
+        retencion_4ta = multiplicar(monto_base, 8, 100) if not locador.suspendido and monto_base > 150000 else 0
         
         total_ingresos = monto_base
         total_descuentos = retencion_4ta
@@ -296,17 +298,18 @@ def calcular_planilla_simple(empresa_id, mes, año):
         
         resultado['locadores'].append({
             'locador': locador,
-            'monto_base': monto_base,
-            'retencion_4ta': retencion_4ta,
-            'total_ingresos': total_ingresos,
-            'total_descuentos': total_descuentos,
-            'neto': neto
+            'monto_base': a_float(monto_base),
+            'retencion_4ta': a_float(retencion_4ta),
+            'total_ingresos': a_float(total_ingresos),
+            'total_descuentos': a_float(total_descuentos),
+            'neto': a_float(neto)
         })
         
-        resultado['totales']['total_ingresos'] += total_ingresos
-        resultado['totales']['total_descuentos'] += total_descuentos
-        resultado['totales']['total_neto'] += neto
+        totales['total_ingresos'] += total_ingresos
+        totales['total_descuentos'] += total_descuentos
+        totales['total_neto'] += neto
     
+    resultado['totales'] = {clave: a_float(centimos) for clave, centimos in totales.items()}
     return resultado
 
 if __name__ == '__main__':
@@ -2,6 +2,7 @@ from flask import Flask, render_template, request, redirect, url_for, flash, jso
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime, date
 import os
+from dinero import a_centimos, a_float, multiplicar
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'sispla_peru_2024'
@@ -203,46 +204,50 @@ def calcular_planilla_simple(empresa_id, mes, año):
         }
     }
     
+    # Montos en céntimos enteros (ver dinero.py): cada concepto se redondea una
+    # sola vez y los totales son la suma exacta de las filas
+    totales = {'total_ingresos': 0, 'total_descuentos': 0, 'total_neto': 0}
+    
     # Calcular planillas de empleados
     for empleado in empleados:
         # Cálculo básico
-        sueldo_base = float(empleado.sueldo_base)
+        sueldo_base = a_centimos(empleado.sueldo_base)
         
         # Beneficios según régimen
         if empresa.regimen_laboral in ['microempresa', 'pequeña_empresa']:
-            vacaciones = sueldo_base * 15 / 360
+            vacaciones = multiplicar(sueldo_base, 15, 360)
         else:
-            vacaciones = sueldo_base * 30 / 360
+            vacaciones = multiplicar(sueldo_base, 30, 360)
             
         if empresa.regimen_laboral == 'microempresa':
             cts = 0
         elif empresa.regimen_laboral == 'pequeña_empresa':
-            cts = sueldo_base * 15 / 12
+            cts = multiplicar(sueldo_base, 15, 12)
         else:
             cts = sueldo_base
             
         if empresa.regimen_laboral == 'microempresa':
             gratificacion = 0
         elif empresa.regimen_laboral == 'pequeña_empresa' and mes in [7, 12]:
-            gratificacion = sueldo_base / 2
+            gratificacion = multiplicar(sueldo_base, 1, 2)
         elif empresa.regimen_laboral == 'general' and mes in [7, 12]:
-            gratificacion = sueldo_base * 1.09
+            gratificacion = multiplicar(sueldo_base, 109, 100)
         else:
             gratificacion = 0
             
-        if empresa.regimen_laboral in ['pequeña_empresa', 'general'] and sueldo_base <= 1025:
-            asignacion_familiar = 102.50
+        if empresa.regimen_laboral in ['pequeña_empresa', 'general'] and sueldo_base <= 102500:
+            asignacion_familiar = 10250
         else:
             asignacion_familiar = 0
         
         # Descuentos
         if empleado.tipo_pension == 'ONP':
-            pension = sueldo_base * 0.13
+            pension = multiplicar(sueldo_base, 13, 100)
         else:
-            pension = sueldo_base * 0.12
+            pension = multiplicar(sueldo_base, 12, 100)
             
-        if sueldo_base > 1025:
-            impuesto_renta = max(0, (sueldo_base - 1025) * 0.08)
+        if sueldo_base > 102500:
+            impuesto_renta = multiplicar(sueldo_base - 102500, 8, 100)
         else:
             impuesto_renta = 0
         
@@ -256,35 +261,35 @@ def calcular_planilla_simple(empresa_id, mes, año):
             'nombres': empleado.nombres,
             'apellidos': empleado.apellidos,
             'dni': empleado.dni,
-            'sueldo_base': sueldo_base,
+            'sueldo_base': a_float(sueldo_base),
             'dias_trabajados': 30,
             'dias_faltados': 0,
             'beneficios': {
-                'vacaciones': round(vacaciones, 2),
-                'cts': round(cts, 2),
-                'gratificacion': round(gratificacion, 2),
-                'asignacion_familiar': round(asignacion_familiar, 2)
+                'vacaciones': a_float(vacaciones),
+                'cts': a_float(cts),
+                'gratificacion': a_float(gratificacion),
+                'asignacion_familiar': a_float(asignacion_familiar)
             },
             'descuentos': {
-                'pension': round(pension, 2),
-                'impuesto_renta': round(impuesto_renta, 2),
+                'pension': a_float(pension),
+                'impuesto_renta': a_float(impuesto_renta),
                 'prestamos': 0,
                 'adelantos': 0
             },
-            'total_ingresos': round(total_ingresos, 2),
-            'total_descuentos': round(total_descuentos, 2),
-            'neto_pagar': round(neto_pagar, 2)
+            'total_ingresos': a_float(total_ingresos),
+            'total_descuentos': a_float(total_descuentos),
+            'neto_pagar': a_float(neto_pagar)
         })
         
-        resultados['totales']['total_ingresos'] += total_ingresos
-        resultados['totales']['total_descuentos'] += total_descuentos
-        resultados['totales']['total_neto'] += neto_pagar
+        totales['total_ingresos'] += total_ingresos
+        totales['total_descuentos'] += total_descuentos
+        totales['total_neto'] += neto_pagar
     
     # Calcular planillas de locadores
     for locador in locadores:
-        monto_bruto = float(locador.monto_mensual)
-        if not locador.suspendido and monto_bruto > 1500:
-            retencion_4ta_cat = monto_bruto * 0.08
+        monto_bruto = a_centimos(locador.monto_mensual)
+        if not locador.suspendido and monto_bruto > 150000:
+            retencion_4ta_cat = multiplicar(monto_bruto, 8, 100)
         else:
             retencion_4ta_cat = 0
         neto_pagar = monto_bruto - retencion_4ta_cat
@@ -294,21 +299,19 @@ def calcular_planilla_simple(empresa_id, mes, año):
             'nombres': locador.nombres,
             'apellidos': locador.apellidos,
             'dni': locador.dni,
-            'monto_mensual': monto_bruto,
+            'monto_mensual': a_float(monto_bruto),
             'suspendido': locador.suspendido,
-            'monto_bruto': monto_bruto,
-            'retencion_4ta_cat': round(retencion_4ta_cat, 2),
-            'neto_pagar': round(neto_pagar, 2)
+            'monto_bruto': a_float(monto_bruto),
+            'retencion_4ta_cat': a_float(retencion_4ta_cat),
+            'neto_pagar': a_float(neto_pagar)
         })
         
-        resultados['totales']['total_neto'] += neto_pagar
+        totales['total_neto'] += neto_pagar
     
     # Actualizar contadores
     resultados['totales']['total_empleados'] = len(empleados)
     resultados['totales']['total_locadores'] = len(locadores)
-    resultados['totales']['total_ingresos'] = round(resultados['totales']['total_ingresos'], 2)
-    resultados['totales']['total_descuentos'] = round(resultados['totales']['total_descuentos'], 2)
-    resultados['totales']['total_neto'] = round(resultados['totales']['total_neto'], 2)
+    resultados['totales'].update({clave: a_float(centimos) for clave, centimos in totales.items()})
     
     return resultados
 
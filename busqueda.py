@@ -0,0 +1,184 @@
+"""
+Búsqueda global de personal por DNI, nombres y apellidos
+Núcleo común para las versiones del sistema: un índice FTS5 de SQLite
+(personal_fts) reúne empleados y locadores de todas las empresas y se
+mantiene con triggers en cada INSERT, UPDATE y DELETE, también para las
+escrituras en bloque fuera del ORM. Si la versión de SQLite no trae FTS5 se
+usan índices globales sobre dni, apellidos y nombres con búsqueda por prefijo.
+"""
+
+import re
+import weakref
+
+from sqlalchemy import and_, or_, select, literal, union_all, table, column
+from sqlalchemy.exc import OperationalError
+
+from paginacion import condicion_prefijo
+
+# Resultados por búsqueda
+LIMITE_BUSQUEDA = 20
+LIMITE_BUSQUEDA_MAXIMO = 100
+
+# (tabla, tipo, resto de rowid): el rowid del índice es id * 2 + resto, de modo
+# que los triggers ubican la fila de cada persona sin recorrer el índice
+TABLAS_PERSONAL = (('empleados', 'empleado', 0), ('locadores', 'locador', 1))
+TIPOS_POR_RESTO = {resto: tipo for _, tipo, resto in TABLAS_PERSONAL}
+
+CREAR_INDICE_FTS = """
+    CREATE VIRTUAL TABLE personal_fts USING fts5(
+        empresa_id UNINDEXED, activo UNINDEXED, nombres, apellidos, dni,
+        tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3'
+    )
+"""
+
+TRIGGERS_FTS = """
+    CREATE TRIGGER IF NOT EXISTS personal_fts_{tabla}_ai AFTER INSERT ON {tabla} BEGIN
+        INSERT INTO personal_fts (rowid, empresa_id, activo, nombres, apellidos, dni)
+        VALUES (new.id * 2 + {resto}, new.empresa_id, new.activo, new.nombres, new.apellidos, new.dni);
+    END;
+    CREATE TRIGGER IF NOT EXISTS personal_fts_{tabla}_au
+    AFTER UPDATE OF id, empresa_id, activo, nombres, apellidos, dni ON {tabla} BEGIN
+        DELETE FROM personal_fts WHERE rowid = old.id * 2 + {resto};
+        INSERT INTO personal_fts (rowid, empresa_id, activo, nombres, apellidos, dni)
+        VALUES (new.id * 2 + {resto}, new.empresa_id, new.activo, new.nombres, new.apellidos, new.dni);
+    END;
+    CREATE TRIGGER IF NOT EXISTS personal_fts_{tabla}_ad AFTER DELETE ON {tabla} BEGIN
+        DELETE FROM personal_fts WHERE rowid = old.id * 2 + {resto};
+    END;
+"""
+
+LLENAR_INDICE_FTS = """
+    INSERT INTO personal_fts (rowid, empresa_id, activo, nombres, apellidos, dni)
+    SELECT id * 2 + {resto}, empresa_id, activo, nombres, apellidos, dni FROM {tabla}
+"""
+
+# Índices globales de la búsqueda por prefijo (sin FTS5)
+INDICES_PREFIJO = [
+    (f'ix_{tabla}_{columna}', tabla, columna)
+    for tabla, _, _ in TABLAS_PERSONAL for columna in ('dni', 'apellidos', 'nombres')
+]
+
+# Motores cuyo SQLite no trae FTS5 (usan la búsqueda por prefijo)
+_motores_sin_fts5 = weakref.WeakSet()
+
+def _indice_fts_existe(conexion):
+    """Indica si la tabla personal_fts ya existe en la base de datos"""
+    return conexion.exec_driver_sql(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'personal_fts'"
+    ).scalar() is not None
+
+def _crear_indice_fts(conexion):
+    """Crea personal_fts, sus triggers y lo llena con el personal existente"""
+    conexion.exec_driver_sql(CREAR_INDICE_FTS)
+    for tabla, _, resto in TABLAS_PERSONAL:
+        for sentencia in TRIGGERS_FTS.format(tabla=tabla, resto=resto).split('END;')[:-1]:
+            conexion.exec_driver_sql(sentencia + 'END;')
+        conexion.exec_driver_sql(LLENAR_INDICE_FTS.format(tabla=tabla, resto=resto))
+
+def asegurar_indice_busqueda(conexion):
+    """
+    Crea el índice de búsqueda si la base de datos aún no lo tiene
+
+    El índice se llena desde las tablas en la transacción de la conexión
+    (el llamador confirma); desde ahí los triggers lo mantienen al día.
+
+    Returns:
+        'fts5' o 'prefijo', según lo que soporte SQLite
+    """
+    motor = conexion.engine
+    if motor in _motores_sin_fts5:
+        return 'prefijo'
+    if _indice_fts_existe(conexion):
+        return 'fts5'
+    try:
+        with conexion.begin_nested():
+            _crear_indice_fts(conexion)
+        return 'fts5'
+    except OperationalError as error:
+        if 'fts5' not in str(error):
+            raise
+    # SQLite compilado sin FTS5 ("no such module: fts5")
+    _motores_sin_fts5.add(motor)
+    for nombre, tabla, columna in INDICES_PREFIJO:
+        conexion.exec_driver_sql(f"CREATE INDEX IF NOT EXISTS {nombre} ON {tabla} ({columna})")
+    return 'prefijo'
+
+def terminos_busqueda(texto):
+    """Palabras y números del texto buscado (sin signos)"""
+    return re.findall(r'\w+', texto or '')
+
+def _consulta_fts(terminos):
+    """Expresión MATCH de FTS5: todos los términos por prefijo"""
+    return ' '.join('"{}"*'.format(termino) for termino in terminos)
+
+def _fila_resultado(tipo, persona_id, empresa_id, empresa, activo, nombres, apellidos, dni):
+    """Resultado serializable (dict) de una persona encontrada"""
+    return {
+        'tipo': tipo,
+        'id': persona_id,
+        'empresa_id': empresa_id,
+        'empresa': empresa,
+        'activo': bool(activo),
+        'nombres': nombres,
+        'apellidos': apellidos,
+        'dni': dni
+    }
+
+def _buscar_fts(conexion, terminos, limite):
+    """Mejores coincidencias del índice FTS5 ordenadas por relevancia (bm25)"""
+    filas = conexion.exec_driver_sql("""
+        SELECT personal_fts.rowid, personal_fts.empresa_id, empresas.nombre, personal_fts.activo,
+               personal_fts.nombres, personal_fts.apellidos, personal_fts.dni
+        FROM personal_fts LEFT JOIN empresas ON empresas.id = personal_fts.empresa_id
+        WHERE personal_fts MATCH ?
+        ORDER BY personal_fts.rank
+        LIMIT ?
+    """, (_consulta_fts(terminos), limite)).fetchall()
+    return [_fila_resultado(TIPOS_POR_RESTO[rowid % 2], rowid // 2, *resto) for rowid, *resto in filas]
+
+def _buscar_prefijo(conexion, terminos, limite):
+    """
+    Búsqueda sin FTS5: el primer término por prefijo sobre los índices de
+    dni, apellidos y nombres; el resto debe aparecer en cualquiera de ellos
+    """
+    empresas = table('empresas', column('id'), column('nombre'))
+    consultas = []
+    for nombre_tabla, tipo, _ in TABLAS_PERSONAL:
+        personas = table(nombre_tabla, column('id'), column('empresa_id'), column('activo'),
+                         column('nombres'), column('apellidos'), column('dni'))
+        campos = (personas.c.nombres, personas.c.apellidos, personas.c.dni)
+        condiciones = [or_(*[condicion_prefijo(campo, terminos[0]) for campo in campos])]
+        for termino in terminos[1:]:
+            condiciones.append(or_(*[campo.like(f'%{termino}%') for campo in campos]))
+        consultas.append(
+            select(literal(tipo).label('tipo'), personas.c.id, personas.c.empresa_id, empresas.c.nombre,
+                   personas.c.activo, *campos)
+            .select_from(personas.outerjoin(empresas, empresas.c.id == personas.c.empresa_id))
+            .where(and_(*condiciones))
+        )
+    union = union_all(*consultas).subquery()
+    filas = conexion.execute(
+        select(union).order_by(union.c.apellidos, union.c.nombres, union.c.id).limit(limite)
+    ).fetchall()
+    return [_fila_resultado(*fila) for fila in filas]
+
+def buscar_personal(conexion, texto, limite=LIMITE_BUSQUEDA):
+    """
+    Busca empleados y locadores de todas las empresas por DNI, nombres o
+    apellidos (cada palabra por prefijo, sin distinguir tildes en FTS5)
+
+    Args:
+        conexion: conexión de SQLAlchemy (db.session.connection())
+        texto: lo escrito por el usuario, p. ej. "garcia ana" o "4012"
+        limite: máximo de resultados
+
+    Returns:
+        lista de dicts con tipo, id, empresa, nombres, apellidos, dni y activo
+    """
+    terminos = terminos_busqueda(texto)
+    if not terminos:
+        return []
+    limite = max(1, min(limite, LIMITE_BUSQUEDA_MAXIMO))
+    if asegurar_indice_busqueda(conexion) == 'fts5':
+        return _buscar_fts(conexion, terminos, limite)
+    return _buscar_prefijo(conexion, terminos, limite)
@@ -0,0 +1,188 @@
+"""
+Cálculo Columnar de Beneficios y Descuentos
+Procesa toda la planilla como columnas (listas paralelas) en lugar de
+empleado por empleado. Los montos se trabajan en céntimos enteros y se
+redondean una sola vez (mitad hacia arriba), por lo que el resultado
+coincide al céntimo con la ruta Decimal de calculadora_planilla. Los
+factores de cada régimen salen de las reglas compiladas (reglas_regimen).
+
+Lo usan las corridas de planilla (calcular_pagos_periodo, iterar_planilla
+y calcular_planilla_anual) a través de conceptos_empleados.
+"""
+
+from datetime import date
+from dinero import a_centimos, a_soles, dividir_redondeando, fraccion as _fraccion
+from reglas_regimen import MESES_GRATIFICACION
+from calculadora_planilla import TASA_AFP_DEFECTO, TASAS_PENSION_DEFECTO
+
+CONCEPTOS = ('vacaciones', 'cts', 'gratificacion', 'asignacion_familiar', 'pension', 'impuesto_renta')
+BENEFICIOS = CONCEPTOS[:4]
+
+# Tramos de 5ta categoría en céntimos: (límite superior, base fija, tasa %)
+TRAMOS_RENTA_5TA = (
+    (50000, 0, 8),
+    (100000, 4000, 14),
+    (None, 11000, 17),
+)
+
+# Fracción nula: el concepto no corresponde
+_SIN_FACTOR = (0, 1, 2)
+
+def _factor_redondeo(numerador, denominador):
+    """
+    Prepara una fracción para redondear montos no negativos sin llamadas:
+    round(x * n / d) == (x * 2n + d) // 2d
+    """
+    return (2 * numerador, denominador, 2 * denominador)
+
+def _columna_centimos(montos):
+    """Convierte una columna de montos a céntimos enteros"""
+    return [a_centimos(monto) for monto in montos]
+
+def _años_servicio(fecha_ingreso, referencia):
+    """Años completos de servicio a la fecha de referencia"""
+    años = referencia.year - fecha_ingreso.year
+    if (referencia.month, referencia.day) < (fecha_ingreso.month, fecha_ingreso.day):
+        años -= 1
+    return max(0, años)
+
+def _tasa_pension(tipo_pension, afp_codigo, tasa_onp, tasas_afp):
+    """Fracción de pensión aplicable según sistema y AFP"""
+    if tipo_pension == 'ONP':
+        return tasa_onp
+    if tipo_pension == 'AFP' and afp_codigo:
+        return tasas_afp.get(afp_codigo, _fraccion(TASA_AFP_DEFECTO))
+    return (0, 1)
+
+def _renta_5ta(sueldo, umbral):
+    """Impuesto a la renta 5ta categoría en céntimos"""
+    if sueldo <= umbral:
+        return 0
+    base = sueldo - umbral
+    limite_anterior = 0
+    for limite, fijo, tasa in TRAMOS_RENTA_5TA:
+        if limite is None or base <= limite:
+            return dividir_redondeando(fijo * 100 + (base - limite_anterior) * tasa, 100)
+        limite_anterior = limite
+
+def calcular_columnas(columnas, mes, año, umbral_renta_5ta='1025', fecha_referencia=None,
+                      tasas_pension=None):
+    """
+    Calcula beneficios y descuentos para toda la planilla de una vez
+
+    Los factores de cada régimen, las tasas de pensión y los años de servicio
+    se resuelven una vez por valor distinto; el recorrido de cada columna solo
+    hace aritmética entera.
+
+    Args:
+        columnas: dict con listas paralelas 'sueldo_base', 'fecha_ingreso',
+                  'tipo_pension', 'afp_codigo' y 'reglas' (ReglasRegimen)
+        mes, año: Período de cálculo
+        umbral_renta_5ta: Umbral mínimo no afecto a 5ta categoría (soles)
+        fecha_referencia: Fecha para los años de servicio (default: hoy)
+        tasas_pension: Tabla de obtener_tasas_pension (default: tasas por defecto)
+
+    Returns:
+        dict con una lista de céntimos enteros por concepto (ver CONCEPTOS)
+    """
+    if fecha_referencia is None:
+        fecha_referencia = date.today()
+    if tasas_pension is None:
+        tasas_pension = TASAS_PENSION_DEFECTO
+
+    sueldos = _columna_centimos(columnas['sueldo_base'])
+    reglas_filas = columnas['reglas']
+    fechas = columnas['fecha_ingreso']
+    umbral = a_centimos(umbral_renta_5ta)
+    tasa_onp = _fraccion(tasas_pension['ONP'])
+    tasas_afp = {codigo: _fraccion(tasa) for codigo, tasa in tasas_pension['AFP'].items()}
+
+    # Factores precompilados por régimen
+    distintas = set(reglas_filas)
+    factores_vacaciones = {reglas: _factor_redondeo(*reglas.vacaciones) for reglas in distintas}
+    if mes in MESES_GRATIFICACION:
+        factores_gratificacion = {reglas: _factor_redondeo(*reglas.gratificacion) for reglas in distintas}
+    else:
+        factores_gratificacion = dict.fromkeys(distintas, _SIN_FACTOR)
+
+    # CTS: el factor depende del régimen y, si es por año, de los años de servicio
+    factores_cts = {}
+    for reglas, fecha in zip(reglas_filas, fechas):
+        clave = (reglas, fecha if reglas.usa_años_servicio else None)
+        if clave not in factores_cts:
+            numerador, denominador = reglas.cts
+            if reglas.usa_años_servicio:
+                numerador *= _años_servicio(fecha, fecha_referencia)
+            factores_cts[clave] = _factor_redondeo(numerador, denominador)
+
+    factores_pension = {}
+    claves_pension = list(zip(columnas['tipo_pension'], columnas['afp_codigo']))
+    for clave in claves_pension:
+        if clave not in factores_pension:
+            factores_pension[clave] = _factor_redondeo(*_tasa_pension(clave[0], clave[1], tasa_onp, tasas_afp))
+
+    vacaciones = []
+    for sueldo, reglas in zip(sueldos, reglas_filas):
+        doble, denominador, doble_denominador = factores_vacaciones[reglas]
+        vacaciones.append((sueldo * doble + denominador) // doble_denominador)
+
+    cts = []
+    for sueldo, reglas, fecha in zip(sueldos, reglas_filas, fechas):
+        doble, denominador, doble_denominador = factores_cts[(reglas, fecha if reglas.usa_años_servicio else None)]
+        cts.append((sueldo * doble + denominador) // doble_denominador)
+
+    gratificacion = []
+    for sueldo, reglas in zip(sueldos, reglas_filas):
+        doble, denominador, doble_denominador = factores_gratificacion[reglas]
+        gratificacion.append((sueldo * doble + denominador) // doble_denominador)
+
+    asignacion_familiar = [
+        reglas.asignacion_familiar if sueldo <= reglas.umbral_asignacion else 0
+        for sueldo, reglas in zip(sueldos, reglas_filas)
+    ]
+
+    pension = []
+    for sueldo, clave in zip(sueldos, claves_pension):
+        doble, denominador, doble_denominador = factores_pension[clave]
+        pension.append((sueldo * doble + denominador) // doble_denominador)
+
+    impuesto_renta = [_renta_5ta(sueldo, umbral) if sueldo > umbral else 0 for sueldo in sueldos]
+
+    return {
+        'vacaciones': vacaciones,
+        'cts': cts,
+        'gratificacion': gratificacion,
+        'asignacion_familiar': asignacion_familiar,
+        'pension': pension,
+        'impuesto_renta': impuesto_renta
+    }
+
+def columnas_desde_empleados(empleados, reglas):
+    """Arma las columnas de entrada a partir de objetos Empleado de una empresa"""
+    return {
+        'sueldo_base': [empleado.sueldo_base for empleado in empleados],
+        'fecha_ingreso': [empleado.fecha_ingreso for empleado in empleados],
+        'tipo_pension': [empleado.tipo_pension for empleado in empleados],
+        'afp_codigo': [empleado.afp_codigo for empleado in empleados],
+        'reglas': [reglas] * len(empleados)
+    }
+
+def conceptos_empleados(empleados, reglas, mes, año, umbral_renta_5ta='1025', fecha_referencia=None,
+                        tasas_pension=None):
+    """
+    Beneficios y descuentos de los empleados de una empresa para construir_pago
+
+    Returns:
+        lista alineada con empleados de (beneficios, descuentos), dicts de
+        montos Decimal en soles como los de calcular_beneficios_sociales y
+        calcular_descuentos_empleado
+    """
+    resultado = calcular_columnas(columnas_desde_empleados(empleados, reglas), mes, año,
+                                  umbral_renta_5ta, fecha_referencia, tasas_pension)
+    return [
+        ({'vacaciones': a_soles(vacaciones), 'cts': a_soles(cts), 'gratificacion': a_soles(gratificacion),
+          'asignacion_familiar': a_soles(asignacion)},
+         {'pension': a_soles(pension), 'impuesto_renta': a_soles(renta)})
+        for vacaciones, cts, gratificacion, asignacion, pension, renta in zip(
+            *(resultado[concepto] for concepto in CONCEPTOS))
+    ]
@@ -4,9 +4,15 @@ Implementa la lógica de cálculo de beneficios sociales y descuentos
 según el régimen laboral de la empresa (Microempresa, Pequeña Empresa, General)
 """
 
+import time
 from decimal import Decimal, ROUND_HALF_UP
 from datetime import datetime, date
-from models import Empresa, Empleado, Locador, Ausencia, Prestamo, Adelanto, Pago, PagoLocador, Configuracion
+from sqlalchemy import event, UniqueConstraint
+from sqlalchemy.dialects import sqlite, postgresql
+from sqlalchemy.orm import Session
+from dinero import a_centimos, a_soles, multiplicar, aplicar_tasa
+from reglas_regimen import ReglasRegimen, compilar_reglas
+from models import db, Empresa, Empleado, Locador, Ausencia, Prestamo, Adelanto, Pago, PagoLocador, Planilla, Configuracion, marcar_adelantos
 
 # Constantes del sistema laboral peruano
 ASIGNACION_FAMILIAR = Decimal('102.50')
@@ -15,27 +21,150 @@ UMBRAL_RETENCION_4TA_CAT = Decimal('1500.00')
 TASA_RETENCION_4TA_CAT = Decimal('0.08')
 TASA_PENSION_ONP = Decimal('0.13')
 
-# Tasas de AFP (ejemplo - deben ser configurables)
+# Tasas de AFP por defecto (las vigentes se leen de Configuracion: tasa_afp_<codigo>)
 TASAS_AFP = {
     'PRIMA': Decimal('0.12'),
     'INTEGRA': Decimal('0.12'),
     'PROFUTURO': Decimal('0.12'),
     'HABITAT': Decimal('0.12')
 }
+TASA_AFP_DEFECTO = Decimal('0.12')
+
+TASAS_PENSION_DEFECTO = {'ONP': TASA_PENSION_ONP, 'AFP': TASAS_AFP}
+
+# Factores de beneficios sociales por régimen laboral (fracciones del sueldo)
+_ASIGNACION = (a_centimos(ASIGNACION_FAMILIAR), a_centimos(UMBRAL_ASIGNACION_FAMILIAR))
+REGIMENES = {
+    # Microempresa: NO corresponde CTS, gratificaciones ni asignación familiar
+    'microempresa': {'vacaciones': (15, 360)},
+    'pequeña_empresa': {
+        'vacaciones': (15, 360),           # 15 días al año
+        'cts': (15, 12), 'cts_por_año': True,  # Media remuneración anual
+        'gratificacion': (1, 2),           # Medio sueldo
+        'asignacion_familiar': _ASIGNACION
+    },
+    'general': {
+        'vacaciones': (30, 360),           # 30 días al año
+        'cts': (30, 12), 'cts_por_año': True,  # Un sueldo anual
+        'gratificacion': (109, 100),       # Sueldo + 9% bonificación
+        'asignacion_familiar': _ASIGNACION
+    }
+}
+REGLAS_REGIMEN = compilar_reglas(REGIMENES)
+REGLAS_SIN_BENEFICIOS = ReglasRegimen('sin_regimen')
+
+def obtener_reglas_regimen(regimen):
+    """Reglas compiladas del régimen (sin beneficios si el régimen no existe)"""
+    return REGLAS_REGIMEN.get(regimen, REGLAS_SIN_BENEFICIOS)
+
+# Caché de configuración por proceso. _version_configuracion sube con cada
+# escritura de Configuracion; la caché se recarga cuando no coincide.
+_version_configuracion = 0
+_cache_configuracion = {'version': None, 'motor': None, 'marca': None, 'valores': {}, 'tasas': TASAS_PENSION_DEFECTO}
+
+def invalidar_configuracion():
+    """Marca como desactualizada la caché de configuración"""
+    global _version_configuracion
+    _version_configuracion += 1
+
+def _marca_configuracion():
+    """Cantidad de filas y última actualización de Configuracion (una consulta)"""
+    return tuple(db.session.query(
+        db.func.count(Configuracion.id), db.func.max(Configuracion.fecha_actualizacion)
+    ).one())
+
+def construir_tasas_pension(valores):
+    """
+    Arma la tabla de tasas de pensión desde los valores de configuración
+    
+    Las claves tasa_pension_onp y tasa_afp_<codigo> se guardan en porcentaje;
+    si faltan se usan las tasas por defecto.
+    """
+    tasas_afp = dict(TASAS_AFP)
+    for clave, valor in valores.items():
+        if clave.startswith('tasa_afp_'):
+            tasas_afp[clave[len('tasa_afp_'):].upper()] = Decimal(valor) / 100
+    
+    tasa_onp = TASA_PENSION_ONP
+    if 'tasa_pension_onp' in valores:
+        tasa_onp = Decimal(valores['tasa_pension_onp']) / 100
+    
+    return {'ONP': tasa_onp, 'AFP': tasas_afp}
+
+def _cargar_cache_configuracion():
+    """Recarga la caché si cambió la versión o la base de datos en uso"""
+    cache = _cache_configuracion
+    if cache['version'] != _version_configuracion or cache['motor'] is not db.engine:
+        version = _version_configuracion
+        filas = Configuracion.query.all()
+        valores = {config.clave: config.valor for config in filas}
+        fechas = [config.fecha_actualizacion for config in filas if config.fecha_actualizacion]
+        cache.update({
+            'version': version,
+            'motor': db.engine,
+            'marca': (len(filas), max(fechas) if fechas else None),
+            'valores': valores,
+            'tasas': construir_tasas_pension(valores)
+        })
+    return cache
+
+def refrescar_configuracion():
+    """
+    Invalida la caché si la configuración cambió desde otro proceso
+    
+    Se llama una vez por corrida o por petición; cuesta una consulta agregada.
+    """
+    cache = _cache_configuracion
+    if cache['version'] == _version_configuracion and cache['motor'] is db.engine:
+        if _marca_configuracion() != cache['marca']:
+            invalidar_configuracion()
+
+def obtener_valores_configuracion():
+    """Todos los valores de configuración (clave → valor) desde la caché"""
+    return _cargar_cache_configuracion()['valores']
+
+def obtener_tasas_pension():
+    """Tabla de tasas de pensión {'ONP': tasa, 'AFP': {codigo: tasa}} desde la caché"""
+    return _cargar_cache_configuracion()['tasas']
 
 def obtener_configuracion(clave, valor_default='0'):
     """Obtiene configuración del sistema o retorna valor por defecto"""
-    config = Configuracion.query.filter_by(clave=clave).first()
-    return Decimal(config.valor) if config else Decimal(valor_default)
+    valor = obtener_valores_configuracion().get(clave)
+    return Decimal(valor) if valor is not None else Decimal(valor_default)
+
+@event.listens_for(Session, 'after_flush')
+def _detectar_cambio_configuracion(session, flush_context):
+    """Sube la versión de configuración cuando se escribe una fila de Configuracion"""
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, Configuracion):
+            session.info['configuracion_modificada'] = True
+            invalidar_configuracion()
+            break
+
+@event.listens_for(Session, 'after_rollback')
+def _descartar_cambio_configuracion(session):
+    """Un rollback deshace cambios ya vistos por la caché: se invalida de nuevo"""
+    if session.info.pop('configuracion_modificada', False):
+        invalidar_configuracion()
+
+@event.listens_for(Session, 'after_commit')
+def _confirmar_cambio_configuracion(session):
+    session.info.pop('configuracion_modificada', None)
+
+def rango_mes(mes, año):
+    """Retorna el rango [inicio, fin) de fechas de un mes"""
+    inicio = date(año, mes, 1)
+    fin = date(año + 1, 1, 1) if mes == 12 else date(año, mes + 1, 1)
+    return inicio, fin
 
 def calcular_dias_trabajados(empleado_id, mes, año):
     """Calcula los días trabajados de un empleado en un mes específico"""
-    from app import db
     # Obtener ausencias del mes
+    inicio, fin = rango_mes(mes, año)
     ausencias = Ausencia.query.filter(
         Ausencia.empleado_id == empleado_id,
-        db.extract('month', Ausencia.fecha) == mes,
-        db.extract('year', Ausencia.fecha) == año
+        Ausencia.fecha >= inicio,
+        Ausencia.fecha < fin
     ).all()
     
     # Calcular días perdidos
@@ -47,93 +176,77 @@ def calcular_dias_trabajados(empleado_id, mes, año):
     
     return max(0, dias_trabajados), dias_perdidos
 
-def calcular_beneficios_sociales(empleado, empresa, mes, año):
+def calcular_beneficios_sociales(empleado, empresa, mes, año, fecha_referencia=None, reglas=None):
     """
     Calcula beneficios sociales según el régimen laboral de la empresa
+    
+    Los montos se calculan en céntimos (ver dinero.py) y se retornan como
+    Decimal con dos decimales. Los años de servicio se cuentan hasta
+    fecha_referencia (por defecto, hoy). Los cálculos masivos pasan las
+    reglas ya compiladas del régimen para no resolverlas por empleado.
     """
-    regimen = empresa.regimen_laboral
-    sueldo_base = empleado.sueldo_base
+    if reglas is None:
+        reglas = obtener_reglas_regimen(empresa.regimen_laboral)
+    sueldo = a_centimos(empleado.sueldo_base)
     
-    beneficios = {
-        'vacaciones': Decimal('0'),
-        'cts': Decimal('0'),
-        'gratificacion': Decimal('0'),
-        'asignacion_familiar': Decimal('0')
-    }
+    años_servicio = 1
+    if reglas.usa_años_servicio:
+        años_servicio = calcular_años_servicio(empleado.fecha_ingreso, fecha_referencia)
+    vacaciones, cts, gratificacion, asignacion_familiar = reglas.beneficios(sueldo, mes, años_servicio)
     
-    # Vacaciones anuales
-    if regimen in ['microempresa', 'pequeña_empresa']:
-        beneficios['vacaciones'] = (sueldo_base * Decimal('15')) / Decimal('360')  # 15 días al año
-    elif regimen == 'general':
-        beneficios['vacaciones'] = (sueldo_base * Decimal('30')) / Decimal('360')  # 30 días al año
-    
-    # CTS (Compensación por Tiempo de Servicios)
-    if regimen == 'pequeña_empresa':
-        # Media remuneración anual (15 días por año de servicio)
-        años_servicio = calcular_años_servicio(empleado.fecha_ingreso)
-        beneficios['cts'] = (sueldo_base * Decimal('15') * años_servicio) / Decimal('12')
-    elif regimen == 'general':
-        # Un sueldo anual
-        años_servicio = calcular_años_servicio(empleado.fecha_ingreso)
-        beneficios['cts'] = (sueldo_base * Decimal('30') * años_servicio) / Decimal('12')
-    # Microempresa: NO corresponde CTS
-    
-    # Gratificaciones (Julio y Diciembre)
-    if mes in [7, 12]:  # Julio y Diciembre
-        if regimen == 'pequeña_empresa':
-            beneficios['gratificacion'] = sueldo_base / Decimal('2')  # Medio sueldo
-        elif regimen == 'general':
-            beneficios['gratificacion'] = sueldo_base + (sueldo_base * Decimal('0.09'))  # Sueldo + 9% bonificación
-        # Microempresa: NO corresponde gratificaciones
-    
-    # Asignación Familiar
-    if regimen in ['pequeña_empresa', 'general']:
-        if sueldo_base <= UMBRAL_ASIGNACION_FAMILIAR:
-            beneficios['asignacion_familiar'] = ASIGNACION_FAMILIAR
-    # Microempresa: NO corresponde asignación familiar
-    
-    return beneficios
-
-def calcular_años_servicio(fecha_ingreso):
-    """Calcula los años de servicio de un empleado"""
-    hoy = date.today()
+    return {
+        'vacaciones': a_soles(vacaciones),
+        'cts': a_soles(cts),
+        'gratificacion': a_soles(gratificacion),
+        'asignacion_familiar': a_soles(asignacion_familiar)
+    }
+
+def calcular_años_servicio(fecha_ingreso, fecha_referencia=None):
+    """Calcula los años de servicio de un empleado a la fecha de referencia (por defecto, hoy)"""
+    hoy = fecha_referencia or date.today()
     años = hoy.year - fecha_ingreso.year
     if hoy.month < fecha_ingreso.month or (hoy.month == fecha_ingreso.month and hoy.day < fecha_ingreso.day):
         años -= 1
     return max(0, años)
 
-def calcular_descuentos_empleado(empleado, mes, año):
+def calcular_descuentos_empleado(empleado, mes, año, umbral_minimo=None, tasas=None):
     """
     Calcula descuentos para empleados (pensión e impuesto a la renta)
+    
+    Si no se indican umbral_minimo o tasas se toman de la caché de
+    configuración del sistema.
     """
-    sueldo_base = empleado.sueldo_base
+    sueldo = a_centimos(empleado.sueldo_base)
+    pension = impuesto_renta = 0
     
-    descuentos = {
-        'pension': Decimal('0'),
-        'impuesto_renta': Decimal('0')
-    }
+    if tasas is None:
+        tasas = obtener_tasas_pension()
     
     # Cálculo de pensión
     if empleado.tipo_pension == 'ONP':
-        descuentos['pension'] = sueldo_base * TASA_PENSION_ONP
+        pension = aplicar_tasa(sueldo, tasas['ONP'])
     elif empleado.tipo_pension == 'AFP' and empleado.afp_codigo:
-        tasa_afp = TASAS_AFP.get(empleado.afp_codigo, Decimal('0.12'))
-        descuentos['pension'] = sueldo_base * tasa_afp
+        pension = aplicar_tasa(sueldo, tasas['AFP'].get(empleado.afp_codigo, TASA_AFP_DEFECTO))
     
     # Impuesto a la Renta 5ta Categoría
     # Umbral mínimo no afecto (debe ser configurable)
-    umbral_minimo = obtener_configuracion('umbral_renta_5ta', '1025')
-    if sueldo_base > umbral_minimo:
-        # Cálculo simplificado del impuesto a la renta
-        base_imponible = sueldo_base - umbral_minimo
-        if base_imponible <= Decimal('500'):
-            descuentos['impuesto_renta'] = base_imponible * Decimal('0.08')
-        elif base_imponible <= Decimal('1000'):
-            descuentos['impuesto_renta'] = Decimal('40') + ((base_imponible - Decimal('500')) * Decimal('0.14'))
+    if umbral_minimo is None:
+        umbral_minimo = obtener_configuracion('umbral_renta_5ta', '1025')
+    umbral = a_centimos(umbral_minimo)
+    if sueldo > umbral:
+        # Cálculo simplificado del impuesto a la renta (tramos de S/. 500 y S/. 1000)
+        base_imponible = sueldo - umbral
+        if base_imponible <= 50000:
+            impuesto_renta = multiplicar(base_imponible, 8, 100)
+        elif base_imponible <= 100000:
+            impuesto_renta = 4000 + multiplicar(base_imponible - 50000, 14, 100)
         else:
-            descuentos['impuesto_renta'] = Decimal('110') + ((base_imponible - Decimal('1000')) * Decimal('0.17'))
+            impuesto_renta = 11000 + multiplicar(base_imponible - 100000, 17, 100)
     
-    return descuentos
+    return {
+        'pension': a_soles(pension),
+        'impuesto_renta': a_soles(impuesto_renta)
+    }
 
 def calcular_deudas_internas(empleado_id, mes, año):
     """
@@ -174,9 +287,6 @@ def calcular_planilla_empleado(empleado, empresa, mes, año, tipo_pago='mensual'
     # Calcular días trabajados
     dias_trabajados, dias_faltados = calcular_dias_trabajados(empleado.id, mes, año)
     
-    # Sueldo proporcional por días trabajados
-    sueldo_proporcional = (empleado.sueldo_base * dias_trabajados) / Decimal('30')
-    
     # Calcular beneficios sociales
     beneficios = calcular_beneficios_sociales(empleado, empresa, mes, año)
     
@@ -184,10 +294,29 @@ def calcular_planilla_empleado(empleado, empresa, mes, año, tipo_pago='mensual'
     descuentos_empleado = calcular_descuentos_empleado(empleado, mes, año)
     deudas = calcular_deudas_internas(empleado.id, mes, año)
     
+    return construir_pago(empleado, mes, año, tipo_pago, dias_trabajados, dias_faltados,
+                          beneficios, descuentos_empleado, deudas)
+
+def construir_pago(empleado, mes, año, tipo_pago, dias_trabajados, dias_faltados,
+                   beneficios, descuentos_empleado, deudas):
+    """
+    Arma el registro Pago a partir de los conceptos ya calculados
+    
+    Los totales se suman en céntimos, así coinciden exactamente con la suma
+    de los conceptos guardados.
+    """
+    # Sueldo proporcional por días trabajados
+    sueldo_proporcional = multiplicar(a_centimos(empleado.sueldo_base), dias_trabajados, 30)
+    
     # Totales
-    total_ingresos = sueldo_proporcional + sum(beneficios.values())
-    total_descuentos = sum(descuentos_empleado.values()) + sum(deudas.values())
-    neto_pagar = total_ingresos - total_descuentos
+    ingresos = sueldo_proporcional + sum(a_centimos(monto) for monto in beneficios.values())
+    descuentos = (sum(a_centimos(monto) for monto in descuentos_empleado.values())
+                  + sum(a_centimos(monto) for monto in deudas.values()))
+    
+    sueldo_proporcional = a_soles(sueldo_proporcional)
+    total_ingresos = a_soles(ingresos)
+    total_descuentos = a_soles(descuentos)
+    neto_pagar = a_soles(ingresos - descuentos)
     
     # Crear registro de pago
     pago = Pago(
@@ -213,18 +342,170 @@ def calcular_planilla_empleado(empleado, empresa, mes, año, tipo_pago='mensual'
     
     return pago
 
+def cargar_datos_periodo(empresa_id, mes, año, empleado_ids=None, incluir_aplicados=None, tipo_pago=None):
+    """
+    Carga en bloque los insumos de la planilla de una empresa para un período
+    
+    Ejecuta un número fijo de consultas agrupadas (empleados, locadores,
+    ausencias, préstamos, adelantos y configuración) sin importar cuántas
+    personas tenga la planilla, y devuelve mapas indexados por empleado_id.
+    
+    Con empleado_ids se cargan solo esos empleados (recálculo parcial): no se
+    incluyen locadores y se toman también los adelantos ya aplicados del mes,
+    porque el pago que se reemplaza ya los había descontado (incluir_aplicados
+    permite cambiar esto, p. ej. al procesar la planilla por lotes).
+    
+    Con tipo_pago, los empleados que ya tienen pago del período y tipo toman
+    también sus adelantos aplicados: el cálculo sobrescribe ese pago, que ya
+    los descontaba.
+    """
+    empresa = Empresa.query.get_or_404(empresa_id)
+    if incluir_aplicados is None:
+        incluir_aplicados = empleado_ids is not None
+    
+    filtro_empleados = [Empleado.empresa_id == empresa_id, Empleado.activo == True]
+    if empleado_ids is not None:
+        filtro_empleados.append(Empleado.id.in_(empleado_ids))
+    
+    empleados = Empleado.query.filter(*filtro_empleados).order_by(Empleado.id).all()
+    if empleado_ids is None:
+        locadores = Locador.query.filter_by(empresa_id=empresa_id, activo=True).order_by(Locador.id).all()
+    else:
+        locadores = []
+    
+    inicio, fin = rango_mes(mes, año)
+    
+    # Faltas del mes agrupadas por empleado
+    faltas = dict(
+        db.session.query(Ausencia.empleado_id, db.func.count(Ausencia.id))
+        .join(Empleado, Empleado.id == Ausencia.empleado_id)
+        .filter(
+            *filtro_empleados,
+            Ausencia.tipo == 'falta',
+            Ausencia.fecha >= inicio,
+            Ausencia.fecha < fin
+        )
+        .group_by(Ausencia.empleado_id)
+        .all()
+    )
+    
+    # Cuotas de préstamos activos por empleado
+    prestamos = {}
+    cuotas = (
+        db.session.query(Prestamo.empleado_id, Prestamo.cuota_mensual)
+        .join(Empleado, Empleado.id == Prestamo.empleado_id)
+        .filter(
+            *filtro_empleados,
+            Prestamo.activo == True
+        )
+        .all()
+    )
+    for empleado_id, cuota_mensual in cuotas:
+        prestamos[empleado_id] = prestamos.get(empleado_id, Decimal('0')) + cuota_mensual
+    
+    # Adelantos pendientes del mes por empleado
+    adelantos = {}
+    consulta_adelantos = (
+        Adelanto.query
+        .join(Empleado, Empleado.id == Adelanto.empleado_id)
+        .filter(
+            *filtro_empleados,
+            Adelanto.mes_aplicar == mes,
+            Adelanto.año_aplicar == año
+        )
+    )
+    if not incluir_aplicados:
+        sin_aplicar = Adelanto.aplicado == False
+        if tipo_pago:
+            con_pago = db.session.query(Pago.empleado_id).filter(
+                Pago.mes == mes, Pago.año == año, Pago.tipo_pago == tipo_pago
+            )
+            sin_aplicar = db.or_(sin_aplicar, Adelanto.empleado_id.in_(con_pago))
+        consulta_adelantos = consulta_adelantos.filter(sin_aplicar)
+    pendientes = consulta_adelantos.all()
+    for adelanto in pendientes:
+        adelantos.setdefault(adelanto.empleado_id, []).append(adelanto)
+    
+    # Configuración y tasas desde la caché (se recargan solo si cambiaron)
+    refrescar_configuracion()
+    configuracion = obtener_valores_configuracion()
+    tasas = obtener_tasas_pension()
+    
+    return {
+        'empresa': empresa,
+        'mes': mes,
+        'año': año,
+        'empleados': empleados,
+        'locadores': locadores,
+        'faltas': faltas,
+        'prestamos': prestamos,
+        'adelantos': adelantos,
+        'configuracion': configuracion,
+        'tasas': tasas,
+        'reglas': obtener_reglas_regimen(empresa.regimen_laboral)
+    }
+
+def conceptos_periodo(datos, empleados=None):
+    """
+    Beneficios y descuentos de los empleados del período calculados por
+    columnas (calculadora_columnar), una lista alineada con empleados
+    """
+    from calculadora_columnar import conceptos_empleados
+    if empleados is None:
+        empleados = datos['empleados']
+    return conceptos_empleados(empleados, datos['reglas'], datos['mes'], datos['año'],
+                               datos['configuracion'].get('umbral_renta_5ta', '1025'),
+                               tasas_pension=datos['tasas'])
+
+def calcular_planilla_empleado_en_bloque(empleado, datos, tipo_pago='mensual', marcar_adelantos=True,
+                                         conceptos=None):
+    """
+    Calcula la planilla de un empleado usando los mapas de cargar_datos_periodo
+    (sin consultas adicionales a la base de datos)
+    
+    conceptos es el par (beneficios, descuentos) del empleado ya calculado
+    por conceptos_periodo; sin él se calcula aquí.
+    """
+    empresa = datos['empresa']
+    mes = datos['mes']
+    año = datos['año']
+    
+    dias_faltados = datos['faltas'].get(empleado.id, 0)
+    dias_trabajados = max(0, 30 - dias_faltados)
+    
+    if conceptos:
+        beneficios, descuentos_empleado = conceptos
+    else:
+        beneficios = calcular_beneficios_sociales(empleado, empresa, mes, año, reglas=datos['reglas'])
+        umbral_minimo = Decimal(datos['configuracion'].get('umbral_renta_5ta', '1025'))
+        descuentos_empleado = calcular_descuentos_empleado(empleado, mes, año, umbral_minimo, datos['tasas'])
+    
+    deudas = {
+        'prestamos': datos['prestamos'].get(empleado.id, Decimal('0')),
+        'adelantos': Decimal('0')
+    }
+    for adelanto in datos['adelantos'].get(empleado.id, []):
+        deudas['adelantos'] += adelanto.monto
+        if marcar_adelantos and not adelanto.aplicado:
+            adelanto.aplicado = True  # Marcar como aplicado
+    
+    return construir_pago(empleado, mes, año, tipo_pago, dias_trabajados, dias_faltados,
+                          beneficios, descuentos_empleado, deudas)
+
 def calcular_planilla_locador(locador, mes, año):
     """
     Calcula el pago para un locador de servicios
     """
-    monto_bruto = locador.monto_mensual
-    retencion_4ta_cat = Decimal('0')
+    monto = a_centimos(locador.monto_mensual)
+    retencion = 0
     
     # Retención 4ta Categoría (8% si supera el umbral y no está suspendido)
-    if not locador.suspendido and monto_bruto > UMBRAL_RETENCION_4TA_CAT:
-        retencion_4ta_cat = monto_bruto * TASA_RETENCION_4TA_CAT
+    if not locador.suspendido and monto > a_centimos(UMBRAL_RETENCION_4TA_CAT):
+        retencion = aplicar_tasa(monto, TASA_RETENCION_4TA_CAT)
     
-    neto_pagar = monto_bruto - retencion_4ta_cat
+    monto_bruto = a_soles(monto)
+    retencion_4ta_cat = a_soles(retencion)
+    neto_pagar = a_soles(monto - retencion)
     
     # Crear registro de pago
     pago_locador = PagoLocador(
@@ -238,15 +519,207 @@ def calcular_planilla_locador(locador, mes, año):
     
     return pago_locador
 
-def calcular_planilla_completa(empresa_id, mes, año):
+def calcular_pagos_periodo(empresa_id, mes, año, tipo_pago='mensual', empleado_ids=None):
     """
-    Función principal que calcula la planilla completa de una empresa
+    Calcula los pagos de una empresa para un período sin guardarlos
+    
+    Retorna los Pago y PagoLocador (aún fuera de la sesión), alineados con
+    las listas de empleados y locadores de cargar_datos_periodo, y los ids
+    de los adelantos que quedan aplicados en esta corrida. Beneficios y
+    descuentos se calculan por columnas para toda la planilla.
     """
-    empresa = Empresa.query.get_or_404(empresa_id)
+    datos = cargar_datos_periodo(empresa_id, mes, año, empleado_ids, tipo_pago=tipo_pago)
+    adelantos_aplicados = [adelanto.id
+                           for adelantos in datos['adelantos'].values()
+                           for adelanto in adelantos
+                           if not adelanto.aplicado]
+    
+    pagos = [calcular_planilla_empleado_en_bloque(empleado, datos, tipo_pago, conceptos=conceptos)
+             for empleado, conceptos in zip(datos['empleados'], conceptos_periodo(datos))]
+    pagos_locadores = [calcular_planilla_locador(locador, mes, año)
+                       for locador in datos['locadores']]
     
-    # Obtener empleados y locadores activos
-    empleados = Empleado.query.filter_by(empresa_id=empresa_id, activo=True).all()
-    locadores = Locador.query.filter_by(empresa_id=empresa_id, activo=True).all()
+    return {
+        'datos': datos,
+        'pagos': pagos,
+        'pagos_locadores': pagos_locadores,
+        'adelantos_aplicados': adelantos_aplicados
+    }
+
+def registro_a_dict(registro):
+    """Convierte un Pago o PagoLocador en un dict de columnas para inserción masiva"""
+    valores = {}
+    for columna in registro.__table__.columns:
+        valor = getattr(registro, columna.key)
+        if valor is not None:
+            valores[columna.key] = valor
+    return valores
+
+# Filas por sentencia INSERT (executemany) al guardar pagos en bloque
+TAMAÑO_CHUNK_PAGOS = 1000
+
+# Constructores de INSERT ... ON CONFLICT por dialecto
+INSERT_CON_CONFLICTO = {'sqlite': sqlite.insert, 'postgresql': postgresql.insert}
+
+def _valores_defecto(tabla):
+    """Valores por defecto de las columnas (los invocables se evalúan una vez)"""
+    valores = {}
+    for columna in tabla.columns:
+        if columna.default is None:
+            continue
+        if columna.default.is_callable:
+            valores[columna.key] = columna.default.arg(None)
+        elif columna.default.is_scalar:
+            valores[columna.key] = columna.default.arg
+    return valores
+
+def clave_unica(modelo):
+    """Columnas de la restricción UNIQUE del modelo (vacío si no tiene)"""
+    for restriccion in modelo.__table__.constraints:
+        if isinstance(restriccion, UniqueConstraint):
+            return tuple(columna.key for columna in restriccion.columns)
+    return ()
+
+def _sentencia_insercion(tabla, columnas, clave):
+    """INSERT simple, o upsert sobre la clave que reemplaza el resto de columnas"""
+    if not clave:
+        return tabla.insert()
+    dialecto = db.engine.dialect.name
+    if dialecto not in INSERT_CON_CONFLICTO:
+        raise ValueError(f"Upsert en bloque no soportado para {dialecto}")
+    sentencia = INSERT_CON_CONFLICTO[dialecto](tabla)
+    return sentencia.on_conflict_do_update(
+        index_elements=list(clave),
+        set_={columna: sentencia.excluded[columna] for columna in columnas if columna not in clave}
+    )
+
+def insertar_en_bloque(modelo, registros, tamaño_chunk=TAMAÑO_CHUNK_PAGOS, clave=()):
+    """
+    Inserta registros (objetos del modelo o dicts de columnas) con un INSERT
+    executemany por chunk, sin pasar por la unidad de trabajo del ORM
+    
+    Todas las filas llevan las mismas columnas; las que vienen vacías toman
+    el valor por defecto del modelo. Con clave, las filas que ya existen
+    para esas columnas se sobrescriben en su lugar (ON CONFLICT DO UPDATE).
+    No confirma la transacción.
+    
+    Returns:
+        lista con filas y segundos de cada chunk
+    """
+    tabla = modelo.__table__
+    columnas = [columna.key for columna in tabla.columns if not columna.primary_key]
+    defecto = _valores_defecto(tabla)
+    sentencia = _sentencia_insercion(tabla, columnas, clave)
+    tiempos = []
+    
+    for posicion in range(0, len(registros), tamaño_chunk):
+        inicio = time.perf_counter()
+        filas = []
+        for registro in registros[posicion:posicion + tamaño_chunk]:
+            valores = registro if isinstance(registro, dict) else registro.__dict__
+            filas.append({
+                columna: valores[columna] if valores.get(columna) is not None else defecto.get(columna)
+                for columna in columnas
+            })
+        db.session.execute(sentencia, filas)
+        tiempos.append({
+            'tabla': tabla.name,
+            'filas': len(filas),
+            'segundos': round(time.perf_counter() - inicio, 4)
+        })
+    return tiempos
+
+def guardar_pagos_en_bloque(pagos, pagos_locadores=(), tamaño_chunk=TAMAÑO_CHUNK_PAGOS):
+    """
+    Etapa de escritura de una planilla calculada: Pago y PagoLocador en
+    bloque por chunks de tamaño_chunk
+    
+    Los pagos se guardan por su clave de período (uq_pago_periodo y
+    uq_pago_locador_periodo): recalcular un período sobrescribe las filas
+    existentes en lugar de duplicarlas.
+    
+    Returns:
+        lista de tiempos por chunk (ver insertar_en_bloque)
+    """
+    return (insertar_en_bloque(Pago, list(pagos), tamaño_chunk, clave_unica(Pago))
+            + insertar_en_bloque(PagoLocador, list(pagos_locadores), tamaño_chunk, clave_unica(PagoLocador)))
+
+def fila_empleado(empleado, pago):
+    """Fila de resultado (dict serializable) de un empleado y su pago"""
+    return {
+        'id': empleado.id,
+        'nombres': empleado.nombres,
+        'apellidos': empleado.apellidos,
+        'dni': empleado.dni,
+        'sueldo_base': float(empleado.sueldo_base),
+        'dias_trabajados': pago.dias_trabajados,
+        'dias_faltados': pago.dias_faltados,
+        'beneficios': {
+            'vacaciones': float(pago.vacaciones),
+            'cts': float(pago.cts),
+            'gratificacion': float(pago.gratificacion),
+            'asignacion_familiar': float(pago.asignacion_familiar)
+        },
+        'descuentos': {
+            'pension': float(pago.pension),
+            'impuesto_renta': float(pago.impuesto_renta),
+            'prestamos': float(pago.prestamos),
+            'adelantos': float(pago.adelantos)
+        },
+        'total_ingresos': float(pago.total_ingresos),
+        'total_descuentos': float(pago.total_descuentos),
+        'neto_pagar': float(pago.neto_pagar)
+    }
+
+def fila_locador(locador, pago_locador):
+    """Fila de resultado (dict serializable) de un locador y su pago"""
+    return {
+        'id': locador.id,
+        'nombres': locador.nombres,
+        'apellidos': locador.apellidos,
+        'dni': locador.dni,
+        'monto_mensual': float(locador.monto_mensual),
+        'suspendido': locador.suspendido,
+        'monto_bruto': float(pago_locador.monto_bruto),
+        'retencion_4ta_cat': float(pago_locador.retencion_4ta_cat),
+        'neto_pagar': float(pago_locador.neto_pagar)
+    }
+
+def guardar_planilla(empresa_id, mes, año, tipo_pago, totales):
+    """
+    Crea o actualiza el resumen (Planilla) de un período calculado
+    
+    No confirma la transacción: se guarda junto con los pagos del período.
+    """
+    planilla = Planilla.query.filter_by(
+        empresa_id=empresa_id, mes=mes, año=año, tipo_pago=tipo_pago
+    ).first()
+    if not planilla:
+        planilla = Planilla(empresa_id=empresa_id, mes=mes, año=año, tipo_pago=tipo_pago)
+        db.session.add(planilla)
+    
+    planilla.total_empleados = totales['total_empleados']
+    planilla.total_locadores = totales['total_locadores']
+    planilla.total_ingresos = totales['total_ingresos']
+    planilla.total_descuentos = totales['total_descuentos']
+    planilla.total_neto = totales['total_neto']
+    planilla.fecha_calculo = datetime.utcnow()
+    return planilla
+
+def calcular_planilla_completa(empresa_id, mes, año, tipo_pago='mensual', tamaño_chunk=TAMAÑO_CHUNK_PAGOS):
+    """
+    Función principal que calcula la planilla completa de una empresa
+    
+    Los insumos se cargan en bloque con cargar_datos_periodo, de modo que
+    la cantidad de consultas por corrida no depende del número de personas.
+    Los pagos se escriben con guardar_pagos_en_bloque en chunks de
+    tamaño_chunk; el resultado incluye el tiempo de cada chunk en 'insercion'.
+    """
+    calculo = calcular_pagos_periodo(empresa_id, mes, año, tipo_pago)
+    datos = calculo['datos']
+    empresa = datos['empresa']
+    empleados = datos['empleados']
+    locadores = datos['locadores']
     
     resultados = {
         'empresa': empresa.nombre,
@@ -265,61 +738,16 @@ def calcular_planilla_completa(empresa_id, mes, año):
     }
     
     # Calcular planillas de empleados
-    for empleado in empleados:
-        pago = calcular_planilla_empleado(empleado, empresa, mes, año)
-        
-    # Guardar en base de datos
-    from app import db
-    db.session.add(pago)
-        
-        resultados['empleados'].append({
-            'id': empleado.id,
-            'nombres': empleado.nombres,
-            'apellidos': empleado.apellidos,
-            'dni': empleado.dni,
-            'sueldo_base': float(empleado.sueldo_base),
-            'dias_trabajados': pago.dias_trabajados,
-            'dias_faltados': pago.dias_faltados,
-            'beneficios': {
-                'vacaciones': float(pago.vacaciones),
-                'cts': float(pago.cts),
-                'gratificacion': float(pago.gratificacion),
-                'asignacion_familiar': float(pago.asignacion_familiar)
-            },
-            'descuentos': {
-                'pension': float(pago.pension),
-                'impuesto_renta': float(pago.impuesto_renta),
-                'prestamos': float(pago.prestamos),
-                'adelantos': float(pago.adelantos)
-            },
-            'total_ingresos': float(pago.total_ingresos),
-            'total_descuentos': float(pago.total_descuentos),
-            'neto_pagar': float(pago.neto_pagar)
-        })
+    for empleado, pago in zip(empleados, calculo['pagos']):
+        resultados['empleados'].append(fila_empleado(empleado, pago))
         
         resultados['totales']['total_ingresos'] += pago.total_ingresos
         resultados['totales']['total_descuentos'] += pago.total_descuentos
         resultados['totales']['total_neto'] += pago.neto_pagar
     
     # Calcular planillas de locadores
-    for locador in locadores:
-        pago_locador = calcular_planilla_locador(locador, mes, año)
-        
-    # Guardar en base de datos
-    from app import db
-    db.session.add(pago_locador)
-        
-        resultados['locadores'].append({
-            'id': locador.id,
-            'nombres': locador.nombres,
-            'apellidos': locador.apellidos,
-            'dni': locador.dni,
-            'monto_mensual': float(locador.monto_mensual),
-            'suspendido': locador.suspendido,
-            'monto_bruto': float(pago_locador.monto_bruto),
-            'retencion_4ta_cat': float(pago_locador.retencion_4ta_cat),
-            'neto_pagar': float(pago_locador.neto_pagar)
-        })
+    for locador, pago_locador in zip(locadores, calculo['pagos_locadores']):
+        resultados['locadores'].append(fila_locador(locador, pago_locador))
         
         resultados['totales']['total_neto'] += pago_locador.neto_pagar
     
@@ -327,17 +755,255 @@ def calcular_planilla_completa(empresa_id, mes, año):
     resultados['totales']['total_empleados'] = len(empleados)
     resultados['totales']['total_locadores'] = len(locadores)
     
+    # Guardar en base de datos: pagos en bloque por chunks y el resumen del período
+    resultados['insercion'] = guardar_pagos_en_bloque(calculo['pagos'], calculo['pagos_locadores'], tamaño_chunk)
+    guardar_planilla(empresa_id, mes, año, tipo_pago, resultados['totales'])
+    
     # Convertir Decimal a float para JSON
     resultados['totales']['total_ingresos'] = float(resultados['totales']['total_ingresos'])
     resultados['totales']['total_descuentos'] = float(resultados['totales']['total_descuentos'])
     resultados['totales']['total_neto'] = float(resultados['totales']['total_neto'])
     
     # Confirmar cambios en base de datos
-    from app import db
     db.session.commit()
     
     return resultados
 
+def _ids_por_lote(columna_id, filtros, tamaño_lote):
+    """Recorre ids en orden ascendente por lotes (paginación por id, sin OFFSET)"""
+    ultimo_id = 0
+    while True:
+        ids = [fila_id for (fila_id,) in
+               db.session.query(columna_id)
+               .filter(*filtros, columna_id > ultimo_id)
+               .order_by(columna_id)
+               .limit(tamaño_lote)]
+        if not ids:
+            return
+        ultimo_id = ids[-1]
+        yield ids
+
+def iterar_planilla(empresa_id, mes, año, tipo_pago='mensual', guardar=False, tamaño_lote=500):
+    """
+    Calcula la planilla de una empresa como flujo de filas
+    
+    Empleados y locadores se leen por lotes de tamaño_lote, cada lote con sus
+    insumos de cargar_datos_periodo, de modo que en memoria solo hay un lote
+    a la vez sin importar el tamaño de la planilla. Con guardar=True cada
+    lote se confirma en la base de datos (pagos y adelantos aplicados) y al
+    final se guarda el resumen Planilla.
+    
+    Yields:
+        dict con 'tipo' ('empleado' o 'locador'), 'fila' (mismo formato que
+        calcular_planilla_completa) y 'totales' acumulados hasta esa fila
+    """
+    empresa = Empresa.query.get_or_404(empresa_id)
+    totales = {
+        'total_empleados': 0,
+        'total_locadores': 0,
+        'total_ingresos': Decimal('0'),
+        'total_descuentos': Decimal('0'),
+        'total_neto': Decimal('0')
+    }
+    
+    def acumulados():
+        return {clave: valor if isinstance(valor, int) else float(valor)
+                for clave, valor in totales.items()}
+    
+    filtros = [Empleado.empresa_id == empresa_id, Empleado.activo == True]
+    for ids in _ids_por_lote(Empleado.id, filtros, tamaño_lote):
+        datos = cargar_datos_periodo(empresa_id, mes, año, ids, incluir_aplicados=False, tipo_pago=tipo_pago)
+        pagos = []
+        for empleado, conceptos in zip(datos['empleados'], conceptos_periodo(datos)):
+            pago = calcular_planilla_empleado_en_bloque(empleado, datos, tipo_pago, marcar_adelantos=False,
+                                                        conceptos=conceptos)
+            pagos.append(pago)
+            totales['total_empleados'] += 1
+            totales['total_ingresos'] += pago.total_ingresos
+            totales['total_descuentos'] += pago.total_descuentos
+            totales['total_neto'] += pago.neto_pagar
+            yield {'tipo': 'empleado', 'fila': fila_empleado(empleado, pago), 'totales': acumulados()}
+        
+        if guardar:
+            guardar_pagos_en_bloque(pagos)
+            adelantos_ids = [adelanto.id for adelantos in datos['adelantos'].values()
+                             for adelanto in adelantos if not adelanto.aplicado]
+            if adelantos_ids:
+                marcar_adelantos(adelantos_ids)
+            db.session.commit()
+    
+    filtros = [Locador.empresa_id == empresa_id, Locador.activo == True]
+    for ids in _ids_por_lote(Locador.id, filtros, tamaño_lote):
+        pagos_locadores = []
+        for locador in Locador.query.filter(Locador.id.in_(ids)).order_by(Locador.id):
+            pago_locador = calcular_planilla_locador(locador, mes, año)
+            pagos_locadores.append(pago_locador)
+            totales['total_locadores'] += 1
+            totales['total_neto'] += pago_locador.neto_pagar
+            yield {'tipo': 'locador', 'fila': fila_locador(locador, pago_locador), 'totales': acumulados()}
+        if guardar:
+            guardar_pagos_en_bloque((), pagos_locadores)
+            db.session.commit()
+    
+    if guardar:
+        guardar_planilla(empresa.id, mes, año, tipo_pago, totales)
+        db.session.commit()
+
+# Campos de Pago que se reemplazan al recalcular un empleado
+CAMPOS_RECALCULO_PAGO = (
+    'sueldo_base', 'dias_trabajados', 'dias_faltados',
+    'vacaciones', 'cts', 'gratificacion', 'asignacion_familiar',
+    'pension', 'impuesto_renta', 'prestamos', 'adelantos',
+    'total_ingresos', 'total_descuentos', 'neto_pagar'
+)
+
+def recalcular_planilla(empresa_id, mes, año, tipo_pago='mensual'):
+    """
+    Recalcula solo los empleados con insumos modificados desde su último pago
+    
+    Un empleado queda pendiente cuando su fecha_modificacion (que los eventos
+    de models.py actualizan al cambiar sueldo, ausencias, préstamos o
+    adelantos) es posterior a la fecha_calculo de su pago del período, o
+    cuando aún no tiene pago. Un cambio de configuración posterior a la
+    planilla marca a todos. Los pagos existentes se actualizan en su lugar,
+    los de empleados desactivados se eliminan (y sus adelantos del período
+    vuelven a quedar pendientes), y los totales de la Planilla se corrigen
+    por diferencia. Los locadores no registran sus cambios, así que su parte
+    se recalcula siempre. Sin planilla previa se hace el cálculo completo.
+    
+    Returns:
+        dict con el modo ('completo' o 'incremental'), ids recalculados,
+        ids retirados y los totales del período
+    """
+    planilla = Planilla.query.filter_by(
+        empresa_id=empresa_id, mes=mes, año=año, tipo_pago=tipo_pago
+    ).first()
+    if not planilla:
+        resultado = calcular_planilla_completa(empresa_id, mes, año, tipo_pago)
+        return {
+            'modo': 'completo',
+            'recalculados': [empleado['id'] for empleado in resultado['empleados']],
+            'retirados': [],
+            'totales': resultado['totales']
+        }
+    
+    ultima_configuracion = db.session.query(db.func.max(Configuracion.fecha_actualizacion)).scalar()
+    configuracion_modificada = bool(ultima_configuracion and ultima_configuracion > planilla.fecha_calculo)
+    
+    # Último pago del período por empleado de la empresa
+    ultimo_pago = (
+        db.session.query(Pago.empleado_id, db.func.max(Pago.id).label('pago_id'))
+        .join(Empleado, Empleado.id == Pago.empleado_id)
+        .filter(
+            Empleado.empresa_id == empresa_id,
+            Pago.mes == mes,
+            Pago.año == año,
+            Pago.tipo_pago == tipo_pago
+        )
+        .group_by(Pago.empleado_id)
+        .subquery()
+    )
+    
+    sin_pago = ultimo_pago.c.pago_id.is_(None)
+    if configuracion_modificada:
+        pendiente = Empleado.activo == True
+    else:
+        pendiente = db.and_(Empleado.activo == True, db.or_(
+            sin_pago, Empleado.fecha_modificacion > Pago.fecha_calculo
+        ))
+    retirado = db.and_(Empleado.activo == False, db.not_(sin_pago))
+    
+    filas = (
+        db.session.query(Empleado.id, Empleado.activo, ultimo_pago.c.pago_id)
+        .outerjoin(ultimo_pago, ultimo_pago.c.empleado_id == Empleado.id)
+        .outerjoin(Pago, Pago.id == ultimo_pago.c.pago_id)
+        .filter(Empleado.empresa_id == empresa_id, db.or_(pendiente, retirado))
+        .all()
+    )
+    
+    pendientes = [empleado_id for empleado_id, activo, _ in filas if activo]
+    retirados = [empleado_id for empleado_id, activo, _ in filas if not activo]
+    pagos_ids = [pago_id for _, _, pago_id in filas if pago_id]
+    pagos_previos = {pago.empleado_id: pago
+                     for pago in Pago.query.filter(Pago.id.in_(pagos_ids)).all()} if pagos_ids else {}
+    
+    diferencia = {'total_empleados': 0, 'total_ingresos': Decimal('0'),
+                  'total_descuentos': Decimal('0'), 'total_neto': Decimal('0')}
+    
+    def restar(pago):
+        diferencia['total_ingresos'] -= pago.total_ingresos
+        diferencia['total_descuentos'] -= pago.total_descuentos
+        diferencia['total_neto'] -= pago.neto_pagar
+    
+    def sumar(pago):
+        diferencia['total_ingresos'] += pago.total_ingresos
+        diferencia['total_descuentos'] += pago.total_descuentos
+        diferencia['total_neto'] += pago.neto_pagar
+    
+    for empleado_id in retirados:
+        pago = pagos_previos[empleado_id]
+        restar(pago)
+        diferencia['total_empleados'] -= 1
+        db.session.delete(pago)
+    
+    # El pago retirado ya no descuenta los adelantos que había aplicado
+    if retirados:
+        marcar_adelantos([adelanto_id for (adelanto_id,) in db.session.query(Adelanto.id).filter(
+            Adelanto.empleado_id.in_(retirados),
+            Adelanto.mes_aplicar == mes,
+            Adelanto.año_aplicar == año,
+            Adelanto.aplicado == True
+        )], aplicado=False)
+    
+    if pendientes:
+        calculo = calcular_pagos_periodo(empresa_id, mes, año, tipo_pago, pendientes)
+        ahora = datetime.utcnow()
+        for empleado, nuevo in zip(calculo['datos']['empleados'], calculo['pagos']):
+            sumar(nuevo)
+            previo = pagos_previos.get(empleado.id)
+            if previo:
+                restar(previo)
+                for campo in CAMPOS_RECALCULO_PAGO:
+                    setattr(previo, campo, getattr(nuevo, campo))
+                previo.fecha_calculo = ahora
+            else:
+                diferencia['total_empleados'] += 1
+                db.session.add(nuevo)
+    
+    # Locadores: se reemplazan sus pagos del período y su parte del neto
+    locadores = Locador.query.filter_by(empresa_id=empresa_id, activo=True).order_by(Locador.id).all()
+    pagos_locadores = [calcular_planilla_locador(locador, mes, año) for locador in locadores]
+    de_la_empresa = db.session.query(Locador.id).filter(Locador.empresa_id == empresa_id)
+    del_periodo = [PagoLocador.locador_id.in_(de_la_empresa), PagoLocador.mes == mes, PagoLocador.año == año]
+    neto_locadores = db.session.query(db.func.sum(PagoLocador.neto_pagar)).filter(*del_periodo).scalar()
+    diferencia['total_neto'] -= neto_locadores or Decimal('0')
+    PagoLocador.query.filter(*del_periodo, PagoLocador.locador_id.notin_(
+        [locador.id for locador in locadores]
+    )).delete(synchronize_session=False)
+    insertar_en_bloque(PagoLocador, pagos_locadores, TAMAÑO_CHUNK_PAGOS, clave_unica(PagoLocador))
+    diferencia['total_neto'] += sum((pago.neto_pagar for pago in pagos_locadores), Decimal('0'))
+    
+    planilla.total_locadores = len(locadores)
+    planilla.total_empleados += diferencia['total_empleados']
+    planilla.total_ingresos += diferencia['total_ingresos']
+    planilla.total_descuentos += diferencia['total_descuentos']
+    planilla.total_neto += diferencia['total_neto']
+    planilla.fecha_calculo = datetime.utcnow()
+    db.session.commit()
+    
+    return {
+        'modo': 'incremental',
+        'recalculados': pendientes,
+        'retirados': retirados,
+        'totales': {
+            'total_empleados': planilla.total_empleados,
+            'total_locadores': planilla.total_locadores,
+            'total_ingresos': float(planilla.total_ingresos),
+            'total_descuentos': float(planilla.total_descuentos),
+            'total_neto': float(planilla.total_neto)
+        }
+    }
+
 def obtener_resumen_regimen(empresa_id):
     """
     Obtiene un resumen de las reglas aplicables según el régimen laboral
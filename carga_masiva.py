@@ -0,0 +1,982 @@
+"""
+Carga Masiva de Personal
+Importa empleados y locadores desde la plantilla de carga (ver
+descargar_plantilla en app_completo.py) sin cargar el archivo completo en
+memoria: el libro se lee en modo de solo lectura de openpyxl fila por fila
+(o el CSV, UTF-8 o Latin-1, con el módulo csv, bastante más rápido), cada
+fila se valida y se inserta en bloques de tamaño fijo (INSERT
+executemany) con un commit por bloque. La memoria y el tamaño de cada
+transacción quedan acotados sin importar cuántas filas tenga el archivo.
+
+En modo 'actualizar' las filas se cruzan por (empresa_id, dni) con el
+personal existente (una consulta por bloque y tabla): solo se insertan las
+personas nuevas y a las existentes se les actualizan los campos que cambiaron.
+
+Un .xlsx puede traer además hojas 'Ausencias', 'Préstamos' y 'Adelantos'
+(ver HOJAS_MOVIMIENTOS): se cargan después del personal, resolviendo cada
+DNI con un índice en memoria, con INSERT en bloque y una transacción por hoja.
+
+Con --simular (validar_archivo) el archivo se valida y se compara con la
+base de datos sin escribir nada, y las filas rechazadas se devuelven en un
+libro de errores.
+
+Uso: python carga_masiva.py <empresa_id> <archivo.xlsx|archivo.csv> [--actualizar] [--simular]
+"""
+
+import codecs
+import csv
+import re
+import sys
+import time
+import unicodedata
+from datetime import datetime, date
+
+from openpyxl import Workbook, load_workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font
+from sqlalchemy import inspect, select, bindparam
+
+# Filas por bloque (una transacción y un INSERT executemany por tabla)
+TAMAÑO_CHUNK_CARGA = 1000
+
+# Columnas de la plantilla de carga, en orden
+ENCABEZADOS_PLANTILLA = [
+    'Tipo', 'Nombres', 'Apellidos', 'DNI', 'Sueldo/Monto', 'Fecha Ingreso/Inicio',
+    'Fecha Nacimiento', 'Dirección', 'Teléfono', 'Email', 'Tipo Pensión',
+    'Código AFP', 'Cuenta Bancaria', 'Banco', 'Tipo Pago', 'Descuento Alimentos'
+]
+
+# Modos de carga: 'insertar' crea siempre filas nuevas; 'actualizar' cruza por DNI
+MODOS_CARGA = ('insertar', 'actualizar')
+
+# Columnas que una nueva carga no modifica en el personal existente
+CAMPOS_NO_ACTUALIZABLES = ('empresa_id', 'dni', 'activo', 'suspendido', 'fecha_creacion')
+
+TABLAS_TIPO = (('empleado', 'empleados'), ('locador', 'locadores'))
+
+# Columnas que llena cada celda opcional de la plantilla (índice -> columnas).
+# Si la celda viene vacía, la columna toma el valor por defecto al insertar,
+# pero al actualizar se conserva lo guardado.
+COLUMNAS_OPCIONALES = {
+    'empleado': {
+        4: ('sueldo_base',), 5: ('fecha_ingreso',), 6: ('fecha_nacimiento',), 7: ('direccion',),
+        8: ('telefono',), 9: ('email',), 10: ('tipo_pension', 'afp_codigo'), 12: ('cuenta_bancaria',),
+        13: ('banco',), 14: ('tipo_pago',), 15: ('descuento_alimentos',)
+    },
+    'locador': {
+        4: ('monto_mensual',), 5: ('fecha_inicio',), 12: ('cuenta_bancaria',), 13: ('banco',),
+        15: ('descuento_alimentos',)
+    },
+}
+
+# Cambios detallados (fila, dni, columnas) que informa una simulación
+MAXIMO_DETALLE_CAMBIOS = 100
+
+# Valores aceptados en la plantilla (los códigos AFP son los de TASAS_AFP en calculadora_planilla.py)
+TIPOS_PENSION = ('ONP', 'AFP')
+CODIGOS_AFP = ('PRIMA', 'INTEGRA', 'PROFUTURO', 'HABITAT')
+TIPOS_PAGO = ('mensual', 'quincenal')
+PATRON_DNI = re.compile(r'\d{8}')
+PATRON_CUENTA = re.compile(r'\d{10,20}')
+
+# Separadores de columna aceptados en los archivos CSV
+SEPARADORES_CSV = ',;\t'
+
+# Número con coma decimal y punto de miles opcional (CSV de Excel en español: 1.500,50)
+PATRON_DECIMAL_COMA = re.compile(r'-?(?:\d{1,3}(?:\.\d{3})+|\d+),\d+')
+
+# Número con puntos de miles y sin decimales (1.500, 12.000): en esos CSV el punto no es decimal
+PATRON_MILES_PUNTO = re.compile(r'-?\d{1,3}(?:\.\d{3})+')
+
+class ErrorFila(ValueError):
+    """Valor no válido en una fila del archivo de carga"""
+
+def _clave_hoja(nombre):
+    """Nombre de hoja sin tildes ni mayúsculas ('Préstamos' -> 'prestamos')"""
+    sin_tildes = unicodedata.normalize('NFKD', nombre).encode('ascii', 'ignore').decode('ascii')
+    return sin_tildes.strip().lower()
+
+def _hoja_personal(libro):
+    """
+    Hoja de personal del libro: la llamada 'Personal' o, si no hay, la
+    activa (la única en la plantilla de una hoja) siempre que no sea de movimientos
+    """
+    for nombre in libro.sheetnames:
+        if _clave_hoja(nombre) == 'personal':
+            return libro[nombre]
+    for hoja in [libro.active] + list(libro.worksheets):
+        if hoja is not None and _clave_hoja(hoja.title) not in HOJAS_MOVIMIENTOS:
+            return hoja
+    return None
+
+def leer_filas_xlsx(archivo, hoja=None, columnas=None):
+    """
+    Recorre una hoja en modo de solo lectura (streaming)
+
+    Args:
+        hoja: nombre de la hoja (por defecto la de personal)
+        columnas: columnas a leer (por defecto las de la plantilla de personal)
+
+    Yields:
+        (número de fila en el archivo, tupla de valores)
+    """
+    libro = load_workbook(archivo, read_only=True, data_only=True)
+    try:
+        hoja = libro[hoja] if hoja else _hoja_personal(libro)
+        if hoja is None:
+            return
+        for numero, valores in enumerate(
+                hoja.iter_rows(min_row=2, max_col=columnas or len(ENCABEZADOS_PLANTILLA), values_only=True),
+                start=2):
+            yield numero, valores
+    finally:
+        libro.close()
+
+def filas_estimadas_xlsx(archivo):
+    """Filas de datos según la dimensión declarada en la hoja de personal (None si no la declara)"""
+    libro = load_workbook(archivo, read_only=True)
+    try:
+        hoja = _hoja_personal(libro)
+        maximo = hoja.max_row if hoja is not None else 1
+        return maximo - 1 if maximo else None
+    finally:
+        libro.close()
+
+def hojas_movimientos_xlsx(archivo):
+    """Hojas de movimientos que trae el libro: {'ausencias': 'Ausencias', ...} en orden de carga"""
+    libro = load_workbook(archivo, read_only=True)
+    try:
+        por_clave = {_clave_hoja(nombre): nombre for nombre in libro.sheetnames}
+    finally:
+        libro.close()
+    if hasattr(archivo, 'seek'):
+        archivo.seek(0)
+    return {tipo: por_clave[tipo] for tipo in HOJAS_MOVIMIENTOS if tipo in por_clave}
+
+def _abrir_binario(archivo):
+    """Archivo abierto en modo binario y si hay que cerrarlo (ruta) o no (archivo del llamador)"""
+    if hasattr(archivo, 'read'):
+        return archivo, False
+    return open(archivo, 'rb'), True
+
+def _lineas_csv(binario):
+    """Decodifica línea por línea: UTF-8 (con o sin BOM) y, si no lo es, Latin-1"""
+    for numero, linea in enumerate(binario):
+        if numero == 0 and linea.startswith(codecs.BOM_UTF8):
+            linea = linea[len(codecs.BOM_UTF8):]
+        try:
+            yield linea.decode('utf-8')
+        except UnicodeDecodeError:
+            yield linea.decode('latin-1')
+
+def _punto_decimal(valor):
+    """Celda con coma decimal o puntos de miles como número con punto; el resto sin cambios"""
+    texto = valor.strip()
+    if PATRON_DECIMAL_COMA.fullmatch(texto):
+        return texto.replace('.', '').replace(',', '.')
+    if PATRON_MILES_PUNTO.fullmatch(texto):
+        return texto.replace('.', '')
+    return valor
+
+def leer_filas_csv(archivo):
+    """
+    Recorre un CSV con las columnas de la plantilla (streaming, sin openpyxl)
+
+    Acepta UTF-8 o Latin-1 y separador coma, punto y coma (Excel en español)
+    o tabulador, detectado en la fila de encabezados. Con punto y coma los
+    números vienen con coma decimal y punto de miles y se normalizan
+    (1.500,50 -> 1500.50, 1.500 -> 1500).
+
+    Yields:
+        (número de fila en el archivo, tupla de valores de la plantilla)
+    """
+    binario, cerrar = _abrir_binario(archivo)
+    try:
+        lineas = _lineas_csv(binario)
+        encabezados = next(lineas, '')
+        try:
+            separador = csv.Sniffer().sniff(encabezados, delimiters=SEPARADORES_CSV).delimiter
+        except csv.Error:
+            separador = ','
+        columnas = len(ENCABEZADOS_PLANTILLA)
+        for numero, valores in enumerate(csv.reader(lineas, delimiter=separador), start=2):
+            if separador == ';':
+                valores = [_punto_decimal(valor) for valor in valores[:columnas]]
+            yield numero, tuple(valores[:columnas])
+    finally:
+        if cerrar:
+            binario.close()
+
+def filas_estimadas_csv(archivo):
+    """Filas de datos contando saltos de línea (None si el archivo no se puede recorrer dos veces)"""
+    if hasattr(archivo, 'read') and not (hasattr(archivo, 'seekable') and archivo.seekable()):
+        return None
+    binario, cerrar = _abrir_binario(archivo)
+    try:
+        lineas = 0
+        ultimo = b'\n'
+        for bloque in iter(lambda: binario.read(1 << 20), b''):
+            lineas += bloque.count(b'\n')
+            ultimo = bloque[-1:]
+        if ultimo != b'\n':
+            lineas += 1
+        return max(lineas - 1, 0)
+    finally:
+        if cerrar:
+            binario.close()
+
+def formato_archivo(archivo, nombre=None):
+    """'csv' o 'xlsx' según la extensión del nombre (o de la ruta del archivo)"""
+    nombre = nombre or (archivo if isinstance(archivo, str) else getattr(archivo, 'name', '')) or ''
+    return 'csv' if str(nombre).lower().endswith('.csv') else 'xlsx'
+
+def leer_filas(archivo, formato):
+    """Filas del archivo de carga con el lector del formato ('csv' o 'xlsx')"""
+    return leer_filas_csv(archivo) if formato == 'csv' else leer_filas_xlsx(archivo)
+
+def filas_estimadas(archivo, formato):
+    """Filas de datos esperadas en el archivo de carga (None si no se conoce)"""
+    total = filas_estimadas_csv(archivo) if formato == 'csv' else filas_estimadas_xlsx(archivo)
+    if hasattr(archivo, 'seek'):
+        archivo.seek(0)
+    return total
+
+def _texto(valor):
+    """Celda como texto sin espacios ('' si está vacía)"""
+    if valor is None:
+        return ''
+    if isinstance(valor, float) and valor.is_integer():
+        valor = int(valor)
+    return str(valor).strip()
+
+def _numero(valor, campo):
+    """Celda como float (0 si está vacía)"""
+    if valor in (None, ''):
+        return 0.0
+    try:
+        return float(valor)
+    except (TypeError, ValueError):
+        raise ErrorFila(f'{campo} no es un número: {valor}')
+
+def _fecha(valor, campo, por_defecto=None):
+    """Celda como fecha: fecha de Excel, AAAA-MM-DD o DD/MM/AAAA"""
+    if valor in (None, ''):
+        return por_defecto
+    if isinstance(valor, datetime):
+        return valor.date()
+    if isinstance(valor, date):
+        return valor
+    texto = str(valor).strip()
+    for formato in ('%Y-%m-%d', '%d/%m/%Y'):
+        try:
+            return datetime.strptime(texto, formato).date()
+        except ValueError:
+            pass
+    raise ErrorFila(f'{campo} no es una fecha válida: {valor}')
+
+def _dni(valor):
+    """DNI de 8 dígitos (Excel guarda como número los DNI y pierde los ceros a la izquierda)"""
+    if isinstance(valor, (int, float)) and not isinstance(valor, bool):
+        texto = _texto(valor).zfill(8)
+    else:
+        texto = _texto(valor)
+    if texto and not PATRON_DNI.fullmatch(texto):
+        raise ErrorFila(f'DNI no válido (8 dígitos): {valor}')
+    return texto
+
+def _cuenta(cuenta, banco):
+    """Cuenta bancaria sin espacios ni guiones; cuenta y banco van juntos"""
+    cuenta = re.sub(r'[\s-]', '', cuenta)
+    if cuenta and not PATRON_CUENTA.fullmatch(cuenta):
+        raise ErrorFila(f'Cuenta bancaria no válida (10 a 20 dígitos): {cuenta}')
+    if cuenta and not banco:
+        raise ErrorFila('Falta el banco de la cuenta bancaria')
+    if banco and not cuenta:
+        raise ErrorFila(f'Falta la cuenta bancaria del banco {banco}')
+    return cuenta
+
+def _pension(tipo_pension, afp_codigo):
+    """Sistema de pensiones y código AFP (solo se guarda el código si es AFP)"""
+    tipo_pension = tipo_pension.upper() or 'ONP'
+    if tipo_pension not in TIPOS_PENSION:
+        raise ErrorFila(f'Tipo de pensión no válido: {tipo_pension}')
+    if tipo_pension != 'AFP':
+        return tipo_pension, None
+    afp_codigo = afp_codigo.upper()
+    if afp_codigo not in CODIGOS_AFP:
+        raise ErrorFila(f"Código AFP no válido: {afp_codigo or '(vacío)'}")
+    return tipo_pension, afp_codigo
+
+def _columnas_vacias(tipo, valores):
+    """Columnas de las celdas opcionales que vinieron vacías en la fila"""
+    return frozenset(columna for indice, columnas in COLUMNAS_OPCIONALES[tipo].items()
+                     if _texto(valores[indice]) == '' for columna in columnas)
+
+def validar_fila(empresa_id, valores, hoy=None):
+    """
+    Convierte una fila de la plantilla en los valores de columna a insertar
+
+    Returns:
+        ('empleado' o 'locador', dict de columnas, columnas cuya celda vino
+        vacía y tienen el valor por defecto), o None si la fila está vacía
+
+    Raises:
+        ErrorFila con el motivo si la fila no es válida
+    """
+    valores = tuple(valores) + (None,) * (len(ENCABEZADOS_PLANTILLA) - len(valores))
+    if all(valor in (None, '') for valor in valores):
+        return None
+    hoy = hoy or date.today()
+
+    tipo = _texto(valores[0]).lower()
+    comunes = {
+        'empresa_id': empresa_id,
+        'nombres': _texto(valores[1]),
+        'apellidos': _texto(valores[2]),
+        'dni': _dni(valores[3]),
+        'activo': True,
+        'fecha_creacion': datetime.utcnow()
+    }
+    for campo in ('nombres', 'apellidos', 'dni'):
+        if not comunes[campo]:
+            raise ErrorFila(f'Falta {campo}')
+
+    if tipo == 'empleado':
+        tipo_pension, afp_codigo = _pension(_texto(valores[10]), _texto(valores[11]))
+        columnas = dict(
+            comunes,
+            sueldo_base=_numero(valores[4], 'Sueldo'),
+            fecha_ingreso=_fecha(valores[5], 'Fecha de ingreso', hoy),
+            fecha_nacimiento=_fecha(valores[6], 'Fecha de nacimiento'),
+            direccion=_texto(valores[7]),
+            telefono=_texto(valores[8]),
+            email=_texto(valores[9]),
+            tipo_pension=tipo_pension,
+            afp_codigo=afp_codigo,
+            cuenta_bancaria=_cuenta(_texto(valores[12]), _texto(valores[13])),
+            banco=_texto(valores[13]),
+            tipo_pago=_texto(valores[14]).lower() or 'mensual',
+            descuento_alimentos=_numero(valores[15], 'Descuento alimentos')
+        )
+        if columnas['tipo_pago'] not in TIPOS_PAGO:
+            raise ErrorFila(f"Tipo de pago no válido: {columnas['tipo_pago']}")
+        nacimiento = columnas['fecha_nacimiento']
+        if nacimiento and nacimiento >= columnas['fecha_ingreso']:
+            raise ErrorFila('La fecha de nacimiento debe ser anterior a la de ingreso')
+        return tipo, columnas, _columnas_vacias(tipo, valores)
+    if tipo == 'locador':
+        # Columnas de locador en la plantilla: monto, inicio, cuenta, banco y alimentos
+        return tipo, dict(
+            comunes,
+            monto_mensual=_numero(valores[4], 'Monto'),
+            fecha_inicio=_fecha(valores[5], 'Fecha de inicio', hoy),
+            suspendido=False,
+            cuenta_bancaria=_cuenta(_texto(valores[12]), _texto(valores[13])),
+            banco=_texto(valores[13]),
+            descuento_alimentos=_numero(valores[15], 'Descuento alimentos')
+        ), _columnas_vacias(tipo, valores)
+    raise ErrorFila(f'Tipo no válido: {valores[0]}')
+
+def _entero(valor, campo, por_defecto=None, minimo=1, maximo=None):
+    """Celda como entero dentro del rango [minimo, maximo]"""
+    if valor in (None, ''):
+        if por_defecto is None:
+            raise ErrorFila(f'Falta {campo.lower()}')
+        return por_defecto
+    numero = _numero(valor, campo)
+    if not numero.is_integer() or numero < minimo or (maximo is not None and numero > maximo):
+        rango = f'entre {minimo} y {maximo}' if maximo is not None else f'desde {minimo}'
+        raise ErrorFila(f'{campo} debe ser un entero {rango}: {valor}')
+    return int(numero)
+
+def _monto(valor, campo):
+    """Monto obligatorio y mayor que cero"""
+    if valor in (None, ''):
+        raise ErrorFila(f'Falta {campo.lower()}')
+    monto = _numero(valor, campo)
+    if monto <= 0:
+        raise ErrorFila(f'{campo} debe ser mayor que cero: {valor}')
+    return monto
+
+def _si_no(valor):
+    """Celda Sí/No como booleano"""
+    return _clave_hoja(_texto(valor)) in ('si', 's', 'x', '1', 'true', 'verdadero')
+
+def validar_ausencia(valores, hoy):
+    """Columnas de una fila de la hoja Ausencias (para cualquiera de los esquemas)"""
+    fecha = _fecha(valores[1], 'Fecha')
+    if fecha is None:
+        raise ErrorFila('Falta fecha')
+    tipo = _texto(valores[2]).lower()
+    if not tipo:
+        raise ErrorFila('Falta tipo')
+    horas = _numero(valores[4], 'Horas perdidas') if valores[4] not in (None, '') else 8.0
+    if not 0 <= horas <= 24:
+        raise ErrorFila(f'Horas perdidas fuera de rango (0 a 24): {valores[4]}')
+    return {'fecha': fecha, 'tipo': tipo, 'justificada': _si_no(valores[3]),
+            'horas_perdidas': horas, 'motivo': _texto(valores[5])}
+
+def validar_prestamo(valores, hoy):
+    """Columnas de una fila de la hoja Préstamos (para cualquiera de los esquemas)"""
+    monto = _monto(valores[1], 'Monto')
+    cuotas = _entero(valores[2], 'Cuotas')
+    fecha = _fecha(valores[3], 'Fecha', hoy)
+    cuota_mensual = round(monto / cuotas, 2)
+    return {'monto': monto, 'monto_total': monto, 'monto_pendiente': monto, 'cuotas': cuotas,
+            'cuota_mensual': cuota_mensual, 'cuotas_pagadas': 0, 'fecha_inicio': fecha,
+            'fecha_prestamo': fecha, 'motivo': _texto(valores[4]), 'activo': True}
+
+def validar_adelanto(valores, hoy):
+    """Columnas de una fila de la hoja Adelantos (para cualquiera de los esquemas)"""
+    monto = _monto(valores[1], 'Monto')
+    fecha = _fecha(valores[2], 'Fecha', hoy)
+    meses = _entero(valores[5], 'Meses', por_defecto=1)
+    return {'monto': monto, 'fecha': fecha, 'fecha_adelanto': fecha,
+            'mes_aplicar': _entero(valores[3], 'Mes a aplicar', fecha.month, 1, 12),
+            'año_aplicar': _entero(valores[4], 'Año a aplicar', fecha.year, 2000, 2100),
+            'descuento_mensual': round(monto / meses, 2), 'meses_restantes': meses,
+            'motivo': _texto(valores[6]), 'activo': True, 'aplicado': False}
+
+# Hojas de movimientos del libro de carga. Los validadores devuelven las
+# columnas de todos los esquemas del sistema (app_completo.py y models.py);
+# al insertar se usan solo las que tiene la tabla de la aplicación.
+HOJAS_MOVIMIENTOS = {
+    'ausencias': {
+        'titulo': 'Ausencias', 'tabla': 'ausencias', 'validar': validar_ausencia,
+        'encabezados': ['DNI', 'Fecha', 'Tipo', 'Justificada (Sí/No)', 'Horas Perdidas', 'Motivo'],
+    },
+    'prestamos': {
+        'titulo': 'Préstamos', 'tabla': 'prestamos', 'validar': validar_prestamo,
+        'encabezados': ['DNI', 'Monto', 'Cuotas', 'Fecha', 'Motivo'],
+    },
+    'adelantos': {
+        'titulo': 'Adelantos', 'tabla': 'adelantos', 'validar': validar_adelanto,
+        'encabezados': ['DNI', 'Monto', 'Fecha', 'Mes Aplicar', 'Año Aplicar', 'Meses', 'Motivo'],
+    },
+}
+
+def _invalidar_planillas(session, planillas, empresa_id):
+    """Marca como no vigentes las planillas guardadas de la empresa"""
+    session.execute(
+        planillas.update()
+        .where(planillas.c.empresa_id == empresa_id, planillas.c.vigente == True)
+        .values(vigente=False)
+    )
+
+def _tabla_planillas(db):
+    """Tabla de planillas guardadas, si la aplicación y la base de datos la tienen"""
+    planillas = db.metadata.tables.get('planillas')
+    if planillas is None or 'vigente' not in planillas.c:
+        return None
+    if not inspect(db.session.connection()).has_table('planillas'):
+        return None
+    return planillas
+
+def _tabla_resumen(db):
+    """Tabla empresa_resumen (esquema de models.py), si la base de datos la tiene"""
+    resumen = db.metadata.tables.get('empresa_resumen')
+    if resumen is None or not inspect(db.session.connection()).has_table('empresa_resumen'):
+        return None
+    return resumen
+
+def _actualizar_derivados(session, tablas, tabla_resumen, empleado_ids, deltas):
+    """
+    Mantiene lo que los eventos de sesión de models.py derivan en cada flush
+    y que las escrituras en bloque no disparan: fecha_modificacion de los
+    empleados afectados (para recalcular_planilla) y las diferencias del
+    bloque en empresa_resumen (ver _aportes_resumen)
+    """
+    empleados = tablas['empleados']
+    if empleado_ids and 'fecha_modificacion' in empleados.c:
+        session.execute(
+            empleados.update()
+            .where(empleados.c.id.in_(list(empleado_ids)))
+            .values(fecha_modificacion=datetime.utcnow())
+        )
+    if tabla_resumen is not None and deltas:
+        from models import aplicar_deltas_resumen
+        aplicar_deltas_resumen(session.connection(), deltas)
+
+def _aportes_resumen(session, deltas, tabla, insertados=(), actualizados=(), signo=1):
+    """
+    Suma a deltas el aporte a empresa_resumen de las filas insertadas (desde
+    los valores del bloque) y de las actualizadas (desde la base: signo=-1
+    antes del UPDATE y 1 después), sin recorrer el personal de la empresa
+    """
+    from models import APORTES_RESUMEN, sumar_aporte, sumar_guardados, sumar_por_empleado
+    if tabla not in APORTES_RESUMEN:
+        return
+    columna_estado, cuenta, columna_monto, _, _ = APORTES_RESUMEN[tabla]
+    if tabla in ('empleados', 'locadores'):
+        for registro in insertados:
+            sumar_aporte(deltas, registro['empresa_id'], tabla, registro.get(columna_estado, cuenta),
+                         registro.get(columna_monto))
+    elif insertados:
+        sumar_por_empleado(session.connection(), deltas, [
+            (tabla, registro['empleado_id'], registro.get(columna_estado, cuenta), registro.get(columna_monto))
+            for registro in insertados])
+    if actualizados:
+        sumar_guardados(session.connection(), deltas, tabla, list(actualizados), signo)
+
+def _iguales(actual, nuevo):
+    """Compara un valor guardado con el de la fila ('' y None, 1500 y 1500.0 son iguales)"""
+    if actual in (None, '') and nuevo in (None, ''):
+        return True
+    if isinstance(nuevo, float) and actual is not None:
+        return float(actual) == nuevo
+    return actual == nuevo
+
+def separar_existentes(session, tabla, empresa_id, registros, vacias=None):
+    """
+    Cruza las filas de un bloque con el personal de la empresa por DNI
+
+    Una sola consulta por bloque (dni IN ...) sobre el índice por empresa.
+    Si el DNI se repite en el bloque, vale la última fila. Las columnas de
+    vacias (dni -> columnas con la celda vacía) no se comparan ni se
+    actualizan: una celda en blanco conserva el dato guardado.
+
+    Returns:
+        (filas nuevas, cambios [{'_id': id, '_dni': dni, columna cambiada: valor}],
+         cantidad sin cambios)
+    """
+    por_dni = {registro['dni']: registro for registro in registros}
+    campos = [campo for campo in next(iter(por_dni.values()), {})
+              if campo not in CAMPOS_NO_ACTUALIZABLES and campo in tabla.c]
+    existentes = {}
+    if por_dni:
+        consulta = (
+            select(tabla.c.id, tabla.c.dni, *[tabla.c[campo] for campo in campos])
+            .where(tabla.c.empresa_id == empresa_id, tabla.c.dni.in_(list(por_dni)))
+            .order_by(tabla.c.id)
+        )
+        for fila in session.execute(consulta):
+            existentes.setdefault(fila.dni, fila)
+
+    vacias = vacias or {}
+    nuevos, cambios, sin_cambios = [], [], 0
+    for dni, registro in por_dni.items():
+        actual = existentes.get(dni)
+        if actual is None:
+            nuevos.append(registro)
+            continue
+        omitidos = vacias.get(dni, ())
+        distintos = {campo: registro[campo] for campo in campos
+                     if campo not in omitidos and not _iguales(actual._mapping[campo], registro[campo])}
+        if distintos:
+            cambios.append(dict({'_id': actual.id, '_dni': dni}, **distintos))
+        else:
+            sin_cambios += 1
+    return nuevos, cambios, sin_cambios
+
+def _sentencia_actualizacion(tabla, campos):
+    """UPDATE por id para executemany (los parámetros usan el prefijo 'nuevo_')"""
+    return (
+        tabla.update()
+        .where(tabla.c.id == bindparam('_id'))
+        .values({campo: bindparam(f'nuevo_{campo}') for campo in campos})
+    )
+
+def _escribir_chunk(session, tablas, planillas, empresa_id, pendientes, cambios=None, tabla_resumen=None):
+    """
+    Inserta y actualiza el bloque, invalida las planillas, marca los empleados
+    actualizados y el resumen de la empresa, y confirma (una transacción)
+    """
+    escritos = False
+    deltas = {}
+    for tipo, tabla in TABLAS_TIPO:
+        if pendientes[tipo]:
+            session.execute(tablas[tabla].insert(), pendientes[tipo])
+            escritos = True
+        # Un UPDATE executemany por combinación de columnas cambiadas
+        grupos = {}
+        for cambio in (cambios or {}).get(tipo, ()):
+            campos = tuple(sorted(campo for campo in cambio if not campo.startswith('_')))
+            grupos.setdefault(campos, []).append(
+                {'_id': cambio['_id'], **{f'nuevo_{campo}': cambio[campo] for campo in campos}})
+        # Solo el monto de las filas actualizadas cambia su aporte al resumen
+        monto = 'sueldo_base' if tipo == 'empleado' else 'monto_mensual'
+        montos_cambiados = [cambio['_id'] for cambio in (cambios or {}).get(tipo, ()) if monto in cambio]
+        if tabla_resumen is not None:
+            _aportes_resumen(session, deltas, tabla, pendientes[tipo], montos_cambiados, -1)
+        for campos, parametros in grupos.items():
+            session.execute(_sentencia_actualizacion(tablas[tabla], campos), parametros)
+            escritos = True
+        if tabla_resumen is not None and montos_cambiados:
+            _aportes_resumen(session, deltas, tabla, actualizados=montos_cambiados)
+    if escritos:
+        if planillas is not None:
+            _invalidar_planillas(session, planillas, empresa_id)
+        _actualizar_derivados(session, tablas, tabla_resumen,
+                              [cambio['_id'] for cambio in (cambios or {}).get('empleado', ())], deltas)
+    session.commit()
+
+class LibroErrores:
+    """
+    Libro .xlsx con las filas rechazadas, escrito en modo write-only de
+    openpyxl (las filas se vuelcan a disco a medida que llegan)
+
+    Cada hoja tiene las columnas de la hoja original más la fila original y
+    el motivo, de modo que se puede corregir y volver a subir tal cual. El
+    libro y cada hoja se crean con la primera fila rechazada.
+    """
+
+    def __init__(self):
+        self.libro = None
+        self.hojas = {}
+        self.filas = 0
+
+    def agregar(self, numero, valores, mensaje, hoja='Errores', encabezados=ENCABEZADOS_PLANTILLA):
+        """Copia la fila rechazada con el motivo resaltado"""
+        if self.libro is None:
+            self.libro = Workbook(write_only=True)
+        if hoja not in self.hojas:
+            self.hojas[hoja] = self.libro.create_sheet(hoja)
+            self.hojas[hoja].append(list(encabezados) + ['Fila Original', 'Errores'])
+        valores = list(valores) + [None] * (len(encabezados) - len(valores))
+        motivo = WriteOnlyCell(self.hojas[hoja], value=mensaje)
+        motivo.font = Font(color='C00000', bold=True)
+        self.hojas[hoja].append(valores[:len(encabezados)] + [numero, motivo])
+        self.filas += 1
+
+    def guardar(self, destino):
+        """Guarda el libro en una ruta o archivo abierto (solo si hubo filas rechazadas)"""
+        if self.libro is not None:
+            self.libro.save(destino)
+
+def importar_personal(db, empresa_id, filas, tamaño_chunk=TAMAÑO_CHUNK_CARGA, total=None, progreso=None,
+                      modo='insertar', simular=False, libro_errores=None, vistos=None):
+    """
+    Valida e inserta en bloques las filas de personal de una empresa
+
+    Las filas con errores (incluido un DNI repetido en el archivo) se omiten
+    y se informan; los bloques ya escritos quedan confirmados. Las escrituras
+    van directo a las tablas (sin la unidad de trabajo del ORM), por lo que
+    en cada bloque que cambia datos se invalidan explícitamente las planillas
+    guardadas de la empresa y se actualiza lo que derivan los eventos de
+    models.py (ver _actualizar_derivados).
+
+    Con simular=True no se escribe nada: cada bloque solo se cruza por DNI
+    con la base de datos (lecturas) para informar qué se crearía, actualizaría
+    o quedaría igual, sin tomar el bloqueo de escritura de SQLite.
+
+    Args:
+        db: instancia de SQLAlchemy de la aplicación (tablas y sesión)
+        empresa_id: empresa a la que se incorpora el personal
+        filas: iterable de (número de fila, valores), p. ej. leer_filas_xlsx
+        tamaño_chunk: filas por bloque
+        total: filas esperadas, para el avance (opcional)
+        progreso: función opcional llamada tras cada bloque con el resumen parcial
+        modo: 'insertar' (siempre filas nuevas) o 'actualizar' (cruce por DNI)
+        simular: validar y calcular las diferencias sin escribir
+        libro_errores: LibroErrores opcional donde se copian las filas rechazadas
+        vistos: dict opcional que se llena con (tipo, dni) -> fila de las filas válidas
+
+    Returns:
+        dict con empleados, locadores, creados, actualizados, sin_cambios,
+        existentes (al simular en modo 'insertar': DNI que ya están en la
+        base), cambios [(fila, dni, columnas)] (al simular), filas procesadas,
+        errores [(fila, mensaje)], bloques, segundos y hojas (vacío; lo
+        llenan importar_archivo y validar_archivo con las hojas de movimientos)
+    """
+    if modo not in MODOS_CARGA:
+        raise ValueError(f'Modo de carga no válido: {modo}')
+    tablas = db.metadata.tables
+    planillas = None if simular else _tabla_planillas(db)
+    tabla_resumen = None if simular else _tabla_resumen(db)
+    resumen = {'empleados': 0, 'locadores': 0, 'creados': 0, 'actualizados': 0, 'sin_cambios': 0,
+               'existentes': 0, 'cambios': [], 'filas': 0, 'total': total, 'errores': [],
+               'bloques': 0, 'segundos': 0.0, 'hojas': {}}
+    pendientes = {'empleado': [], 'locador': []}
+    vacias = {'empleado': {}, 'locador': {}}  # dni -> columnas con la celda vacía, por bloque
+    vistos = {} if vistos is None else vistos  # (tipo, dni) -> fila donde apareció por primera vez
+    inicio = time.perf_counter()
+
+    def cerrar_chunk():
+        resumen['empleados'] += len(pendientes['empleado'])
+        resumen['locadores'] += len(pendientes['locador'])
+        cambios = None
+        if modo == 'actualizar' or simular:
+            cambios = {}
+            for tipo, tabla in TABLAS_TIPO:
+                validas = len(pendientes[tipo])
+                pendientes[tipo], cambios[tipo], sin_cambios = separar_existentes(
+                    db.session, tablas[tabla], empresa_id, pendientes[tipo], vacias[tipo])
+                if modo == 'insertar':
+                    # Se insertarían todas; las que ya existen quedarían duplicadas
+                    resumen['existentes'] += validas - len(pendientes[tipo])
+                    resumen['creados'] += validas
+                    pendientes[tipo], cambios[tipo] = [], []
+                    continue
+                resumen['actualizados'] += len(cambios[tipo])
+                resumen['sin_cambios'] += sin_cambios
+                if simular and len(resumen['cambios']) < MAXIMO_DETALLE_CAMBIOS:
+                    resumen['cambios'].extend(
+                        (vistos[(tipo, cambio['_dni'])], cambio['_dni'],
+                         sorted(campo for campo in cambio if not campo.startswith('_')))
+                        for cambio in cambios[tipo][:MAXIMO_DETALLE_CAMBIOS - len(resumen['cambios'])])
+        resumen['creados'] += len(pendientes['empleado']) + len(pendientes['locador'])
+        if simular:
+            db.session.rollback()
+        else:
+            _escribir_chunk(db.session, tablas, planillas, empresa_id, pendientes, cambios, tabla_resumen)
+        resumen['bloques'] += 1
+        resumen['segundos'] = round(time.perf_counter() - inicio, 3)
+        pendientes['empleado'], pendientes['locador'] = [], []
+        vacias['empleado'], vacias['locador'] = {}, {}
+        if progreso:
+            progreso(resumen)
+
+    try:
+        en_chunk = 0
+        for numero, valores in filas:
+            try:
+                fila = validar_fila(empresa_id, valores)
+                if fila:
+                    clave = (fila[0], fila[1]['dni'])
+                    if clave in vistos:
+                        raise ErrorFila(f'DNI repetido en el archivo (fila {vistos[clave]})')
+                    vistos[clave] = numero
+            except ErrorFila as error:
+                resumen['errores'].append((numero, str(error)))
+                if libro_errores is not None:
+                    libro_errores.agregar(numero, valores, str(error))
+                fila = None
+            resumen['filas'] += 1
+            if fila:
+                tipo, columnas, en_blanco = fila
+                pendientes[tipo].append(columnas)
+                if en_blanco:
+                    vacias[tipo][columnas['dni']] = en_blanco
+                en_chunk += 1
+            if en_chunk >= tamaño_chunk:
+                cerrar_chunk()
+                en_chunk = 0
+        if en_chunk or resumen['bloques'] == 0:
+            cerrar_chunk()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    resumen['segundos'] = round(time.perf_counter() - inicio, 3)
+    return resumen
+
+def indice_dni(db, empresa_id):
+    """
+    DNI -> id de los empleados de la empresa en memoria (una sola consulta)
+
+    Si un DNI se repite vale el empleado activo más antiguo.
+    """
+    empleados = db.metadata.tables['empleados']
+    consulta = (
+        select(empleados.c.id, empleados.c.dni)
+        .where(empleados.c.empresa_id == empresa_id)
+        .order_by(empleados.c.activo.desc(), empleados.c.id)
+    )
+    indice = {}
+    for empleado_id, dni in db.session.execute(consulta):
+        indice.setdefault(dni, empleado_id)
+    return indice
+
+def importar_movimientos(db, empresa_id, tipo, filas, indice, tamaño_chunk=TAMAÑO_CHUNK_CARGA, simular=False,
+                         libro_errores=None):
+    """
+    Valida e inserta una hoja de ausencias, préstamos o adelantos
+
+    Cada fila se resuelve a su empleado con el índice de DNI en memoria, sin
+    consultas por fila. Toda la hoja va en una sola transacción (INSERT
+    executemany por bloques sin confirmar): si alguna fila tiene errores no
+    se guarda nada de la hoja y se informan todas las filas rechazadas, así
+    la hoja corregida se puede volver a subir sin duplicar movimientos.
+
+    Args:
+        tipo: 'ausencias', 'prestamos' o 'adelantos' (ver HOJAS_MOVIMIENTOS)
+        filas: iterable de (número de fila, valores) de la hoja
+        indice: dict DNI -> id de empleado (indice_dni)
+        simular: solo validar, sin escribir
+
+    Returns:
+        dict con hoja, filas, validas, insertados, errores [(fila, mensaje)] y segundos
+    """
+    hoja = HOJAS_MOVIMIENTOS[tipo]
+    tabla = db.metadata.tables[hoja['tabla']]
+    columnas = len(hoja['encabezados'])
+    planillas = None if simular else _tabla_planillas(db)
+    tabla_resumen = None if simular else _tabla_resumen(db)
+    resumen = {'hoja': hoja['titulo'], 'filas': 0, 'validas': 0, 'insertados': 0, 'errores': [], 'segundos': 0.0}
+    pendientes = []
+    empleado_ids = set()
+    deltas = {}
+    hoy, ahora = date.today(), datetime.utcnow()
+    inicio = time.perf_counter()
+
+    try:
+        for numero, valores in filas:
+            valores = tuple(valores) + (None,) * (columnas - len(valores))
+            if all(valor in (None, '') for valor in valores):
+                continue
+            resumen['filas'] += 1
+            try:
+                dni = _dni(valores[0])
+                if not dni:
+                    raise ErrorFila('Falta dni')
+                if dni not in indice:
+                    raise ErrorFila(f'DNI sin empleado en la empresa: {dni}')
+                registro = hoja['validar'](valores, hoy)
+            except ErrorFila as error:
+                resumen['errores'].append((numero, str(error)))
+                if libro_errores is not None:
+                    libro_errores.agregar(numero, valores, str(error), f"Errores {hoja['titulo']}",
+                                          hoja['encabezados'])
+                continue
+            resumen['validas'] += 1
+            if simular or resumen['errores']:
+                continue  # la hoja no se guardará: basta con seguir validando
+            registro.update(empleado_id=indice[dni], fecha_creacion=ahora)
+            empleado_ids.add(indice[dni])
+            pendientes.append({campo: valor for campo, valor in registro.items() if campo in tabla.c})
+            if len(pendientes) >= tamaño_chunk:
+                db.session.execute(tabla.insert(), pendientes)
+                if tabla_resumen is not None:
+                    _aportes_resumen(db.session, deltas, hoja['tabla'], pendientes)
+                pendientes = []
+
+        if simular or resumen['errores']:
+            db.session.rollback()
+        else:
+            if pendientes:
+                db.session.execute(tabla.insert(), pendientes)
+                if tabla_resumen is not None:
+                    _aportes_resumen(db.session, deltas, hoja['tabla'], pendientes)
+            if resumen['validas']:
+                if planillas is not None:
+                    _invalidar_planillas(db.session, planillas, empresa_id)
+                _actualizar_derivados(db.session, db.metadata.tables, tabla_resumen, empleado_ids, deltas)
+            db.session.commit()
+            resumen['insertados'] = resumen['validas']
+    except Exception:
+        db.session.rollback()
+        raise
+
+    resumen['segundos'] = round(time.perf_counter() - inicio, 3)
+    return resumen
+
+def _importar_hojas_movimientos(db, empresa_id, archivo, resumen, tamaño_chunk, progreso=None, simular=False,
+                                libro_errores=None, vistos=None):
+    """
+    Carga las hojas de movimientos del libro después de la de personal, para
+    que sus DNI ya estén en el índice (al simular, los DNI nuevos de la hoja
+    de personal se agregan al índice sin id)
+    """
+    hojas = hojas_movimientos_xlsx(archivo)
+    if not hojas:
+        return
+    indice = indice_dni(db, empresa_id)
+    if simular:
+        for tipo, dni in vistos or ():
+            if tipo == 'empleado':
+                indice.setdefault(dni, None)
+    for tipo, nombre in hojas.items():
+        filas = leer_filas_xlsx(archivo, nombre, len(HOJAS_MOVIMIENTOS[tipo]['encabezados']))
+        resumen['hojas'][tipo] = importar_movimientos(db, empresa_id, tipo, filas, indice, tamaño_chunk,
+                                                      simular, libro_errores)
+        if hasattr(archivo, 'seek'):
+            archivo.seek(0)
+        if progreso:
+            progreso(resumen)
+
+def errores_carga(resumen):
+    """Errores de la hoja de personal y de las de movimientos, estas con el nombre de la hoja"""
+    errores = list(resumen['errores'])
+    for hoja in resumen.get('hojas', {}).values():
+        errores.extend((fila, f"{hoja['hoja']}: {mensaje}") for fila, mensaje in hoja['errores'])
+    return errores
+
+def importar_archivo(db, empresa_id, archivo, tamaño_chunk=TAMAÑO_CHUNK_CARGA, progreso=None, modo='insertar',
+                     formato=None):
+    """
+    Importa un archivo .xlsx o .csv de la plantilla (ruta o archivo abierto)
+
+    formato es 'xlsx' o 'csv'; si no se indica se toma de la extensión. Un
+    .xlsx puede traer además hojas de ausencias, préstamos y adelantos, que
+    se cargan después del personal (una transacción por hoja).
+    """
+    formato = formato or formato_archivo(archivo)
+    total = filas_estimadas(archivo, formato)
+    resumen = importar_personal(db, empresa_id, leer_filas(archivo, formato), tamaño_chunk, total, progreso, modo)
+    if formato == 'xlsx':
+        if hasattr(archivo, 'seek'):
+            archivo.seek(0)
+        _importar_hojas_movimientos(db, empresa_id, archivo, resumen, tamaño_chunk, progreso)
+    return resumen
+
+def validar_archivo(db, empresa_id, archivo, modo='insertar', tamaño_chunk=TAMAÑO_CHUNK_CARGA, destino_errores=None,
+                    formato=None):
+    """
+    Simulación de la carga de un archivo .xlsx o .csv: valida todas las filas
+    (también las de las hojas de movimientos) en una sola lectura y calcula
+    las diferencias con la base de datos sin escribir
+
+    Args:
+        destino_errores: ruta o archivo abierto donde guardar el libro con las
+            filas rechazadas (solo se guarda si hay errores)
+        formato: 'xlsx' o 'csv' (por defecto según la extensión)
+
+    Returns:
+        resumen de importar_personal(simular=True)
+    """
+    libro = LibroErrores() if destino_errores is not None else None
+    formato = formato or formato_archivo(archivo)
+    total = filas_estimadas(archivo, formato)
+    vistos = {}
+    resumen = importar_personal(db, empresa_id, leer_filas(archivo, formato), tamaño_chunk, total,
+                                modo=modo, simular=True, libro_errores=libro, vistos=vistos)
+    if formato == 'xlsx':
+        if hasattr(archivo, 'seek'):
+            archivo.seek(0)
+        _importar_hojas_movimientos(db, empresa_id, archivo, resumen, tamaño_chunk, simular=True,
+                                    libro_errores=libro, vistos=vistos)
+    if libro is not None:
+        libro.guardar(destino_errores)
+    return resumen
+
+def mostrar_progreso(resumen):
+    """Avance en consola de la carga"""
+    total = f"/{resumen['total']}" if resumen['total'] else ''
+    print(f"  {resumen['filas']}{total} filas, {resumen['empleados']} empleados, "
+          f"{resumen['locadores']} locadores, {len(resumen['errores'])} errores ({resumen['segundos']} s)")
+
+if __name__ == '__main__':
+    opciones = sys.argv[3:]
+    if len(sys.argv) < 3 or any(opcion not in ('--actualizar', '--simular') for opcion in opciones):
+        print("Uso: python carga_masiva.py <empresa_id> <archivo.xlsx|archivo.csv> [--actualizar] [--simular]")
+        sys.exit(1)
+
+    from app_completo import app, db
+
+    empresa_id, ruta = int(sys.argv[1]), sys.argv[2]
+    modo = 'actualizar' if '--actualizar' in opciones else 'insertar'
+    with app.app_context():
+        if '--simular' in opciones:
+            ruta_errores = ruta.rsplit('.', 1)[0] + '_errores.xlsx'
+            resultado = validar_archivo(db, empresa_id, ruta, modo, destino_errores=ruta_errores)
+        else:
+            resultado = importar_archivo(db, empresa_id, ruta, progreso=mostrar_progreso, modo=modo)
+    for fila, mensaje in errores_carga(resultado)[:20]:
+        print(f"  Fila {fila}: {mensaje}")
+    for hoja in resultado['hojas'].values():
+        print(f"  {hoja['hoja']}: {hoja['validas']} filas válidas, {hoja['insertados']} registradas, "
+              f"{len(hoja['errores'])} errores")
+    if '--simular' in opciones:
+        for fila, dni, columnas in resultado['cambios'][:20]:
+            print(f"  Fila {fila} (DNI {dni}) cambia: {', '.join(columnas)}")
+        if errores_carga(resultado):
+            print(f"  Filas con errores en {ruta_errores}")
+        if resultado['existentes']:
+            print(f"  ⚠ {resultado['existentes']} DNI ya registrados se duplicarían (use --actualizar)")
+        print(f"✓ Simulación sin cambios en la base: {resultado['creados']} nuevos, "
+              f"{resultado['actualizados']} por actualizar, {resultado['sin_cambios']} sin cambios, "
+              f"{len(errores_carga(resultado))} errores ({resultado['segundos']} s)")
+    else:
+        print(f"✓ Carga terminada: {resultado['empleados']} empleados y {resultado['locadores']} locadores "
+              f"({resultado['creados']} nuevos, {resultado['actualizados']} actualizados, "
+              f"{resultado['sin_cambios']} sin cambios)")
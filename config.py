@@ -4,6 +4,31 @@ Configuración de producción para el Sistema de Planillas Multirégimen Perú
 
 import os
 from datetime import timedelta
+from sqlalchemy import event
+from sqlalchemy.pool import QueuePool
+
+# PRAGMAs del perfil de producción de SQLite, aplicados en cada conexión:
+# WAL permite lecturas concurrentes con una escritura, busy_timeout espera
+# el bloqueo en lugar de fallar con "database is locked" y synchronous=NORMAL
+# (seguro con WAL) evita un fsync por cada commit.
+PRAGMAS_SQLITE_PRODUCCION = {
+    'journal_mode': 'WAL',
+    'busy_timeout': 5000,        # milisegundos
+    'synchronous': 'NORMAL',
+    'cache_size': -64000,        # 64 MB (negativo = KiB)
+    'mmap_size': 268435456,      # 256 MB
+    'temp_store': 'MEMORY'
+}
+
+# Pool de conexiones reutilizables para el motor SQLAlchemy en producción
+OPCIONES_MOTOR_PRODUCCION = {
+    'poolclass': QueuePool,
+    'pool_size': 10,
+    'max_overflow': 20,
+    'pool_timeout': 30,
+    'pool_pre_ping': True,
+    'connect_args': {'timeout': 5, 'check_same_thread': False}
+}
 
 class Config:
     """Configuración base"""
@@ -11,6 +36,10 @@ class Config:
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or 'sqlite:///sispla.db'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     
+    # Perfil de base de datos (sin PRAGMAs: SQLite conserva su modo por defecto)
+    SQLALCHEMY_ENGINE_OPTIONS = {}
+    SQLITE_PRAGMAS = {}
+    
     # Configuración de sesión
     PERMANENT_SESSION_LIFETIME = timedelta(hours=8)
     
@@ -31,6 +60,8 @@ class ProductionConfig(Config):
     """Configuración para producción"""
     DEBUG = False
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or 'sqlite:///sispla_prod.db'
+    SQLALCHEMY_ENGINE_OPTIONS = OPCIONES_MOTOR_PRODUCCION
+    SQLITE_PRAGMAS = PRAGMAS_SQLITE_PRODUCCION
     LOG_LEVEL = 'WARNING'
 
 class TestingConfig(Config):
@@ -47,3 +78,37 @@ config = {
     'default': DevelopmentConfig
 }
 
+
+def aplicar_perfil_bd(app, nombre=None):
+    """
+    Copia el perfil de base de datos de una configuración a la aplicación
+    
+    Solo toma SQLALCHEMY_ENGINE_OPTIONS y SQLITE_PRAGMAS (la URI y demás
+    valores de la aplicación no cambian). Se llama antes de inicializar
+    SQLAlchemy. El perfil se elige con el argumento o la variable de
+    entorno SISPLA_CONFIG (por defecto 'default').
+    """
+    clase = config[nombre or os.environ.get('SISPLA_CONFIG', 'default')]
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = dict(clase.SQLALCHEMY_ENGINE_OPTIONS)
+    app.config['SQLITE_PRAGMAS'] = dict(clase.SQLITE_PRAGMAS)
+
+def registrar_pragmas_sqlite(app, db):
+    """
+    Aplica los SQLITE_PRAGMAS de la aplicación en cada nueva conexión SQLite
+    
+    Se llama después de inicializar SQLAlchemy con la aplicación.
+    """
+    pragmas = app.config.get('SQLITE_PRAGMAS')
+    if not pragmas:
+        return
+    
+    def aplicar_pragmas(conexion_dbapi, registro_conexion):
+        cursor = conexion_dbapi.cursor()
+        for nombre, valor in pragmas.items():
+            cursor.execute(f"PRAGMA {nombre}={valor}")
+        cursor.close()
+    
+    with app.app_context():
+        for motor in db.engines.values():
+            if motor.dialect.name == 'sqlite':
+                event.listen(motor, 'connect', aplicar_pragmas)
@@ -0,0 +1,47 @@
+"""
+Aritmética de Dinero en Céntimos
+Núcleo común para los cálculos de planilla: los montos se representan como
+céntimos enteros y cada concepto se redondea una sola vez, mitad hacia
+arriba (lejos de cero). Las sumas de céntimos son exactas, por lo que los
+totales coinciden con la suma de las filas en todas las versiones del sistema.
+"""
+
+from decimal import Decimal, ROUND_HALF_UP
+
+# Formato de celdas de montos en las exportaciones a Excel
+FORMATO_EXCEL = '#,##0.00'
+
+def a_centimos(monto):
+    """Convierte un monto en soles (Decimal, float, int o str) a céntimos enteros"""
+    if isinstance(monto, int):
+        return monto * 100
+    if isinstance(monto, Decimal) and monto.as_tuple().exponent >= -2:
+        return int(monto * 100)
+    return int((Decimal(str(monto)) * 100).quantize(Decimal('1'), rounding=ROUND_HALF_UP))
+
+def a_soles(centimos):
+    """Convierte céntimos enteros a Decimal con dos decimales"""
+    return Decimal(centimos).scaleb(-2)
+
+def a_float(centimos):
+    """Convierte céntimos a float para plantillas, JSON y Excel"""
+    return centimos / 100
+
+def dividir_redondeando(numerador, denominador):
+    """División entera con redondeo mitad hacia arriba (lejos de cero)"""
+    signo = -1 if (numerador < 0) != (denominador < 0) else 1
+    numerador, denominador = abs(numerador), abs(denominador)
+    return signo * ((2 * numerador + denominador) // (2 * denominador))
+
+def fraccion(tasa):
+    """Retorna una tasa (Decimal, float, int o str) como (numerador, denominador) exactos"""
+    return Decimal(str(tasa)).as_integer_ratio()
+
+def multiplicar(centimos, numerador, denominador=1):
+    """Céntimos por una fracción, redondeado una sola vez"""
+    return dividir_redondeando(centimos * numerador, denominador)
+
+def aplicar_tasa(centimos, tasa):
+    """Céntimos por una tasa decimal (ej. Decimal('0.13')), redondeado una sola vez"""
+    numerador, denominador = fraccion(tasa)
+    return dividir_redondeando(centimos * numerador, denominador)
@@ -4,7 +4,7 @@ Funciones para gestionar préstamos y adelantos de empleados
 """
 
 from datetime import datetime, date, timedelta
-from models import Empleado, Prestamo, Adelanto, Empresa
+from models import db, Empleado, Prestamo, Adelanto, Empresa, obtener_resumen_empresa
 from decimal import Decimal
 import math
 
@@ -94,60 +94,61 @@ def obtener_adelantos_empleado(empleado_id, aplicados_only=False):
     
     return query.order_by(Adelanto.fecha_adelanto.desc()).all()
 
-def obtener_deudas_empresa(empresa_id):
+def obtener_deudas_empresa(empresa_id, detalle=True):
     """
     Obtiene todas las deudas internas de una empresa
-    """
-    empleados = Empleado.query.filter_by(empresa_id=empresa_id).all()
     
+    Los totales se leen de empresa_resumen; con detalle=False no se cargan
+    los préstamos ni los adelantos individuales.
+    """
+    resumen = obtener_resumen_empresa(empresa_id)
     deudas = {
         'prestamos': [],
         'adelantos': [],
         'totales': {
-            'prestamos_pendientes': Decimal('0'),
-            'adelantos_pendientes': Decimal('0'),
-            'total_deudas': Decimal('0')
+            'prestamos_pendientes': float(resumen.prestamos_pendientes or 0),
+            'adelantos_pendientes': float(resumen.adelantos_pendientes or 0),
+            'total_deudas': float(resumen.total_deudas)
         }
     }
-    
-    for empleado in empleados:
-        # Préstamos activos
-        prestamos = obtener_prestamos_empleado(empleado.id, activos_only=True)
-        for prestamo in prestamos:
-            deudas['prestamos'].append({
-                'id': prestamo.id,
-                'empleado': f"{empleado.nombres} {empleado.apellidos}",
-                'monto_total': float(prestamo.monto_total),
-                'monto_pendiente': float(prestamo.monto_pendiente),
-                'cuota_mensual': float(prestamo.cuota_mensual),
-                'fecha_prestamo': prestamo.fecha_prestamo,
-                'motivo': prestamo.motivo
-            })
-            deudas['totales']['prestamos_pendientes'] += prestamo.monto_pendiente
-        
-        # Adelantos pendientes
-        adelantos = obtener_adelantos_empleado(empleado.id, aplicados_only=False)
-        for adelanto in adelantos:
-            deudas['adelantos'].append({
-                'id': adelanto.id,
-                'empleado': f"{empleado.nombres} {empleado.apellidos}",
-                'monto': float(adelanto.monto),
-                'mes_aplicar': adelanto.mes_aplicar,
-                'año_aplicar': adelanto.año_aplicar,
-                'fecha_adelanto': adelanto.fecha_adelanto,
-                'motivo': adelanto.motivo
-            })
-            deudas['totales']['adelantos_pendientes'] += adelanto.monto
-    
-    deudas['totales']['total_deudas'] = (
-        deudas['totales']['prestamos_pendientes'] + 
-        deudas['totales']['adelantos_pendientes']
+    if not detalle:
+        return deudas
+    
+    # Préstamos activos
+    prestamos = (
+        db.session.query(Prestamo, Empleado)
+        .join(Empleado, Empleado.id == Prestamo.empleado_id)
+        .filter(Empleado.empresa_id == empresa_id, Prestamo.activo == True)
+        .order_by(Empleado.id, Prestamo.fecha_prestamo.desc())
     )
+    for prestamo, empleado in prestamos:
+        deudas['prestamos'].append({
+            'id': prestamo.id,
+            'empleado': f"{empleado.nombres} {empleado.apellidos}",
+            'monto_total': float(prestamo.monto_total),
+            'monto_pendiente': float(prestamo.monto_pendiente),
+            'cuota_mensual': float(prestamo.cuota_mensual),
+            'fecha_prestamo': prestamo.fecha_prestamo,
+            'motivo': prestamo.motivo
+        })
     
-    # Convertir Decimal a float para JSON
-    deudas['totales']['prestamos_pendientes'] = float(deudas['totales']['prestamos_pendientes'])
-    deudas['totales']['adelantos_pendientes'] = float(deudas['totales']['adelantos_pendientes'])
-    deudas['totales']['total_deudas'] = float(deudas['totales']['total_deudas'])
+    # Adelantos pendientes
+    adelantos = (
+        db.session.query(Adelanto, Empleado)
+        .join(Empleado, Empleado.id == Adelanto.empleado_id)
+        .filter(Empleado.empresa_id == empresa_id, Adelanto.aplicado == False)
+        .order_by(Empleado.id, Adelanto.fecha_adelanto.desc())
+    )
+    for adelanto, empleado in adelantos:
+        deudas['adelantos'].append({
+            'id': adelanto.id,
+            'empleado': f"{empleado.nombres} {empleado.apellidos}",
+            'monto': float(adelanto.monto),
+            'mes_aplicar': adelanto.mes_aplicar,
+            'año_aplicar': adelanto.año_aplicar,
+            'fecha_adelanto': adelanto.fecha_adelanto,
+            'motivo': adelanto.motivo
+        })
     
     return deudas
 
@@ -4,7 +4,8 @@ Funciones para registrar y gestionar ausencias, permisos y faltas
 """
 
 from datetime import datetime, date, timedelta
-from models import Empleado, Ausencia, Empresa
+from models import db, Empleado, Ausencia, Empresa
+from calculadora_planilla import rango_mes
 from decimal import Decimal
 
 def registrar_ausencia(empleado_id, fecha, tipo, justificada=False, motivo='', horas_perdidas=8.0):
@@ -38,14 +39,11 @@ def obtener_ausencias_empleado(empleado_id, mes=None, año=None):
     """
     Obtiene las ausencias de un empleado en un período específico
     """
-    from app import db
     query = Ausencia.query.filter_by(empleado_id=empleado_id)
     
     if mes and año:
-        query = query.filter(
-            db.extract('month', Ausencia.fecha) == mes,
-            db.extract('year', Ausencia.fecha) == año
-        )
+        inicio, fin = rango_mes(mes, año)
+        query = query.filter(Ausencia.fecha >= inicio, Ausencia.fecha < fin)
     
     return query.order_by(Ausencia.fecha.desc()).all()
 
@@ -56,10 +54,8 @@ def obtener_ausencias_empresa(empresa_id, mes=None, año=None):
     query = db.session.query(Ausencia).join(Empleado).filter(Empleado.empresa_id == empresa_id)
     
     if mes and año:
-        query = query.filter(
-            db.extract('month', Ausencia.fecha) == mes,
-            db.extract('year', Ausencia.fecha) == año
-        )
+        inicio, fin = rango_mes(mes, año)
+        query = query.filter(Ausencia.fecha >= inicio, Ausencia.fecha < fin)
     
     return query.order_by(Ausencia.fecha.desc()).all()
 
@@ -209,7 +205,8 @@ def obtener_estadisticas_ausencias(empresa_id, año=None):
     
     ausencias = db.session.query(Ausencia).join(Empleado).filter(
         Empleado.empresa_id == empresa_id,
-        db.extract('year', Ausencia.fecha) == año
+        Ausencia.fecha >= date(año, 1, 1),
+        Ausencia.fecha < date(año + 1, 1, 1)
     ).all()
     
     estadisticas = {
@@ -1,7 +1,12 @@
+import weakref
 from datetime import datetime, date
 from decimal import Decimal
+from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
+from sqlalchemy.orm import Session
 
-# db será importado desde app.py
+# Instancia compartida; app.py la enlaza con db.init_app(app)
+db = SQLAlchemy()
 
 class Empresa(db.Model):
     """Modelo para empresas con régimen laboral específico"""
@@ -27,6 +32,12 @@ class Empresa(db.Model):
 class Empleado(db.Model):
     """Modelo para empleados con sueldo fijo mensual"""
     __tablename__ = 'empleados'
+    __table_args__ = (
+        db.Index('ix_empleados_empresa_activo', 'empresa_id', 'activo'),
+        db.Index('ix_empleados_empresa_apellidos', 'empresa_id', 'apellidos', 'id'),
+        db.Index('ix_empleados_empresa_nombres', 'empresa_id', 'nombres'),
+        db.Index('ix_empleados_empresa_dni', 'empresa_id', 'dni'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     empresa_id = db.Column(db.Integer, db.ForeignKey('empresas.id'), nullable=False)
@@ -47,6 +58,7 @@ class Empleado(db.Model):
     # Estado
     activo = db.Column(db.Boolean, default=True)
     fecha_creacion = db.Column(db.DateTime, default=datetime.utcnow)
+    fecha_modificacion = db.Column(db.DateTime, default=datetime.utcnow)  # Último cambio en insumos de planilla
     
     # Relaciones
     ausencias = db.relationship('Ausencia', backref='empleado', lazy=True, cascade='all, delete-orphan')
@@ -60,6 +72,11 @@ class Empleado(db.Model):
 class Locador(db.Model):
     """Modelo para locadores de servicios (Recibos por Honorarios)"""
     __tablename__ = 'locadores'
+    __table_args__ = (
+        db.Index('ix_locadores_empresa_apellidos', 'empresa_id', 'apellidos', 'id'),
+        db.Index('ix_locadores_empresa_nombres', 'empresa_id', 'nombres'),
+        db.Index('ix_locadores_empresa_dni', 'empresa_id', 'dni'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     empresa_id = db.Column(db.Integer, db.ForeignKey('empresas.id'), nullable=False)
@@ -87,6 +104,9 @@ class Locador(db.Model):
 class Ausencia(db.Model):
     """Modelo para registrar ausencias, permisos y faltas"""
     __tablename__ = 'ausencias'
+    __table_args__ = (
+        db.Index('ix_ausencias_empleado_fecha', 'empleado_id', 'fecha'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     empleado_id = db.Column(db.Integer, db.ForeignKey('empleados.id'), nullable=False)
@@ -103,6 +123,9 @@ class Ausencia(db.Model):
 class Prestamo(db.Model):
     """Modelo para préstamos internos a empleados"""
     __tablename__ = 'prestamos'
+    __table_args__ = (
+        db.Index('ix_prestamos_empleado_activo', 'empleado_id', 'activo'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     empleado_id = db.Column(db.Integer, db.ForeignKey('empleados.id'), nullable=False)
@@ -121,6 +144,9 @@ class Prestamo(db.Model):
 class Adelanto(db.Model):
     """Modelo para adelantos de sueldo"""
     __tablename__ = 'adelantos'
+    __table_args__ = (
+        db.Index('ix_adelantos_empleado_periodo', 'empleado_id', 'año_aplicar', 'mes_aplicar', 'aplicado'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     empleado_id = db.Column(db.Integer, db.ForeignKey('empleados.id'), nullable=False)
@@ -138,6 +164,10 @@ class Adelanto(db.Model):
 class Pago(db.Model):
     """Modelo para pagos de empleados (quincenales y mensuales)"""
     __tablename__ = 'pagos'
+    __table_args__ = (
+        db.Index('ix_pagos_empleado_periodo', 'empleado_id', 'año', 'mes'),
+        db.UniqueConstraint('empleado_id', 'mes', 'año', 'tipo_pago', name='uq_pago_periodo'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     empleado_id = db.Column(db.Integer, db.ForeignKey('empleados.id'), nullable=False)
@@ -177,6 +207,9 @@ class Pago(db.Model):
 class PagoLocador(db.Model):
     """Modelo para pagos a locadores de servicios"""
     __tablename__ = 'pagos_locadores'
+    __table_args__ = (
+        db.UniqueConstraint('locador_id', 'mes', 'año', name='uq_pago_locador_periodo'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     locador_id = db.Column(db.Integer, db.ForeignKey('locadores.id'), nullable=False)
@@ -194,6 +227,58 @@ class PagoLocador(db.Model):
     def __repr__(self):
         return f'<PagoLocador {self.locador.nombres} - {self.mes}/{self.año}>'
 
+class Planilla(db.Model):
+    """Modelo para el resumen de una planilla calculada por empresa y período"""
+    __tablename__ = 'planillas'
+    __table_args__ = (
+        db.UniqueConstraint('empresa_id', 'mes', 'año', 'tipo_pago', name='uq_planilla_periodo'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    empresa_id = db.Column(db.Integer, db.ForeignKey('empresas.id'), nullable=False)
+    mes = db.Column(db.Integer, nullable=False)
+    año = db.Column(db.Integer, nullable=False)
+    tipo_pago = db.Column(db.String(20), nullable=False, default='mensual')
+    
+    # Totales
+    total_empleados = db.Column(db.Integer, default=0)
+    total_locadores = db.Column(db.Integer, default=0)
+    total_ingresos = db.Column(db.Numeric(12, 2), default=0)
+    total_descuentos = db.Column(db.Numeric(12, 2), default=0)
+    total_neto = db.Column(db.Numeric(12, 2), default=0)
+    
+    fecha_calculo = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<Planilla {self.empresa_id} - {self.mes}/{self.año} {self.tipo_pago}>'
+
+class EmpresaResumen(db.Model):
+    """
+    Resumen materializado por empresa: personal activo, costo mensual,
+    deudas pendientes y última planilla. Se actualiza en la misma transacción
+    que los cambios de personal, deudas y planillas, sumando diferencias (ver
+    _actualizar_resumen_empresas); reconstruir_resumen_empresas la rehace completa.
+    """
+    __tablename__ = 'empresa_resumen'
+    
+    empresa_id = db.Column(db.Integer, db.ForeignKey('empresas.id'), primary_key=True)
+    empleados_activos = db.Column(db.Integer, default=0)
+    locadores_activos = db.Column(db.Integer, default=0)
+    costo_mensual = db.Column(db.Numeric(12, 2), default=0)  # Sueldos y honorarios activos
+    prestamos_pendientes = db.Column(db.Numeric(12, 2), default=0)
+    adelantos_pendientes = db.Column(db.Numeric(12, 2), default=0)
+    ultima_planilla_mes = db.Column(db.Integer)
+    ultima_planilla_año = db.Column(db.Integer)
+    ultima_planilla_neto = db.Column(db.Numeric(12, 2))
+    fecha_actualizacion = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    @property
+    def total_deudas(self):
+        return (self.prestamos_pendientes or 0) + (self.adelantos_pendientes or 0)
+    
+    def __repr__(self):
+        return f'<EmpresaResumen {self.empresa_id}>'
+
 class Configuracion(db.Model):
     """Modelo para configuraciones del sistema"""
     __tablename__ = 'configuraciones'
@@ -207,3 +292,371 @@ class Configuracion(db.Model):
     def __repr__(self):
         return f'<Configuracion {self.clave}: {self.valor}>'
 
+# Campos cuyo cambio obliga a recalcular la planilla del empleado
+CAMPOS_CALCULO_PLANILLA = {
+    Empleado: ('sueldo_base', 'fecha_ingreso', 'tipo_pension', 'afp_codigo', 'activo'),
+    Ausencia: ('empleado_id', 'fecha', 'tipo'),
+    Prestamo: ('empleado_id', 'cuota_mensual', 'activo'),
+    Adelanto: ('empleado_id', 'monto', 'mes_aplicar', 'año_aplicar'),
+}
+
+def _cambia_calculo(obj, campos):
+    """Indica si alguno de los campos del objeto fue modificado en la sesión"""
+    estado = db.inspect(obj)
+    return any(estado.attrs[campo].history.has_changes() for campo in campos)
+
+@event.listens_for(Session, 'before_flush')
+def _registrar_cambios_planilla(session, flush_context, instances):
+    """
+    Registra los insumos de planilla que cambian en este flush
+    
+    Los empleados afectados se marcan con fecha_modificacion en after_flush,
+    cuando las llaves foráneas de los registros nuevos ya están asignadas.
+    """
+    ahora = datetime.utcnow()
+    pendientes = session.info.setdefault('insumos_planilla_modificados', [])
+    empleados_ids = session.info.setdefault('empleados_planilla_modificados', set())
+    
+    for obj in list(session.new) + list(session.deleted):
+        if isinstance(obj, (Ausencia, Prestamo, Adelanto)):
+            pendientes.append(obj)
+        elif isinstance(obj, Configuracion):
+            obj.fecha_actualizacion = ahora
+    
+    for obj in session.dirty:
+        campos = CAMPOS_CALCULO_PLANILLA.get(type(obj))
+        if isinstance(obj, Configuracion):
+            obj.fecha_actualizacion = ahora
+        elif campos and _cambia_calculo(obj, campos):
+            if isinstance(obj, Empleado):
+                obj.fecha_modificacion = ahora
+            else:
+                pendientes.append(obj)
+                # Si el registro cambió de empleado, el anterior también queda afectado
+                anterior = db.inspect(obj).attrs['empleado_id'].history.deleted
+                empleados_ids.update(anterior)
+
+@event.listens_for(Session, 'after_flush')
+def _marcar_empleados_modificados(session, flush_context):
+    """Actualiza fecha_modificacion de los empleados con insumos modificados"""
+    pendientes = session.info.pop('insumos_planilla_modificados', [])
+    ids = session.info.pop('empleados_planilla_modificados', set())
+    ids.update(obj.empleado_id for obj in pendientes)
+    ids.discard(None)
+    if ids:
+        tabla = Empleado.__table__
+        session.connection().execute(
+            tabla.update().where(tabla.c.id.in_(ids)).values(fecha_modificacion=datetime.utcnow())
+        )
+
+def consulta_resumen_empresas(empresa_ids=None):
+    """SELECT con las columnas de empresa_resumen calculadas desde las tablas base"""
+    empresas = Empresa.__table__
+    empleados = Empleado.__table__
+    locadores = Locador.__table__
+    prestamos = Prestamo.__table__
+    adelantos = Adelanto.__table__
+    planillas = Planilla.__table__
+    
+    def escalar(columna, *condiciones, desde=None):
+        consulta = db.select(columna)
+        if desde is not None:
+            consulta = consulta.select_from(desde)
+        return consulta.where(*condiciones).scalar_subquery()
+    
+    empleado_de_empresa = prestamos.join(empleados, prestamos.c.empleado_id == empleados.c.id)
+    adelanto_de_empresa = adelantos.join(empleados, adelantos.c.empleado_id == empleados.c.id)
+    ultima_planilla = db.select(planillas).where(planillas.c.empresa_id == empresas.c.id).order_by(
+        planillas.c.año.desc(), planillas.c.mes.desc(), planillas.c.id.desc()
+    ).limit(1)
+    
+    def de_ultima_planilla(columna):
+        return ultima_planilla.with_only_columns(planillas.c[columna]).scalar_subquery()
+    
+    consulta = db.select(
+        empresas.c.id,
+        escalar(db.func.count(empleados.c.id), empleados.c.empresa_id == empresas.c.id, empleados.c.activo == True),
+        escalar(db.func.count(locadores.c.id), locadores.c.empresa_id == empresas.c.id, locadores.c.activo == True),
+        escalar(db.func.coalesce(db.func.sum(empleados.c.sueldo_base), 0),
+                empleados.c.empresa_id == empresas.c.id, empleados.c.activo == True)
+        + escalar(db.func.coalesce(db.func.sum(locadores.c.monto_mensual), 0),
+                  locadores.c.empresa_id == empresas.c.id, locadores.c.activo == True),
+        escalar(db.func.coalesce(db.func.sum(prestamos.c.monto_pendiente), 0),
+                empleados.c.empresa_id == empresas.c.id, prestamos.c.activo == True, desde=empleado_de_empresa),
+        escalar(db.func.coalesce(db.func.sum(adelantos.c.monto), 0),
+                empleados.c.empresa_id == empresas.c.id, adelantos.c.aplicado == False, desde=adelanto_de_empresa),
+        de_ultima_planilla('mes'),
+        de_ultima_planilla('año'),
+        de_ultima_planilla('total_neto'),
+        db.literal(datetime.utcnow(), db.DateTime)
+    )
+    if empresa_ids is not None:
+        consulta = consulta.where(empresas.c.id.in_(empresa_ids))
+    return consulta
+
+COLUMNAS_RESUMEN = ('empresa_id', 'empleados_activos', 'locadores_activos', 'costo_mensual',
+                    'prestamos_pendientes', 'adelantos_pendientes', 'ultima_planilla_mes',
+                    'ultima_planilla_año', 'ultima_planilla_neto', 'fecha_actualizacion')
+
+def actualizar_resumen_empresas(conexion, empresa_ids=None):
+    """
+    Recalcula las filas de empresa_resumen de las empresas indicadas (todas si
+    es None) con un DELETE y un INSERT ... SELECT en la conexión dada
+    """
+    tabla = EmpresaResumen.__table__
+    borrar = tabla.delete()
+    if empresa_ids is not None:
+        if not empresa_ids:
+            return
+        empresa_ids = list(empresa_ids)
+        borrar = borrar.where(tabla.c.empresa_id.in_(empresa_ids))
+    conexion.execute(borrar)
+    conexion.execute(tabla.insert().from_select(COLUMNAS_RESUMEN, consulta_resumen_empresas(empresa_ids)))
+
+# Motores en los que ya se verificó que existe empresa_resumen
+_motores_con_resumen = weakref.WeakSet()
+
+def _resumen_disponible(conexion):
+    """
+    Indica si la base de datos tiene la tabla empresa_resumen
+
+    En bases anteriores a la tabla el resumen se omite hasta ejecutar
+    reconstruir_resumen.py, en lugar de hacer fallar las escrituras.
+    """
+    motor = conexion.engine
+    if motor not in _motores_con_resumen:
+        if not db.inspect(conexion).has_table(EmpresaResumen.__tablename__):
+            return False
+        _motores_con_resumen.add(motor)
+    return True
+
+def reconstruir_resumen_empresas():
+    """Reconstruye empresa_resumen completo (reparación de desajustes) y confirma"""
+    EmpresaResumen.__table__.create(db.engine, checkfirst=True)
+    actualizar_resumen_empresas(db.session.connection())
+    db.session.commit()
+    return EmpresaResumen.query.count()
+
+def asegurar_resumen_empresas():
+    """Llena empresa_resumen si le faltan empresas (bases anteriores a la tabla)"""
+    if EmpresaResumen.query.count() < Empresa.query.count():
+        reconstruir_resumen_empresas()
+
+def obtener_resumen_empresa(empresa_id):
+    """
+    Resumen de la empresa (una consulta por clave primaria)
+
+    Se relee siempre: la fila se actualiza fuera del ORM en cada flush.
+    """
+    return db.session.get(EmpresaResumen, empresa_id, populate_existing=True) or EmpresaResumen(
+        empresa_id=empresa_id, empleados_activos=0, locadores_activos=0, costo_mensual=Decimal('0'),
+        prestamos_pendientes=Decimal('0'), adelantos_pendientes=Decimal('0')
+    )
+
+# Aporte de cada tabla a empresa_resumen: (columna de estado, valor que suma,
+# columna del monto, contador y acumulado de empresa_resumen)
+APORTES_RESUMEN = {
+    'empleados': ('activo', True, 'sueldo_base', 'empleados_activos', 'costo_mensual'),
+    'locadores': ('activo', True, 'monto_mensual', 'locadores_activos', 'costo_mensual'),
+    'prestamos': ('activo', True, 'monto_pendiente', None, 'prestamos_pendientes'),
+    'adelantos': ('aplicado', False, 'monto', None, 'adelantos_pendientes'),
+}
+MODELOS_RESUMEN = {Empleado: 'empleados', Locador: 'locadores', Prestamo: 'prestamos', Adelanto: 'adelantos'}
+
+def sumar_aporte(deltas, empresa_id, tabla, estado, monto, signo=1):
+    """
+    Suma a deltas (empresa -> columna -> diferencia) el aporte de un registro
+    de la tabla con ese estado y monto; signo=-1 lo resta
+    """
+    _, cuenta, _, contador, acumulado = APORTES_RESUMEN[tabla]
+    if empresa_id is None or estado is None or bool(estado) != cuenta:
+        return
+    fila = deltas.setdefault(empresa_id, {})
+    if contador:
+        fila[contador] = fila.get(contador, 0) + signo
+    fila[acumulado] = fila.get(acumulado, 0) + signo * Decimal(str(monto or 0))
+
+def sumar_guardados(conexion, deltas, tabla, ids, signo=1):
+    """Suma (o resta con signo=-1) a deltas el aporte guardado de los registros indicados (una consulta)"""
+    columna_estado, _, columna_monto, _, _ = APORTES_RESUMEN[tabla]
+    registros = db.metadata.tables[tabla]
+    if tabla in ('empleados', 'locadores'):
+        consulta = db.select(registros.c.empresa_id, registros.c[columna_estado], registros.c[columna_monto])
+    else:
+        empleados = Empleado.__table__
+        consulta = db.select(empleados.c.empresa_id, registros.c[columna_estado], registros.c[columna_monto]
+                             ).select_from(registros.join(empleados, registros.c.empleado_id == empleados.c.id))
+    for empresa_id, estado, monto in conexion.execute(consulta.where(registros.c.id.in_(ids))):
+        sumar_aporte(deltas, empresa_id, tabla, estado, monto, signo)
+
+def sumar_por_empleado(conexion, deltas, movimientos):
+    """Suma a deltas movimientos [(tabla, empleado_id, estado, monto)] con la empresa actual de cada empleado"""
+    ids = {empleado_id for _, empleado_id, _, _ in movimientos} - {None}
+    if not ids:
+        return
+    tabla = Empleado.__table__
+    empresas = dict(conexion.execute(db.select(tabla.c.id, tabla.c.empresa_id).where(tabla.c.id.in_(ids))).all())
+    for nombre, empleado_id, estado, monto in movimientos:
+        sumar_aporte(deltas, empresas.get(empleado_id), nombre, estado, monto)
+
+def aplicar_deltas_resumen(conexion, deltas):
+    """
+    Suma las diferencias a las filas de empresa_resumen (un UPDATE por
+    empresa con cambios), sin recorrer el personal de la empresa
+    """
+    tabla = EmpresaResumen.__table__
+    ahora = datetime.utcnow()
+    for empresa_id, columnas in deltas.items():
+        cambios = {columna: db.func.coalesce(tabla.c[columna], 0) + valor
+                   for columna, valor in columnas.items() if valor}
+        if cambios:
+            conexion.execute(tabla.update().where(tabla.c.empresa_id == empresa_id)
+                             .values(fecha_actualizacion=ahora, **cambios))
+
+def actualizar_ultima_planilla(conexion, empresa_ids):
+    """Copia a empresa_resumen la última planilla de cada empresa (índice por empresa y período)"""
+    tabla = EmpresaResumen.__table__
+    planillas = Planilla.__table__
+    ultima = db.select(planillas).where(planillas.c.empresa_id == tabla.c.empresa_id).order_by(
+        planillas.c.año.desc(), planillas.c.mes.desc(), planillas.c.id.desc()
+    ).limit(1)
+    conexion.execute(
+        tabla.update().where(tabla.c.empresa_id.in_(list(empresa_ids))).values(
+            ultima_planilla_mes=ultima.with_only_columns(planillas.c.mes).scalar_subquery(),
+            ultima_planilla_año=ultima.with_only_columns(planillas.c.año).scalar_subquery(),
+            ultima_planilla_neto=ultima.with_only_columns(planillas.c.total_neto).scalar_subquery(),
+            fecha_actualizacion=datetime.utcnow()
+        )
+    )
+
+def marcar_adelantos(adelanto_ids, aplicado=True):
+    """
+    Marca adelantos como aplicados (o los libera) con un UPDATE en bloque y
+    ajusta adelantos_pendientes de sus empresas con la diferencia
+
+    Solo cuentan los adelantos que cambian de estado.
+    """
+    adelanto_ids = list(adelanto_ids)
+    if not adelanto_ids:
+        return
+    conexion = db.session.connection()
+    if _resumen_disponible(conexion):
+        tabla = Adelanto.__table__
+        cambian = conexion.execute(
+            db.select(tabla.c.empleado_id, tabla.c.monto)
+            .where(tabla.c.id.in_(adelanto_ids), tabla.c.aplicado == (not aplicado))
+        ).all()
+        # Un adelanto que pasa a aplicado deja de estar pendiente, y al revés
+        deltas = {}
+        sumar_por_empleado(conexion, deltas, [('adelantos', empleado_id, False, -(monto or 0) if aplicado else monto)
+                                              for empleado_id, monto in cambian])
+        aplicar_deltas_resumen(conexion, deltas)
+    Adelanto.query.filter(Adelanto.id.in_(adelanto_ids)).update(
+        {'aplicado': aplicado}, synchronize_session=False
+    )
+
+@event.listens_for(Session, 'before_flush')
+def _registrar_aportes_resumen(session, flush_context, instances):
+    """
+    Resta el aporte guardado (antes del flush) de los registros que cambian
+    o se eliminan; _actualizar_resumen_empresas suma el aporte nuevo
+    """
+    session.info.pop('aportes_resumen', None)
+    cambiados, planillas, empresas = [], set(), {'nuevas': [], 'eliminadas': []}
+    guardados = {}
+    
+    for obj in session.new:
+        if type(obj) in MODELOS_RESUMEN or isinstance(obj, Planilla):
+            cambiados.append(obj)
+        elif isinstance(obj, Empresa):
+            empresas['nuevas'].append(obj)
+    for obj in session.deleted:
+        if type(obj) in MODELOS_RESUMEN:
+            guardados.setdefault(MODELOS_RESUMEN[type(obj)], set()).add(obj.id)
+        elif isinstance(obj, Planilla):
+            planillas.add(obj.empresa_id)
+        elif isinstance(obj, Empresa):
+            empresas['eliminadas'].append(obj.id)
+    for obj in session.dirty:
+        tabla = MODELOS_RESUMEN.get(type(obj))
+        if tabla:
+            columna_estado, _, columna_monto, _, _ = APORTES_RESUMEN[tabla]
+            clave = 'empresa_id' if tabla in ('empleados', 'locadores') else 'empleado_id'
+            if _cambia_calculo(obj, (clave, columna_estado, columna_monto)):
+                guardados.setdefault(tabla, set()).add(obj.id)
+                cambiados.append(obj)
+        elif isinstance(obj, Planilla) and _cambia_calculo(obj, ('empresa_id', 'mes', 'año', 'total_neto')):
+            planillas.update(db.inspect(obj).attrs['empresa_id'].history.deleted)
+            cambiados.append(obj)
+    
+    if not (cambiados or planillas or guardados or empresas['nuevas'] or empresas['eliminadas']):
+        return
+    conexion = session.connection()
+    if not _resumen_disponible(conexion):
+        return
+    
+    deltas, movimientos = {}, []
+    for tabla, ids in guardados.items():
+        sumar_guardados(conexion, deltas, tabla, ids, -1)
+    
+    # Un empleado que cambia de empresa se lleva sus préstamos y adelantos
+    # guardados que no cambian en este flush
+    traslados = [obj.id for obj in cambiados if isinstance(obj, Empleado) and obj.id is not None
+                 and db.inspect(obj).attrs['empresa_id'].history.deleted]
+    for tabla in ('prestamos', 'adelantos') if traslados else ():
+        columna_estado, _, columna_monto, _, _ = APORTES_RESUMEN[tabla]
+        registros = db.metadata.tables[tabla]
+        filas = [fila for fila in conexion.execute(
+            db.select(registros.c.id, registros.c.empleado_id, registros.c[columna_estado], registros.c[columna_monto])
+            .where(registros.c.empleado_id.in_(traslados))
+        ) if fila[0] not in guardados.get(tabla, ())]
+        if filas:
+            sumar_guardados(conexion, deltas, tabla, [fila[0] for fila in filas], -1)
+            movimientos.extend((tabla, empleado_id, estado, monto) for _, empleado_id, estado, monto in filas)
+    
+    session.info['aportes_resumen'] = (deltas, movimientos, cambiados, planillas, empresas)
+
+@event.listens_for(Session, 'after_flush')
+def _actualizar_resumen_empresas(session, flush_context):
+    """
+    Actualiza empresa_resumen de las empresas afectadas por el flush, dentro
+    de la misma transacción, con diferencias (col = col + delta) calculadas
+    solo sobre los registros que cambiaron: el costo no depende del tamaño
+    de la empresa. La reconstrucción completa queda para
+    reconstruir_resumen_empresas (reconstruir_resumen.py).
+
+    Las escrituras masivas (bulk_insert_mappings, query.update) no pasan por
+    aquí: marcar_adelantos y la carga masiva (carga_masiva.py) aplican sus
+    propias diferencias con aplicar_deltas_resumen.
+    """
+    aportes = session.info.pop('aportes_resumen', None)
+    if aportes is None:
+        return
+    deltas, movimientos, cambiados, planillas, empresas = aportes
+    conexion = session.connection()
+    tabla = EmpresaResumen.__table__
+    
+    if empresas['eliminadas']:
+        conexion.execute(tabla.delete().where(tabla.c.empresa_id.in_(empresas['eliminadas'])))
+    if empresas['nuevas']:
+        conexion.execute(tabla.insert(), [{
+            'empresa_id': empresa.id, 'empleados_activos': 0, 'locadores_activos': 0, 'costo_mensual': 0,
+            'prestamos_pendientes': 0, 'adelantos_pendientes': 0, 'fecha_actualizacion': datetime.utcnow()
+        } for empresa in empresas['nuevas']])
+    
+    for obj in cambiados:
+        if isinstance(obj, Planilla):
+            planillas.add(obj.empresa_id)
+            continue
+        nombre = MODELOS_RESUMEN[type(obj)]
+        columna_estado, _, columna_monto, _, _ = APORTES_RESUMEN[nombre]
+        if nombre in ('empleados', 'locadores'):
+            sumar_aporte(deltas, obj.empresa_id, nombre, getattr(obj, columna_estado), getattr(obj, columna_monto))
+        else:
+            movimientos.append((nombre, obj.empleado_id, getattr(obj, columna_estado), getattr(obj, columna_monto)))
+    sumar_por_empleado(conexion, deltas, movimientos)
+    
+    aplicar_deltas_resumen(conexion, deltas)
+    planillas.discard(None)
+    if planillas:
+        actualizar_ultima_planilla(conexion, planillas)
@@ -0,0 +1,121 @@
+"""
+Paginación por clave (keyset) del listado de personal
+Núcleo común para las versiones del sistema: las páginas se recorren en
+orden (apellidos, id) continuando desde la última fila mostrada, sin OFFSET,
+de modo que cada página cuesta lo mismo sin importar el tamaño de la planilla.
+Los filtros se resuelven en la base de datos con los índices por empresa.
+"""
+
+import base64
+import binascii
+import json
+
+from sqlalchemy import and_, or_, tuple_, func
+
+# Filas por página del listado de personal
+POR_PAGINA = 50
+POR_PAGINA_MAXIMA = 200
+
+# Filtros de texto aceptados en la URL del listado
+FILTROS_PERSONAL = ('nombre', 'dni', 'banco', 'tipo_pago')
+
+def leer_filtros_personal(args, activo='1'):
+    """
+    Filtros informados en los parámetros de la URL (request.args)
+
+    activo es '1' (solo activos), '0' (solo inactivos) o 'todos'; el valor
+    por defecto depende de lo que cada versión mostraba antes.
+    """
+    filtros = {}
+    for campo in FILTROS_PERSONAL:
+        valor = (args.get(campo) or '').strip()
+        if valor:
+            filtros[campo] = valor
+    valor_activo = args.get('activo', activo)
+    filtros['activo'] = valor_activo if valor_activo in ('1', '0', 'todos') else activo
+    return filtros
+
+def codificar_cursor(registro):
+    """Cursor opaco para la URL con la clave (apellidos, id) de la última fila"""
+    clave = json.dumps([registro.apellidos, registro.id])
+    return base64.urlsafe_b64encode(clave.encode('utf-8')).decode('ascii')
+
+def decodificar_cursor(cursor):
+    """Clave (apellidos, id) de un cursor; None si falta o no es válido"""
+    if not cursor:
+        return None
+    try:
+        apellidos, registro_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    except (ValueError, TypeError, binascii.Error, UnicodeError):
+        return None
+    if not isinstance(apellidos, str) or not isinstance(registro_id, int):
+        return None
+    return apellidos, registro_id
+
+def condicion_prefijo(columna, texto):
+    """
+    Coincidencia por prefijo como rango (columna >= texto < texto + máx.),
+    que a diferencia de LIKE sí usa el índice. Se prueban el texto tal cual,
+    en mayúsculas y con la primera letra en mayúscula.
+    """
+    variantes = {texto, texto.upper(), texto[:1].upper() + texto[1:]}
+    return or_(*[and_(columna >= variante, columna < variante + '\U0010ffff') for variante in sorted(variantes)])
+
+def filtrar_personal(consulta, modelo, filtros):
+    """
+    Aplica los filtros a una consulta de empleados o locadores
+
+    nombre y dni filtran por prefijo; banco, tipo_pago y activo por igualdad.
+    Los filtros sobre columnas que el modelo no tiene (los locadores no
+    tienen tipo_pago) se ignoran.
+    """
+    if filtros.get('nombre'):
+        consulta = consulta.filter(or_(condicion_prefijo(modelo.apellidos, filtros['nombre']),
+                                       condicion_prefijo(modelo.nombres, filtros['nombre'])))
+    if filtros.get('dni'):
+        consulta = consulta.filter(condicion_prefijo(modelo.dni, filtros['dni']))
+    for campo in ('banco', 'tipo_pago'):
+        if filtros.get(campo) and hasattr(modelo, campo):
+            consulta = consulta.filter(getattr(modelo, campo) == filtros[campo])
+    if filtros.get('activo', 'todos') != 'todos':
+        consulta = consulta.filter(modelo.activo == (filtros['activo'] == '1'))
+    return consulta
+
+def contar_personal(empresa_id, filtros, *modelos):
+    """
+    Total de registros de cada modelo que cumplen los filtros, en una sola
+    consulta (un COUNT por modelo como subconsulta escalar)
+
+    Returns:
+        tupla con un total por modelo, en el mismo orden
+    """
+    totales = [
+        filtrar_personal(modelo.query.filter(modelo.empresa_id == empresa_id), modelo, filtros)
+        .with_entities(func.count(modelo.id))
+        .scalar_subquery()
+        for modelo in modelos
+    ]
+    return tuple(modelos[0].query.session.query(*totales).one())
+
+def paginar_personal(modelo, empresa_id, filtros, cursor=None, por_pagina=POR_PAGINA):
+    """
+    Página de empleados o locadores de una empresa ordenada por (apellidos, id)
+
+    Se lee una fila de más para saber si hay página siguiente; la clave de
+    la última fila mostrada es el cursor de la siguiente.
+
+    Returns:
+        (registros de la página, cursor de la página siguiente o None)
+    """
+    por_pagina = max(1, min(por_pagina, POR_PAGINA_MAXIMA))
+    consulta = filtrar_personal(modelo.query.filter(modelo.empresa_id == empresa_id), modelo, filtros)
+
+    clave = decodificar_cursor(cursor)
+    if clave:
+        consulta = consulta.filter(tuple_(modelo.apellidos, modelo.id) > tuple_(*clave))
+
+    registros = consulta.order_by(modelo.apellidos, modelo.id).limit(por_pagina + 1).all()
+    if len(registros) > por_pagina:
+        registros = registros[:por_pagina]
+        return registros, codificar_cursor(registros[-1])
+    return registros, None
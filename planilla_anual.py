@@ -0,0 +1,247 @@
+"""
+Planilla Anual en una Sola Pasada
+Calcula los doce meses de una empresa (incluidas las gratificaciones de
+julio y diciembre) leyendo los insumos una sola vez. Los préstamos se
+amortizan y los adelantos se consumen mes a mes en memoria, y los pagos
+resultantes se escriben en bloque. Se usa para reconstruir historia y para
+auditorías anuales.
+"""
+
+import sys
+import time
+import calendar
+from decimal import Decimal
+from datetime import date
+
+from models import db, Empresa, Empleado, Locador, Ausencia, Prestamo, Adelanto, Pago, PagoLocador, marcar_adelantos
+from calculadora_columnar import conceptos_empleados
+from calculadora_planilla import (
+    construir_pago,
+    calcular_planilla_locador, registro_a_dict, guardar_planilla, guardar_pagos_en_bloque,
+    refrescar_configuracion, obtener_valores_configuracion, obtener_tasas_pension,
+    obtener_reglas_regimen
+)
+
+def fin_de_mes(mes, año):
+    """Último día del mes"""
+    return date(año, mes, calendar.monthrange(año, mes)[1])
+
+def _meses_desde(fecha, mes, año):
+    """Meses transcurridos desde el mes de la fecha hasta (mes, año), sin incluirlo"""
+    return (año - fecha.year) * 12 + (mes - fecha.month)
+
+def _saldo_inicial(prestamo, año):
+    """
+    Saldo del préstamo al inicio del año según su cronograma
+
+    Se asume una cuota por mes desde el mes del préstamo; así el resultado
+    no depende de corridas anteriores y la historia puede reconstruirse.
+    """
+    cuotas_previas = max(0, _meses_desde(prestamo.fecha_prestamo, 1, año))
+    return max(Decimal('0'), prestamo.monto_total - prestamo.cuota_mensual * cuotas_previas)
+
+def _cuota_del_mes(prestamo, saldo, mes, año):
+    """Cuota que corresponde descontar en el mes (0 si el préstamo no aplica)"""
+    if saldo <= 0 or _meses_desde(prestamo.fecha_prestamo, mes, año) < 0:
+        return Decimal('0')
+    # Un préstamo cancelado deja de descontarse después de su fecha de finalización
+    if not prestamo.activo and prestamo.fecha_finalizacion and prestamo.fecha_finalizacion < date(año, mes, 1):
+        return Decimal('0')
+    return min(prestamo.cuota_mensual, saldo)
+
+def cargar_datos_año(empresa_id, año):
+    """
+    Carga una sola vez los insumos del año de una empresa
+
+    Retorna empleados y locadores activos, faltas por (empleado, mes),
+    préstamos por empleado, adelantos por (empleado, mes) y la configuración.
+    """
+    empresa = Empresa.query.get_or_404(empresa_id)
+    empleados = Empleado.query.filter_by(empresa_id=empresa_id, activo=True).order_by(Empleado.id).all()
+    locadores = Locador.query.filter_by(empresa_id=empresa_id, activo=True).order_by(Locador.id).all()
+
+    inicio, fin = date(año, 1, 1), date(año + 1, 1, 1)
+
+    faltas = {}
+    fechas = (
+        db.session.query(Ausencia.empleado_id, Ausencia.fecha)
+        .join(Empleado, Empleado.id == Ausencia.empleado_id)
+        .filter(
+            Empleado.empresa_id == empresa_id,
+            Empleado.activo == True,
+            Ausencia.tipo == 'falta',
+            Ausencia.fecha >= inicio,
+            Ausencia.fecha < fin
+        )
+        .all()
+    )
+    for empleado_id, fecha in fechas:
+        clave = (empleado_id, fecha.month)
+        faltas[clave] = faltas.get(clave, 0) + 1
+
+    prestamos = {}
+    consulta_prestamos = (
+        Prestamo.query
+        .join(Empleado, Empleado.id == Prestamo.empleado_id)
+        .filter(
+            Empleado.empresa_id == empresa_id,
+            Empleado.activo == True,
+            Prestamo.fecha_prestamo < fin
+        )
+        .order_by(Prestamo.id)
+    )
+    for prestamo in consulta_prestamos:
+        prestamos.setdefault(prestamo.empleado_id, []).append(prestamo)
+
+    adelantos = {}
+    consulta_adelantos = (
+        Adelanto.query
+        .join(Empleado, Empleado.id == Adelanto.empleado_id)
+        .filter(
+            Empleado.empresa_id == empresa_id,
+            Empleado.activo == True,
+            Adelanto.año_aplicar == año
+        )
+    )
+    for adelanto in consulta_adelantos:
+        adelantos.setdefault((adelanto.empleado_id, adelanto.mes_aplicar), []).append(adelanto)
+
+    refrescar_configuracion()
+
+    return {
+        'empresa': empresa,
+        'año': año,
+        'empleados': empleados,
+        'locadores': locadores,
+        'faltas': faltas,
+        'prestamos': prestamos,
+        'adelantos': adelantos,
+        'configuracion': obtener_valores_configuracion(),
+        'tasas': obtener_tasas_pension(),
+        'reglas': obtener_reglas_regimen(empresa.regimen_laboral)
+    }
+
+def calcular_planilla_anual(empresa_id, año, tipo_pago='mensual', guardar=True):
+    """
+    Calcula los doce meses del año de una empresa en una sola pasada
+
+    Cada mes toma en cuenta la fecha de ingreso de los empleados, las faltas
+    del mes, la cuota de cada préstamo según su saldo (que se amortiza en
+    memoria) y los adelantos del mes. Con guardar=True se reemplazan los
+    pagos del año de la empresa con inserciones en bloque, se marcan los
+    adelantos como aplicados y se guarda el resumen Planilla de cada mes.
+    El saldo de los préstamos en la base de datos no se modifica.
+
+    Returns:
+        dict con los totales por mes y del año
+    """
+    inicio = time.perf_counter()
+    datos = cargar_datos_año(empresa_id, año)
+    empresa = datos['empresa']
+    umbral_minimo = datos['configuracion'].get('umbral_renta_5ta', '1025')
+
+    saldos = {prestamo.id: _saldo_inicial(prestamo, año)
+              for lista in datos['prestamos'].values() for prestamo in lista}
+
+    pagos = []
+    pagos_locadores = []
+    meses = []
+
+    for mes in range(1, 13):
+        referencia = fin_de_mes(mes, año)
+        totales = {
+            'total_empleados': 0,
+            'total_locadores': 0,
+            'total_ingresos': Decimal('0'),
+            'total_descuentos': Decimal('0'),
+            'total_neto': Decimal('0')
+        }
+
+        # Beneficios y descuentos del mes por columnas, para los empleados ya ingresados
+        empleados = [empleado for empleado in datos['empleados'] if empleado.fecha_ingreso <= referencia]
+        conceptos = conceptos_empleados(empleados, datos['reglas'], mes, año, umbral_minimo, referencia,
+                                        datos['tasas'])
+        for empleado, (beneficios, descuentos_empleado) in zip(empleados, conceptos):
+            dias_faltados = datos['faltas'].get((empleado.id, mes), 0)
+            dias_trabajados = max(0, 30 - dias_faltados)
+
+            deudas = {'prestamos': Decimal('0'), 'adelantos': Decimal('0')}
+            for prestamo in datos['prestamos'].get(empleado.id, []):
+                cuota = _cuota_del_mes(prestamo, saldos[prestamo.id], mes, año)
+                saldos[prestamo.id] -= cuota
+                deudas['prestamos'] += cuota
+            for adelanto in datos['adelantos'].get((empleado.id, mes), []):
+                deudas['adelantos'] += adelanto.monto
+
+            pago = construir_pago(empleado, mes, año, tipo_pago, dias_trabajados, dias_faltados,
+                                  beneficios, descuentos_empleado, deudas)
+            pagos.append(registro_a_dict(pago))
+            totales['total_empleados'] += 1
+            totales['total_ingresos'] += pago.total_ingresos
+            totales['total_descuentos'] += pago.total_descuentos
+            totales['total_neto'] += pago.neto_pagar
+
+        for locador in datos['locadores']:
+            if locador.fecha_inicio > referencia:
+                continue
+            pago_locador = calcular_planilla_locador(locador, mes, año)
+            pagos_locadores.append(registro_a_dict(pago_locador))
+            totales['total_locadores'] += 1
+            totales['total_neto'] += pago_locador.neto_pagar
+
+        meses.append({'mes': mes, **totales})
+
+    if guardar:
+        empleados_ids = [empleado.id for empleado in datos['empleados']]
+        locadores_ids = [locador.id for locador in datos['locadores']]
+        if empleados_ids:
+            Pago.query.filter(Pago.empleado_id.in_(empleados_ids), Pago.año == año,
+                              Pago.tipo_pago == tipo_pago).delete(synchronize_session=False)
+        if locadores_ids:
+            PagoLocador.query.filter(PagoLocador.locador_id.in_(locadores_ids),
+                                     PagoLocador.año == año).delete(synchronize_session=False)
+
+        guardar_pagos_en_bloque(pagos, pagos_locadores)
+
+        adelantos_ids = [adelanto.id for lista in datos['adelantos'].values() for adelanto in lista]
+        if adelantos_ids:
+            marcar_adelantos(adelantos_ids)
+        for totales_mes in meses:
+            guardar_planilla(empresa_id, totales_mes['mes'], año, tipo_pago, totales_mes)
+        db.session.commit()
+
+    resumen = {
+        'empresa': empresa.nombre,
+        'año': año,
+        'meses': [
+            {clave: valor if isinstance(valor, int) else float(valor) for clave, valor in totales_mes.items()}
+            for totales_mes in meses
+        ],
+        'totales': {
+            'total_pagos': len(pagos),
+            'total_pagos_locadores': len(pagos_locadores),
+            'total_ingresos': float(sum(totales_mes['total_ingresos'] for totales_mes in meses)),
+            'total_descuentos': float(sum(totales_mes['total_descuentos'] for totales_mes in meses)),
+            'total_neto': float(sum(totales_mes['total_neto'] for totales_mes in meses))
+        },
+        'segundos': round(time.perf_counter() - inicio, 3)
+    }
+    return resumen
+
+if __name__ == '__main__':
+    if len(sys.argv) < 3:
+        print("Uso: python planilla_anual.py <empresa_id> <año>")
+        sys.exit(1)
+
+    from app import app
+
+    empresa_id, año = int(sys.argv[1]), int(sys.argv[2])
+
+    with app.app_context():
+        resumen = calcular_planilla_anual(empresa_id, año)
+
+    for totales_mes in resumen['meses']:
+        print(f"  {totales_mes['mes']:02d}/{año}: {totales_mes['total_empleados']} empleados, "
+              f"neto S/. {totales_mes['total_neto']:.2f}")
+    print(f"✓ {resumen['empresa']} {año}: {resumen['totales']['total_pagos']} pagos "
+          f"en {resumen['segundos']}s")
@@ -0,0 +1,162 @@
+"""
+Cálculo de Planillas por Lote
+Calcula en paralelo la planilla de todas las empresas activas para un período.
+Cada empresa se procesa en un proceso trabajador independiente; el proceso
+principal escribe los resultados en bloque y reporta tiempos y errores por
+empresa sin detener el resto de la corrida.
+
+La corrida ocupa varios procesos durante minutos, por eso se lanza desde la
+línea de comandos (python planilla_lote.py <mes> <año> [procesos]) y no
+desde una petición web.
+"""
+
+import sys
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from flask import Flask
+
+from models import db, Empresa, marcar_adelantos
+from calculadora_planilla import calcular_pagos_periodo, registro_a_dict, guardar_planilla, guardar_pagos_en_bloque
+
+# Aplicación propia de cada proceso trabajador
+_app_trabajador = None
+
+def _iniciar_trabajador(database_uri):
+    """Crea la aplicación Flask del proceso trabajador"""
+    global _app_trabajador
+    _app_trabajador = Flask(__name__)
+    _app_trabajador.config['SQLALCHEMY_DATABASE_URI'] = database_uri
+    _app_trabajador.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(_app_trabajador)
+
+def _calcular_empresa(empresa_id, mes, año):
+    """
+    Calcula la planilla de una empresa dentro del proceso trabajador
+
+    No escribe en la base de datos: retorna los pagos como dicts de columnas
+    para que el proceso principal los inserte en bloque.
+    """
+    inicio = time.perf_counter()
+    with _app_trabajador.app_context():
+        try:
+            calculo = calcular_pagos_periodo(empresa_id, mes, año)
+            pagos = [registro_a_dict(pago) for pago in calculo['pagos']]
+            pagos_locadores = [registro_a_dict(pago) for pago in calculo['pagos_locadores']]
+            totales = {
+                'total_empleados': len(pagos),
+                'total_locadores': len(pagos_locadores),
+                'total_ingresos': sum(pago['total_ingresos'] for pago in pagos),
+                'total_descuentos': sum(pago['total_descuentos'] for pago in pagos),
+                'total_neto': sum(pago['neto_pagar'] for pago in pagos + pagos_locadores)
+            }
+        finally:
+            # Los adelantos marcados en memoria se aplican desde el proceso principal
+            db.session.rollback()
+            db.session.remove()
+
+    return {
+        'empresa_id': empresa_id,
+        'pagos': pagos,
+        'pagos_locadores': pagos_locadores,
+        'adelantos_aplicados': calculo['adelantos_aplicados'],
+        'totales': totales,
+        'segundos_calculo': time.perf_counter() - inicio
+    }
+
+def _guardar_resultado(resultado, mes, año):
+    """Escribe en bloque los pagos calculados de una empresa y su resumen"""
+    guardar_pagos_en_bloque(resultado['pagos'], resultado['pagos_locadores'])
+    if resultado['adelantos_aplicados']:
+        marcar_adelantos(resultado['adelantos_aplicados'])
+    guardar_planilla(resultado['empresa_id'], mes, año, 'mensual', resultado['totales'])
+    db.session.commit()
+
+def calcular_planillas_lote(mes, año, empresa_ids=None, procesos=None):
+    """
+    Calcula la planilla de varias empresas en procesos separados
+
+    Debe llamarse dentro de un contexto de aplicación con una base de datos
+    en archivo (los trabajadores abren su propia conexión).
+
+    Args:
+        mes, año: Período a calcular
+        empresa_ids: Empresas a procesar (default: todas las activas)
+        procesos: Número de procesos trabajadores (default: núcleos disponibles)
+
+    Returns:
+        dict con el reporte por empresa y los totales de la corrida
+    """
+    inicio = time.perf_counter()
+
+    if empresa_ids is None:
+        empresa_ids = [empresa.id for empresa in
+                       Empresa.query.filter_by(activa=True).order_by(Empresa.id).all()]
+
+    database_uri = db.engine.url.render_as_string(hide_password=False)
+    reporte = {
+        'mes': mes,
+        'año': año,
+        'empresas': [],
+        'totales': {
+            'empresas_ok': 0,
+            'empresas_error': 0,
+            'total_pagos': 0,
+            'segundos': 0
+        }
+    }
+
+    contexto = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=procesos, mp_context=contexto,
+                             initializer=_iniciar_trabajador, initargs=(database_uri,)) as pool:
+        futuros = {pool.submit(_calcular_empresa, empresa_id, mes, año): empresa_id
+                   for empresa_id in empresa_ids}
+
+        for futuro in as_completed(futuros):
+            empresa_id = futuros[futuro]
+            fila = {'empresa_id': empresa_id, 'estado': 'ok', 'error': None}
+            try:
+                resultado = futuro.result()
+                inicio_escritura = time.perf_counter()
+                _guardar_resultado(resultado, mes, año)
+                fila.update({
+                    'empleados': len(resultado['pagos']),
+                    'locadores': len(resultado['pagos_locadores']),
+                    'total_neto': float(resultado['totales']['total_neto']),
+                    'segundos_calculo': round(resultado['segundos_calculo'], 3),
+                    'segundos_escritura': round(time.perf_counter() - inicio_escritura, 3)
+                })
+                reporte['totales']['empresas_ok'] += 1
+                reporte['totales']['total_pagos'] += len(resultado['pagos']) + len(resultado['pagos_locadores'])
+            except Exception as e:
+                db.session.rollback()
+                fila['estado'] = 'error'
+                fila['error'] = str(e) or e.__class__.__name__
+                reporte['totales']['empresas_error'] += 1
+            reporte['empresas'].append(fila)
+
+    reporte['empresas'].sort(key=lambda fila: fila['empresa_id'])
+    reporte['totales']['segundos'] = round(time.perf_counter() - inicio, 3)
+    return reporte
+
+if __name__ == '__main__':
+    if len(sys.argv) < 3:
+        print("Uso: python planilla_lote.py <mes> <año> [procesos]")
+        sys.exit(1)
+
+    from app import app
+
+    mes, año = int(sys.argv[1]), int(sys.argv[2])
+    procesos = int(sys.argv[3]) if len(sys.argv) > 3 else None
+
+    with app.app_context():
+        reporte = calcular_planillas_lote(mes, año, procesos=procesos)
+
+    for fila in reporte['empresas']:
+        if fila['estado'] == 'ok':
+            print(f"✓ Empresa {fila['empresa_id']}: {fila['empleados']} empleados, "
+                  f"{fila['locadores']} locadores en {fila['segundos_calculo']}s")
+        else:
+            print(f"❌ Empresa {fila['empresa_id']}: {fila['error']}")
+    print(f"Total: {reporte['totales']['empresas_ok']} ok, "
+          f"{reporte['totales']['empresas_error']} con error en {reporte['totales']['segundos']}s")
@@ -0,0 +1,28 @@
+"""
+Script para crear y reconstruir la tabla empresa_resumen desde las tablas
+base (primera instalación o reparación de desajustes)
+"""
+
+import sys
+
+def reconstruir():
+    """Reconstruye el resumen de todas las empresas"""
+    from app import app
+    from models import reconstruir_resumen_empresas
+
+    print("Reconstruyendo resumen de empresas...")
+
+    try:
+        with app.app_context():
+            cantidad = reconstruir_resumen_empresas()
+        print(f"✓ Resumen reconstruido para {cantidad} empresas")
+        return True
+
+    except Exception as e:
+        print(f"❌ Error reconstruyendo resumen: {e}")
+        return False
+
+if __name__ == '__main__':
+    if not reconstruir():
+        print("La reconstrucción falló. Revise los errores anteriores.")
+        sys.exit(1)
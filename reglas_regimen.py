@@ -0,0 +1,62 @@
+"""
+Reglas por Régimen Laboral
+Cada régimen (microempresa, pequeña_empresa, general) se compila una sola
+vez en un objeto con sus factores ya resueltos; el cálculo por empleado
+llama al objeto directamente en lugar de volver a comparar el nombre del
+régimen. Cada versión del sistema declara su propia tabla de factores.
+"""
+
+from dinero import multiplicar
+
+# Meses en que se pagan gratificaciones (julio y diciembre)
+MESES_GRATIFICACION = frozenset((7, 12))
+
+class ReglasRegimen:
+    """
+    Factores precalculados de un régimen laboral
+
+    Los factores son fracciones (numerador, denominador) sobre el sueldo en
+    céntimos; un concepto que no corresponde queda como (0, 1).
+    """
+
+    __slots__ = ('nombre', 'vacaciones', 'cts', 'cts_por_año', 'usa_años_servicio',
+                 'gratificacion', 'asignacion_familiar', 'umbral_asignacion')
+
+    def __init__(self, nombre, vacaciones=(0, 1), cts=(0, 1), cts_por_año=False,
+                 gratificacion=(0, 1), asignacion_familiar=None):
+        self.nombre = nombre
+        self.vacaciones = vacaciones
+        self.cts = cts
+        self.cts_por_año = cts_por_año
+        # Solo se calculan los años de servicio si la CTS depende de ellos
+        self.usa_años_servicio = cts_por_año and cts[0] != 0
+        self.gratificacion = gratificacion
+        # (monto, umbral) en céntimos: se paga si el sueldo no supera el umbral
+        self.asignacion_familiar, self.umbral_asignacion = asignacion_familiar or (0, -1)
+
+    def beneficios(self, sueldo, mes, años_servicio=1):
+        """
+        Calcula (vacaciones, cts, gratificación, asignación familiar) en céntimos
+
+        Args:
+            sueldo: Sueldo en céntimos sobre el que se aplican los factores
+            mes: Mes del período (julio y diciembre pagan gratificación)
+            años_servicio: Solo se usa si la CTS es por año de servicio
+        """
+        vacaciones = multiplicar(sueldo, *self.vacaciones)
+        numerador, denominador = self.cts
+        if self.cts_por_año:
+            numerador *= años_servicio
+        cts = multiplicar(sueldo, numerador, denominador)
+        gratificacion = multiplicar(sueldo, *self.gratificacion) if mes in MESES_GRATIFICACION else 0
+        asignacion_familiar = self.asignacion_familiar if sueldo <= self.umbral_asignacion else 0
+        return vacaciones, cts, gratificacion, asignacion_familiar
+
+def compilar_reglas(tabla):
+    """
+    Compila una tabla {régimen: factores} en objetos ReglasRegimen
+
+    Returns:
+        dict régimen -> ReglasRegimen
+    """
+    return {nombre: ReglasRegimen(nombre, **factores) for nombre, factores in tabla.items()}
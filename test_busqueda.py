@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Probar la búsqueda global de personal: el índice FTS5 se crea con el
+personal existente, los triggers lo mantienen en altas, cambios y bajas
+(también en escrituras en bloque) y la búsqueda por prefijo lo reemplaza
+cuando SQLite no trae FTS5
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import time
+from datetime import date
+
+import app_completo
+import busqueda
+from app_completo import db, Empresa, Empleado, Locador
+from busqueda import buscar_personal, asegurar_indice_busqueda
+from test_planilla_guardada import crear_app_prueba
+
+def poblar():
+    """Dos empresas con empleados y un locador"""
+    norte = Empresa(nombre='Norte SAC', ruc='20100000001', regimen_laboral='general')
+    sur = Empresa(nombre='Sur EIRL', ruc='20100000002', regimen_laboral='microempresa')
+    db.session.add_all([norte, sur])
+    db.session.flush()
+    db.session.add_all([
+        Empleado(empresa_id=norte.id, nombres='Ana María', apellidos='García Pérez', dni='40123456',
+                 sueldo_base=1500.0, fecha_ingreso=date(2023, 1, 1)),
+        Empleado(empresa_id=sur.id, nombres='Luis', apellidos='Garcés', dni='40129999',
+                 sueldo_base=1200.0, fecha_ingreso=date(2023, 1, 1)),
+        Empleado(empresa_id=sur.id, nombres='Rosa', apellidos='Quispe', dni='71234567',
+                 sueldo_base=1100.0, fecha_ingreso=date(2023, 1, 1), activo=False),
+        Locador(empresa_id=norte.id, nombres='Ana', apellidos='Torres', dni='45555555',
+                monto_mensual=2000.0, fecha_inicio=date(2024, 1, 1)),
+    ])
+    db.session.commit()
+    return norte, sur
+
+def buscar(texto, limite=20):
+    """Búsqueda con la conexión de la sesión"""
+    return buscar_personal(db.session.connection(), texto, limite)
+
+def test_busqueda_fts():
+    """Coincidencias por prefijo, sin tildes, en todas las empresas"""
+    app = crear_app_prueba()
+    with app.app_context():
+        db.create_all()
+        norte, sur = poblar()
+
+        assert asegurar_indice_busqueda(db.session.connection()) == 'fts5'
+        garcia = buscar('garcia')
+        assert [(r['tipo'], r['apellidos'], r['empresa']) for r in garcia] == [('empleado', 'García Pérez', 'Norte SAC')]
+        assert {r['apellidos'] for r in buscar('garc')} == {'García Pérez', 'Garcés'}
+        assert sorted(r['dni'] for r in buscar('4012')) == ['40123456', '40129999']
+        assert {(r['tipo'], r['apellidos']) for r in buscar('ana')} == {('empleado', 'García Pérez'), ('locador', 'Torres')}
+        assert [r['apellidos'] for r in buscar('ana torres')] == ['Torres']
+        assert buscar('quispe')[0]['activo'] is False
+        assert buscar('') == [] and buscar('  ¿? ') == []
+        assert len(buscar('a', limite=1)) <= 1
+
+        # Los triggers mantienen el índice en altas, cambios y bajas
+        nuevo = Empleado(empresa_id=sur.id, nombres='Jorge', apellidos='Mamani', dni='48888888',
+                         sueldo_base=1000.0, fecha_ingreso=date(2024, 1, 1))
+        db.session.add(nuevo)
+        db.session.commit()
+        assert [r['id'] for r in buscar('mamani')] == [nuevo.id]
+        nuevo.apellidos = 'Condori'
+        db.session.commit()
+        assert buscar('mamani') == [] and [r['id'] for r in buscar('condori')] == [nuevo.id]
+        db.session.delete(nuevo)
+        db.session.commit()
+        assert buscar('condori') == []
+
+        # Escritura en bloque fuera del ORM
+        db.session.execute(Locador.__table__.insert(), [
+            {'empresa_id': norte.id, 'nombres': 'Pedro', 'apellidos': 'Huamán', 'dni': '46666666',
+             'monto_mensual': 1000.0, 'fecha_inicio': date(2024, 1, 1), 'activo': True}])
+        db.session.commit()
+        assert [r['tipo'] for r in buscar('huaman')] == ['locador']
+        db.drop_all()
+
+def test_busqueda_rapida_con_mucho_personal():
+    """Las mejores coincidencias se obtienen en milisegundos con 60 000 personas"""
+    app = crear_app_prueba()
+    with app.app_context():
+        db.create_all()
+        norte, _ = poblar()
+        apellidos = ['Quispe', 'Mamani', 'Flores', 'Rojas', 'Huamán', 'Vargas', 'Torres', 'Castillo']
+        db.session.execute(Empleado.__table__.insert(), [
+            {'empresa_id': norte.id, 'nombres': f'Nombre{i}', 'apellidos': f'{apellidos[i % 8]} {i}',
+             'dni': f'{10000000 + i}', 'sueldo_base': 1000.0, 'fecha_ingreso': date(2023, 1, 1), 'activo': True}
+            for i in range(60000)
+        ])
+        db.session.commit()
+        asegurar_indice_busqueda(db.session.connection())
+
+        inicio = time.perf_counter()
+        resultados = buscar('10004321')
+        por_dni = time.perf_counter() - inicio
+        inicio = time.perf_counter()
+        buscar('castillo nombre12')
+        por_nombre = time.perf_counter() - inicio
+
+        print(f"   ✓ Búsqueda por DNI: {por_dni * 1000:.1f} ms, por nombre: {por_nombre * 1000:.1f} ms")
+        assert [r['dni'] for r in resultados] == ['10004321']
+        assert por_dni < 0.5 and por_nombre < 0.5
+        db.drop_all()
+
+def test_busqueda_por_prefijo_sin_fts5():
+    """Sin FTS5 se usan índices globales y la búsqueda por prefijo"""
+    app = crear_app_prueba()
+    with app.app_context():
+        db.create_all()
+        poblar()
+        # Un módulo inexistente simula un SQLite compilado sin FTS5
+        crear_original = busqueda.CREAR_INDICE_FTS
+        busqueda.CREAR_INDICE_FTS = crear_original.replace('fts5(', 'fts5_no_disponible(')
+        try:
+            assert asegurar_indice_busqueda(db.session.connection()) == 'prefijo'
+            assert [r['apellidos'] for r in buscar('garc')] == ['Garcés', 'García Pérez']
+            assert [r['dni'] for r in buscar('4555')] == ['45555555']
+            assert [r['apellidos'] for r in buscar('ana torr')] == ['Torres']
+            indices = {fila[0] for fila in db.session.execute(
+                db.text("SELECT name FROM sqlite_master WHERE type = 'index'"))}
+            assert {'ix_empleados_dni', 'ix_locadores_apellidos'} <= indices
+        finally:
+            busqueda.CREAR_INDICE_FTS = crear_original
+            busqueda._motores_sin_fts5.discard(db.engine)
+        db.drop_all()
+
+def test_ruta_buscar():
+    """La ruta /buscar responde JSON y conserva el índice creado"""
+    app = crear_app_prueba()
+    with app.app_context():
+        db.create_all()
+        poblar()
+        with app.test_request_context('/buscar?q=torres'):
+            respuesta = app_completo.buscar()
+        datos = respuesta.get_json()
+        assert datos['consulta'] == 'torres'
+        assert [r['tipo'] for r in datos['resultados']] == ['locador']
+        assert db.session.execute(db.text(
+            "SELECT count(*) FROM sqlite_master WHERE name = 'personal_fts'")).scalar() == 1
+        db.drop_all()
+
+if __name__ == "__main__":
+    test_busqueda_fts()
+    test_busqueda_rapida_con_mucho_personal()
+    test_busqueda_por_prefijo_sin_fts5()
+    test_ruta_buscar()
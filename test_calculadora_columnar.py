@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Probar que el modo columnar coincide al céntimo con la ruta Decimal
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import random
+from decimal import Decimal, ROUND_HALF_UP
+from datetime import date
+from types import SimpleNamespace
+
+from models import db
+from calculadora_planilla import (calcular_beneficios_sociales, calcular_descuentos_empleado,
+                                  calcular_pagos_periodo, calcular_planilla_empleado_en_bloque,
+                                  cargar_datos_periodo, obtener_reglas_regimen, TASAS_PENSION_DEFECTO)
+from calculadora_columnar import calcular_columnas, a_soles
+from test_planilla_masiva import crear_app_prueba, poblar_empresa
+
+REGIMENES = ['microempresa', 'pequeña_empresa', 'general']
+PENSIONES = [('ONP', None), ('AFP', 'PRIMA'), ('AFP', 'HABITAT'), ('AFP', 'OTRA'), ('AFP', None)]
+
+def generar_planilla(cantidad, semilla=2024):
+    """Genera una planilla aleatoria reproducible"""
+    aleatorio = random.Random(semilla)
+    empleados = []
+    for _ in range(cantidad):
+        tipo_pension, afp_codigo = aleatorio.choice(PENSIONES)
+        empleados.append(SimpleNamespace(
+            sueldo_base=Decimal(aleatorio.randint(50000, 900000)) / 100,
+            fecha_ingreso=date(aleatorio.randint(2005, 2024), aleatorio.randint(1, 12), aleatorio.randint(1, 28)),
+            tipo_pension=tipo_pension,
+            afp_codigo=afp_codigo,
+            regimen=aleatorio.choice(REGIMENES)
+        ))
+    return empleados
+
+def redondear(monto):
+    return monto.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+
+def test_columnar_igual_a_decimal():
+    """Cada concepto coincide al céntimo con calculadora_planilla"""
+    empleados = generar_planilla(2000)
+    # Incluir los bordes de los tramos de 5ta y de asignación familiar
+    for sueldo in ('1025.00', '1025.01', '1525.00', '1525.01', '2025.00', '2025.01'):
+        empleados.append(SimpleNamespace(sueldo_base=Decimal(sueldo), fecha_ingreso=date(2019, 5, 5),
+                                         tipo_pension='ONP', afp_codigo=None, regimen='general'))
+
+    columnas = {
+        'sueldo_base': [e.sueldo_base for e in empleados],
+        'fecha_ingreso': [e.fecha_ingreso for e in empleados],
+        'tipo_pension': [e.tipo_pension for e in empleados],
+        'afp_codigo': [e.afp_codigo for e in empleados],
+        'reglas': [obtener_reglas_regimen(e.regimen) for e in empleados]
+    }
+
+    for mes in (6, 7, 12):
+        resultado = calcular_columnas(columnas, mes, 2024, umbral_renta_5ta='1025')
+        for i, empleado in enumerate(empleados):
+            empresa = SimpleNamespace(regimen_laboral=empleado.regimen)
+            esperado = calcular_beneficios_sociales(empleado, empresa, mes, 2024)
+            esperado.update(calcular_descuentos_empleado(empleado, mes, 2024, Decimal('1025'),
+                                                         TASAS_PENSION_DEFECTO))
+            for concepto, monto in esperado.items():
+                assert a_soles(resultado[concepto][i]) == redondear(monto), (concepto, empleado)
+
+    print(f"   ✓ {len(empleados)} empleados coinciden al céntimo")
+
+def test_corrida_usa_columnas():
+    """calcular_pagos_periodo arma los pagos por columnas con el mismo resultado que empleado por empleado"""
+    app = crear_app_prueba()
+    with app.app_context():
+        db.create_all()
+        empresa = poblar_empresa(40)
+        for mes in (10, 12):
+            columnar = calcular_pagos_periodo(empresa.id, mes, 2024)['pagos']
+            db.session.rollback()
+            datos = cargar_datos_periodo(empresa.id, mes, 2024)
+            por_empleado = [calcular_planilla_empleado_en_bloque(empleado, datos) for empleado in datos['empleados']]
+            db.session.rollback()
+            columnas = [columna.key for columna in columnar[0].__table__.columns]
+            assert [[getattr(pago, c) for c in columnas] for pago in columnar] == \
+                [[getattr(pago, c) for c in columnas] for pago in por_empleado]
+        print(f"   ✓ {len(columnar)} pagos por columnas iguales a los calculados empleado por empleado")
+        db.drop_all()
+
+if __name__ == "__main__":
+    test_columnar_igual_a_decimal()
+    test_corrida_usa_columnas()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Probar la carga masiva en modo 'actualizar': las filas se cruzan por
+(empresa_id, dni) con una consulta por bloque, solo se insertan las personas
+nuevas y a las existentes se les actualizan los campos que cambiaron
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import event
+
+from app_completo import db, Empresa, Empleado, Locador, Planilla
+from carga_masiva import importar_archivo
+from test_planilla_guardada import crear_app_prueba
+from test_carga_masiva import fila_empleado, fila_locador, crear_libro, crear_empresa
+
+def registrar_sentencias(sentencias):
+    """Anota cada sentencia SQL ejecutada en la lista dada"""
+    def anotar(conn, cursor, statement, parameters, context, executemany):
+        sentencias.append(statement)
+    event.listen(db.engine, 'before_cursor_execute', anotar)
+    return anotar
+
+def test_actualizar_por_dni():
+    """Una segunda carga del mismo padrón solo escribe las diferencias"""
+    app = crear_app_prueba()
+    with app.app_context():
+        db.create_all()
+        empresa = crear_empresa()
+        otra = Empresa(nombre='Otra SAC', ruc='20888888888', regimen_laboral='general')
+        db.session.add(otra)
+        db.session.commit()
+
+        filas = [fila_empleado(i) for i in range(250)] + [fila_locador(i) for i in range(50)]
+        importar_archivo(db, empresa.id, crear_libro(filas))
+        # El mismo DNI en otra empresa no se cruza
+        importar_archivo(db, otra.id, crear_libro([fila_empleado(0)]))
+        Empleado.query.filter_by(empresa_id=empresa.id, dni='10000003').update({'activo': False})
+        db.session.commit()
+        assert Empleado.query.count() == 251 and Locador.query.count() == 50
+
+        filas_nuevas = [fila[:] for fila in filas]
+        for i in range(0, 20, 2):
+            filas_nuevas[i][4] = 9999.0          # sueldo cambiado
+        filas_nuevas[3][2] = 'Apellido Corregido'
+        for i in range(250, 255):
+            filas_nuevas[i][13] = 'Interbank'    # banco del locador
+        filas_nuevas += [fila_empleado(i) for i in range(1000, 1020)]
+        filas_nuevas.append(fila_empleado(1000)[:4] + [7777.0] + fila_empleado(1000)[5:])  # DNI repetido
+
+        sentencias = []
+        anotar = registrar_sentencias(sentencias)
+        resumen = importar_archivo(db, empresa.id, crear_libro(filas_nuevas), tamaño_chunk=100,
+                                   modo='actualizar')
+        event.remove(db.engine, 'before_cursor_execute', anotar)
+
+        print(f"   ✓ {resumen['creados']} nuevos, {resumen['actualizados']} actualizados, "
+              f"{resumen['sin_cambios']} sin cambios en {resumen['bloques']} bloques")
+        assert resumen['creados'] == 20
+        assert resumen['actualizados'] == 16
+        assert resumen['errores'] == [(322, 'DNI repetido en el archivo (fila 302)')]
+        assert resumen['creados'] + resumen['actualizados'] + resumen['sin_cambios'] == 320
+        assert Empleado.query.filter_by(empresa_id=empresa.id).count() == 270
+        assert Locador.query.count() == 50
+
+        busquedas = [s for s in sentencias if s.lstrip().startswith('SELECT') and
+                     ('FROM empleados' in s or 'FROM locadores' in s)]
+        assert len(busquedas) <= 2 * resumen['bloques']
+        print(f"   ✓ {len(busquedas)} consultas de cruce por DNI para {resumen['bloques']} bloques")
+
+        def empleado(dni):
+            return Empleado.query.filter_by(empresa_id=empresa.id, dni=dni).one()
+        assert empleado('10000000').sueldo_base == 9999.0
+        assert empleado('10000001').sueldo_base == 1501.0
+        assert empleado('10000003').apellidos == 'Apellido Corregido'
+        assert empleado('10000003').activo is False
+        assert empleado('10001000').sueldo_base == 2500.0
+        assert Empleado.query.filter_by(empresa_id=otra.id).one().sueldo_base == 1500.0
+        assert Locador.query.filter_by(dni='20000000').one().banco == 'Interbank'
+        assert Planilla.query.filter_by(empresa_id=empresa.id, vigente=True).count() == 0
+        print("   ✓ Solo cambian los campos modificados; las personas inactivas siguen inactivas")
+
+        sentencias = []
+        anotar = registrar_sentencias(sentencias)
+        repetida = importar_archivo(db, empresa.id, crear_libro(filas_nuevas), modo='actualizar')
+        event.remove(db.engine, 'before_cursor_execute', anotar)
+        assert repetida['sin_cambios'] == 320 and repetida['creados'] == repetida['actualizados'] == 0
+        assert not [s for s in sentencias if s.lstrip().startswith(('INSERT', 'UPDATE'))]
+        print("   ✓ Recargar el mismo padrón no escribe nada")
+
+def test_celdas_vacias_conservan_datos():
+    """Una celda vacía en modo 'actualizar' no reemplaza lo guardado por el valor por defecto"""
+    app = crear_app_prueba()
+    with app.app_context():
+        db.create_all()
+        empresa = crear_empresa()
+        fila = fila_empleado(1)
+        fila[15] = 120
+        importar_archivo(db, empresa.id, crear_libro([fila, fila_locador(1)]))
+
+        # Sin fecha de ingreso, tipo de pensión, código AFP ni descuento de alimentos
+        vacia = fila[:5] + [None] + fila[6:10] + [None, None] + fila[12:15] + [None]
+        locador = fila_locador(1)[:4] + [None, None] + fila_locador(1)[6:15] + [None]
+        resumen = importar_archivo(db, empresa.id, crear_libro([vacia, locador]), modo='actualizar')
+        assert (resumen['actualizados'], resumen['sin_cambios']) == (0, 2)
+
+        vacia[4] = 1800
+        resumen = importar_archivo(db, empresa.id, crear_libro([vacia]), modo='actualizar')
+        assert resumen['actualizados'] == 1
+        empleado = Empleado.query.filter_by(dni=fila[3]).one()
+        assert (empleado.sueldo_base, empleado.fecha_ingreso.isoformat()) == (1800, '2024-01-15')
+        assert (empleado.tipo_pension, empleado.afp_codigo, empleado.descuento_alimentos) == ('AFP', 'PRIMA', 120)
+        assert Locador.query.one().monto_mensual == 3000
+        print("   ✓ Las celdas vacías conservan fecha de ingreso, pensión y descuentos guardados")
+
+if __name__ == "__main__":
+    print("🧪 Probando la carga con actualización por DNI...")
+    test_actualizar_por_dni()
+    test_celdas_vacias_conservan_datos()
+    print("✅ Carga por DNI verificada")
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Probar la carga masiva desde CSV: mismas columnas que la plantilla, UTF-8 o
+Latin-1, separador coma o punto y coma (con coma decimal), y el mismo proceso
+en bloques que el .xlsx pero sin el costo de leer el libro con openpyxl
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import csv
+import io
+import shutil
+import tempfile
+import time
+from datetime import date
+
+from app_completo import db, Empleado, Locador, cargar_excel
+from carga_masiva import (importar_archivo, validar_archivo, leer_filas_csv, filas_estimadas_csv,
+                          formato_archivo, ENCABEZADOS_PLANTILLA)
+from test_planilla_guardada import crear_app_prueba
+from test_carga_masiva import fila_empleado, fila_locador, crear_libro, crear_empresa
+
+def crear_csv(filas, codificacion='utf-8', separador=',', bom=False):
+    """CSV en memoria con los encabezados de la plantilla (fechas AAAA-MM-DD)"""
+    texto = io.StringIO()
+    escritor = csv.writer(texto, delimiter=separador)
+    escritor.writerow(ENCABEZADOS_PLANTILLA)
+    for fila in filas:
+        escritor.writerow(['' if valor is None else valor.isoformat() if isinstance(valor, date) else valor
+                           for valor in fila])
+    contenido = texto.getvalue().encode(codificacion)
+    return io.BytesIO((b'\xef\xbb\xbf' if bom else b'') + contenido)
+
+def personal_guardado():
+    """Empleados y locadores cargados, comparables entre cargas"""
+    empleados = [(e.dni, e.nombres, e.apellidos, e.sueldo_base, e.fecha_ingreso, e.direccion, e.afp_codigo,
+                  e.cuenta_bancaria, e.tipo_pago) for e in Empleado.query.order_by(Empleado.dni)]
+    locadores = [(l.dni, l.nombres, l.monto_mensual, l.fecha_inicio, l.banco, l.descuento_alimentos)
+                 for l in Locador.query.order_by(Locador.dni)]
+    return empleados, locadores
+
+def test_lectura_csv():
+    """Codificación, separador, BOM y campos entre comillas"""
+    fila = fila_empleado(1)
+    fila[1], fila[2], fila[7] = 'José', 'Muñoz Peña', 'Av. Grau 123, dpto. 4\nCercado'
+    for codificacion, separador, bom in (('utf-8', ',', False), ('utf-8', ';', True), ('latin-1', ';', False)):
+        archivo = crear_csv([fila, [''] * 16, fila_locador(2)], codificacion, separador, bom)
+        filas = list(leer_filas_csv(archivo))
+        assert [numero for numero, _ in filas] == [2, 3, 4]
+        assert filas[0][1][1:3] == ('José', 'Muñoz Peña') and filas[0][1][7] == fila[7]
+        assert filas[2][1][0] == 'locador' and len(filas[0][1]) == 16
+        archivo.seek(0)
+        assert filas_estimadas_csv(archivo) == 4  # el salto dentro de la dirección cuenta como línea
+    assert formato_archivo('padron.CSV') == 'csv' and formato_archivo('padron.xlsx') == 'xlsx'
+    print("   ✓ UTF-8, UTF-8 con BOM y Latin-1; coma y punto y coma; comillas con saltos de línea")
+
+def test_coma_decimal_con_punto_y_coma():
+    """Con punto y coma (Excel en español) los montos usan coma decimal"""
+    con_coma = fila_empleado(1)
+    con_coma[4] = '1500,50'
+    con_miles = fila_locador(2)
+    con_miles[4], con_miles[15] = '2.350,75', '120,5'
+    direccion = fila_empleado(3)
+    direccion[7] = 'Jr. Lima 1,5'
+    solo_miles = fila_empleado(4)
+    solo_miles[4] = '1.500'
+    miles_y_decimales = fila_empleado(5)
+    miles_y_decimales[4] = '12.000,00'
+    filas = list(leer_filas_csv(crear_csv([con_coma, con_miles, direccion, solo_miles, miles_y_decimales],
+                                          separador=';')))
+    assert filas[0][1][4] == '1500.50' and filas[1][1][4] == '2350.75' and filas[1][1][15] == '120.5'
+    assert filas[2][1][7] == 'Jr. Lima 1,5'
+    assert filas[3][1][4] == '1500' and filas[4][1][4] == '12000.00'
+
+    app = crear_app_prueba()
+    with app.app_context():
+        db.create_all()
+        empresa = crear_empresa()
+        resumen = importar_archivo(db, empresa.id, crear_csv([con_coma, con_miles, solo_miles, miles_y_decimales],
+                                                             separador=';'), formato='csv')
+        assert resumen['errores'] == []
+        sueldos = [empleado.sueldo_base for empleado in Empleado.query.order_by(Empleado.dni)]
+        assert sueldos == [1500.5, 1500.0, 12000.0]
+        locador = Locador.query.one()
+        assert locador.monto_mensual == 2350.75 and locador.descuento_alimentos == 120.5
+        db.drop_all()
+    print("   ✓ Punto y coma: 1500,50, 2.350,75, 1.500 y 12.000,00 se cargan con su valor")
+
+def test_csv_igual_que_xlsx():
+    """El CSV carga lo mismo que el .xlsx con las mismas filas, en menos tiempo"""
+    filas = [fila_empleado(i) if i % 5 else fila_locador(i) for i in range(4000)]
+    filas[10] = ['empleado', 'Sin', 'Dni', None, 1000, None]
+    tiempos, cargas = {}, {}
+    for formato, archivo in (('xlsx', crear_libro(filas)), ('csv', crear_csv(filas, 'latin-1', ';'))):
+        app = crear_app_prueba()
+        with app.app_context():
+            db.create_all()
+            empresa = crear_empresa()
+            inicio = time.perf_counter()
+            resumen = importar_archivo(db, empresa.id, archivo, formato=formato)
+            tiempos[formato] = time.perf_counter() - inicio
+            cargas[formato] = personal_guardado()
+            assert resumen['total'] == 4000 and resumen['errores'] == [(12, 'Falta dni')]
+            assert resumen['empleados'] == 3200 and resumen['locadores'] == 799
+            db.drop_all()
+
+    assert cargas['csv'] == cargas['xlsx']
+    assert tiempos['csv'] < tiempos['xlsx'] / 2
+    print(f"   ✓ 4 000 filas: xlsx {tiempos['xlsx']:.2f} s, csv {tiempos['csv']:.2f} s "
+          f"({tiempos['xlsx'] / tiempos['csv']:.1f}x), mismo resultado")
+
+def test_csv_desde_disco_y_formulario():
+    """La ruta .csv (cola de cargas) y la validación del formulario usan el lector CSV"""
+    carpeta = tempfile.mkdtemp()
+    app = crear_app_prueba()
+    try:
+        with app.app_context():
+            db.create_all()
+            empresa = crear_empresa()
+            ruta = os.path.join(carpeta, 'padron.csv')
+            with open(ruta, 'wb') as archivo:
+                archivo.write(crear_csv([fila_empleado(i) for i in range(50)]).getvalue())
+            resumen = importar_archivo(db, empresa.id, ruta)
+            assert resumen['empleados'] == 50 and resumen['total'] == 50
+            print("   ✓ Carga desde la ruta .csv guardada por la cola")
+
+            simulacion = validar_archivo(db, empresa.id, ruta, 'actualizar')
+            assert simulacion['sin_cambios'] == 50
+
+            filas = [fila_empleado(100), fila_empleado(101)[:3] + ['12'] + fila_empleado(101)[4:]]
+            datos = {'archivo': (crear_csv(filas), 'padron.csv'), 'accion': 'validar'}
+            with app.test_request_context(f'/cargar_excel/{empresa.id}', method='POST', data=datos,
+                                          content_type='multipart/form-data'):
+                respuesta = cargar_excel(empresa.id)
+            assert 'errores_padron.xlsx' in respuesta.headers['Content-Disposition']
+            assert Empleado.query.count() == 50
+            print("   ✓ 'Validar sin Cargar' acepta CSV y devuelve el libro de errores")
+    finally:
+        shutil.rmtree(carpeta)
+
+if __name__ == "__main__":
+    print("🧪 Probando la carga masiva desde CSV...")
+    test_lectura_csv()
+    test_coma_decimal_con_punto_y_coma()
+    test_csv_igual_que_xlsx()
+    test_csv_desde_disco_y_formulario()
+    print("✅ Carga CSV verificada")
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Probar la carga de un libro con hojas de personal, ausencias, préstamos y
+adelantos: cada fila se resuelve por DNI con un índice en memoria (una
+consulta) y cada hoja se inserta en bloque en una sola transacción
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import io
+from datetime import date
+from openpyxl import Workbook, load_workbook
+from sqlalchemy import event
+
+import models
+from app_completo import db, Empleado, Ausencia, Prestamo, Adelanto, Planilla, descargar_plantilla
+from carga_masiva import importar_archivo, validar_archivo, errores_carga, ENCABEZADOS_PLANTILLA, HOJAS_MOVIMIENTOS
+from test_planilla_guardada import crear_app_prueba
+from test_carga_masiva import fila_empleado, crear_empresa
+import test_planilla_masiva
+
+def crear_libro_hojas(personal=(), ausencias=(), prestamos=(), adelantos=()):
+    """Libro con la hoja Personal y las hojas de movimientos que tengan filas"""
+    libro = Workbook()
+    hoja = libro.active
+    hoja.title = 'Personal'
+    hoja.append(ENCABEZADOS_PLANTILLA)
+    for fila in personal:
+        hoja.append(fila)
+    for tipo, filas in (('ausencias', ausencias), ('prestamos', prestamos), ('adelantos', adelantos)):
+        if filas:
+            hoja = libro.create_sheet(HOJAS_MOVIMIENTOS[tipo]['titulo'])
+            hoja.append(HOJAS_MOVIMIENTOS[tipo]['encabezados'])
+            for fila in filas:
+                hoja.append(fila)
+    salida = io.BytesIO()
+    libro.save(salida)
+    salida.seek(0)
+    return salida
+
+def dni(i):
+    """DNI de fila_empleado(i)"""
+    return f'{10000000 + i}'
+
+def contar(motor, sentencias, commits):
+    """Anota las sentencias y los commits del motor"""
+    def anotar(conn, cursor, statement, parameters, context, executemany):
+        sentencias.append(statement)
+    def confirmar(conn):
+        commits.append(1)
+    event.listen(motor, 'before_cursor_execute', anotar)
+    event.listen(motor, 'commit', confirmar)
+    return anotar, confirmar
+
+def test_libro_con_movimientos():
+    """Personal nuevo y existente con sus movimientos en una sola carga"""
+    app = crear_app_prueba()
+    with app.app_context():
+        db.create_all()
+        empresa = crear_empresa()
+        importar_archivo(db, empresa.id, crear_libro_hojas([fila_empleado(i) for i in range(100)]))
+        Planilla.query.update({'vigente': True})
+        db.session.commit()
+
+        personal = [fila_empleado(i) for i in range(100, 150)]
+        ausencias = [[dni(i), date(2024, 10, 1 + i % 28), 'injustificada', 'No', 8, 'Falta'] for i in range(150)]
+        ausencias.append([None] * 6)
+        prestamos = [[dni(i), 1200, 6, '2024-10-01', 'Préstamo personal'] for i in range(0, 150, 3)]
+        adelantos = [[dni(i), 500, date(2024, 10, 5), 11, 2024, 2, 'Adelanto'] for i in range(0, 150, 5)]
+
+        sentencias, commits = [], []
+        anotar, confirmar = contar(db.engine, sentencias, commits)
+        resumen = importar_archivo(db, empresa.id, crear_libro_hojas(personal, ausencias, prestamos, adelantos),
+                                   tamaño_chunk=40)
+        event.remove(db.engine, 'before_cursor_execute', anotar)
+        event.remove(db.engine, 'commit', confirmar)
+
+        hojas = resumen['hojas']
+        print(f"   ✓ {resumen['empleados']} empleados nuevos; " +
+              ", ".join(f"{h['hoja']}: {h['insertados']}" for h in hojas.values()))
+        assert resumen['empleados'] == 50 and errores_carga(resumen) == []
+        assert [hojas[tipo]['insertados'] for tipo in ('ausencias', 'prestamos', 'adelantos')] == [150, 50, 30]
+        assert Ausencia.query.count() == 150 and Prestamo.query.count() == 50 and Adelanto.query.count() == 30
+
+        busquedas = [s for s in sentencias if s.lstrip().startswith('SELECT') and 'FROM empleados' in s]
+        assert len(busquedas) == 1
+        # Personal: 2 bloques de 40 filas; cada hoja de movimientos: una sola transacción
+        assert len(commits) == 2 + 3
+        print(f"   ✓ Una consulta de DNI para {150 + 50 + 30} movimientos y {len(commits)} commits")
+
+        prestamo = Prestamo.query.join(Empleado).filter(Empleado.dni == dni(3)).one()
+        assert (prestamo.monto, prestamo.cuotas, prestamo.cuota_mensual) == (1200, 6, 200)
+        assert prestamo.fecha_inicio == date(2024, 10, 1) and prestamo.activo
+        adelanto = Adelanto.query.join(Empleado).filter(Empleado.dni == dni(145)).one()
+        assert (adelanto.descuento_mensual, adelanto.meses_restantes) == (250, 2)
+        assert Planilla.query.filter_by(vigente=True).count() == 0
+        print("   ✓ Préstamos y adelantos con cuota calculada; planillas invalidadas")
+
+def test_hoja_con_errores_no_se_guarda():
+    """Una hoja con errores no guarda nada; las demás sí"""
+    app = crear_app_prueba()
+    with app.app_context():
+        db.create_all()
+        empresa = crear_empresa()
+        personal = [fila_empleado(i) for i in range(20)]
+        ausencias = [[dni(i), date(2024, 10, 2), 'permiso', 'Sí', 4, None] for i in range(20)]
+        adelantos = [[dni(i), 300, None, None, None, None, None] for i in range(20)]
+        adelantos[5][0] = '99999999'
+        adelantos[7][3] = 13
+        prestamos = [[dni(1), 0, 3, None, None], [dni(2), 900, 'tres', None, None]]
+
+        errores = io.BytesIO()
+        simulacion = validar_archivo(db, empresa.id, crear_libro_hojas(personal, ausencias, prestamos, adelantos),
+                                     destino_errores=errores)
+        assert Empleado.query.count() == 0 and Ausencia.query.count() == 0
+        assert simulacion['hojas']['ausencias']['validas'] == 20
+        libro = load_workbook(io.BytesIO(errores.getvalue()), read_only=True)
+        assert libro.sheetnames == ['Errores Préstamos', 'Errores Adelantos']
+        assert [fila[-2] for fila in libro['Errores Adelantos'].iter_rows(min_row=2, values_only=True)] == [7, 9]
+        libro.close()
+        print("   ✓ La simulación acepta los DNI nuevos del personal y anota cada hoja con errores")
+
+        resumen = importar_archivo(db, empresa.id, crear_libro_hojas(personal, ausencias, prestamos, adelantos))
+        errores_hojas = errores_carga(resumen)
+        assert [fila for fila, _ in errores_hojas] == [2, 3, 7, 9]
+        assert errores_hojas[0][1] == 'Préstamos: Monto debe ser mayor que cero: 0'
+        assert 'DNI sin empleado en la empresa: 99999999' in errores_hojas[2][1]
+        assert 'Mes a aplicar debe ser un entero entre 1 y 12' in errores_hojas[3][1]
+        assert resumen['hojas']['adelantos']['insertados'] == 0 and Adelanto.query.count() == 0
+        assert Prestamo.query.count() == 0
+        assert Ausencia.query.count() == 20 and Ausencia.query.first().horas_perdidas == 4
+        print(f"   ✓ Préstamos y Adelantos rechazados completos ({len(errores_hojas)} errores); Ausencias registradas")
+
+def test_esquema_de_models():
+    """Las hojas se adaptan a las columnas de models.py (monto_total, fecha_prestamo, mes_aplicar...)"""
+    app = test_planilla_masiva.crear_app_prueba()
+    with app.app_context():
+        models.db.create_all()
+        empresa = test_planilla_masiva.poblar_empresa(3)
+        dnis = [empleado.dni for empleado in models.Empleado.query.order_by(models.Empleado.id)]
+        antes = (models.Prestamo.query.count(), models.Adelanto.query.count(), models.Ausencia.query.count())
+        libro = crear_libro_hojas(
+            ausencias=[[dnis[0], '2024-11-04', 'falta', 'no', None, None]],
+            prestamos=[[dnis[1], 1000, 4, '2024-11-01', 'Préstamo']],
+            adelantos=[[dnis[2], 600, '2024-11-10', 12, 2024, None, None]]
+        )
+        resumen = importar_archivo(models.db, empresa.id, libro)
+        assert errores_carga(resumen) == []
+        prestamo = models.Prestamo.query.filter_by(motivo='Préstamo').one()
+        assert (float(prestamo.monto_total), float(prestamo.monto_pendiente), float(prestamo.cuota_mensual)) == \
+            (1000, 1000, 250)
+        adelanto = models.Adelanto.query.order_by(models.Adelanto.id.desc()).first()
+        assert (adelanto.mes_aplicar, adelanto.año_aplicar, adelanto.aplicado) == (12, 2024, False)
+        ausencia = models.Ausencia.query.order_by(models.Ausencia.id.desc()).first()
+        assert float(ausencia.horas_perdidas) == 8 and ausencia.justificada is False
+        assert (models.Prestamo.query.count(), models.Adelanto.query.count(), models.Ausencia.query.count()) == \
+            tuple(n + 1 for n in antes)
+        print("   ✓ Mismas hojas sobre el esquema de models.py")
+
+def test_resumen_y_recalculo_en_models():
+    """Las escrituras en bloque actualizan empresa_resumen y marcan a los empleados para recalcular_planilla"""
+    from calculadora_planilla import calcular_planilla_completa, recalcular_planilla
+    app = test_planilla_masiva.crear_app_prueba()
+    with app.app_context():
+        models.db.create_all()
+        empresa = test_planilla_masiva.poblar_empresa(3)
+        calcular_planilla_completa(empresa.id, 11, 2024)
+        antes = models.obtener_resumen_empresa(empresa.id)
+        empleados_antes, prestamos_antes = antes.empleados_activos, float(antes.prestamos_pendientes)
+        ids = [empleado.id for empleado in models.Empleado.query.order_by(models.Empleado.id)]
+
+        libro = crear_libro_hojas(prestamos=[['00000001', 1000, 4, '2024-11-01', 'Préstamo']])
+        resumen = importar_archivo(models.db, empresa.id, libro)
+        assert errores_carga(resumen) == []
+        assert float(models.obtener_resumen_empresa(empresa.id).prestamos_pendientes) == prestamos_antes + 1000
+        assert recalcular_planilla(empresa.id, 11, 2024)['recalculados'] == [ids[1]]
+        print("   ✓ Préstamo en bloque: resumen de la empresa y recálculo incremental al día")
+
+        cambiado = ['empleado', 'Nombre2', 'Apellido2', '00000002', 1800, None, None, None, None, None,
+                    'AFP', 'PRIMA', None, None, None, None]
+        libro = crear_libro_hojas([fila_empleado(500), cambiado])
+        resumen = importar_archivo(models.db, empresa.id, libro, modo='actualizar')
+        assert (resumen['creados'], resumen['actualizados']) == (1, 1)
+        guardado = models.obtener_resumen_empresa(empresa.id)
+        assert guardado.empleados_activos == empleados_antes + 1
+        # Las diferencias del bloque (alta y cambio de sueldo) coinciden con la reconstrucción
+        recalculado = models.db.session.execute(models.consulta_resumen_empresas([empresa.id])).one()
+        assert guardado.costo_mensual == recalculado[models.COLUMNAS_RESUMEN.index('costo_mensual')]
+        nuevo = models.Empleado.query.filter_by(dni=dni(500)).one()
+        assert recalcular_planilla(empresa.id, 11, 2024)['recalculados'] == [ids[2], nuevo.id]
+        print("   ✓ Personal en bloque: empleados activos y recálculo de los nuevos y actualizados")
+
+def test_plantilla_con_hojas():
+    """La plantilla descargada trae las hojas de movimientos y se puede cargar tal cual"""
+    app = crear_app_prueba()
+    with app.app_context():
+        db.create_all()
+        empresa = crear_empresa()
+        with app.test_request_context(f'/descargar_plantilla/{empresa.id}'):
+            respuesta = descargar_plantilla(empresa.id)
+        respuesta.direct_passthrough = False
+        libro = load_workbook(io.BytesIO(respuesta.get_data()))
+        assert libro.sheetnames == ['Plantilla Carga Masiva', 'Ausencias', 'Préstamos', 'Adelantos']
+        libro['Préstamos'].append(['12345678', 600, 3, '2024-11-01', None])
+        salida = io.BytesIO()
+        libro.save(salida)
+        salida.seek(0)
+        resumen = importar_archivo(db, empresa.id, salida)
+        assert resumen['empleados'] == 1 and resumen['locadores'] == 1
+        assert resumen['hojas']['prestamos']['insertados'] == 1 and resumen['hojas']['ausencias']['filas'] == 0
+        print("   ✓ La plantilla incluye Ausencias, Préstamos y Adelantos")
+
+if __name__ == "__main__":
+    print("🧪 Probando la carga de libros con varias hojas...")
+    test_libro_con_movimientos()
+    test_hoja_con_errores_no_se_guarda()
+    test_esquema_de_models()
+    test_resumen_y_recalculo_en_models()
+    test_plantilla_con_hojas()
+    print("✅ Carga de varias hojas verificada")
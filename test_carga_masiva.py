@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Probar la carga masiva en streaming: el libro se lee en modo de solo
+lectura, las filas se insertan en bloques con un commit por bloque, los
+errores se informan por fila y la memoria no crece con el archivo
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import io
+import tracemalloc
+from datetime import date
+from openpyxl import Workbook
+
+from app_completo import db, Empresa, Empleado, Locador, Planilla
+from carga_masiva import importar_archivo, ENCABEZADOS_PLANTILLA, TAMAÑO_CHUNK_CARGA
+from test_planilla_guardada import crear_app_prueba
+
+def fila_empleado(i):
+    """Fila de empleado con el formato de la plantilla"""
+    return ['empleado', f'Nombre{i}', f'Apellido{i}', f'{10000000 + i}', 1500 + i, date(2024, 1, 15),
+            date(1990, 5, 1), 'Av. Lima 123', '987654321', f'e{i}@correo.pe', 'AFP', 'PRIMA',
+            '1234567890123456', 'BCP', 'quincenal', 0]
+
+def fila_locador(i):
+    """Fila de locador con el formato de la plantilla"""
+    return ['locador', f'Loc{i}', f'Ador{i}', f'{20000000 + i}', 3000, '2024-02-01', None, None, None, None,
+            None, None, '9876543210987654', 'BBVA', None, 50]
+
+def crear_libro(filas):
+    """Libro .xlsx en memoria con las filas dadas (como el de descargar_plantilla)"""
+    libro = Workbook()
+    hoja = libro.active
+    hoja.title = 'Plantilla Carga Masiva'
+    hoja.append(ENCABEZADOS_PLANTILLA)
+    for fila in filas:
+        hoja.append(fila)
+    salida = io.BytesIO()
+    libro.save(salida)
+    salida.seek(0)
+    return salida
+
+def crear_empresa():
+    """Empresa con una planilla guardada vigente"""
+    empresa = Empresa(nombre='Carga SAC', ruc='20777777777', regimen_laboral='general')
+    db.session.add(empresa)
+    db.session.flush()
+    db.session.add(Planilla(empresa_id=empresa.id, mes=10, año=2024, total_neto=100.0))
+    db.session.commit()
+    return empresa
+
+def test_carga_en_bloques():
+    """2 500 filas en bloques de 1 000 con errores informados por fila"""
+    app = crear_app_prueba()
+    with app.app_context():
+        db.create_all()
+        empresa = crear_empresa()
+
+        filas = [fila_empleado(i) if i % 5 else fila_locador(i) for i in range(2500)]
+        filas[10] = ['empleado', 'Sin', 'Dni', None, 1000, None]
+        filas[20] = ['gerente', 'Tipo', 'Raro', '12345678', 1000, None]
+        filas[30] = fila_empleado(30)[:4] + ['mil', None]
+        filas[40] = fila_empleado(40)[:5] + ['31/02/2024']
+        filas.insert(50, [None] * 16)
+        avances = []
+
+        resumen = importar_archivo(db, empresa.id, crear_libro(filas), progreso=lambda r: avances.append(r['filas']))
+
+        print(f"   ✓ {resumen['empleados']} empleados y {resumen['locadores']} locadores "
+              f"en {resumen['bloques']} bloques ({resumen['segundos']} s)")
+        assert resumen['filas'] == 2501 and resumen['total'] == 2501
+        assert [fila for fila, _ in resumen['errores']] == [12, 22, 32, 42]
+        assert 'Falta dni' in resumen['errores'][0][1]
+        assert 'Tipo no válido' in resumen['errores'][1][1]
+        assert resumen['bloques'] == 3 and len(avances) == 3
+        assert Empleado.query.count() == resumen['empleados'] == 2000
+        assert Locador.query.count() == resumen['locadores'] == 496
+
+        empleado = Empleado.query.filter_by(dni='10000001').one()
+        assert (empleado.tipo_pago, empleado.afp_codigo, empleado.fecha_ingreso) == ('quincenal', 'PRIMA', date(2024, 1, 15))
+        assert empleado.activo is True and empleado.fecha_creacion is not None
+        locador = Locador.query.filter_by(dni='20000000').one()
+        assert (locador.banco, locador.fecha_inicio, locador.descuento_alimentos) == ('BBVA', date(2024, 2, 1), 50.0)
+
+        # Las inserciones en bloque invalidan las planillas guardadas de la empresa
+        assert Planilla.query.one().vigente is False
+        db.drop_all()
+
+def test_memoria_acotada():
+    """La memoria de la carga depende del bloque y no del tamaño del archivo"""
+    app = crear_app_prueba()
+    with app.app_context():
+        db.create_all()
+        empresa = crear_empresa()
+        pico = {}
+        for cantidad in (300, 1500):
+            libro = crear_libro(fila_empleado(cantidad * 10 + i) for i in range(cantidad))
+            tracemalloc.start()
+            importar_archivo(db, empresa.id, libro, tamaño_chunk=250)
+            pico[cantidad] = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+        print(f"   ✓ Memoria máxima: {pico[300] / 1e6:.1f} MB (300 filas) vs {pico[1500] / 1e6:.1f} MB (1 500 filas)")
+        assert Empleado.query.count() == 1800
+        assert pico[1500] < pico[300] * 2
+        db.drop_all()
+
+if __name__ == "__main__":
+    test_carga_en_bloques()
+    test_memoria_acotada()
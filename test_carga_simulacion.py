@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Probar la simulación de la carga masiva: todas las filas se validan en una
+sola lectura (DNI, fechas, pensión, banco/cuenta y duplicados), se calculan
+las diferencias con la base de datos sin escribir y las filas rechazadas se
+devuelven en un libro de errores
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import io
+import time
+from datetime import date
+from openpyxl import load_workbook
+from sqlalchemy import event
+
+from app_completo import db, Empleado, Locador, Planilla, cargar_excel
+from carga_masiva import importar_archivo, validar_archivo, validar_fila, ErrorFila, ENCABEZADOS_PLANTILLA
+from test_planilla_guardada import crear_app_prueba
+from test_carga_masiva import fila_empleado, fila_locador, crear_libro, crear_empresa
+
+def error_de(valores):
+    """Motivo por el que validar_fila rechaza la fila (None si la acepta)"""
+    try:
+        validar_fila(1, valores)
+    except ErrorFila as error:
+        return str(error)
+    return None
+
+def test_reglas_de_validacion():
+    """DNI, pensión, cuenta bancaria, tipo de pago y fechas"""
+    fila = fila_empleado(1)
+    assert error_de(fila) is None
+    assert validar_fila(1, fila[:3] + [1234567] + fila[4:])[1]['dni'] == '01234567'
+    assert 'DNI no válido' in error_de(fila[:3] + ['1234-567'] + fila[4:])
+    assert 'Código AFP no válido' in error_de(fila[:11] + [None] + fila[12:])
+    assert 'Tipo de pensión no válido' in error_de(fila[:10] + ['SNP'] + fila[11:])
+    assert validar_fila(1, fila[:10] + ['onp'] + fila[11:])[1]['afp_codigo'] is None
+    assert 'Falta el banco' in error_de(fila[:13] + [None] + fila[14:])
+    assert 'Cuenta bancaria no válida' in error_de(fila[:12] + ['12AB'] + fila[13:])
+    assert validar_fila(1, fila[:12] + ['191-1234567-0-12'] + fila[13:])[1]['cuenta_bancaria'] == '1911234567012'
+    assert 'Tipo de pago no válido' in error_de(fila[:14] + ['semanal'] + fila[15:])
+    assert 'anterior a la de ingreso' in error_de(fila[:6] + [date(2030, 1, 1)] + fila[7:])
+    assert 'Falta la cuenta' in error_de(fila_locador(1)[:12] + [None] + fila_locador(1)[13:])
+    print("   ✓ Reglas de DNI, pensión, cuenta bancaria, tipo de pago y fechas")
+
+def test_simulacion_sin_escribir():
+    """La simulación informa errores y diferencias sin modificar la base de datos"""
+    app = crear_app_prueba()
+    with app.app_context():
+        db.create_all()
+        empresa = crear_empresa()
+        importar_archivo(db, empresa.id, crear_libro([fila_empleado(i) for i in range(200)]))
+        Planilla.query.update({'vigente': True})
+        db.session.commit()
+
+        filas = [fila_empleado(i) for i in range(5000)] + [fila_locador(i) for i in range(500)]
+        for i in range(0, 30, 3):
+            filas[i][4] = 8000.0
+        filas[7] = filas[7][:3] + ['123'] + filas[7][4:]
+        filas[8] = filas[8][:5] + ['2024-13-01'] + filas[8][6:]
+        filas[9] = filas[9][:11] + ['CAPITAL'] + filas[9][12:]
+        filas[5100] = filas[5100][:13] + [None] + filas[5100][14:]
+        filas.append(fila_empleado(4000))
+
+        sentencias = []
+        def anotar(conn, cursor, statement, parameters, context, executemany):
+            sentencias.append(statement)
+        event.listen(db.engine, 'before_cursor_execute', anotar)
+        errores = io.BytesIO()
+        inicio = time.perf_counter()
+        resumen = validar_archivo(db, empresa.id, crear_libro(filas), 'actualizar', destino_errores=errores)
+        segundos = time.perf_counter() - inicio
+        event.remove(db.engine, 'before_cursor_execute', anotar)
+
+        print(f"   ✓ {resumen['filas']} filas validadas en {segundos:.2f} s: {resumen['creados']} nuevos, "
+              f"{resumen['actualizados']} por actualizar, {resumen['sin_cambios']} sin cambios, "
+              f"{len(resumen['errores'])} errores")
+        assert [fila for fila, _ in resumen['errores']] == [9, 10, 11, 5102, 5502]
+        assert 'DNI repetido en el archivo (fila 4002)' == resumen['errores'][-1][1]
+        assert resumen['actualizados'] == 9 and resumen['sin_cambios'] == 188
+        assert resumen['creados'] == 4800 + 499
+        assert resumen['cambios'][0] == (2, '10000000', ['sueldo_base'])
+        assert not [s for s in sentencias if s.lstrip().startswith(('INSERT', 'UPDATE', 'DELETE'))]
+        assert Empleado.query.count() == 200 and Locador.query.count() == 0
+        assert Planilla.query.filter_by(vigente=True).count() == 1
+        print("   ✓ Ninguna escritura: la base de datos y las planillas siguen iguales")
+
+        libro = load_workbook(io.BytesIO(errores.getvalue()), read_only=True)
+        hoja = libro['Errores']
+        filas_libro = list(hoja.iter_rows(values_only=True))
+        libro.close()
+        assert list(filas_libro[0]) == ENCABEZADOS_PLANTILLA + ['Fila Original', 'Errores']
+        assert [fila[-2] for fila in filas_libro[1:]] == [9, 10, 11, 5102, 5502]
+        assert filas_libro[1][3] == '123' and 'DNI no válido' in filas_libro[1][-1]
+        print(f"   ✓ Libro de errores con {len(filas_libro) - 1} filas anotadas")
+
+        insertar = validar_archivo(db, empresa.id, crear_libro(filas[:300]))
+        assert insertar['existentes'] == 197 and insertar['creados'] == 297
+        print(f"   ✓ En modo insertar se avisa de {insertar['existentes']} DNI ya registrados")
+
+def test_validar_desde_el_formulario():
+    """El botón 'Validar sin Cargar' descarga el libro de errores"""
+    app = crear_app_prueba()
+    with app.app_context():
+        db.create_all()
+        empresa = crear_empresa()
+        filas = [fila_empleado(1), fila_empleado(2)[:3] + ['12'] + fila_empleado(2)[4:]]
+        datos = {'archivo': (crear_libro(filas), 'padron.xlsx'), 'accion': 'validar'}
+        with app.test_request_context(f'/cargar_excel/{empresa.id}', method='POST', data=datos,
+                                      content_type='multipart/form-data'):
+            respuesta = cargar_excel(empresa.id)
+        respuesta.direct_passthrough = False
+        assert 'errores_padron.xlsx' in respuesta.headers['Content-Disposition']
+        hoja = load_workbook(io.BytesIO(respuesta.get_data())).active
+        assert hoja.max_row == 2 and hoja.cell(row=2, column=17).value == 3
+        assert Empleado.query.count() == 0
+        print("   ✓ El formulario descarga el libro de errores sin cargar nada")
+
+if __name__ == "__main__":
+    print("🧪 Probando la simulación de la carga masiva...")
+    test_reglas_de_validacion()
+    test_simulacion_sin_escribir()
+    test_validar_desde_el_formulario()
+    print("✅ Simulación de carga verificada")
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Probar la cola de cargas masivas: la subida solo guarda el archivo y encola,
+los workers toman cada trabajo una sola vez (también en procesos paralelos),
+los trabajos de un worker caído vuelven a la cola y /estado_carga informa filas procesadas, errores y tiempo restante
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import multiprocessing
+import shutil
+import tempfile
+from datetime import datetime, timedelta
+from flask import Flask
+from sqlalchemy.orm.attributes import set_committed_value
+from werkzeug.datastructures import FileStorage
+
+from config import config
+from app_completo import db, Empleado, Locador, TrabajoCarga, encolar_carga, estado_trabajo, estado_carga
+from worker_carga import (tomar_trabajo, procesar_trabajo, ejecutar_worker, liberar_vencidos,
+                          TIEMPO_RESERVA, MAXIMO_INTENTOS)
+from test_planilla_guardada import crear_app_prueba
+from test_carga_masiva import fila_empleado, fila_locador, crear_libro, crear_empresa
+
+def subir(empresa_id, carpeta, filas, nombre='personal.xlsx'):
+    """Encola un libro como lo haría el formulario de carga"""
+    return encolar_carga(empresa_id, FileStorage(stream=crear_libro(filas), filename=nombre), carpeta)
+
+def test_encolar_y_procesar():
+    """El trabajo queda pendiente, un worker lo toma y registra el resultado"""
+    carpeta = tempfile.mkdtemp()
+    app = crear_app_prueba()
+    try:
+        with app.app_context():
+            db.create_all()
+            empresa = crear_empresa()
+            filas = [fila_empleado(i) if i % 4 else fila_locador(i) for i in range(120)]
+            filas[7] = ['empleado', 'Sin', 'Dni', None, 1000, None]
+
+            trabajo = subir(empresa.id, carpeta, filas, nombre='../personal octubre.xlsx')
+            assert trabajo.estado == 'pendiente'
+            assert os.path.dirname(trabajo.ruta_archivo) == os.path.abspath(carpeta)
+            assert os.path.exists(trabajo.ruta_archivo)
+            assert Empleado.query.count() == 0
+            print("   ✓ La subida solo guarda el archivo y encola el trabajo")
+
+            tomado = tomar_trabajo('worker-prueba')
+            assert tomado.id == trabajo.id and tomado.estado == 'procesando' and tomado.worker == 'worker-prueba'
+            assert tomar_trabajo('otro-worker') is None
+            print("   ✓ Un trabajo tomado no vuelve a entregarse")
+
+            procesar_trabajo(tomado, tamaño_chunk=50)
+            estado = estado_trabajo(tomado)
+            assert estado['estado'] == 'terminado' and estado['porcentaje'] == 100
+            assert estado['filas_procesadas'] == 120 and estado['errores'] == 1
+            assert estado['empleados'] == 89 and estado['locadores'] == 30
+            assert estado['detalle_errores'][0][0] == 9 and estado['eta_segundos'] == 0
+            assert Empleado.query.count() == 89 and Locador.query.count() == 30
+            assert not os.path.exists(tomado.ruta_archivo)
+            print(f"   ✓ Carga terminada: {estado['mensaje']}")
+    finally:
+        shutil.rmtree(carpeta)
+
+def test_estado_y_eta():
+    """El avance parcial estima el tiempo restante y el error queda registrado"""
+    carpeta = tempfile.mkdtemp()
+    app = crear_app_prueba()
+    try:
+        with app.app_context():
+            db.create_all()
+            empresa = crear_empresa()
+            ahora = datetime.utcnow()
+            en_curso = TrabajoCarga(empresa_id=empresa.id, nombre_archivo='a.xlsx', ruta_archivo='a.xlsx',
+                                    estado='procesando', total_filas=1000, filas_procesadas=250,
+                                    fecha_inicio=ahora - timedelta(seconds=10))
+            db.session.add(en_curso)
+            db.session.commit()
+
+            estado = estado_trabajo(en_curso, ahora)
+            assert estado['porcentaje'] == 25.0 and estado['eta_segundos'] == 30.0
+            print(f"   ✓ 250/1000 filas en 10 s: ETA {estado['eta_segundos']} s")
+
+            with app.test_request_context(f'/estado_carga/{en_curso.id}'):
+                respuesta = estado_carga(en_curso.id)
+            assert respuesta.get_json()['filas_procesadas'] == 250
+            print("   ✓ /estado_carga responde en JSON")
+
+            roto = subir(empresa.id, carpeta, [])
+            with open(roto.ruta_archivo, 'wb') as archivo:
+                archivo.write(b'no es un xlsx')
+            procesar_trabajo(tomar_trabajo())
+            assert roto.estado == 'error' and roto.mensaje
+            print(f"   ✓ Archivo inválido: estado error ({roto.mensaje[:40]})")
+    finally:
+        shutil.rmtree(carpeta)
+
+def test_reserva_vencida():
+    """Un trabajo sin avance pasado el tiempo de reserva se retoma y, tras varios intentos, falla"""
+    carpeta = tempfile.mkdtemp()
+    app = crear_app_prueba()
+    try:
+        with app.app_context():
+            db.create_all()
+            empresa = crear_empresa()
+            trabajo = subir(empresa.id, carpeta, [fila_empleado(i) for i in range(30)])
+            vencido = timedelta(seconds=TIEMPO_RESERVA + 1)
+
+            def abandonar():
+                # El worker muere: la toma queda sin avance más allá de la reserva
+                trabajo.fecha_inicio -= vencido
+                db.session.commit()
+
+            caido = tomar_trabajo('worker-caido')
+            assert caido.id == trabajo.id and caido.intentos == 1
+            assert tomar_trabajo('worker-vivo') is None
+            abandonar()
+            retomado = tomar_trabajo('worker-vivo')
+            assert retomado.id == trabajo.id and retomado.worker == 'worker-vivo' and retomado.intentos == 2
+            print("   ✓ La reserva vencida devuelve el trabajo a la cola y otro worker lo retoma")
+
+            # Un bloque confirmado renueva la reserva: el trabajo en curso no se libera
+            procesar_trabajo(retomado, tamaño_chunk=10)
+            assert retomado.estado == 'terminado' and retomado.fecha_avance
+            assert liberar_vencidos(ahora=retomado.fecha_avance + timedelta(seconds=TIEMPO_RESERVA - 1)) == 0
+
+            # El worker que perdió la reserva se detiene sin tocar el trabajo
+            trabajo = subir(empresa.id, carpeta, [fila_empleado(100 + i) for i in range(30)])
+            lento = tomar_trabajo('worker-lento')
+            abandonar()
+            tomar_trabajo('worker-nuevo')
+            # En su propia sesión el worker lento aún se ve como dueño del trabajo
+            set_committed_value(lento, 'worker', 'worker-lento')
+            procesar_trabajo(lento, tamaño_chunk=10)
+            assert lento.worker == 'worker-nuevo' and lento.estado == 'procesando'
+            assert Empleado.query.count() == 40
+            print("   ✓ El worker que perdió la reserva no sobrescribe el trabajo retomado")
+
+            for _ in range(MAXIMO_INTENTOS - 2):
+                abandonar()
+                assert tomar_trabajo('worker-nuevo').id == trabajo.id
+            abandonar()
+            assert liberar_vencidos() == 1
+            assert trabajo.estado == 'error' and trabajo.fecha_fin and trabajo.intentos == MAXIMO_INTENTOS
+            assert tomar_trabajo('worker-nuevo') is None
+            print(f"   ✓ Tras {MAXIMO_INTENTOS} tomas sin terminar queda en error: {trabajo.mensaje}")
+    finally:
+        shutil.rmtree(carpeta)
+
+def _worker_en_proceso(app, resultados):
+    """Proceso hijo: conexiones propias y procesa hasta vaciar la cola"""
+    with app.app_context():
+        db.engine.dispose()
+        resultados.put(ejecutar_worker(intervalo=0.1, una_vez=True))
+
+def test_workers_en_paralelo():
+    """Varios procesos sobre la misma base: cada trabajo se procesa una vez"""
+    carpeta = tempfile.mkdtemp()
+    app = Flask(__name__)
+    app.config.from_object(config['testing'])
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + os.path.join(carpeta, 'cola.db')
+    db.init_app(app)
+    try:
+        with app.app_context():
+            db.create_all()
+            empresa = crear_empresa()
+            for lote in range(6):
+                subir(empresa.id, carpeta, [fila_empleado(lote * 100 + i) for i in range(100)])
+            db.session.remove()
+            db.engine.dispose()
+
+        contexto = multiprocessing.get_context('fork')
+        resultados = contexto.Queue()
+        procesos = [contexto.Process(target=_worker_en_proceso, args=(app, resultados)) for _ in range(3)]
+        for proceso in procesos:
+            proceso.start()
+        for proceso in procesos:
+            proceso.join(60)
+        procesados = [resultados.get(timeout=5) for _ in procesos]
+
+        with app.app_context():
+            assert sum(procesados) == 6
+            assert TrabajoCarga.query.filter_by(estado='terminado').count() == 6
+            assert Empleado.query.count() == 600
+            workers = {trabajo.worker for trabajo in TrabajoCarga.query.all()}
+            print(f"   ✓ 6 trabajos en 3 procesos ({procesados}), {len(workers)} tomas distintas, 600 empleados")
+    finally:
+        shutil.rmtree(carpeta)
+
+if __name__ == "__main__":
+    print("🧪 Probando la cola de cargas masivas...")
+    test_encolar_y_procesar()
+    test_estado_y_eta()
+    test_reserva_vencida()
+    test_workers_en_paralelo()
+    print("✅ Cola de cargas verificada")
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Probar la caché de configuración: sin consultas repetidas, tasas leídas de
+la base de datos e invalidación al escribir configuraciones
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from decimal import Decimal
+from datetime import datetime
+
+from models import db, Configuracion
+from calculadora_planilla import obtener_configuracion, obtener_tasas_pension, refrescar_configuracion
+from test_planilla_masiva import crear_app_prueba, contar_consultas
+
+def leer_configuracion_repetida(veces):
+    """Simula la lectura por empleado de la ruta individual"""
+    for _ in range(veces):
+        obtener_configuracion('umbral_renta_5ta', '1025')
+        obtener_tasas_pension()
+
+def test_cache_e_invalidacion():
+    """La caché se carga una vez y se recarga al escribir Configuracion"""
+    app = crear_app_prueba()
+    with app.app_context():
+        db.create_all()
+        onp = Configuracion(clave='tasa_pension_onp', valor='10')
+        db.session.add_all([onp, Configuracion(clave='tasa_afp_habitat', valor='11.5'),
+                            Configuracion(clave='umbral_renta_5ta', valor='1100')])
+        db.session.commit()
+
+        tasas = obtener_tasas_pension()
+        assert tasas['ONP'] == Decimal('0.10')
+        assert tasas['AFP']['HABITAT'] == Decimal('0.115')
+        assert tasas['AFP']['PRIMA'] == Decimal('0.12')
+
+        _, consultas = contar_consultas(leer_configuracion_repetida, 500)
+        assert consultas == 0
+        assert obtener_configuracion('umbral_renta_5ta') == Decimal('1100')
+
+        # Escritura por ORM: el contador de versión invalida la caché
+        onp.valor = '13'
+        db.session.commit()
+        assert obtener_tasas_pension()['ONP'] == Decimal('0.13')
+
+        # Escritura externa (otro proceso): se detecta al refrescar
+        Configuracion.query.filter_by(clave='umbral_renta_5ta').update(
+            {'valor': '1200', 'fecha_actualizacion': datetime.utcnow()}, synchronize_session=False
+        )
+        assert obtener_configuracion('umbral_renta_5ta') == Decimal('1100')
+        refrescar_configuracion()
+        assert obtener_configuracion('umbral_renta_5ta') == Decimal('1200')
+        db.drop_all()
+
+if __name__ == "__main__":
+    test_cache_e_invalidacion()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Probar el resumen del panel principal: una sola consulta sin importar la
+cantidad de empresas, con conteos activos y el total de la última planilla
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from datetime import date
+from flask import render_template
+from sqlalchemy import event
+
+import app_completo
+from app_completo import db, Empresa, Empleado, Locador, Planilla, resumen_empresas
+from test_planilla_guardada import crear_app_prueba
+
+def crear_empresas(cantidad, inicio=0):
+    """Crea empresas con empleados activos e inactivos y un locador"""
+    for i in range(inicio, inicio + cantidad):
+        empresa = Empresa(nombre=f'Empresa {i}', ruc=f'20{i:09d}', regimen_laboral='general')
+        db.session.add(empresa)
+        db.session.flush()
+        for j in range(3):
+            db.session.add(Empleado(empresa_id=empresa.id, nombres=f'N{j}', apellidos=f'A{j}', dni=f'{i:04d}{j:04d}',
+                                    sueldo_base=1500.0, fecha_ingreso=date(2023, 1, 1), activo=j != 2))
+        db.session.add(Locador(empresa_id=empresa.id, nombres='L', apellidos='L', dni=f'9{i:07d}',
+                               monto_mensual=2000.0, fecha_inicio=date(2024, 1, 1)))
+    db.session.commit()
+
+def contar_consultas(funcion):
+    """Ejecuta la función y cuenta las sentencias emitidas"""
+    consultas = []
+
+    def registrar(conn, cursor, statement, parameters, context, executemany):
+        consultas.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', registrar)
+    try:
+        resultado = funcion()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', registrar)
+    return resultado, len(consultas)
+
+def test_resumen_una_consulta():
+    """El panel usa una consulta con 2 o con 20 empresas"""
+    app = crear_app_prueba()
+    with app.app_context():
+        db.create_all()
+        crear_empresas(2)
+        _, consultas_pocas = contar_consultas(resumen_empresas)
+        crear_empresas(18, inicio=2)
+        resumen, consultas_muchas = contar_consultas(resumen_empresas)
+
+        print(f"   ✓ Consultas: {consultas_pocas} (2 empresas) vs {consultas_muchas} (20 empresas)")
+        assert consultas_pocas == consultas_muchas == 1
+        assert len(resumen) == 20
+        assert all(item['empleados_activos'] == 2 and item['locadores_activos'] == 1 for item in resumen)
+        assert resumen[0]['ultima_planilla'] is None
+        db.drop_all()
+
+def test_ultima_planilla():
+    """El total mostrado es el de la planilla más reciente de la empresa"""
+    app = crear_app_prueba()
+    with app.app_context():
+        db.create_all()
+        crear_empresas(1)
+        empresa = Empresa.query.first()
+        db.session.add_all([
+            Planilla(empresa_id=empresa.id, mes=12, año=2023, total_neto=900.0),
+            Planilla(empresa_id=empresa.id, mes=2, año=2024, version=1, vigente=False, total_neto=1000.0),
+            Planilla(empresa_id=empresa.id, mes=2, año=2024, version=2, total_neto=1100.0),
+            Planilla(empresa_id=empresa.id, mes=1, año=2024, total_neto=800.0),
+        ])
+        db.session.commit()
+
+        resumen = resumen_empresas()
+        assert resumen[0]['ultima_planilla'] == 1100.0
+
+        with app_completo.app.test_request_context('/'):
+            html = render_template('index.html', empresas_con_conteos=resumen)
+        assert 'Última planilla: S/. 1100.00' in html
+        db.drop_all()
+
+if __name__ == "__main__":
+    test_resumen_una_consulta()
+    test_ultima_planilla()
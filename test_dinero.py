@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Probar el núcleo de dinero en céntimos y que los totales de planilla
+cuadran exactamente con la suma de las filas
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from decimal import Decimal
+from datetime import date
+
+from dinero import a_centimos, a_soles, a_float, multiplicar, aplicar_tasa, dividir_redondeando
+from app_completo import db, Empresa, Empleado, Locador, calcular_planilla_completa
+from test_planilla_guardada import crear_app_prueba
+
+def test_redondeo_mitad_arriba():
+    """Conversión y redondeo explícitos, sin errores de punto flotante"""
+    assert a_centimos(0.1 + 0.2) == 30
+    assert a_centimos('1.005') == 101
+    assert a_centimos(Decimal('1500.50')) == 150050
+    assert a_centimos(7) == 700
+    assert a_soles(150050) == Decimal('1500.50')
+    assert a_float(150050) == 1500.5
+    assert dividir_redondeando(5, 2) == 3
+    assert dividir_redondeando(-5, 2) == -3
+    assert multiplicar(100001, 1, 2) == 50001
+    assert aplicar_tasa(150050, Decimal('0.13')) == 19507
+    assert aplicar_tasa(150050, 0.13) == 19507
+
+def test_totales_igual_suma_de_filas():
+    """Los totales de app_completo son la suma exacta de los montos mostrados"""
+    app = crear_app_prueba()
+    with app.app_context():
+        db.create_all()
+        empresa = Empresa(nombre='Céntimos', ruc='20777777777', regimen_laboral='general')
+        db.session.add(empresa)
+        db.session.flush()
+        for i in range(50):
+            db.session.add(Empleado(empresa_id=empresa.id, nombres=f'N{i}', apellidos=f'A{i}',
+                                    dni=f'{i:08d}', sueldo_base=1000.01 + i * 37.37,
+                                    fecha_ingreso=date(2020, 1, 1),
+                                    tipo_pago='quincenal' if i % 3 == 0 else 'mensual',
+                                    descuento_alimentos=0.1 * i))
+        db.session.add(Locador(empresa_id=empresa.id, nombres='L', apellidos='L', dni='99999999',
+                               monto_mensual=1999.99, fecha_inicio=date(2024, 1, 1)))
+        db.session.commit()
+
+        resultado = calcular_planilla_completa(empresa.id, 7, 2024)
+        filas = resultado['empleados'] + resultado['locadores']
+        assert a_centimos(resultado['totales']['total_neto']) == sum(a_centimos(fila['neto']) for fila in filas)
+        assert a_centimos(resultado['totales']['total_ingresos']) == sum(
+            a_centimos(fila['total_ingresos']) for fila in filas)
+        for fila in resultado['empleados']:
+            assert a_centimos(fila['neto']) == a_centimos(fila['total_ingresos']) - a_centimos(fila['total_descuentos'])
+        db.drop_all()
+
+if __name__ == "__main__":
+    test_redondeo_mitad_arriba()
+    test_totales_igual_suma_de_filas()
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Probar el resumen materializado por empresa: se actualiza en la misma
+transacción que las escrituras sumando diferencias (sin reagregar la
+empresa), se descarta con el rollback y se puede reconstruir
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from decimal import Decimal
+from datetime import date
+
+from sqlalchemy import event
+
+from models import (db, Empresa, Empleado, Locador, Prestamo, Adelanto, EmpresaResumen, COLUMNAS_RESUMEN,
+                    obtener_resumen_empresa, reconstruir_resumen_empresas, consulta_resumen_empresas,
+                    marcar_adelantos)
+from calculadora_planilla import calcular_planilla_completa
+from gestion_deudas import obtener_deudas_empresa, cancelar_prestamo
+from test_planilla_masiva import crear_app_prueba, poblar_empresa, contar_consultas
+
+def test_resumen_actualizado_al_escribir():
+    """Personal, deudas y planilla se reflejan en empresa_resumen"""
+    app = crear_app_prueba()
+    with app.app_context():
+        db.create_all()
+        empresa = poblar_empresa(4)
+        otra = poblar_empresa(2)
+
+        resumen = obtener_resumen_empresa(empresa.id)
+        assert resumen.empleados_activos == 4
+        assert resumen.locadores_activos == 1
+        assert resumen.costo_mensual == Decimal('6006.00')  # 1000+1001+1002+1003 + 2000
+        assert resumen.prestamos_pendientes == Decimal('2400.00')
+        assert resumen.adelantos_pendientes == Decimal('320.00')
+        assert resumen.ultima_planilla_neto is None
+
+        # Cálculo de planilla: adelantos aplicados y última planilla
+        resultado = calcular_planilla_completa(empresa.id, 10, 2024)
+        resumen = obtener_resumen_empresa(empresa.id)
+        assert resumen.adelantos_pendientes == 0
+        assert (resumen.ultima_planilla_mes, resumen.ultima_planilla_año) == (10, 2024)
+        assert float(resumen.ultima_planilla_neto) == resultado['totales']['total_neto']
+
+        # Cambios de personal y deudas
+        empleado = Empleado.query.filter_by(empresa_id=empresa.id).first()
+        empleado.activo = False
+        db.session.commit()
+        prestamo = Prestamo.query.filter_by(empleado_id=empleado.id).first()
+        cancelar_prestamo(prestamo.id)
+        resumen = obtener_resumen_empresa(empresa.id)
+        assert resumen.empleados_activos == 3
+        assert resumen.prestamos_pendientes == Decimal('1800.00')
+
+        # La otra empresa no se modifica
+        assert obtener_resumen_empresa(otra.id).empleados_activos == 2
+
+        # Un rollback descarta también el resumen
+        db.session.add(Locador(empresa_id=empresa.id, nombres='X', apellidos='Y', dni='12312312',
+                               monto_mensual=Decimal('100'), fecha_inicio=date(2024, 1, 1)))
+        db.session.flush()
+        assert obtener_resumen_empresa(empresa.id).locadores_activos == 2
+        db.session.rollback()
+        assert obtener_resumen_empresa(empresa.id).locadores_activos == 1
+        db.drop_all()
+
+def test_deudas_desde_resumen_y_reconstruccion():
+    """obtener_deudas_empresa lee los totales en O(1) y la reconstrucción repara desajustes"""
+    app = crear_app_prueba()
+    with app.app_context():
+        db.create_all()
+        empresa = poblar_empresa(30)
+
+        deudas, consultas = contar_consultas(obtener_deudas_empresa, empresa.id)
+        assert consultas == 3
+        assert deudas['totales']['prestamos_pendientes'] == 18000.0
+        assert deudas['totales']['total_deudas'] == 18000.0 + 30 * 80.0
+        assert len(deudas['prestamos']) == 30 and len(deudas['adelantos']) == 30
+
+        _, consultas = contar_consultas(obtener_deudas_empresa, empresa.id, False)
+        assert consultas == 1
+
+        # Escritura masiva fuera del ORM: el resumen queda desajustado hasta reconstruir
+        Adelanto.query.update({'aplicado': True}, synchronize_session=False)
+        db.session.commit()
+        assert obtener_resumen_empresa(empresa.id).adelantos_pendientes == Decimal('2400.00')
+        db.session.query(EmpresaResumen).delete()
+        db.session.commit()
+
+        assert reconstruir_resumen_empresas() == 1
+        resumen = obtener_resumen_empresa(empresa.id)
+        assert resumen.adelantos_pendientes == 0
+        assert resumen.empleados_activos == 30
+        db.drop_all()
+
+def resumen_recalculado(empresa_id):
+    """Columnas de empresa_resumen calculadas desde las tablas base (sin la fecha)"""
+    fila = db.session.execute(consulta_resumen_empresas([empresa_id])).one()
+    return dict(zip(COLUMNAS_RESUMEN[:-1], fila[:-1]))
+
+def resumen_guardado(empresa_id):
+    """Columnas de la fila de empresa_resumen (sin la fecha)"""
+    resumen = obtener_resumen_empresa(empresa_id)
+    return {columna: getattr(resumen, columna) for columna in COLUMNAS_RESUMEN[:-1]}
+
+def sentencias_resumen(funcion):
+    """Ejecuta la función y retorna las sentencias que tocan empresa_resumen"""
+    sentencias = []
+
+    def registrar(conn, cursor, statement, parameters, context, executemany):
+        sentencias.append(' '.join(statement.split()))
+
+    event.listen(db.engine, 'before_cursor_execute', registrar)
+    try:
+        funcion()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', registrar)
+    return [sentencia for sentencia in sentencias if 'empresa_resumen' in sentencia]
+
+def test_diferencias_sin_reagregar():
+    """Cada escritura suma diferencias al resumen, que siempre coincide con la reconstrucción"""
+    app = crear_app_prueba()
+    with app.app_context():
+        db.create_all()
+        chica = poblar_empresa(3)
+        grande = poblar_empresa(60)
+
+        def cambiar_sueldo(empresa_id):
+            empleado = Empleado.query.filter_by(empresa_id=empresa_id).first()
+            empleado.sueldo_base += 10
+            db.session.commit()
+
+        # El costo de una escritura no depende del tamaño de la empresa
+        en_chica = sentencias_resumen(lambda: cambiar_sueldo(chica.id))
+        en_grande = sentencias_resumen(lambda: cambiar_sueldo(grande.id))
+        assert en_chica == en_grande and len(en_grande) == 1
+        assert en_grande[0].startswith('UPDATE empresa_resumen SET')
+        assert all('DELETE' not in sentencia and 'INSERT' not in sentencia for sentencia in en_grande)
+        print(f"   ✓ Cambio de sueldo: {len(en_grande)} UPDATE con diferencias en empresas de 3 y 60 empleados")
+
+        def verificar():
+            for empresa in (chica, grande):
+                assert resumen_guardado(empresa.id) == resumen_recalculado(empresa.id), empresa.id
+
+        # Altas, bajas, traslados, pagos de deuda y planillas
+        empleado = Empleado.query.filter_by(empresa_id=grande.id).first()
+        empleado.empresa_id = chica.id
+        db.session.commit()
+        verificar()
+        assert obtener_resumen_empresa(chica.id).empleados_activos == 4
+
+        otro = Empleado.query.filter_by(empresa_id=grande.id, activo=True).order_by(Empleado.id.desc()).first()
+        otro.activo = False
+        prestamo = Prestamo.query.filter_by(empleado_id=otro.id).first()
+        prestamo.monto_pendiente -= Decimal('50')
+        db.session.delete(Adelanto.query.filter_by(empleado_id=otro.id).first())
+        db.session.add(Locador(empresa_id=chica.id, nombres='Nuevo', apellidos='Loc', dni='88888888',
+                               monto_mensual=Decimal('1500.50'), fecha_inicio=date(2024, 1, 1)))
+        db.session.commit()
+        verificar()
+
+        marcar_adelantos([adelanto.id for adelanto in Adelanto.query.join(Empleado)
+                          .filter(Empleado.empresa_id == chica.id)])
+        db.session.commit()
+        verificar()
+        assert obtener_resumen_empresa(chica.id).adelantos_pendientes == 0
+        marcar_adelantos([adelanto.id for adelanto in Adelanto.query.limit(2)], aplicado=False)
+        db.session.commit()
+        verificar()
+
+        calcular_planilla_completa(grande.id, 10, 2024)
+        verificar()
+        db.session.delete(Prestamo.query.join(Empleado).filter(Empleado.empresa_id == chica.id).first())
+        db.session.commit()
+        verificar()
+        print("   ✓ Traslado, baja, pago de deuda, adelantos en bloque y planilla: igual a la reconstrucción")
+        db.drop_all()
+
+if __name__ == "__main__":
+    test_resumen_actualizado_al_escribir()
+    test_deudas_desde_resumen_y_reconstruccion()
+    test_diferencias_sin_reagregar()
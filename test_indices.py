@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Probar los índices compuestos y los filtros por rango de fechas: los
+períodos se resuelven con búsquedas en índice y el script de actualización
+crea los índices en bases existentes
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import sqlite3
+import tempfile
+from datetime import date
+
+from models import db, Empleado, Ausencia
+from calculadora_planilla import calcular_dias_trabajados, rango_mes
+from gestion_personal import obtener_ausencias_empresa, obtener_ausencias_empleado
+from actualizar_bd_indices import actualizar_base_datos, INDICES
+from test_planilla_masiva import crear_app_prueba, poblar_empresa
+
+def plan_consulta(consulta):
+    """Plan de ejecución de SQLite para una consulta ORM"""
+    sql = str(consulta.statement.compile(db.engine, compile_kwargs={'literal_binds': True}))
+    filas = db.session.execute(db.text(f"EXPLAIN QUERY PLAN {sql}")).fetchall()
+    return ' '.join(fila[-1] for fila in filas)
+
+def test_filtros_por_rango():
+    """Los filtros de mes usan el índice y respetan los bordes del mes"""
+    app = crear_app_prueba()
+    with app.app_context():
+        db.create_all()
+        empresa = poblar_empresa(3)
+        empleado = Empleado.query.filter_by(empresa_id=empresa.id).first()
+        db.session.add(Ausencia(empleado_id=empleado.id, fecha=date(2024, 10, 31), tipo='falta'))
+        db.session.add(Ausencia(empleado_id=empleado.id, fecha=date(2024, 11, 1), tipo='falta'))
+        db.session.commit()
+
+        assert rango_mes(12, 2024) == (date(2024, 12, 1), date(2025, 1, 1))
+        assert calcular_dias_trabajados(empleado.id, 10, 2024) == (28, 2)
+        assert len(obtener_ausencias_empleado(empleado.id, 10, 2024)) == 2
+        assert len(obtener_ausencias_empresa(empresa.id, 10, 2024)) == 4
+        assert len(obtener_ausencias_empresa(empresa.id, 11, 2024)) == 1
+
+        inicio, fin = rango_mes(10, 2024)
+        consulta = Ausencia.query.filter(Ausencia.empleado_id == empleado.id,
+                                         Ausencia.fecha >= inicio, Ausencia.fecha < fin)
+        plan = plan_consulta(consulta)
+        print(f"   ✓ Plan: {plan}")
+        assert 'ix_ausencias_empleado_fecha' in plan
+        db.drop_all()
+
+def test_script_actualizacion():
+    """El script crea los índices faltantes y puede ejecutarse de nuevo"""
+    with tempfile.TemporaryDirectory() as carpeta:
+        ruta = os.path.join(carpeta, 'antigua.db')
+        conn = sqlite3.connect(ruta)
+        conn.executescript('''
+            CREATE TABLE empleados (id INTEGER PRIMARY KEY, empresa_id INTEGER, activo BOOLEAN,
+                                    nombres TEXT, apellidos TEXT, dni TEXT);
+            CREATE TABLE locadores (id INTEGER PRIMARY KEY, empresa_id INTEGER,
+                                    nombres TEXT, apellidos TEXT, dni TEXT);
+            CREATE TABLE ausencias (id INTEGER PRIMARY KEY, empleado_id INTEGER, fecha DATE);
+            CREATE TABLE prestamos (id INTEGER PRIMARY KEY, empleado_id INTEGER, activo BOOLEAN);
+            CREATE TABLE adelantos (id INTEGER PRIMARY KEY, empleado_id INTEGER, activo BOOLEAN);
+            CREATE TABLE pagos (id INTEGER PRIMARY KEY, empleado_id INTEGER, año INTEGER, mes INTEGER);
+        ''')
+        conn.close()
+
+        assert actualizar_base_datos(ruta)
+        assert actualizar_base_datos(ruta)
+
+        conn = sqlite3.connect(ruta)
+        indices = {fila[0] for fila in conn.execute("SELECT name FROM sqlite_master WHERE type='index'")}
+        conn.close()
+        # adelantos de otra versión del esquema no tiene año_aplicar: se omite
+        esperados = {nombre for nombre, tabla, _ in INDICES if tabla != 'adelantos'}
+        assert esperados <= indices
+        assert 'ix_adelantos_empleado_periodo' not in indices
+
+if __name__ == "__main__":
+    test_filtros_por_rango()
+    test_script_actualizacion()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Probar la escritura en bloque de pagos: un INSERT executemany por chunk,
+con el tiempo de cada chunk y los mismos valores que el cálculo del ORM
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from decimal import Decimal
+from sqlalchemy import event
+
+from models import db, Pago, PagoLocador
+from calculadora_planilla import (calcular_planilla_completa, calcular_pagos_periodo,
+                                  registro_a_dict, iterar_planilla)
+from test_planilla_masiva import crear_app_prueba, poblar_empresa
+
+def contar_inserts(funcion, *args, **kwargs):
+    """Ejecuta la función y cuenta las sentencias INSERT sobre pagos"""
+    inserts = []
+
+    def registrar(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('INSERT INTO PAGOS '):
+            inserts.append(len(parameters) if executemany else 1)
+
+    event.listen(db.engine, 'before_cursor_execute', registrar)
+    try:
+        resultado = funcion(*args, **kwargs)
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', registrar)
+    return resultado, inserts
+
+def test_insercion_por_chunks():
+    """25 empleados en chunks de 10 se escriben con 3 INSERT"""
+    app = crear_app_prueba()
+    with app.app_context():
+        db.create_all()
+        empresa = poblar_empresa(25)
+        esperado = [registro_a_dict(pago) for pago in calcular_pagos_periodo(empresa.id, 10, 2024)['pagos']]
+        db.session.rollback()
+
+        resultado, inserts = contar_inserts(calcular_planilla_completa, empresa.id, 10, 2024, tamaño_chunk=10)
+        print(f"   ✓ INSERT por chunk: {inserts}")
+        assert inserts == [10, 10, 5]
+
+        chunks = [chunk for chunk in resultado['insercion'] if chunk['tabla'] == 'pagos']
+        assert [chunk['filas'] for chunk in chunks] == [10, 10, 5]
+        assert all(chunk['segundos'] >= 0 for chunk in chunks)
+        assert [chunk['filas'] for chunk in resultado['insercion'] if chunk['tabla'] == 'pagos_locadores'] == [1]
+
+        # Los valores guardados coinciden con el cálculo y las columnas por defecto se completan
+        guardados = {pago.empleado_id: pago for pago in Pago.query.all()}
+        assert len(guardados) == 25
+        for valores in esperado:
+            pago = guardados[valores['empleado_id']]
+            assert pago.neto_pagar == valores['neto_pagar']
+            assert pago.prestamos == valores['prestamos']
+            assert pago.adelantos == valores['adelantos']
+            assert pago.otros_descuentos == Decimal('0.00')
+            assert pago.fecha_calculo is not None
+        assert PagoLocador.query.one().fecha_calculo is not None
+        db.drop_all()
+
+def test_iterar_planilla_en_bloque():
+    """La planilla por lotes escribe cada lote con un solo INSERT"""
+    app = crear_app_prueba()
+    with app.app_context():
+        db.create_all()
+        empresa = poblar_empresa(12)
+        filas, inserts = contar_inserts(
+            lambda: list(iterar_planilla(empresa.id, 10, 2024, guardar=True, tamaño_lote=5)))
+        assert inserts == [5, 5, 2]
+        assert Pago.query.count() == 12
+        assert PagoLocador.query.count() == 1
+        db.drop_all()
+
+if __name__ == "__main__":
+    test_insercion_por_chunks()
+    test_iterar_planilla_en_bloque()
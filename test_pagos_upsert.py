@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Probar el guardado idempotente de pagos: recalcular un período sobrescribe
+las filas por su clave (empleado, mes, año, tipo de pago) sin duplicarlas
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import sqlite3
+import tempfile
+from decimal import Decimal
+
+from models import db, Empleado, Pago, PagoLocador, Planilla
+from calculadora_planilla import calcular_planilla_completa
+from actualizar_bd_pagos_unicos import actualizar_base_datos
+from test_planilla_masiva import crear_app_prueba, poblar_empresa
+from test_pagos_en_bloque import contar_inserts
+
+def test_recalculo_sobrescribe():
+    """Tres corridas del mismo período dejan un pago por empleado y clave"""
+    app = crear_app_prueba()
+    with app.app_context():
+        db.create_all()
+        empresa = poblar_empresa(12)
+        calcular_planilla_completa(empresa.id, 10, 2024)
+        ids_originales = {pago.empleado_id: pago.id for pago in Pago.query.all()}
+        originales = {pago.empleado_id: (pago.adelantos, pago.neto_pagar) for pago in Pago.query.all()}
+        assert all(adelantos > 0 for adelantos, _ in originales.values())
+
+        empleado = Empleado.query.filter_by(empresa_id=empresa.id).first()
+        empleado.sueldo_base = Decimal('3000.00')
+        db.session.commit()
+        _, inserts = contar_inserts(calcular_planilla_completa, empresa.id, 10, 2024, tamaño_chunk=5)
+        resultado = calcular_planilla_completa(empresa.id, 10, 2024)
+
+        print(f"   ✓ Sentencias por chunk en el recálculo: {inserts}")
+        assert inserts == [5, 5, 2]
+        assert Pago.query.count() == 12
+        assert PagoLocador.query.count() == 1
+        assert Planilla.query.count() == 1
+        # Las filas se actualizan en su lugar y reflejan el último cálculo
+        assert {pago.empleado_id: pago.id for pago in Pago.query.all()} == ids_originales
+        assert Pago.query.filter_by(empleado_id=empleado.id).one().sueldo_base == Decimal('2900.00')  # 29 días
+        total = sum(pago.neto_pagar for pago in Pago.query.all()) + PagoLocador.query.one().neto_pagar
+        assert float(total) == resultado['totales']['total_neto']
+        # Los adelantos ya aplicados se siguen descontando en el pago sobrescrito
+        recalculados = {pago.empleado_id: (pago.adelantos, pago.neto_pagar) for pago in Pago.query.all()}
+        assert recalculados.pop(empleado.id)[0] == originales.pop(empleado.id)[0]
+        assert recalculados == originales
+        print("   ✓ Adelantos y neto de cada pago iguales tras recalcular el período")
+
+        # Otro tipo de pago del mismo mes es otra clave
+        calcular_planilla_completa(empresa.id, 10, 2024, 'quincenal')
+        assert Pago.query.count() == 24
+        db.drop_all()
+
+def test_script_elimina_duplicados():
+    """El script conserva el último pago por clave y crea el índice único"""
+    with tempfile.TemporaryDirectory() as carpeta:
+        ruta = os.path.join(carpeta, 'antigua.db')
+        conn = sqlite3.connect(ruta)
+        conn.executescript('''
+            CREATE TABLE pagos (id INTEGER PRIMARY KEY, empleado_id INTEGER, mes INTEGER, año INTEGER,
+                                tipo_pago VARCHAR(20), neto_pagar NUMERIC);
+            INSERT INTO pagos VALUES (1, 1, 10, 2024, 'mensual', 100), (2, 1, 10, 2024, 'mensual', 110),
+                                     (3, 1, 10, 2024, 'quincenal', 50), (4, 2, 10, 2024, 'mensual', 200);
+        ''')
+        conn.close()
+
+        assert actualizar_base_datos(ruta)
+        assert actualizar_base_datos(ruta)
+
+        conn = sqlite3.connect(ruta)
+        assert conn.execute("SELECT id FROM pagos ORDER BY id").fetchall() == [(2,), (3,), (4,)]
+        try:
+            conn.execute("INSERT INTO pagos VALUES (5, 2, 10, 2024, 'mensual', 0)")
+            assert False, "la clave única debió rechazar el duplicado"
+        except sqlite3.IntegrityError:
+            pass
+        conn.close()
+
+if __name__ == "__main__":
+    test_recalculo_sobrescribe()
+    test_script_elimina_duplicados()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Probar el perfil de base de datos: en producción cada conexión usa WAL,
+busy_timeout y los PRAGMAs ajustados; en desarrollo SQLite no cambia
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import tempfile
+from flask import Flask
+from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.pool import QueuePool
+
+from config import aplicar_perfil_bd, registrar_pragmas_sqlite, PRAGMAS_SQLITE_PRODUCCION
+
+def crear_app_perfil(ruta_bd, perfil):
+    """Aplicación con su propia base de datos en archivo y el perfil indicado"""
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{ruta_bd}'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    aplicar_perfil_bd(app, perfil)
+    db = SQLAlchemy(app)
+    registrar_pragmas_sqlite(app, db)
+    return app, db
+
+def leer_pragmas(db):
+    """Valores de los PRAGMAs en dos conexiones distintas del pool"""
+    valores = []
+    with db.engine.connect() as primera, db.engine.connect() as segunda:
+        for conexion in (primera, segunda):
+            valores.append({
+                nombre: conexion.exec_driver_sql(f"PRAGMA {nombre}").scalar()
+                for nombre in ('journal_mode', 'busy_timeout', 'synchronous', 'cache_size', 'mmap_size')
+            })
+    return valores
+
+def test_perfil_produccion():
+    """Cada conexión del perfil de producción aplica los PRAGMAs y usa el pool"""
+    with tempfile.TemporaryDirectory() as carpeta:
+        app, db = crear_app_perfil(os.path.join(carpeta, 'prod.db'), 'production')
+        with app.app_context():
+            assert isinstance(db.engine.pool, QueuePool)
+            for pragmas in leer_pragmas(db):
+                assert pragmas['journal_mode'] == 'wal'
+                assert pragmas['busy_timeout'] == PRAGMAS_SQLITE_PRODUCCION['busy_timeout']
+                assert pragmas['synchronous'] == 1  # NORMAL
+                assert pragmas['cache_size'] == PRAGMAS_SQLITE_PRODUCCION['cache_size']
+                assert pragmas['mmap_size'] == PRAGMAS_SQLITE_PRODUCCION['mmap_size']
+            db.engine.dispose()
+
+def test_perfil_desarrollo_sin_cambios():
+    """El perfil por defecto no cambia el modo de diario de la base de datos"""
+    with tempfile.TemporaryDirectory() as carpeta:
+        app, db = crear_app_perfil(os.path.join(carpeta, 'dev.db'), 'default')
+        with app.app_context():
+            for pragmas in leer_pragmas(db):
+                assert pragmas['journal_mode'] == 'delete'
+            db.engine.dispose()
+
+if __name__ == "__main__":
+    test_perfil_produccion()
+    test_perfil_desarrollo_sin_cambios()
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Probar el listado paginado de personal: las páginas por clave (apellidos, id)
+recorren a todo el personal sin repetir filas, los filtros se resuelven en
+la base de datos con índices y cada página cuesta lo mismo
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from datetime import date
+from urllib.parse import urlencode
+from flask import render_template
+
+import app_completo
+from app_completo import db, Empresa, Empleado, Locador
+from paginacion import leer_filtros_personal, paginar_personal, contar_personal, decodificar_cursor
+from test_planilla_guardada import crear_app_prueba
+from test_dashboard import contar_consultas
+
+APELLIDOS = ['Quispe', 'Mamani', 'García', 'Flores', 'Rojas']
+
+def poblar_personal(cantidad):
+    """Empresa con empleados de apellidos repetidos, bancos y tipos de pago variados"""
+    empresa = Empresa(nombre='Empresa Grande', ruc='20123456789', regimen_laboral='general')
+    db.session.add(empresa)
+    db.session.flush()
+    for i in range(cantidad):
+        db.session.add(Empleado(
+            empresa_id=empresa.id, nombres=f'Nombre{i}', apellidos=APELLIDOS[i % len(APELLIDOS)],
+            dni=f'{40000000 + i}', sueldo_base=1500.0, fecha_ingreso=date(2023, 1, 1),
+            banco='BCP' if i % 2 else 'Interbank', tipo_pago='quincenal' if i % 3 == 0 else 'mensual',
+            activo=i % 10 != 9))
+    for i in range(3):
+        db.session.add(Locador(empresa_id=empresa.id, nombres=f'Loc{i}', apellidos='Torres', dni=f'5000000{i}',
+                               monto_mensual=2000.0, fecha_inicio=date(2024, 1, 1), banco='BCP'))
+    db.session.commit()
+    return empresa.id
+
+def recorrer(modelo, empresa_id, filtros, por_pagina):
+    """Lee todas las páginas y retorna los ids en orden y la cantidad de páginas"""
+    ids, paginas, cursor = [], 0, None
+    while True:
+        registros, cursor = paginar_personal(modelo, empresa_id, filtros, cursor, por_pagina)
+        ids.extend(registro.id for registro in registros)
+        paginas += 1
+        if not cursor:
+            return ids, paginas
+
+def test_recorrido_por_paginas():
+    """Las páginas siguen el orden (apellidos, id) sin saltos ni repetidos"""
+    app = crear_app_prueba()
+    with app.app_context():
+        db.create_all()
+        empresa_id = poblar_personal(95)
+
+        filtros = leer_filtros_personal({})
+        ids, paginas = recorrer(Empleado, empresa_id, filtros, 20)
+        esperados = [empleado.id for empleado in Empleado.query.filter_by(empresa_id=empresa_id, activo=True)
+                     .order_by(Empleado.apellidos, Empleado.id)]
+        print(f"   ✓ {len(ids)} empleados activos en {paginas} páginas")
+        assert ids == esperados
+        assert paginas == 5
+
+        todos, _ = recorrer(Empleado, empresa_id, leer_filtros_personal({'activo': 'todos'}), 20)
+        assert len(todos) == 95
+
+        # Un cursor inválido vuelve a la primera página
+        assert decodificar_cursor('no-es-un-cursor') is None
+        primera, _ = paginar_personal(Empleado, empresa_id, filtros, 'no-es-un-cursor', 20)
+        assert [empleado.id for empleado in primera] == esperados[:20]
+
+        # Cada página cuesta una consulta, también al final del listado
+        _, cursor = paginar_personal(Empleado, empresa_id, filtros, None, 80)
+        _, consultas = contar_consultas(lambda: paginar_personal(Empleado, empresa_id, filtros, cursor, 80))
+        assert consultas == 1
+        db.drop_all()
+
+def test_filtros_en_servidor():
+    """Los filtros combinados devuelven solo las filas que cumplen todos"""
+    app = crear_app_prueba()
+    with app.app_context():
+        db.create_all()
+        empresa_id = poblar_personal(30)
+
+        def buscar(modelo, **args):
+            registros, _ = paginar_personal(modelo, empresa_id, leer_filtros_personal(args), None, 100)
+            return registros
+
+        assert {empleado.apellidos for empleado in buscar(Empleado, nombre='garc')} == {'García'}
+        assert sorted(empleado.dni for empleado in buscar(Empleado, dni='4000001')) == \
+            [f'4000001{i}' for i in range(9)]
+        quincenales_bcp = buscar(Empleado, banco='BCP', tipo_pago='quincenal')
+        assert quincenales_bcp and all(e.banco == 'BCP' and e.tipo_pago == 'quincenal' and e.activo
+                                       for e in quincenales_bcp)
+        assert len(buscar(Empleado, activo='0')) == 3
+        # Los locadores no tienen tipo de pago: ese filtro no los excluye
+        assert len(buscar(Locador, tipo_pago='quincenal', banco='BCP')) == 3
+        db.drop_all()
+
+def test_planes_con_indices():
+    """El orden y los filtros por nombre y DNI usan los índices por empresa"""
+    app = crear_app_prueba()
+    with app.app_context():
+        db.create_all()
+        empresa_id = poblar_personal(10)
+
+        def plan(filtros):
+            from paginacion import filtrar_personal
+            consulta = (filtrar_personal(Empleado.query.filter(Empleado.empresa_id == empresa_id),
+                                         Empleado, filtros)
+                        .order_by(Empleado.apellidos, Empleado.id).limit(51))
+            sql = str(consulta.statement.compile(db.engine, compile_kwargs={'literal_binds': True}))
+            return ' '.join(fila[-1] for fila in db.session.execute(db.text(f"EXPLAIN QUERY PLAN {sql}")))
+
+        assert 'ix_empleados_empresa_apellidos' in plan({'activo': '1'})
+        assert 'TEMP B-TREE' not in plan({'activo': '1'})
+        assert 'ix_empleados_empresa_dni' in plan({'dni': '4000'})
+        # Por nombre el planificador recorre el índice ordenado de la empresa (sin ordenar en memoria)
+        plan_nombre = plan({'nombre': 'Ro'})
+        assert 'USING INDEX ix_empleados_empresa_' in plan_nombre and 'SCAN empleados' not in plan_nombre
+        db.drop_all()
+
+def test_plantilla_con_paginacion():
+    """La plantilla muestra los totales, los filtros y los enlaces con los cursores de ambas pestañas"""
+    app = crear_app_prueba()
+    with app.app_context():
+        db.create_all()
+        empresa_id = poblar_personal(8)
+        empresa = Empresa.query.get(empresa_id)
+        filtros = leer_filtros_personal({'banco': 'BCP'})
+        empleados, siguiente = paginar_personal(Empleado, empresa_id, filtros, None, 2)
+        locadores, siguiente_locadores = paginar_personal(Locador, empresa_id, filtros, None, 2)
+        totales, consultas = contar_consultas(lambda: contar_personal(empresa_id, filtros, Empleado, Locador))
+        assert totales == (4, 3) and consultas == 1
+
+        cursor_locadores = urlencode({'locadores_despues': siguiente_locadores})
+        with app_completo.app.test_request_context(f'/personal/{empresa_id}?{cursor_locadores}'):
+            html = render_template('personal.html', empresa=empresa, empleados=empleados, locadores=locadores,
+                                   filtros=filtros, siguiente_empleados=siguiente, siguiente_locadores=None,
+                                   total_empleados=totales[0], total_locadores=totales[1])
+        assert 'Empleados (4)' in html and 'Locadores (3)' in html
+        assert '<h4 class="text-primary">4</h4>' in html
+        assert f'empleados_despues={siguiente}' in html
+        # El enlace de empleados conserva la página actual de locadores
+        assert cursor_locadores in html
+        assert 'banco=BCP' in html
+        assert 'Siguientes locadores' not in html
+        print("   ✓ Totales con un COUNT y enlaces que conservan el cursor de la otra pestaña")
+        db.drop_all()
+
+if __name__ == "__main__":
+    test_recorrido_por_paginas()
+    test_filtros_en_servidor()
+    test_planes_con_indices()
+    test_plantilla_con_paginacion()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Probar la planilla anual en una sola pasada: consultas constantes, préstamos
+amortizados mes a mes y adelantos consumidos en su mes
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from decimal import Decimal
+from datetime import date
+
+from models import db, Empleado, Prestamo, Adelanto, Pago, PagoLocador, Planilla
+from calculadora_planilla import calcular_pagos_periodo
+from planilla_anual import calcular_planilla_anual
+from test_planilla_masiva import crear_app_prueba, poblar_empresa, contar_consultas
+
+def test_consultas_constantes():
+    """La cantidad de SELECT del año no depende del número de empleados"""
+    app = crear_app_prueba()
+    with app.app_context():
+        db.create_all()
+        chica = poblar_empresa(3)
+        grande = poblar_empresa(30)
+
+        _, consultas_chica = contar_consultas(calcular_planilla_anual, chica.id, 2024)
+        resumen, consultas_grande = contar_consultas(calcular_planilla_anual, grande.id, 2024)
+
+        print(f"   ✓ Consultas del año: {consultas_chica} (3 empleados) vs {consultas_grande} (30 empleados)")
+        assert consultas_chica == consultas_grande
+        assert resumen['totales']['total_pagos'] == 30 * 12
+        assert Pago.query.filter_by(año=2024).count() == 33 * 12
+        assert PagoLocador.query.count() == 2 * 12
+        assert Planilla.query.filter_by(empresa_id=grande.id, año=2024).count() == 12
+        db.drop_all()
+
+def test_amortizacion_y_adelantos():
+    """El préstamo se descuenta hasta agotar su saldo y el adelanto solo en su mes"""
+    app = crear_app_prueba()
+    with app.app_context():
+        db.create_all()
+        empresa = poblar_empresa(2)
+        empleado = Empleado.query.filter_by(empresa_id=empresa.id).first()
+        # Préstamo de 2023: 600 en cuotas de 50 → en 2024 solo quedan 100 (enero y febrero)
+        db.session.add(Prestamo(empleado_id=empleado.id, monto_total=Decimal('600'), monto_pendiente=Decimal('600'),
+                                cuota_mensual=Decimal('50.00'), fecha_prestamo=date(2023, 3, 1)))
+        db.session.commit()
+
+        calcular_planilla_anual(empresa.id, 2024)
+
+        pagos = {pago.mes: pago for pago in Pago.query.filter_by(empleado_id=empleado.id).all()}
+        assert pagos[1].prestamos == Decimal('100.00')
+        assert pagos[2].prestamos == Decimal('100.00')
+        assert pagos[3].prestamos == Decimal('50.00')
+        # El préstamo de enero 2024 (600 / 50) termina en diciembre
+        assert pagos[12].prestamos == Decimal('50.00')
+        assert sum(pago.prestamos for pago in pagos.values()) == Decimal('700.00')
+
+        assert pagos[10].adelantos == Decimal('80.00')
+        assert all(pago.adelantos == 0 for mes, pago in pagos.items() if mes != 10)
+        assert Adelanto.query.filter_by(aplicado=False).count() == 0
+        assert pagos[7].gratificacion > 0 and pagos[12].gratificacion > 0 and pagos[6].gratificacion == 0
+        # El saldo guardado del préstamo no se modifica
+        assert Prestamo.query.filter(Prestamo.monto_pendiente != Decimal('600')).count() == 0
+        db.drop_all()
+
+def test_coincide_con_calculo_mensual():
+    """Un mes del año coincide con el cálculo mensual de la misma empresa"""
+    app = crear_app_prueba()
+    with app.app_context():
+        db.create_all()
+        empresa = poblar_empresa(4)
+        # Sin CTS: el cálculo mensual cuenta los años de servicio a la fecha de hoy
+        empresa.regimen_laboral = 'microempresa'
+        db.session.commit()
+
+        esperados = {pago.empleado_id: pago.neto_pagar
+                     for pago in calcular_pagos_periodo(empresa.id, 10, 2024)['pagos']}
+        db.session.rollback()
+
+        resumen = calcular_planilla_anual(empresa.id, 2024)
+        octubre = {pago.empleado_id: pago.neto_pagar for pago in Pago.query.filter_by(mes=10).all()}
+        assert octubre == esperados
+        assert resumen['meses'][9]['total_empleados'] == 4
+
+        # Una segunda corrida reemplaza los pagos del año sin duplicarlos
+        calcular_planilla_anual(empresa.id, 2024)
+        assert Pago.query.count() == 4 * 12
+        db.drop_all()
+
+if __name__ == "__main__":
+    test_consultas_constantes()
+    test_amortizacion_y_adelantos()
+    test_coincide_con_calculo_mensual()
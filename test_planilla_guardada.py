@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Probar las planillas guardadas de app_completo: se reutilizan mientras los
+insumos no cambien y se genera una nueva versión cuando cambian
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from datetime import date
+from flask import Flask
+
+from config import config
+from app_completo import (db, Empresa, Empleado, Locador, Prestamo, Planilla,
+                          calcular_planilla_completa, obtener_planilla)
+
+def crear_app_prueba():
+    """Crea una aplicación con base de datos en memoria para los modelos de app_completo"""
+    app = Flask(__name__)
+    app.config.from_object(config['testing'])
+    db.init_app(app)
+    return app
+
+def test_planilla_guardada_y_versiones():
+    """La planilla se calcula una vez y se regenera solo al cambiar insumos"""
+    app = crear_app_prueba()
+    with app.app_context():
+        db.create_all()
+        empresa = Empresa(nombre='Empresa Guardada', ruc='20555555555', regimen_laboral='general')
+        db.session.add(empresa)
+        db.session.flush()
+        empleado = Empleado(empresa_id=empresa.id, nombres='Ana', apellidos='Soto', dni='11111111',
+                            sueldo_base=2000.0, fecha_ingreso=date(2022, 1, 1))
+        otra_empresa = Empresa(nombre='Otra', ruc='20666666666', regimen_laboral='microempresa')
+        db.session.add_all([empleado, otra_empresa])
+        db.session.add(Locador(empresa_id=empresa.id, nombres='Luis', apellidos='Rey', dni='22222222',
+                               monto_mensual=3000.0, fecha_inicio=date(2024, 1, 1)))
+        db.session.commit()
+
+        primera = obtener_planilla(empresa.id, 10, 2024)
+        esperado = calcular_planilla_completa(empresa.id, 10, 2024)
+        assert primera['version'] == 1
+        assert primera['totales'] == esperado['totales']
+        assert primera['empleados'][0]['neto'] == esperado['empleados'][0]['neto']
+
+        # Sin cambios se reutiliza la misma versión
+        assert obtener_planilla(empresa.id, 10, 2024)['version'] == 1
+
+        # Cambios en otra empresa no invalidan esta planilla
+        otra_empresa.telefono = '999'
+        db.session.commit()
+        assert obtener_planilla(empresa.id, 10, 2024)['version'] == 1
+
+        db.session.add(Prestamo(empleado_id=empleado.id, monto=600.0, cuotas=6, cuota_mensual=100.0,
+                                fecha_inicio=date(2024, 1, 1)))
+        db.session.commit()
+        segunda = obtener_planilla(empresa.id, 10, 2024)
+        assert segunda['version'] == 2
+        assert segunda['empleados'][0]['descuentos']['prestamos'] == 100.0
+        assert segunda['totales']['total_neto'] == primera['totales']['total_neto'] - 100.0
+        assert Planilla.query.filter_by(empresa_id=empresa.id, vigente=True).count() == 1
+        print(f"   ✓ Versiones generadas: {Planilla.query.count()}")
+        db.drop_all()
+
+def test_una_planilla_por_periodo():
+    """Empleados mensuales y quincenales comparten la versión guardada del período"""
+    app = crear_app_prueba()
+    with app.app_context():
+        db.create_all()
+        empresa = Empresa(nombre='Empresa Mixta', ruc='20777777777', regimen_laboral='general')
+        db.session.add(empresa)
+        db.session.flush()
+        db.session.add_all([
+            Empleado(empresa_id=empresa.id, nombres='Eva', apellidos='Paz', dni='33333333',
+                     sueldo_base=2000.0, fecha_ingreso=date(2022, 1, 1), tipo_pago='mensual'),
+            Empleado(empresa_id=empresa.id, nombres='Raúl', apellidos='Paz', dni='44444444',
+                     sueldo_base=2000.0, fecha_ingreso=date(2022, 1, 1), tipo_pago='quincenal'),
+        ])
+        db.session.commit()
+
+        planilla = obtener_planilla(empresa.id, 10, 2024)
+        ajustados = sorted(emp['sueldo_ajustado'] for emp in planilla['empleados'])
+        assert ajustados == [1000.0, 2000.0]
+        assert obtener_planilla(empresa.id, 10, 2024)['version'] == 1
+        assert Planilla.query.filter_by(empresa_id=empresa.id).count() == 1
+        print("   ✓ Una sola versión por período con ambos tipos de pago")
+        db.drop_all()
+
+if __name__ == "__main__":
+    test_planilla_guardada_y_versiones()
+    test_una_planilla_por_periodo()
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Probar el recálculo incremental: solo se recalculan los empleados con
+insumos modificados y los totales coinciden con un cálculo completo
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from decimal import Decimal
+from datetime import date
+
+from models import db, Empleado, Locador, Ausencia, Adelanto, Pago, PagoLocador, Planilla, Configuracion
+from calculadora_planilla import calcular_planilla_completa, recalcular_planilla
+from test_planilla_masiva import crear_app_prueba, poblar_empresa
+
+def totales_desde_pagos(empresa_id):
+    """Suma directa de los pagos vigentes del período"""
+    pagos = Pago.query.join(Empleado).filter(Empleado.empresa_id == empresa_id,
+                                             Pago.mes == 10, Pago.año == 2024).all()
+    return len(pagos), sum(pago.neto_pagar for pago in pagos)
+
+def test_recalcula_solo_modificados():
+    """Una ausencia nueva recalcula un solo empleado y corrige los totales"""
+    app = crear_app_prueba()
+    with app.app_context():
+        db.create_all()
+        db.session.add(Configuracion(clave='umbral_renta_5ta', valor='1025'))
+        empresa = poblar_empresa(10)
+        calcular_planilla_completa(empresa.id, 10, 2024)
+
+        # Sin cambios no se recalcula a nadie
+        resultado = recalcular_planilla(empresa.id, 10, 2024)
+        assert resultado['modo'] == 'incremental'
+        assert resultado['recalculados'] == []
+
+        empleado = Empleado.query.filter_by(empresa_id=empresa.id).order_by(Empleado.id).first()
+        db.session.add(Ausencia(empleado_id=empleado.id, fecha=date(2024, 10, 8), tipo='falta'))
+        db.session.commit()
+
+        resultado = recalcular_planilla(empresa.id, 10, 2024)
+        assert resultado['recalculados'] == [empleado.id]
+
+        pago = Pago.query.filter_by(empleado_id=empleado.id, mes=10, año=2024).one()
+        assert pago.dias_faltados == 2
+        # Los adelantos ya aplicados se siguen descontando
+        assert pago.adelantos == Decimal('80.00')
+
+        cantidad, neto_empleados = totales_desde_pagos(empresa.id)
+        planilla = Planilla.query.filter_by(empresa_id=empresa.id, mes=10, año=2024).one()
+        assert cantidad == planilla.total_empleados == 10
+        assert resultado['totales']['total_neto'] == float(neto_empleados + Decimal('1840.00'))
+        print(f"   ✓ Recalculado 1 de 10 empleados, neto {resultado['totales']['total_neto']}")
+        db.drop_all()
+
+def test_cambios_globales_y_bajas():
+    """La configuración marca a todos y las bajas se retiran de la planilla"""
+    app = crear_app_prueba()
+    with app.app_context():
+        db.create_all()
+        configuracion = Configuracion(clave='umbral_renta_5ta', valor='1025')
+        db.session.add(configuracion)
+        empresa = poblar_empresa(4)
+        calcular_planilla_completa(empresa.id, 10, 2024)
+
+        configuracion.valor = '900'
+        db.session.commit()
+        resultado = recalcular_planilla(empresa.id, 10, 2024)
+        assert len(resultado['recalculados']) == 4
+
+        empleados = Empleado.query.filter_by(empresa_id=empresa.id).order_by(Empleado.id).all()
+        empleados[0].activo = False
+        adelanto = Adelanto.query.filter_by(empleado_id=empleados[1].id).first()
+        adelanto.monto = Decimal('100.00')
+        db.session.commit()
+
+        resultado = recalcular_planilla(empresa.id, 10, 2024)
+        assert resultado['retirados'] == [empleados[0].id]
+        assert resultado['recalculados'] == [empleados[1].id]
+        assert resultado['totales']['total_empleados'] == 3
+        assert Pago.query.filter_by(empleado_id=empleados[1].id).one().adelantos == Decimal('100.00')
+
+        cantidad, neto_empleados = totales_desde_pagos(empresa.id)
+        assert cantidad == 3
+        assert resultado['totales']['total_neto'] == float(neto_empleados + Decimal('1840.00'))
+        db.drop_all()
+
+def neto_locadores(empresa_id):
+    """Suma de los pagos de locadores del período"""
+    pagos = PagoLocador.query.join(Locador).filter(Locador.empresa_id == empresa_id,
+                                                    PagoLocador.mes == 10, PagoLocador.año == 2024).all()
+    return len(pagos), sum(pago.neto_pagar for pago in pagos)
+
+def test_locadores_y_adelantos_de_bajas():
+    """Los cambios de locadores se reflejan y la baja libera sus adelantos aplicados"""
+    app = crear_app_prueba()
+    with app.app_context():
+        db.create_all()
+        db.session.add(Configuracion(clave='umbral_renta_5ta', valor='1025'))
+        empresa = poblar_empresa(3)
+        calcular_planilla_completa(empresa.id, 10, 2024)
+
+        # Alta, cambio de monto y baja de locadores
+        locador = Locador.query.filter_by(empresa_id=empresa.id).one()
+        locador.monto_mensual = Decimal('3000.00')
+        db.session.add(Locador(empresa_id=empresa.id, nombres='Nuevo', apellidos='Loc', dni='77777777',
+                               monto_mensual=Decimal('1000.00'), fecha_inicio=date(2024, 1, 1)))
+        db.session.commit()
+
+        resultado = recalcular_planilla(empresa.id, 10, 2024)
+        assert resultado['recalculados'] == []
+        assert resultado['totales']['total_locadores'] == 2
+        cantidad, neto = neto_locadores(empresa.id)
+        assert (cantidad, neto) == (2, Decimal('2760.00') + Decimal('1000.00'))
+        _, neto_empleados = totales_desde_pagos(empresa.id)
+        assert resultado['totales']['total_neto'] == float(neto_empleados + neto)
+
+        locador.activo = False
+        db.session.commit()
+        resultado = recalcular_planilla(empresa.id, 10, 2024)
+        assert resultado['totales']['total_locadores'] == 1
+        assert neto_locadores(empresa.id) == (1, Decimal('1000.00'))
+        assert resultado['totales']['total_neto'] == float(neto_empleados + Decimal('1000.00'))
+        print(f"   ✓ Locadores recalculados sin cambios de empleados, neto {resultado['totales']['total_neto']}")
+
+        # La baja de un empleado deja su adelanto pendiente otra vez
+        empleado = Empleado.query.filter_by(empresa_id=empresa.id).order_by(Empleado.id).first()
+        adelanto = Adelanto.query.filter_by(empleado_id=empleado.id).one()
+        assert adelanto.aplicado
+        empleado.activo = False
+        db.session.commit()
+        resultado = recalcular_planilla(empresa.id, 10, 2024)
+        assert resultado['retirados'] == [empleado.id]
+        assert not db.session.get(Adelanto, adelanto.id).aplicado
+
+        # Al reactivarlo, el adelanto se vuelve a descontar
+        empleado.activo = True
+        db.session.commit()
+        resultado = recalcular_planilla(empresa.id, 10, 2024)
+        assert resultado['recalculados'] == [empleado.id]
+        assert Pago.query.filter_by(empleado_id=empleado.id).one().adelantos == Decimal('80.00')
+        assert db.session.get(Adelanto, adelanto.id).aplicado
+        db.drop_all()
+
+if __name__ == "__main__":
+    test_recalcula_solo_modificados()
+    test_cambios_globales_y_bajas()
+    test_locadores_y_adelantos_de_bajas()
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Probar el cálculo de planillas por lote en procesos separados
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import tempfile
+from decimal import Decimal
+from datetime import date
+from flask import Flask
+
+from models import db, Empresa, Empleado, Locador, Adelanto, Pago, PagoLocador
+from planilla_lote import calcular_planillas_lote
+
+def test_lote_varias_empresas():
+    """Cada empresa se calcula aparte y un error no detiene la corrida"""
+    with tempfile.TemporaryDirectory() as directorio:
+        app = Flask(__name__)
+        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + os.path.join(directorio, 'lote.db')
+        app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+        db.init_app(app)
+
+        with app.app_context():
+            db.create_all()
+            ids = []
+            for n, regimen in enumerate(['microempresa', 'pequeña_empresa', 'general']):
+                empresa = Empresa(nombre=f'Empresa {n}', ruc=f'2010000000{n}', regimen_laboral=regimen)
+                db.session.add(empresa)
+                db.session.flush()
+                ids.append(empresa.id)
+                for i in range(4):
+                    empleado = Empleado(empresa_id=empresa.id, nombres=f'N{i}', apellidos=f'A{i}',
+                                        dni=f'{n}{i:07d}', sueldo_base=Decimal('1500.00'),
+                                        fecha_ingreso=date(2022, 3, 1))
+                    db.session.add(empleado)
+                    db.session.flush()
+                    db.session.add(Adelanto(empleado_id=empleado.id, monto=Decimal('100.00'),
+                                            fecha_adelanto=date(2024, 10, 1), mes_aplicar=10, año_aplicar=2024))
+                db.session.add(Locador(empresa_id=empresa.id, nombres='L', apellidos='L', dni=f'9{n}000000',
+                                       monto_mensual=Decimal('1800.00'), fecha_inicio=date(2024, 1, 1)))
+            db.session.commit()
+
+            # Una empresa inexistente debe reportarse como error sin afectar a las demás
+            reporte = calcular_planillas_lote(10, 2024, empresa_ids=ids + [999], procesos=2)
+
+            estados = {fila['empresa_id']: fila['estado'] for fila in reporte['empresas']}
+            print(f"   ✓ Estados: {estados}")
+            assert estados == {ids[0]: 'ok', ids[1]: 'ok', ids[2]: 'ok', 999: 'error'}
+            assert reporte['totales']['empresas_ok'] == 3
+            assert reporte['totales']['empresas_error'] == 1
+            assert all(fila['segundos_calculo'] >= 0 for fila in reporte['empresas'] if fila['estado'] == 'ok')
+
+            assert Pago.query.count() == 12
+            assert PagoLocador.query.count() == 3
+            assert Adelanto.query.filter_by(aplicado=False).count() == 0
+            assert all(pago.adelantos == Decimal('100.00') for pago in Pago.query.all())
+            db.session.remove()
+
+if __name__ == "__main__":
+    test_lote_varias_empresas()
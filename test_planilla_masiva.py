@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Probar el motor masivo de calculadora_planilla: la cantidad de consultas
+por corrida no debe depender del número de empleados
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from decimal import Decimal
+from datetime import date
+from flask import Flask
+from sqlalchemy import event
+
+from config import config
+from models import db, Empresa, Empleado, Locador, Ausencia, Prestamo, Adelanto, Pago, Configuracion
+from calculadora_planilla import calcular_planilla_completa, calcular_planilla_empleado
+
+def crear_app_prueba():
+    """Crea una aplicación con base de datos en memoria"""
+    app = Flask(__name__)
+    app.config.from_object(config['testing'])
+    db.init_app(app)
+    return app
+
+def poblar_empresa(cantidad_empleados):
+    """Crea una empresa con empleados, ausencias, préstamos y adelantos"""
+    empresa = Empresa(nombre=f'Empresa {cantidad_empleados}', ruc=f'20{cantidad_empleados:09d}',
+                      regimen_laboral='general')
+    db.session.add(empresa)
+    db.session.flush()
+
+    for i in range(cantidad_empleados):
+        empleado = Empleado(
+            empresa_id=empresa.id,
+            nombres=f'Nombre{i}',
+            apellidos=f'Apellido{i}',
+            dni=f'{i:08d}',
+            sueldo_base=Decimal('1000.00') + i,
+            fecha_ingreso=date(2020, 1, 1),
+            tipo_pension='AFP' if i % 2 else 'ONP',
+            afp_codigo='PRIMA' if i % 2 else None
+        )
+        db.session.add(empleado)
+        db.session.flush()
+        db.session.add(Ausencia(empleado_id=empleado.id, fecha=date(2024, 10, 3), tipo='falta'))
+        db.session.add(Ausencia(empleado_id=empleado.id, fecha=date(2024, 9, 3), tipo='falta'))
+        db.session.add(Prestamo(empleado_id=empleado.id, monto_total=Decimal('600'), monto_pendiente=Decimal('600'),
+                                cuota_mensual=Decimal('50.00'), fecha_prestamo=date(2024, 1, 1)))
+        db.session.add(Adelanto(empleado_id=empleado.id, monto=Decimal('80.00'), fecha_adelanto=date(2024, 10, 1),
+                                mes_aplicar=10, año_aplicar=2024))
+
+    db.session.add(Locador(empresa_id=empresa.id, nombres='Loc', apellidos='Ador', dni='99999999',
+                           monto_mensual=Decimal('2000.00'), fecha_inicio=date(2024, 1, 1)))
+    db.session.commit()
+    return empresa
+
+def contar_consultas(funcion, *args):
+    """Ejecuta la función y cuenta las sentencias SELECT emitidas"""
+    consultas = []
+
+    def registrar(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT'):
+            consultas.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', registrar)
+    try:
+        resultado = funcion(*args)
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', registrar)
+    return resultado, len(consultas)
+
+def test_consultas_constantes():
+    """La cantidad de SELECT no crece con el tamaño de la planilla"""
+    app = crear_app_prueba()
+    with app.app_context():
+        db.create_all()
+        db.session.add(Configuracion(clave='umbral_renta_5ta', valor='1025'))
+        chica = poblar_empresa(3)
+        grande = poblar_empresa(40)
+
+        _, consultas_chica = contar_consultas(calcular_planilla_completa, chica.id, 10, 2024)
+        resultado, consultas_grande = contar_consultas(calcular_planilla_completa, grande.id, 10, 2024)
+
+        print(f"   ✓ Consultas: {consultas_chica} (3 empleados) vs {consultas_grande} (40 empleados)")
+        assert consultas_chica == consultas_grande
+        assert resultado['totales']['total_empleados'] == 40
+        assert resultado['totales']['total_locadores'] == 1
+        assert Adelanto.query.filter_by(aplicado=False).count() == 0
+        db.drop_all()
+
+def test_coincide_con_calculo_individual():
+    """El motor masivo produce los mismos pagos que el cálculo por empleado"""
+    app = crear_app_prueba()
+    with app.app_context():
+        db.create_all()
+        empresa = poblar_empresa(5)
+
+        esperados = {}
+        for empleado in Empleado.query.filter_by(empresa_id=empresa.id).all():
+            pago = calcular_planilla_empleado(empleado, empresa, 10, 2024)
+            esperados[empleado.id] = pago.neto_pagar
+        # El cálculo individual marca adelantos; se restauran para la corrida masiva
+        db.session.rollback()
+
+        resultado = calcular_planilla_completa(empresa.id, 10, 2024)
+        for fila in resultado['empleados']:
+            assert fila['dias_faltados'] == 1
+            assert fila['descuentos']['prestamos'] == 50.0
+            assert fila['descuentos']['adelantos'] == 80.0
+            assert fila['neto_pagar'] == float(esperados[fila['id']])
+
+        assert Pago.query.count() == 5
+        db.drop_all()
+
+if __name__ == "__main__":
+    test_consultas_constantes()
+    test_coincide_con_calculo_individual()
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Probar la precarga de préstamos y adelantos en las planillas de app_completo
+y app_compatible: una consulta por colección (selectin) para todo el
+personal, de modo que las consultas por corrida son fijas
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from datetime import date
+from flask import Flask
+from sqlalchemy import event
+
+from config import config
+import app_completo
+import app_compatible
+
+def crear_app_prueba(db):
+    """Crea una aplicación con base de datos en memoria para los modelos de db"""
+    app = Flask(__name__)
+    app.config.from_object(config['testing'])
+    db.init_app(app)
+    return app
+
+def contar_consultas(db, funcion, *args):
+    """Ejecuta la función y cuenta las sentencias SELECT emitidas"""
+    consultas = []
+
+    def registrar(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT'):
+            consultas.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', registrar)
+    try:
+        resultado = funcion(*args)
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', registrar)
+    return resultado, len(consultas)
+
+def poblar_completo(cantidad, inicio=0):
+    """Empresa de app_completo con un préstamo y un adelanto por empleado"""
+    modelos = app_completo
+    empresa = modelos.Empresa(nombre=f'Empresa {inicio}', ruc=f'20{inicio:09d}', regimen_laboral='general')
+    modelos.db.session.add(empresa)
+    modelos.db.session.flush()
+    for i in range(cantidad):
+        empleado = modelos.Empleado(empresa_id=empresa.id, nombres=f'N{i}', apellidos=f'A{i}',
+                                    dni=f'{inicio + i:08d}', sueldo_base=1500.0, fecha_ingreso=date(2023, 1, 1))
+        modelos.db.session.add(empleado)
+        modelos.db.session.flush()
+        modelos.db.session.add_all([
+            modelos.Prestamo(empleado_id=empleado.id, monto=600.0, cuotas=6, cuota_mensual=100.0,
+                             fecha_inicio=date(2024, 1, 1)),
+            modelos.Prestamo(empleado_id=empleado.id, monto=300.0, cuotas=3, cuota_mensual=100.0,
+                             fecha_inicio=date(2023, 1, 1), activo=False),
+            modelos.Adelanto(empleado_id=empleado.id, monto=100.0, fecha=date(2024, 10, 1),
+                             descuento_mensual=50.0, meses_restantes=2),
+        ])
+    modelos.db.session.commit()
+    return empresa.id
+
+def poblar_compatible(cantidad, inicio=0):
+    """Empresa de app_compatible con ausencias, préstamos y adelantos por empleado"""
+    modelos = app_compatible
+    empresa = modelos.Empresa(nombre=f'Empresa {inicio}', ruc=f'20{inicio:09d}', regimen_laboral='general')
+    modelos.db.session.add(empresa)
+    modelos.db.session.flush()
+    for i in range(cantidad):
+        empleado = modelos.Empleado(empresa_id=empresa.id, nombres=f'N{i}', apellidos=f'A{i}',
+                                    dni=f'{inicio + i:08d}', sueldo_base=1500.0, fecha_ingreso=date(2023, 1, 1))
+        modelos.db.session.add(empleado)
+        modelos.db.session.flush()
+        modelos.db.session.add_all([
+            modelos.Ausencia(empleado_id=empleado.id, fecha=date(2024, 10, 3), tipo='falta'),
+            modelos.Ausencia(empleado_id=empleado.id, fecha=date(2024, 9, 3), tipo='falta'),
+            modelos.Prestamo(empleado_id=empleado.id, monto_total=600.0, monto_pendiente=600.0,
+                             cuota_mensual=100.0, fecha_prestamo=date(2024, 1, 1)),
+            modelos.Prestamo(empleado_id=empleado.id, monto_total=300.0, monto_pendiente=0.0,
+                             cuota_mensual=100.0, fecha_prestamo=date(2023, 1, 1), activo=False),
+            modelos.Adelanto(empleado_id=empleado.id, monto=50.0, fecha_adelanto=date(2024, 10, 1),
+                             mes_aplicar=10, año_aplicar=2024),
+            modelos.Adelanto(empleado_id=empleado.id, monto=70.0, fecha_adelanto=date(2024, 11, 1),
+                             mes_aplicar=11, año_aplicar=2024),
+        ])
+    modelos.db.session.commit()
+    return empresa.id
+
+def test_consultas_fijas_app_completo():
+    """app_completo emite las mismas consultas con 2 o con 20 empleados"""
+    db = app_completo.db
+    app = crear_app_prueba(db)
+    with app.app_context():
+        db.create_all()
+        pocos = poblar_completo(2)
+        muchos = poblar_completo(20, inicio=100)
+
+        _, consultas_pocos = contar_consultas(db, app_completo.calcular_planilla_completa, pocos, 10, 2024)
+        db.session.expire_all()
+        resultado, consultas_muchos = contar_consultas(db, app_completo.calcular_planilla_completa, muchos, 10, 2024)
+
+        print(f"   ✓ Consultas: {consultas_pocos} (2 empleados) vs {consultas_muchos} (20 empleados)")
+        assert consultas_pocos == consultas_muchos == 5
+        descuentos = resultado['empleados'][0]['descuentos']
+        assert descuentos['prestamos'] == 100.0
+        assert descuentos['adelantos'] == 50.0
+        db.drop_all()
+
+def test_consultas_fijas_app_compatible():
+    """app_compatible precarga solo las ausencias, préstamos y adelantos del período"""
+    db = app_compatible.db
+    app = crear_app_prueba(db)
+    with app.app_context():
+        db.create_all()
+        pocos = poblar_compatible(2)
+        muchos = poblar_compatible(20, inicio=100)
+
+        _, consultas_pocos = contar_consultas(db, app_compatible.calcular_planilla_simple, pocos, 10, 2024)
+        db.session.expire_all()
+        resultado, consultas_muchos = contar_consultas(db, app_compatible.calcular_planilla_simple, muchos, 10, 2024)
+
+        print(f"   ✓ Consultas: {consultas_pocos} (2 empleados) vs {consultas_muchos} (20 empleados)")
+        assert consultas_pocos == consultas_muchos == 6
+        fila = resultado['empleados'][0]
+        assert fila['dias_faltados'] == 1
+        assert fila['descuentos']['prestamos'] == 100.0
+        assert fila['descuentos']['adelantos'] == 50.0
+        db.drop_all()
+
+if __name__ == "__main__":
+    test_consultas_fijas_app_completo()
+    test_consultas_fijas_app_compatible()
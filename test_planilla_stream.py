@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Probar el cálculo de planilla como flujo de filas: mismos resultados que
+calcular_planilla_completa y memoria pico constante con el tamaño
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import tracemalloc
+from decimal import Decimal
+from datetime import date
+
+from models import db, Empresa, Empleado, Locador, Adelanto, Pago, Planilla
+from calculadora_planilla import calcular_planilla_completa, iterar_planilla
+from test_planilla_masiva import crear_app_prueba, poblar_empresa
+
+def poblar_empresa_masiva(cantidad):
+    """Crea una empresa grande con inserciones en bloque"""
+    empresa = Empresa(nombre=f'Masiva {cantidad}', ruc=f'30{cantidad:09d}', regimen_laboral='general')
+    db.session.add(empresa)
+    db.session.flush()
+    db.session.bulk_insert_mappings(Empleado, [{
+        'empresa_id': empresa.id, 'nombres': f'N{i}', 'apellidos': f'A{i}', 'dni': f'{i:08d}',
+        'sueldo_base': Decimal('1200.00') + i % 500, 'fecha_ingreso': date(2019, 3, 1),
+        'tipo_pension': 'ONP'
+    } for i in range(cantidad)])
+    db.session.commit()
+    return empresa.id
+
+def memoria_pico(empresa_id):
+    """Memoria pico (bytes) al recorrer la planilla completa sin guardar"""
+    tracemalloc.start()
+    filas = 0
+    for registro in iterar_planilla(empresa_id, 10, 2024, tamaño_lote=100):
+        filas += 1
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return filas, pico
+
+def test_flujo_igual_a_calculo_completo():
+    """Las filas y totales del flujo coinciden con el cálculo completo"""
+    app = crear_app_prueba()
+    with app.app_context():
+        db.create_all()
+        empresa = poblar_empresa(12)
+
+        registros = list(iterar_planilla(empresa.id, 10, 2024, tamaño_lote=5))
+        # Sin guardar no se escribe nada
+        assert Pago.query.count() == 0
+        assert Adelanto.query.filter_by(aplicado=True).count() == 0
+
+        resultado = calcular_planilla_completa(empresa.id, 10, 2024)
+        filas = [registro['fila'] for registro in registros]
+        assert filas == resultado['empleados'] + resultado['locadores']
+        assert registros[-1]['totales'] == resultado['totales']
+        assert registros[0]['totales']['total_empleados'] == 1
+        db.drop_all()
+
+def test_flujo_guardando_por_lotes():
+    """Con guardar=True se escriben pagos, adelantos aplicados y el resumen"""
+    app = crear_app_prueba()
+    with app.app_context():
+        db.create_all()
+        empresa = poblar_empresa(7)
+
+        ultimo = None
+        for registro in iterar_planilla(empresa.id, 10, 2024, guardar=True, tamaño_lote=3):
+            ultimo = registro
+        assert Pago.query.count() == 7
+        assert Adelanto.query.filter_by(aplicado=False).count() == 0
+        planilla = Planilla.query.filter_by(empresa_id=empresa.id, mes=10, año=2024).one()
+        assert float(planilla.total_neto) == ultimo['totales']['total_neto']
+        db.drop_all()
+
+def test_memoria_constante():
+    """La memoria pico no crece con la cantidad de empleados"""
+    app = crear_app_prueba()
+    with app.app_context():
+        db.create_all()
+        chica = poblar_empresa_masiva(300)
+        grande = poblar_empresa_masiva(3000)
+
+        filas_chica, pico_chica = memoria_pico(chica)
+        filas_grande, pico_grande = memoria_pico(grande)
+        print(f"   ✓ Pico: {pico_chica // 1024} KB ({filas_chica} filas) vs "
+              f"{pico_grande // 1024} KB ({filas_grande} filas)")
+        assert filas_grande == 3000
+        assert pico_grande < pico_chica * 2
+        db.drop_all()
+
+if __name__ == "__main__":
+    test_flujo_igual_a_calculo_completo()
+    test_flujo_guardando_por_lotes()
+    test_memoria_constante()
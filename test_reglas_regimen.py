@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Probar las reglas compiladas por régimen laboral: mismos montos que las
+cadenas de condiciones que reemplazan, en cada versión del sistema
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from decimal import Decimal
+from datetime import date
+
+from reglas_regimen import ReglasRegimen, compilar_reglas
+from calculadora_planilla import REGLAS_REGIMEN, obtener_reglas_regimen, calcular_beneficios_sociales
+import app_completo
+import app_funcional
+
+class Registro:
+    """Objeto simple con los atributos que leen los cálculos"""
+    def __init__(self, **atributos):
+        self.__dict__.update(atributos)
+
+def test_reglas_calculadora():
+    """Las reglas de calculadora_planilla reproducen los montos por régimen"""
+    general = REGLAS_REGIMEN['general']
+    # 2000.00 soles, 3 años de servicio, julio
+    assert general.beneficios(200000, 7, 3) == (16667, 1500000, 218000, 0)
+    assert general.beneficios(100000, 5, 1) == (8333, 250000, 0, 10250)
+    assert REGLAS_REGIMEN['pequeña_empresa'].beneficios(100000, 12, 2) == (4167, 250000, 50000, 10250)
+    assert REGLAS_REGIMEN['microempresa'].beneficios(100000, 12, 2) == (4167, 0, 0, 0)
+    assert not REGLAS_REGIMEN['microempresa'].usa_años_servicio
+    assert obtener_reglas_regimen('desconocido').beneficios(100000, 7) == (0, 0, 0, 0)
+
+    empresa = Registro(regimen_laboral='general')
+    empleado = Registro(sueldo_base=Decimal('2000.00'), fecha_ingreso=date(2020, 3, 1))
+    beneficios = calcular_beneficios_sociales(empleado, empresa, 7, 2024, date(2024, 7, 31))
+    assert beneficios == {
+        'vacaciones': Decimal('166.67'),
+        'cts': Decimal('20000.00'),
+        'gratificacion': Decimal('2180.00'),
+        'asignacion_familiar': Decimal('0.00')
+    }
+
+def test_reglas_por_version():
+    """Cada versión conserva su propia tabla de factores"""
+    assert app_completo.REGLAS_REGIMEN['pequeña_empresa'].beneficios(100000, 7) == (4110, 4110, 50000, 10250)
+    assert app_completo.REGLAS_REGIMEN['general'].beneficios(100000, 3) == (8219, 100000, 0, 10250)
+    assert app_completo.REGLAS_REGIMEN['microempresa'].beneficios(100000, 7) == (0, 0, 0, 0)
+    assert app_funcional.REGLAS_REGIMEN['pequeña_empresa'].beneficios(100000, 3) == (4167, 125000, 0, 10250)
+    assert app_funcional.REGLAS_REGIMEN['microempresa'].beneficios(100000, 12) == (4167, 0, 0, 0)
+    assert app_funcional.REGLAS_OTRO_REGIMEN.beneficios(100000, 12) == (8333, 100000, 0, 0)
+
+def test_nuevo_regimen():
+    """Agregar un régimen no cambia las reglas de los existentes"""
+    tabla = {
+        'general': {'vacaciones': (30, 360), 'cts': (1, 1)},
+        'agrario': {'vacaciones': (30, 360), 'gratificacion': (1, 6)}
+    }
+    reglas = compilar_reglas(tabla)
+    assert isinstance(reglas['agrario'], ReglasRegimen)
+    assert reglas['agrario'].beneficios(120000, 12) == (10000, 0, 20000, 0)
+    assert reglas['general'].beneficios(120000, 12) == (10000, 120000, 0, 0)
+
+if __name__ == "__main__":
+    test_reglas_calculadora()
+    test_reglas_por_version()
+    test_nuevo_regimen()
@@ -0,0 +1,233 @@
+"""
+Worker de Cargas Masivas
+Procesa en segundo plano los archivos de personal encolados por
+cargar_excel (tabla trabajos_carga de app_completo.py). Cada worker toma el
+siguiente trabajo pendiente con un UPDATE condicional (solo uno puede pasarlo
+de 'pendiente' a 'procesando'), lo importa en bloques con carga_masiva y
+actualiza filas procesadas y errores tras cada bloque para /estado_carga.
+
+La reserva vence: si un worker muere, su trabajo deja de avanzar y, pasado
+TIEMPO_RESERVA sin bloques confirmados, vuelve a la cola (o queda en 'error'
+tras MAXIMO_INTENTOS tomas).
+
+Uso: python worker_carga.py [--procesos N] [--una-vez]
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import socket
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, update, func
+
+from app_completo import app, db, TrabajoCarga, asegurar_tablas_planilla
+from carga_masiva import importar_archivo, errores_carga, TAMAÑO_CHUNK_CARGA
+
+# Segundos de espera entre consultas cuando la cola está vacía
+INTERVALO_COLA = 2.0
+
+# Errores de fila que se guardan con el trabajo (el total se cuenta aparte)
+MAXIMO_DETALLE_ERRORES = 50
+
+# Segundos sin avance tras los cuales un trabajo 'procesando' se da por abandonado
+TIEMPO_RESERVA = 600
+
+# Tomas de un mismo trabajo antes de marcarlo como 'error'
+MAXIMO_INTENTOS = 3
+
+class ReservaPerdida(Exception):
+    """El trabajo venció y fue devuelto a la cola mientras este worker lo procesaba"""
+
+def identificador_worker():
+    """Identificador único de cada toma de trabajo (equipo, proceso y sufijo aleatorio)"""
+    return f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}'
+
+def liberar_vencidos(tiempo_reserva=TIEMPO_RESERVA, ahora=None):
+    """
+    Devuelve a la cola los trabajos cuyo worker dejó de informar avance
+
+    Un trabajo 'procesando' vence cuando su último bloque confirmado (o su
+    toma, si aún no confirmó ninguno) es más antiguo que tiempo_reserva. Si
+    ya se tomó MAXIMO_INTENTOS veces pasa a 'error'; si no, vuelve a
+    'pendiente' para que otro worker lo retome.
+
+    Returns:
+        cantidad de trabajos liberados
+    """
+    ahora = ahora or datetime.utcnow()
+    tabla = TrabajoCarga.__table__
+    vencido = (
+        (tabla.c.estado == 'procesando')
+        & (func.coalesce(tabla.c.fecha_avance, tabla.c.fecha_inicio) < ahora - timedelta(seconds=tiempo_reserva))
+    )
+    fallidos = db.session.execute(
+        update(tabla)
+        .where(vencido, func.coalesce(tabla.c.intentos, 0) >= MAXIMO_INTENTOS)
+        .values(estado='error', fecha_fin=ahora,
+                mensaje=f'El worker dejó de responder {MAXIMO_INTENTOS} veces; revise el archivo y vuelva a cargarlo')
+    )
+    reencolados = db.session.execute(
+        update(tabla)
+        .where(vencido)
+        .values(estado='pendiente', worker=None, mensaje='Reencolado: el worker anterior dejó de responder')
+    )
+    db.session.commit()
+    return fallidos.rowcount + reencolados.rowcount
+
+def tomar_trabajo(worker=None):
+    """
+    Reserva el trabajo pendiente más antiguo para este worker
+
+    El UPDATE solo cambia la fila si sigue 'pendiente', por lo que dos
+    workers nunca toman el mismo trabajo; el que pierde no actualiza nada.
+    Antes de buscar, los trabajos con la reserva vencida vuelven a la cola.
+
+    Returns:
+        TrabajoCarga reservado o None si la cola está vacía
+    """
+    asegurar_tablas_planilla(db.session.connection())
+    liberar_vencidos()
+    worker = worker or identificador_worker()
+    tabla = TrabajoCarga.__table__
+    siguiente = (
+        select(tabla.c.id)
+        .where(tabla.c.estado == 'pendiente')
+        .order_by(tabla.c.id)
+        .limit(1)
+        .scalar_subquery()
+    )
+    resultado = db.session.execute(
+        update(tabla)
+        .where(tabla.c.id == siguiente, tabla.c.estado == 'pendiente')
+        .values(estado='procesando', worker=worker, fecha_inicio=datetime.utcnow(), fecha_avance=None,
+                intentos=func.coalesce(tabla.c.intentos, 0) + 1)
+    )
+    db.session.commit()
+    if not resultado.rowcount:
+        return None
+    return TrabajoCarga.query.filter_by(worker=worker, estado='procesando').first()
+
+def _renovar_reserva(trabajo_id, worker):
+    """Extiende la reserva del trabajo si este worker aún la tiene"""
+    tabla = TrabajoCarga.__table__
+    resultado = db.session.execute(
+        update(tabla)
+        .where(tabla.c.id == trabajo_id, tabla.c.worker == worker, tabla.c.estado == 'procesando')
+        .values(fecha_avance=datetime.utcnow())
+    )
+    return bool(resultado.rowcount)
+
+def _actualizar_avance(trabajo, resumen):
+    """Copia el resumen parcial de la carga al trabajo"""
+    trabajo.total_filas = resumen['total']
+    trabajo.filas_procesadas = resumen['filas']
+    trabajo.empleados = resumen['empleados']
+    trabajo.locadores = resumen['locadores']
+    trabajo.creados = resumen['creados']
+    trabajo.actualizados = resumen['actualizados']
+    trabajo.sin_cambios = resumen['sin_cambios']
+    errores = errores_carga(resumen)
+    trabajo.errores = len(errores)
+    trabajo.detalle_errores = json.dumps(errores[:MAXIMO_DETALLE_ERRORES])
+
+def procesar_trabajo(trabajo, tamaño_chunk=TAMAÑO_CHUNK_CARGA):
+    """
+    Importa el archivo de un trabajo reservado y registra el resultado
+
+    El avance se confirma tras cada bloque y renueva la reserva; si la
+    carga falla, los bloques ya escritos se mantienen y el trabajo queda en
+    'error' con el motivo. Si la reserva venció y otro worker retomó el
+    trabajo, este se detiene sin modificarlo. El archivo subido se elimina
+    al terminar.
+    """
+    # Cada bloque confirmado recarga el trabajo: el dueño se fija antes de empezar
+    trabajo_id, worker = trabajo.id, trabajo.worker
+
+    def progreso(resumen):
+        if not _renovar_reserva(trabajo_id, worker):
+            raise ReservaPerdida(trabajo.id)
+        _actualizar_avance(trabajo, resumen)
+        db.session.commit()
+
+    try:
+        resumen = importar_archivo(db, trabajo.empresa_id, trabajo.ruta_archivo, tamaño_chunk, progreso,
+                                   trabajo.modo or 'insertar')
+    except ReservaPerdida:
+        db.session.rollback()
+        db.session.refresh(trabajo)
+        return trabajo
+    except Exception as e:
+        db.session.rollback()
+        trabajo.estado = 'error'
+        trabajo.mensaje = str(e)[:500]
+        trabajo.fecha_fin = datetime.utcnow()
+        db.session.commit()
+        return trabajo
+
+    _actualizar_avance(trabajo, resumen)
+    trabajo.total_filas = resumen['filas']
+    trabajo.estado = 'terminado'
+    trabajo.mensaje = (f"{resumen['empleados']} empleados y {resumen['locadores']} locadores: "
+                       f"{resumen['creados']} nuevos, {resumen['actualizados']} actualizados y "
+                       f"{resumen['sin_cambios']} sin cambios en {resumen['segundos']} s")
+    for hoja in resumen['hojas'].values():
+        if hoja['errores']:
+            trabajo.mensaje += f"; {hoja['hoja']}: no se registró (corrija {len(hoja['errores'])} filas)"
+        else:
+            trabajo.mensaje += f"; {hoja['hoja']}: {hoja['insertados']} registros"
+    trabajo.fecha_fin = datetime.utcnow()
+    db.session.commit()
+    if os.path.exists(trabajo.ruta_archivo):
+        os.remove(trabajo.ruta_archivo)
+    return trabajo
+
+def ejecutar_worker(intervalo=INTERVALO_COLA, una_vez=False):
+    """
+    Procesa trabajos de la cola hasta que se interrumpa
+
+    Args:
+        intervalo: segundos de espera cuando no hay trabajos pendientes
+        una_vez: termina en cuanto la cola queda vacía
+
+    Returns:
+        cantidad de trabajos procesados
+    """
+    procesados = 0
+    while True:
+        trabajo = tomar_trabajo()
+        if trabajo is None:
+            if una_vez:
+                return procesados
+            time.sleep(intervalo)
+            continue
+        print(f"  Carga #{trabajo.id} ({trabajo.nombre_archivo}) en proceso {os.getpid()}")
+        procesar_trabajo(trabajo)
+        print(f"  Carga #{trabajo.id}: {trabajo.estado} - {trabajo.mensaje}")
+        procesados += 1
+
+def _proceso_worker(intervalo, una_vez):
+    """Punto de entrada de cada proceso: conexiones propias, no heredadas del padre"""
+    with app.app_context():
+        db.engine.dispose()
+        ejecutar_worker(intervalo, una_vez)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Procesa la cola de cargas masivas de personal')
+    parser.add_argument('--procesos', type=int, default=1, help='procesos worker en paralelo')
+    parser.add_argument('--intervalo', type=float, default=INTERVALO_COLA, help='segundos entre consultas a la cola')
+    parser.add_argument('--una-vez', action='store_true', help='terminar cuando la cola quede vacía')
+    argumentos = parser.parse_args()
+
+    print(f"✓ Worker de cargas iniciado ({argumentos.procesos} procesos)")
+    procesos = [
+        multiprocessing.Process(target=_proceso_worker, args=(argumentos.intervalo, argumentos.una_vez))
+        for _ in range(max(1, argumentos.procesos))
+    ]
+    for proceso in procesos:
+        proceso.start()
+    for proceso in procesos:
+        proceso.join()